@@ -4,14 +4,12 @@ Gem Holding © 2025
 """
 
 import streamlit as st
-import ccxt
-import pandas as pd
 from datetime import datetime
 from config import TOP_COINS, TIMEFRAMES, USERS, PAGE_CONFIG, COMPANY_NAME, COMPANY_LOGO, WATERMARK_TEXT, ACTION_LABELS, SIGNAL_ICONS
-from pattern_detector import PatternDetector
 from chart_utils import ChartGenerator
 from translations import get_pattern_name_vi, get_action_text
 from admin_panel import admin_panel, load_users
+from scan_service import ScanService
 
 # Page config
 st.set_page_config(**PAGE_CONFIG)
@@ -42,6 +40,11 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+@st.cache_resource
+def get_scan_service():
+    """One scan service (exchange client, worker pool, result cache) for all sessions"""
+    return ScanService()
+
 def check_password():
     """Login form"""
     if 'authenticated' in st.session_state and st.session_state.authenticated:
@@ -163,15 +166,20 @@ def main():
     st.markdown("---")
     
     if scan_button:
+        st.session_state.scan_results = run_scan(selected_coins, timeframe, sensitivity)
+        st.session_state.scan_time = datetime.now()
+
+    # Kept in the session so opening a chart (a rerun) does not rescan
+    if 'scan_results' in st.session_state:
+        results = st.session_state.scan_results
         st.markdown("### 📊 Scan Results")
         col1, col2 = st.columns(2)
         with col1:
-            st.info(f"🕐 {datetime.now().strftime('%H:%M:%S')}")
+            st.info(f"🕐 {st.session_state.scan_time.strftime('%H:%M:%S')}")
         with col2:
-            st.success("✅ Found: 0")
+            st.success(f"✅ Found: {len(results)}")
         
         st.markdown("---")
-        results = run_scan(selected_coins, timeframe, sensitivity)
         
         if results:
             display_results(results)
@@ -184,76 +192,31 @@ def run_scan(coins, timeframe, sensitivity):
     progress = st.progress(0)
     status = st.empty()
 
-    tf_mapping = {
-        "15 phút": "15m",
-        "1 giờ": "1h",
-        "4 giờ": "4h",
-        "1 ngày": "1d"
-    }
+    actual_tf = TIMEFRAMES.get(timeframe, "15m")
 
-    actual_tf = tf_mapping.get(timeframe, "15m")
-    
     try:
-        # SWITCH TO BINANCE - more stable than OKX
-        exchange = ccxt.binance({'enableRateLimit': True})
-        st.success("✅ Connected to Binance exchange")
+        report = get_scan_service().scan(
+            coins, actual_tf, sensitivity,
+            progress=lambda done, total: progress.progress(done / total)
+        )
     except Exception as e:
         st.error(f"❌ Exchange error: {e}")
         return []
-    
-    detector = PatternDetector(sensitivity=sensitivity)
-    results = []
-    
-    for idx, coin in enumerate(coins):
-        try:
-            status.text(f"🔍 {coin} ({idx+1}/{len(coins)})")
-
-            # FIX: Wrap fetch in try-except to handle CCXT/OKX parsing errors
-            try:
-                ohlcv = exchange.fetch_ohlcv(coin, actual_tf, limit=200)
-            except TypeError as te:
-                if "NoneType" in str(te):
-                    st.warning(f"⚠️ {coin}: OKX API issue - SKIPPING")
-                    progress.progress((idx + 1) / len(coins))
-                    continue
-                else:
-                    raise
 
-            df = pd.DataFrame(ohlcv, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
-            df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
+    for coin, error in report.errors.items():
+        st.error(f"❌ {coin}: {error}")
 
-            patterns = detector.detect_all_patterns(df)
-
-            if patterns:
-                for p in patterns:
-                    results.append({
-                        'coin': coin,
-                        'pattern': p.get('pattern', 'Unknown'),
-                        'signal': p.get('type', 'Neutral'),
-                        'confidence': p.get('confidence', 0),
-                        'entry': p.get('entry', 0),
-                        'stop_loss': p.get('stop_loss', 0),
-                        'take_profits': p.get('take_profits', []),
-                        'df': df
-                    })
-
-            progress.progress((idx + 1) / len(coins))
-
-        except Exception as e:
-            st.error(f"❌ {coin}: {str(e)}")
-            import traceback
-            st.code(traceback.format_exc())
-    
-    status.text(f"✅ Done! Found {len(results)} patterns")
+    status.text(f"✅ Done! Found {len(report.results)} patterns in {report.seconds:.1f}s "
+                f"({report.fetched} fetched, {report.cached + report.shared} from cache)")
     progress.progress(1.0)
-    return results
+    return report.results
 
 def display_results(results):
     """Display scan results"""
     st.markdown("---")
     st.markdown("### 🎯 Pattern Details with Charts")
 
-    for result in results:
+    for idx, result in enumerate(results):
         try:
             # SAFETY: Ensure all required fields exist and are not None
             if 'type' not in result:
@@ -272,18 +235,19 @@ def display_results(results):
                 col1, col2 = st.columns([2, 1])
 
                 with col1:
-                    # Chart - FIX: capture signals and pass correct dict structure
-                    chart_gen = ChartGenerator()
-                    fig, signals = chart_gen.create_pattern_chart(
-                        result['df'],
-                        {
-                            'pattern': result['pattern'],
-                            'type': result['type'],
-                            'confidence': result['confidence']
-                        },
-                        result['coin']
-                    )
-                    st.plotly_chart(fig, use_container_width=True)
+                    # Candles are loaded only when the chart is opened
+                    if st.toggle("📈 Chart", key=f"chart_{idx}_{result['coin']}_{result['pattern']}"):
+                        chart_gen = ChartGenerator()
+                        fig, _ = chart_gen.create_pattern_chart(
+                            get_scan_service().chart_data(result),
+                            {
+                                'pattern': result['pattern'],
+                                'type': result['type'],
+                                'confidence': result['confidence']
+                            },
+                            result['coin']
+                        )
+                        st.plotly_chart(fig, use_container_width=True)
 
                 with col2:
                     st.markdown(f"""
@@ -297,10 +261,10 @@ def display_results(results):
                     </div>
                     """, unsafe_allow_html=True)
 
-                    # FIX: Use calculated signals instead of placeholder zeros
-                    entry_price = signals['entry']['price']
-                    stop_loss = signals['stop_loss']
-                    take_profits = signals['take_profit']
+                    # Trade levels are computed by the scan (ChartGenerator.calculate_signals)
+                    entry_price = result['entry']
+                    stop_loss = result['stop_loss']
+                    take_profits = result['take_profits']
 
                     st.metric("🎯 Entry", f"${entry_price:,.2f}")
                     st.metric("🛑 Stop Loss", f"${stop_loss:,.2f}")
@@ -75,9 +75,18 @@ async def detailed_health_check() -> Dict[str, Any]:
 @router.get("/metrics")
 async def metrics() -> Dict[str, Any]:
     """Prometheus-compatible metrics endpoint"""
+    from ..services.knowledge_service import knowledge_service
+
+    cache = knowledge_service.cache.stats()
     return {
         "gem_websocket_connections_total": 0,
         "gem_offline_queue_pending": 0,
         "gem_offline_queue_processing": 0,
         "gem_offline_queue_dead_letter": 0,
+        "gem_knowledge_cache_exact_hits": cache["exact_hits"],
+        "gem_knowledge_cache_semantic_hits": cache["semantic_hits"],
+        "gem_knowledge_cache_embedding_hits": cache["embedding_hits"],
+        "gem_knowledge_cache_misses": cache["misses"],
+        "gem_knowledge_cache_hit_rate": cache["hit_rate"],
+        "gem_knowledge_cache_invalidations": cache["invalidations"],
     }
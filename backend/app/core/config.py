@@ -69,6 +69,19 @@ class Settings(BaseSettings):
     HANDOFF_AUTO_ASSIGN: bool = True  # Auto-assign to available agents
     HANDOFF_DEFAULT_PRIORITY: str = "normal"  # Default priority level
 
+    # Knowledge Retrieval (RAG)
+    OPENAI_EMBEDDING_MODEL: str = "text-embedding-3-small"  # Must match ingestion
+    KNOWLEDGE_LOCAL_INDEX: bool = True  # False = always query search_knowledge RPC
+    KNOWLEDGE_INDEX_PATH: str = ""  # Vector index snapshot dir (empty = build in memory)
+    KNOWLEDGE_INDEX_REFRESH: int = 300  # seconds between syncs with ai_knowledge_chunks
+    KNOWLEDGE_MATCH_THRESHOLD: float = 0.7  # Minimum cosine similarity
+    KNOWLEDGE_MAX_RESULTS: int = 3  # Chunks added to the prompt
+    KNOWLEDGE_CACHE_SIZE: int = 1000  # Exact-match queries cached (LRU)
+    KNOWLEDGE_CACHE_TTL: int = 3600  # seconds
+    KNOWLEDGE_SEMANTIC_CACHE_SIZE: int = 500  # Query embeddings for similar-query hits
+    KNOWLEDGE_SEMANTIC_CACHE_TTL: int = 900  # seconds
+    KNOWLEDGE_SEMANTIC_THRESHOLD: float = 0.95  # Cosine similarity to reuse cached results
+
     class Config:
         env_file = ".env"
         case_sensitive = True
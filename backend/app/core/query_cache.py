@@ -0,0 +1,222 @@
+"""
+Knowledge Query Cache
+Two-tier cache for chatbot retrieval: exact query text, then semantic match
+"""
+import re
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+# Semantic tier needs numpy; without it only exact matches are cached
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+
+def normalize_query(text: str) -> str:
+    """
+    Cache key for a query: NFC, lowercase, punctuation dropped, whitespace
+    collapsed. Vietnamese diacritics are kept ("ban" and "bán" differ) but
+    composed and decomposed forms of the same letter match; unaccented
+    spellings are left to the semantic tier.
+    """
+    text = unicodedata.normalize("NFC", text).lower()
+    text = re.sub(r"[^\w\s]", " ", text)
+    return " ".join(text.split())
+
+
+class _ExactEntry:
+    __slots__ = ("embedding", "results", "expires")
+
+    def __init__(self, embedding, expires):
+        self.embedding = embedding
+        self.results: Dict[Hashable, Tuple[int, List[Dict[str, Any]]]] = {}  # scope -> (generation, rows)
+        self.expires = expires
+
+
+class QueryCache:
+    """
+    Retrieval results per (query, scope), scope being the search arguments.
+
+    - Exact tier: LRU keyed by normalize_query(text). Holds the query
+      embedding and its results per scope; a hit skips embedding and
+      search, a known text in a new scope skips only the embedding.
+    - Semantic tier: query embeddings in a fixed-size matrix; a new query
+      within `semantic_threshold` cosine similarity of a cached one, in the
+      same scope, reuses its results (skips the search).
+
+    invalidate() drops every cached result (knowledge changed); exact
+    entries keep their embeddings, which only depend on the query text.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1000,
+        ttl: float = 3600,
+        semantic_entries: int = 500,
+        semantic_ttl: float = 900,
+        semantic_threshold: float = 0.95,
+    ):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.semantic_entries = semantic_entries if NUMPY_AVAILABLE else 0
+        self.semantic_ttl = semantic_ttl
+        self.semantic_threshold = semantic_threshold
+
+        self._exact: "OrderedDict[str, _ExactEntry]" = OrderedDict()
+        self._generation = 0
+        self._vectors = None  # (semantic_entries, dim) float32, allocated on first put
+        self._expires: List[float] = [0.0] * self.semantic_entries
+        self._scopes: List[Optional[Hashable]] = [None] * self.semantic_entries
+        self._results: List[Optional[List[Dict[str, Any]]]] = [None] * self.semantic_entries
+        self._next_slot = 0
+
+        self.exact_hits = 0
+        self.embedding_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @property
+    def generation(self) -> int:
+        """Bumped by invalidate(); pass the value read before a search to put()."""
+        return self._generation
+
+    # ============================================================
+    # Exact Tier
+    # ============================================================
+
+    def get(self, query: str, scope: Hashable) -> Tuple[Optional[List[float]], Optional[List[Dict[str, Any]]]]:
+        """
+        (embedding, results) cached for this query text. Results are None
+        when missing, expired or invalidated; the embedding is still
+        returned then, so only the search has to run again.
+        """
+        key = normalize_query(query)
+        entry = self._exact.get(key)
+        if entry is None:
+            return None, None
+        if entry.expires <= time.monotonic():
+            del self._exact[key]
+            return None, None
+
+        self._exact.move_to_end(key)
+        generation, results = entry.results.get(scope, (None, None))
+        if generation == self._generation:
+            self.exact_hits += 1
+            return entry.embedding, _copy(results)
+        self.embedding_hits += 1
+        return entry.embedding, None
+
+    def put(
+        self,
+        query: str,
+        scope: Hashable,
+        embedding: List[float],
+        results: List[Dict[str, Any]],
+        semantic: bool = True,
+        generation: Optional[int] = None,
+    ):
+        """
+        Cache results for the query text (and its embedding, if `semantic`).
+        Results searched before an invalidation (`generation` is older) are
+        not kept; the embedding is. Storing results restarts the entry's TTL.
+        """
+        current = generation is None or generation == self._generation
+        key = normalize_query(query)
+        expires = time.monotonic() + self.ttl
+        entry = self._exact.get(key)
+        if entry is None:
+            entry = self._exact[key] = _ExactEntry(embedding, expires)
+        self._exact.move_to_end(key)
+        if current:
+            entry.results[scope] = (self._generation, _copy(results))
+            entry.expires = expires
+        while len(self._exact) > self.max_entries:
+            self._exact.popitem(last=False)
+
+        if semantic and current and self.semantic_entries:
+            self._put_semantic(embedding, scope, results)
+
+    # ============================================================
+    # Semantic Tier
+    # ============================================================
+
+    def get_similar(self, embedding: List[float], scope: Hashable) -> Optional[List[Dict[str, Any]]]:
+        """Results of the most similar cached query in `scope`, if close enough."""
+        if self._vectors is None:
+            self.misses += 1
+            return None
+
+        now = time.monotonic()
+        usable = np.array([
+            expires > now and slot_scope == scope
+            for expires, slot_scope in zip(self._expires, self._scopes)
+        ])
+        if usable.any():
+            scores = np.where(usable, self._vectors @ _unit(embedding), -1.0)
+            best = int(np.argmax(scores))
+            if scores[best] >= self.semantic_threshold:
+                self.semantic_hits += 1
+                return _copy(self._results[best])
+
+        self.misses += 1
+        return None
+
+    def _put_semantic(self, embedding: List[float], scope: Hashable, results: List[Dict[str, Any]]):
+        vector = _unit(embedding)
+        if self._vectors is None:
+            self._vectors = np.zeros((self.semantic_entries, len(vector)), dtype=np.float32)
+
+        # Ring buffer: the oldest slot is overwritten
+        slot = self._next_slot
+        self._next_slot = (slot + 1) % self.semantic_entries
+        self._vectors[slot] = vector
+        self._expires[slot] = time.monotonic() + self.semantic_ttl
+        self._scopes[slot] = scope
+        self._results[slot] = _copy(results)
+
+    # ============================================================
+    # Maintenance
+    # ============================================================
+
+    def invalidate(self):
+        """Forget every cached result (knowledge base changed)."""
+        self._generation += 1
+        self._expires = [0.0] * self.semantic_entries
+        self._results = [None] * self.semantic_entries
+        self.invalidations += 1
+
+    def clear(self):
+        self._exact.clear()
+        self.invalidate()
+
+    def stats(self) -> Dict[str, Any]:
+        # Every retrieval ends as an exact hit, a semantic hit or a miss;
+        # embedding_hits are misses of the exact tier that skipped the API
+        lookups = self.exact_hits + self.semantic_hits + self.misses
+        now = time.monotonic()
+        return {
+            "exact_entries": len(self._exact),
+            "semantic_entries": sum(1 for expires in self._expires if expires > now),
+            "exact_hits": self.exact_hits,
+            "embedding_hits": self.embedding_hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+            "hit_rate": (self.exact_hits + self.semantic_hits) / lookups if lookups else 0.0,
+            "invalidations": self.invalidations,
+        }
+
+
+def _unit(embedding) -> "np.ndarray":
+    vector = np.asarray(embedding, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+def _copy(results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    # Callers may annotate rows; cached rows stay untouched
+    return [dict(row) for row in results]
@@ -75,6 +75,10 @@ class RedisKeys:
     # Session cache
     SESSION_CACHE = "gem:session:"  # Key per user: gem:session:{user_id}
 
+    # Live pattern scanner (pub/sub)
+    PATTERN_CHANNEL = "gem:patterns:"  # Channel per stream: gem:patterns:{symbol}:{timeframe}
+    PATTERN_ALL_CHANNEL = "gem:patterns:all"  # Every detection
+
     @classmethod
     def user_rate_key(cls, user_id: str) -> str:
         return f"{cls.RATE_LIMIT}{user_id}"
@@ -86,3 +90,7 @@ class RedisKeys:
     @classmethod
     def session_key(cls, user_id: str) -> str:
         return f"{cls.SESSION_CACHE}{user_id}"
+
+    @classmethod
+    def pattern_channel(cls, symbol: str, timeframe: str) -> str:
+        return f"{cls.PATTERN_CHANNEL}{symbol}:{timeframe}"
@@ -0,0 +1,651 @@
+"""
+Local Vector Index
+In-process approximate nearest neighbour search over knowledge chunks
+"""
+import json
+import logging
+import os
+import shutil
+import time
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+# ============================================================
+# Configuration
+# ============================================================
+
+SNAPSHOT_VERSION = 1
+SNAPSHOT_POINTER = "CURRENT" # Names the live snapshot generation
+SNAPSHOT_KEEP = 2            # Generations kept, so a reader mid-load keeps its files
+STAGING_MAX_AGE = 3600       # Seconds before an abandoned staging directory is removed
+DEFAULT_NPROBE = 8           # Inverted lists scanned per query
+MIN_TRAIN_ROWS = 8192        # Below this, search is exact (already sub-millisecond)
+KMEANS_ITERATIONS = 12
+KMEANS_SAMPLE_PER_LIST = 64  # Training sample size per inverted list
+EXACT_FILTER_ROWS = 4096     # Filters matching fewer rows are searched exactly
+RETRAIN_GROWTH = 2.0         # Retrain once the index doubles since training
+
+CHUNK_PAGE_SIZE = 200        # Chunks (with embeddings) per Supabase page
+ID_PAGE_SIZE = 1000          # PostgREST default max rows
+CHUNK_FETCH_BATCH = 100      # Chunk ids per .in_() lookup
+
+CHUNK_COLUMNS = (
+    "id, document_id, chunk_text, chunk_index, embedding, "
+    "ai_knowledge_documents!inner(title, source_type, category, tags, status)"
+)
+DOCUMENT_FIELDS = ("title", "source_type", "category", "tags")
+
+
+# ============================================================
+# Vector Index
+# ============================================================
+
+
+class VectorIndex:
+    """
+    IVF (inverted file) index with cosine similarity.
+
+    Vectors are normalized and stored as float32, or float16 for half the
+    memory and snapshot size (scoring then upcasts the probed rows, which
+    is slower); k-means centroids split them into ~sqrt(n) lists and a
+    query scans the rows of its `nprobe` nearest lists. Each row carries the pgvector
+    search_knowledge columns (document_id, chunk_text, title, source_type,
+    category) plus tags, and search() returns rows in that shape with
+    similarity = 1 - cosine distance, so callers can switch between the
+    local index and the RPC freely.
+
+    Not thread-safe: mutate and search from one thread, or mutate a copy()
+    elsewhere and swap it in.
+    """
+
+    def __init__(self, dim: int = 1536, dtype: str = "float32", nprobe: int = DEFAULT_NPROBE):
+        self.dim = dim
+        self.dtype = np.dtype(dtype)
+        self.nprobe = nprobe
+
+        self.vectors = np.empty((0, dim), dtype=self.dtype)
+        self.lists = np.empty(0, dtype=np.int32)
+        self.alive = np.empty(0, dtype=bool)
+        self.centroids: Optional[np.ndarray] = None
+        self.trained_rows = 0
+
+        self.ids: List[str] = []
+        self.metadata: List[Dict[str, Any]] = []
+        self._rows: Dict[str, int] = {}
+        self._postings: Dict[str, Dict[Any, set]] = {}
+        self._order: Optional[np.ndarray] = None
+        self._bounds: Optional[np.ndarray] = None
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __contains__(self, chunk_id: str) -> bool:
+        return chunk_id in self._rows
+
+    @property
+    def nlist(self) -> int:
+        return 0 if self.centroids is None else len(self.centroids)
+
+    # ------------------------------------------------------------
+    # Updates
+    # ------------------------------------------------------------
+
+    def add(
+        self,
+        ids: Sequence[str],
+        vectors,
+        metadata: Optional[Sequence[Dict[str, Any]]] = None,
+    ) -> int:
+        """Add (or replace) rows; returns the number added."""
+        if not len(ids):
+            return 0
+        vectors = _normalize(_as_matrix(vectors, self.dim))
+        metadata = metadata or [{} for _ in ids]
+        if not (len(ids) == len(vectors) == len(metadata)):
+            raise ValueError("ids, vectors and metadata must have the same length")
+
+        self.delete([chunk_id for chunk_id in ids if chunk_id in self._rows])
+
+        start = len(self.ids)
+        lists = self._assign(vectors) if self.centroids is not None else np.zeros(len(ids), dtype=np.int32)
+        self.vectors = np.concatenate([self.vectors, vectors.astype(self.dtype)])
+        self.lists = np.concatenate([self.lists, lists])
+        self.alive = np.concatenate([self.alive, np.ones(len(ids), dtype=bool)])
+
+        for offset, (chunk_id, meta) in enumerate(zip(ids, metadata)):
+            row = start + offset
+            self.ids.append(chunk_id)
+            self.metadata.append(dict(meta))
+            self._rows[chunk_id] = row
+            self._post(row, meta)
+        self._order = None
+
+        if self._needs_training():
+            self.train()
+        return len(ids)
+
+    def delete(self, ids: Iterable[str]) -> int:
+        """Drop rows by chunk id; unknown ids are ignored."""
+        deleted = 0
+        for chunk_id in ids:
+            row = self._rows.pop(chunk_id, None)
+            if row is None:
+                continue
+            self.alive[row] = False
+            self._unpost(row, self.metadata[row])
+            deleted += 1
+        return deleted
+
+    def update_document(self, document_id: str, **fields) -> int:
+        """Set document fields (title, category, tags, ...) on all its rows."""
+        rows = list(self._postings.get("document_id", {}).get(document_id, ()))
+        for row in rows:
+            self._unpost(row, self.metadata[row])
+            self.metadata[row].update(fields)
+            self._post(row, self.metadata[row])
+        return len(rows)
+
+    def document_fields(self, document_id: str) -> Optional[Dict[str, Any]]:
+        """DOCUMENT_FIELDS as stored on a document's rows, or None if it has none."""
+        rows = self._postings.get("document_id", {}).get(document_id)
+        if not rows:
+            return None
+        meta = self.metadata[next(iter(rows))]
+        return {field: meta.get(field) for field in DOCUMENT_FIELDS}
+
+    def copy(self) -> "VectorIndex":
+        """
+        Independent index to update while this one keeps serving. Vector,
+        list and centroid arrays are shared: updates replace them rather
+        than write into them.
+        """
+        clone = type(self)(dim=self.dim, dtype=self.dtype.name, nprobe=self.nprobe)
+        clone.vectors = self.vectors
+        clone.lists = self.lists
+        clone.alive = self.alive.copy()
+        clone.centroids = self.centroids
+        clone.trained_rows = self.trained_rows
+        clone.ids = list(self.ids)
+        clone.metadata = [dict(meta) for meta in self.metadata]
+        clone._rows = dict(self._rows)
+        clone._postings = {
+            field: {value: set(rows) for value, rows in values.items()}
+            for field, values in self._postings.items()
+        }
+        clone._order, clone._bounds = self._order, self._bounds
+        return clone
+
+    def train(self, nlist: Optional[int] = None, seed: int = 0):
+        """Re-cluster all live rows into `nlist` lists (default ~sqrt(n))."""
+        self.compact()
+        n = len(self.ids)
+        if n == 0 or (n < MIN_TRAIN_ROWS and nlist is None):
+            self.centroids = None
+            self.lists = np.zeros(n, dtype=np.int32)
+            self.trained_rows = 0
+            self._order = None
+            return
+
+        nlist = min(nlist or max(1, int(np.sqrt(n))), n)
+        rng = np.random.default_rng(seed)
+        sample_size = min(n, nlist * KMEANS_SAMPLE_PER_LIST)
+        sample = self.vectors[rng.choice(n, sample_size, replace=False)].astype(np.float32)
+
+        centroids = sample[rng.choice(sample_size, nlist, replace=False)].copy()
+        for _ in range(KMEANS_ITERATIONS):
+            labels = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, labels, sample)
+            empty = np.bincount(labels, minlength=nlist) == 0
+            sums[empty] = sample[rng.choice(sample_size, int(empty.sum()))]
+            centroids = _normalize(sums)
+
+        self.centroids = centroids
+        self.lists = self._assign(self.vectors)
+        self.trained_rows = n
+        self._order = None
+
+    def compact(self):
+        """Physically remove deleted rows."""
+        if self.alive.all():
+            return
+        keep = np.flatnonzero(self.alive)
+        self.vectors = np.ascontiguousarray(self.vectors[keep])
+        self.lists = self.lists[keep]
+        self.alive = np.ones(len(keep), dtype=bool)
+        self.ids = [self.ids[row] for row in keep]
+        self.metadata = [self.metadata[row] for row in keep]
+        self._rows = {chunk_id: row for row, chunk_id in enumerate(self.ids)}
+        self._postings = {}
+        for row, meta in enumerate(self.metadata):
+            self._post(row, meta)
+        self._order = None
+
+    # ------------------------------------------------------------
+    # Search
+    # ------------------------------------------------------------
+
+    def search(
+        self,
+        query,
+        k: int = 5,
+        category: Optional[str] = None,
+        source_type: Optional[str] = None,
+        tags: Optional[Sequence[str]] = None,
+        document_id: Optional[str] = None,
+        threshold: Optional[float] = None,
+        nprobe: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Approximate top-k rows by cosine similarity.
+
+        Filters are exact: category, source_type and document_id must
+        match, tags must share at least one tag with the row. Filters that
+        leave few rows are searched exhaustively.
+        """
+        q = _normalize(_as_matrix(query, self.dim))[0]
+        allowed = self._filter_mask(category, source_type, tags, document_id)
+
+        if self.centroids is None or (allowed is not None and allowed.sum() <= EXACT_FILTER_ROWS):
+            rows = self._exact_rows(allowed)
+        else:
+            rows = self._probe_rows(q, nprobe or self.nprobe)
+            rows = rows[(self.alive if allowed is None else allowed)[rows]]
+        return self._rank(q, rows, k, threshold)
+
+    def exact_search(self, query, k: int = 5, **filters) -> List[Dict[str, Any]]:
+        """Brute-force top-k over every matching row (ground truth for recall)."""
+        q = _normalize(_as_matrix(query, self.dim))[0]
+        threshold = filters.pop("threshold", None)
+        return self._rank(q, self._exact_rows(self._filter_mask(**filters)), k, threshold)
+
+    def _exact_rows(self, allowed: Optional[np.ndarray]) -> Optional[np.ndarray]:
+        """Rows to scan exhaustively; None = every row (scored without a gather)."""
+        if allowed is None:
+            return None if self.alive.all() else np.flatnonzero(self.alive)
+        return np.flatnonzero(allowed)
+
+    def _rank(self, q: np.ndarray, rows: Optional[np.ndarray], k: int, threshold: Optional[float]) -> List[Dict[str, Any]]:
+        if rows is None:
+            rows = np.arange(len(self.ids))
+            scores = self.vectors.astype(np.float32, copy=False) @ q
+        else:
+            scores = self.vectors[rows].astype(np.float32, copy=False) @ q
+        if not len(rows) or k <= 0:
+            return []
+        if len(rows) > k:
+            top = np.argpartition(-scores, k - 1)[:k]
+        else:
+            top = np.arange(len(rows))
+        top = top[np.argsort(-scores[top], kind="stable")]
+
+        results = []
+        for i in top:
+            similarity = float(scores[i])
+            if threshold is not None and similarity <= threshold:
+                break
+            row = int(rows[i])
+            results.append({"id": self.ids[row], **self.metadata[row], "similarity": similarity})
+        return results
+
+    def _probe_rows(self, q: np.ndarray, nprobe: int) -> np.ndarray:
+        if self._order is None:
+            self._order = np.argsort(self.lists, kind="stable")
+            self._bounds = np.searchsorted(self.lists[self._order], np.arange(self.nlist + 1))
+        nprobe = min(nprobe, self.nlist)
+        probed = np.argpartition(-(self.centroids @ q), nprobe - 1)[:nprobe]
+        return np.concatenate([self._order[self._bounds[c]:self._bounds[c + 1]] for c in probed])
+
+    def _filter_mask(
+        self,
+        category: Optional[str] = None,
+        source_type: Optional[str] = None,
+        tags: Optional[Sequence[str]] = None,
+        document_id: Optional[str] = None,
+    ) -> Optional[np.ndarray]:
+        rows: Optional[set] = None
+        for field, value in (("category", category), ("source_type", source_type), ("document_id", document_id)):
+            if value is not None:
+                matched = self._postings.get(field, {}).get(value, set())
+                rows = matched if rows is None else rows & matched
+        if tags:
+            matched = set().union(*(self._postings.get("tags", {}).get(tag, set()) for tag in tags))
+            rows = matched if rows is None else rows & matched
+        if rows is None:
+            return None
+
+        mask = np.zeros(len(self.ids), dtype=bool)
+        if rows:
+            mask[np.fromiter(rows, dtype=np.int64, count=len(rows))] = True
+        return mask
+
+    def _assign(self, vectors: np.ndarray) -> np.ndarray:
+        lists = np.empty(len(vectors), dtype=np.int32)
+        for i in range(0, len(vectors), 4096):
+            part = vectors[i:i + 4096].astype(np.float32, copy=False)
+            lists[i:i + 4096] = np.argmax(part @ self.centroids.T, axis=1)
+        return lists
+
+    def _needs_training(self) -> bool:
+        if self.centroids is None:
+            return len(self) >= MIN_TRAIN_ROWS
+        return len(self) >= self.trained_rows * RETRAIN_GROWTH
+
+    def _post(self, row: int, meta: Dict[str, Any]):
+        for field in ("category", "source_type", "document_id"):
+            if meta.get(field) is not None:
+                self._postings.setdefault(field, {}).setdefault(meta[field], set()).add(row)
+        for tag in meta.get("tags") or ():
+            self._postings.setdefault("tags", {}).setdefault(tag, set()).add(row)
+
+    def _unpost(self, row: int, meta: Dict[str, Any]):
+        for field in ("category", "source_type", "document_id"):
+            self._postings.get(field, {}).get(meta.get(field), set()).discard(row)
+        for tag in meta.get("tags") or ():
+            self._postings.get("tags", {}).get(tag, set()).discard(row)
+
+    # ------------------------------------------------------------
+    # Snapshots
+    # ------------------------------------------------------------
+
+    def save(self, path: str):
+        """
+        Write a snapshot under `path`. vectors.npy, lists.npy, centroids.npy
+        and index.json (ids + metadata) go into a new generation directory,
+        which the CURRENT pointer is then atomically switched to, so readers
+        (ingestion and the backend share `path`) see the old or the new
+        snapshot as a whole, never a mix. Older generations are pruned.
+        """
+        self.compact()
+        os.makedirs(path, exist_ok=True)
+        name = f"snapshot-{time.time_ns()}-{os.getpid()}"
+        staging = os.path.join(path, f".{name}.tmp")
+        os.makedirs(staging)
+        try:
+            arrays = {"vectors": self.vectors, "lists": self.lists}
+            if self.centroids is not None:
+                arrays["centroids"] = self.centroids
+            for array_name, array in arrays.items():
+                np.save(os.path.join(staging, f"{array_name}.npy"), array)
+
+            manifest = {
+                "version": SNAPSHOT_VERSION,
+                "dim": self.dim,
+                "dtype": self.dtype.name,
+                "nprobe": self.nprobe,
+                "trained_rows": self.trained_rows,
+                "ids": self.ids,
+                "metadata": self.metadata,
+            }
+            with open(os.path.join(staging, "index.json"), "w", encoding="utf-8") as f:
+                json.dump(manifest, f, ensure_ascii=False)
+            os.rename(staging, os.path.join(path, name))
+        except BaseException:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+
+        _atomic_write(os.path.join(path, SNAPSHOT_POINTER), lambda f: f.write(name))
+        _prune_snapshots(path)
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> "VectorIndex":
+        """
+        Open the live snapshot under `path`; vectors stay memory-mapped until
+        the index is modified. Raises ValueError if its files do not agree.
+        """
+        try:
+            return cls._load_generation(_snapshot_dir(path), mmap)
+        except FileNotFoundError:
+            # A concurrent save pruned the generation CURRENT named a moment ago
+            return cls._load_generation(_snapshot_dir(path), mmap)
+
+    @classmethod
+    def _load_generation(cls, path: str, mmap: bool) -> "VectorIndex":
+        with open(os.path.join(path, "index.json"), encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest.get("version") != SNAPSHOT_VERSION:
+            raise ValueError(f"Unsupported vector index snapshot version: {manifest.get('version')}")
+
+        index = cls(dim=manifest["dim"], dtype=manifest["dtype"], nprobe=manifest["nprobe"])
+        index.vectors = np.load(os.path.join(path, "vectors.npy"), mmap_mode="r" if mmap else None)
+        index.lists = np.load(os.path.join(path, "lists.npy"))
+        centroids_path = os.path.join(path, "centroids.npy")
+        index.centroids = np.load(centroids_path) if os.path.exists(centroids_path) else None
+        _check_snapshot(path, index, manifest)
+        index.trained_rows = manifest["trained_rows"]
+        index.alive = np.ones(len(manifest["ids"]), dtype=bool)
+        index.ids = manifest["ids"]
+        index.metadata = manifest["metadata"]
+        index._rows = {chunk_id: row for row, chunk_id in enumerate(index.ids)}
+        for row, meta in enumerate(index.metadata):
+            index._post(row, meta)
+        return index
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "rows": len(self),
+            "deleted": int(len(self.ids) - len(self)),
+            "dim": self.dim,
+            "dtype": self.dtype.name,
+            "nlist": self.nlist,
+            "nprobe": self.nprobe,
+            "bytes": int(self.vectors.nbytes),
+        }
+
+
+# ============================================================
+# Supabase Loading
+# ============================================================
+
+
+def chunk_row_entry(row: Dict[str, Any]):
+    """(id, vector, metadata) from an ai_knowledge_chunks row selected with CHUNK_COLUMNS."""
+    document = row.get("ai_knowledge_documents") or {}
+    embedding = row["embedding"]
+    if isinstance(embedding, str):
+        embedding = json.loads(embedding)  # PostgREST returns pgvector as "[...]"
+    metadata = {
+        "document_id": row["document_id"],
+        "chunk_text": row["chunk_text"],
+        "chunk_index": row.get("chunk_index"),
+        **{field: document.get(field) for field in DOCUMENT_FIELDS},
+    }
+    return row["id"], embedding, metadata
+
+
+def add_chunk_rows(index: VectorIndex, rows: List[Dict[str, Any]]) -> int:
+    entries = [chunk_row_entry(row) for row in rows if row.get("embedding")]
+    if not entries:
+        return 0
+    ids, vectors, metadata = zip(*entries)
+    return index.add(list(ids), vectors, list(metadata))
+
+
+def fetch_chunk_rows(client, ids: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    """Chunks of active documents with embeddings: all of them, or only `ids`."""
+    def query():
+        return (
+            client.table("ai_knowledge_chunks")
+            .select(CHUNK_COLUMNS)
+            .eq("ai_knowledge_documents.status", "active")
+        )
+
+    rows: List[Dict[str, Any]] = []
+    if ids is not None:
+        for i in range(0, len(ids), CHUNK_FETCH_BATCH):
+            rows.extend(query().in_("id", ids[i:i + CHUNK_FETCH_BATCH]).execute().data or [])
+        return rows
+
+    start = 0
+    while True:
+        page = query().order("id").range(start, start + CHUNK_PAGE_SIZE - 1).execute().data or []
+        rows.extend(page)
+        if len(page) < CHUNK_PAGE_SIZE:
+            return rows
+        start += CHUNK_PAGE_SIZE
+
+
+def fetch_chunk_ids(client) -> set:
+    """Ids of all chunks of active documents (cheap: no embeddings)."""
+    ids: set = set()
+    start = 0
+    while True:
+        page = (
+            client.table("ai_knowledge_chunks")
+            .select("id, ai_knowledge_documents!inner(status)")
+            .eq("ai_knowledge_documents.status", "active")
+            .order("id")
+            .range(start, start + ID_PAGE_SIZE - 1)
+            .execute()
+            .data
+            or []
+        )
+        ids.update(row["id"] for row in page)
+        if len(page) < ID_PAGE_SIZE:
+            return ids
+        start += ID_PAGE_SIZE
+
+
+def fetch_document_fields(client, since: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+    """{id: DOCUMENT_FIELDS} of active documents, or only those updated at or after `since`."""
+    documents: Dict[str, Dict[str, Any]] = {}
+    start = 0
+    while True:
+        query = (
+            client.table("ai_knowledge_documents")
+            .select("id, " + ", ".join(DOCUMENT_FIELDS))
+            .eq("status", "active")
+        )
+        if since is not None:
+            query = query.gte("updated_at", since)
+        page = query.order("id").range(start, start + ID_PAGE_SIZE - 1).execute().data or []
+        for row in page:
+            documents[row["id"]] = {field: row.get(field) for field in DOCUMENT_FIELDS}
+        if len(page) < ID_PAGE_SIZE:
+            return documents
+        start += ID_PAGE_SIZE
+
+
+def diff_documents(index: VectorIndex, client, since: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+    """
+    {document id: fields} for indexed documents whose title, source_type,
+    category or tags changed in Supabase (optionally only those updated
+    since `since`). Only reads the index, like diff_from_supabase.
+    """
+    changes = {}
+    for document_id, fields in fetch_document_fields(client, since).items():
+        current = index.document_fields(document_id)
+        if current is not None and current != fields:
+            changes[document_id] = fields
+    return changes
+
+
+def update_documents(index: VectorIndex, documents: Dict[str, Dict[str, Any]]) -> int:
+    """Apply diff_documents() output; returns the number of rows updated."""
+    return sum(index.update_document(document_id, **fields) for document_id, fields in documents.items())
+
+
+def snapshot_exists(path: str) -> bool:
+    """Whether `path` holds a snapshot written by VectorIndex.save()."""
+    return bool(path) and os.path.exists(os.path.join(path, SNAPSHOT_POINTER))
+
+
+def load_from_supabase(client, dim: int = 1536, dtype: str = "float32") -> VectorIndex:
+    """Build an index from every embedded chunk of an active document."""
+    index = VectorIndex(dim=dim, dtype=dtype)
+    add_chunk_rows(index, fetch_chunk_rows(client))
+    logger.info(f"Vector index loaded from Supabase: {len(index)} chunks, {index.nlist} lists")
+    return index
+
+
+def diff_from_supabase(index: VectorIndex, client):
+    """
+    (stale ids, rows to add) that bring `index` up to date. Only reads the
+    index, so it can run in a worker thread while the index serves queries.
+    """
+    current = fetch_chunk_ids(client)
+    stale = [chunk_id for chunk_id in list(index.ids) if chunk_id in index and chunk_id not in current]
+    missing = [chunk_id for chunk_id in current if chunk_id not in index]
+    return stale, fetch_chunk_rows(client, missing) if missing else []
+
+
+def sync_from_supabase(index: VectorIndex, client) -> Dict[str, int]:
+    """
+    Bring an index up to date: add chunks it lacks, drop chunks that are
+    gone and refresh document fields edited since it was built.
+    """
+    stale, rows = diff_from_supabase(index, client)
+    documents = diff_documents(index, client)
+    return {
+        "deleted": index.delete(stale),
+        "added": add_chunk_rows(index, rows),
+        "updated": update_documents(index, documents),
+    }
+
+
+# ============================================================
+# Helpers
+# ============================================================
+
+
+def _as_matrix(vectors, dim: int) -> np.ndarray:
+    matrix = np.asarray(vectors, dtype=np.float32)
+    if matrix.ndim == 1:
+        matrix = matrix[None, :]
+    if matrix.shape[1] != dim:
+        raise ValueError(f"Expected {dim}-dimensional vectors, got {matrix.shape[1]}")
+    return matrix
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+def _snapshot_dir(path: str) -> str:
+    with open(os.path.join(path, SNAPSHOT_POINTER), encoding="utf-8") as f:
+        return os.path.join(path, f.read().strip())
+
+
+def _check_snapshot(path: str, index: VectorIndex, manifest: Dict[str, Any]):
+    """Raise ValueError unless arrays and manifest describe the same rows."""
+    rows = len(manifest["ids"])
+    if not (len(index.vectors) == len(index.lists) == rows == len(manifest["metadata"])):
+        raise ValueError(
+            f"Inconsistent vector index snapshot {path}: {len(index.vectors)} vectors, "
+            f"{len(index.lists)} list assignments, {rows} ids"
+        )
+    if index.vectors.ndim != 2 or index.vectors.shape[1] != index.dim or index.vectors.dtype != index.dtype:
+        raise ValueError(
+            f"Vector index snapshot {path}: vectors are {index.vectors.dtype}{index.vectors.shape}, "
+            f"manifest says {index.dtype.name} x {index.dim}"
+        )
+    nlist = 0 if index.centroids is None else len(index.centroids)
+    if index.centroids is not None and (index.centroids.ndim != 2 or index.centroids.shape[1] != index.dim):
+        raise ValueError(f"Vector index snapshot {path}: centroids are {index.centroids.shape}, dim {index.dim}")
+    if rows and (index.lists.min() < 0 or index.lists.max() >= max(nlist, 1)):
+        raise ValueError(f"Vector index snapshot {path}: list assignments outside {max(nlist, 1)} lists")
+
+
+def _prune_snapshots(path: str):
+    """Drop all but the newest SNAPSHOT_KEEP generations and stale staging dirs."""
+    generations = sorted(name for name in os.listdir(path) if name.startswith("snapshot-"))
+    stale = generations[:-SNAPSHOT_KEEP]
+    now = time.time()
+    for name in os.listdir(path):
+        if name.startswith(".snapshot-") and now - os.path.getmtime(os.path.join(path, name)) > STAGING_MAX_AGE:
+            stale.append(name)
+    for name in stale:
+        # Fails on Windows while another process has it mapped; retried next save
+        shutil.rmtree(os.path.join(path, name), ignore_errors=True)
+
+
+def _atomic_write(path: str, write):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        write(f)
+    os.replace(tmp, path)
@@ -38,6 +38,13 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logger.warning(f"Redis connection failed (will work without): {e}")
 
+    # Load the knowledge vector index before the first chat message
+    try:
+        from .services.knowledge_service import knowledge_service
+        asyncio.create_task(knowledge_service.warm_up())
+    except Exception as e:
+        logger.warning(f"Knowledge index not loaded: {e}")
+
     # Start background workers (offline queue processor)
     # queue_task = asyncio.create_task(process_offline_queue())
 
@@ -88,6 +95,13 @@ async def lifespan(app: FastAPI):
     # Shutdown
     logger.info(f"[{settings.APP_NAME}] Shutting down...")
 
+    # Close the knowledge service HTTP client
+    try:
+        from .services.knowledge_service import knowledge_service
+        await knowledge_service.close()
+    except Exception:
+        pass
+
     # Close Redis
     try:
         from .core.redis import RedisManager
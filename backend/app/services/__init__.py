@@ -12,6 +12,7 @@ from .segment_service import SegmentService, segment_service
 from .cart_recovery_service import CartRecoveryService, cart_recovery_service
 from .broadcast_service import BroadcastService, broadcast_service
 from .gamification_service import GamificationService, gamification_service
+from .knowledge_service import KnowledgeService, knowledge_service
 
 __all__ = [
     "ConnectionManager",
@@ -44,4 +45,7 @@ __all__ = [
     # PHASE 5
     "GamificationService",
     "gamification_service",
+    # AI BRAIN
+    "KnowledgeService",
+    "knowledge_service",
 ]
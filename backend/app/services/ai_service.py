@@ -10,6 +10,7 @@ import logging
 
 from ..core.config import get_settings
 from ..models.schemas import Platform
+from .knowledge_service import knowledge_service
 
 logger = logging.getLogger(__name__)
 
@@ -123,8 +124,11 @@ class AIService:
         try:
             model = self._get_model()
 
+            # Retrieve knowledge chunks (RAG); empty on any failure
+            chunks = await knowledge_service.retrieve(message)
+
             # Build messages for Gemini
-            contents = self._build_contents(message, history, user_tier, intent)
+            contents = self._build_contents(message, history, user_tier, intent, chunks)
 
             # Call Gemini with retry
             for attempt in range(self.max_retries):
@@ -151,7 +155,7 @@ class AIService:
                         return {
                             "text": text,
                             "tokens_used": tokens_used,
-                            "sources": [],
+                            "sources": self._get_sources(chunks),
                             "quick_actions": self._get_quick_actions(intent),
                             "processing_time_ms": processing_time,
                         }
@@ -175,6 +179,7 @@ class AIService:
         history: List[Dict[str, str]],
         user_tier: str,
         intent: Optional[Dict[str, Any]],
+        chunks: Optional[List[Dict[str, Any]]] = None,
     ) -> list:
         """Build Gemini-compatible message contents"""
         contents = []
@@ -189,6 +194,13 @@ class AIService:
         if intent:
             system_text += f"\n[DETECTED INTENT: {intent.get('type', 'general')}]"
 
+        # Add retrieved knowledge
+        if chunks:
+            system_text += "\n\n[GEM KNOWLEDGE - dung kien thuc nay de tra loi chinh xac]"
+            for i, chunk in enumerate(chunks, 1):
+                title = chunk.get("title") or chunk.get("source_type", "")
+                system_text += f"\n[{i}] {title}:\n{chunk['chunk_text']}"
+
         contents.append({
             "role": "user",
             "parts": [{"text": f"[SYSTEM INSTRUCTION]\n{system_text}"}],
@@ -216,6 +228,11 @@ class AIService:
 
         return contents
 
+    def _get_sources(self, chunks: List[Dict[str, Any]]) -> List[str]:
+        """Titles of the knowledge documents used (best match first)"""
+        titles = [chunk.get("title") or chunk.get("source_type", "") for chunk in chunks]
+        return list(dict.fromkeys(title for title in titles if title))
+
     def _get_quick_actions(
         self,
         intent: Optional[Dict[str, Any]],
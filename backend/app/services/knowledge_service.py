@@ -0,0 +1,347 @@
+"""
+Knowledge Retrieval Service
+RAG context for GEM Master from the AI Brain knowledge base
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+import httpx
+
+from ..core.config import get_settings
+from ..core.database import get_supabase_admin
+from ..core.query_cache import QueryCache
+
+# Local vector index needs numpy; without it every query goes to pgvector
+try:
+    from ..core.vector_index import (
+        VectorIndex,
+        add_chunk_rows,
+        diff_documents,
+        diff_from_supabase,
+        load_from_supabase,
+        snapshot_exists,
+        sync_from_supabase,
+        update_documents,
+    )
+    VECTOR_INDEX_AVAILABLE = True
+except ImportError:
+    VECTOR_INDEX_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+OPENAI_EMBEDDINGS_URL = "https://api.openai.com/v1/embeddings"
+RPC_TAG_OVERFETCH = 4  # search_knowledge has no tag filter: fetch more, filter after
+
+
+class KnowledgeService:
+    """
+    Retrieves knowledge chunks for a user message.
+
+    Features:
+    - In-process vector index (memory-mapped snapshot or built from
+      ai_knowledge_chunks), kept in sync with the table in the background
+    - Category / source_type / tag filters
+    - Falls back to the pgvector search_knowledge RPC when the local
+      index is disabled or unavailable; both return the same row shape
+    - Two-tier query cache (exact text, then similar embedding), cleared
+      when ingestion changes the knowledge base
+    """
+
+    def __init__(self):
+        self.settings = get_settings()
+        self._index: Optional["VectorIndex"] = None
+        self._refreshed_at = 0.0  # First query reads the knowledge version
+        self._retry_at = 0.0
+        self._load_lock = asyncio.Lock()
+        self._refresh_task: Optional[asyncio.Task] = None
+        self._knowledge_version: Optional[tuple] = None
+        self._http: Optional[httpx.AsyncClient] = None  # Shared: keeps the OpenAI connection alive
+        self._disabled_logged = False
+        self.cache = QueryCache(
+            max_entries=self.settings.KNOWLEDGE_CACHE_SIZE,
+            ttl=self.settings.KNOWLEDGE_CACHE_TTL,
+            semantic_entries=self.settings.KNOWLEDGE_SEMANTIC_CACHE_SIZE,
+            semantic_ttl=self.settings.KNOWLEDGE_SEMANTIC_CACHE_TTL,
+            semantic_threshold=self.settings.KNOWLEDGE_SEMANTIC_THRESHOLD,
+        )
+        self.stats = {"local": 0, "rpc": 0, "errors": 0}
+
+    async def retrieve(
+        self,
+        query: str,
+        k: Optional[int] = None,
+        category: Optional[str] = None,
+        source_type: Optional[str] = None,
+        tags: Optional[Sequence[str]] = None,
+        threshold: Optional[float] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Most similar knowledge chunks for `query`.
+
+        Returns:
+            search_knowledge rows: id, document_id, chunk_text, similarity,
+            source_type, category, title (best first)
+        """
+        if not query or not query.strip() or not self._enabled():
+            return []
+
+        k = k or self.settings.KNOWLEDGE_MAX_RESULTS
+        if threshold is None:
+            threshold = self.settings.KNOWLEDGE_MATCH_THRESHOLD
+
+        self._schedule_refresh()
+        scope = (k, category, source_type, tuple(sorted(tags or ())), threshold)
+
+        try:
+            embedding, results = self.cache.get(query, scope)
+            if results is not None:
+                return results
+
+            if embedding is None:
+                embedding = await self.embed_query(query)
+            results = self.cache.get_similar(embedding, scope)
+            if results is not None:
+                # Next time the same text is an exact hit
+                self.cache.put(query, scope, embedding, results, semantic=False)
+                return results
+
+            generation = self.cache.generation
+            results = await self._search(embedding, k, category, source_type, tags, threshold)
+            self.cache.put(query, scope, embedding, results, generation=generation)
+            return results
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.error(f"Knowledge retrieval failed: {e}")
+            return []
+
+    async def _search(
+        self,
+        embedding: List[float],
+        k: int,
+        category: Optional[str],
+        source_type: Optional[str],
+        tags: Optional[Sequence[str]],
+        threshold: float,
+    ) -> List[Dict[str, Any]]:
+        index = await self._get_index()
+        if index is not None:
+            self.stats["local"] += 1
+            return index.search(
+                embedding, k,
+                category=category, source_type=source_type, tags=tags, threshold=threshold,
+            )
+
+        self.stats["rpc"] += 1
+        return await asyncio.to_thread(
+            self._search_rpc, embedding, k, category, source_type, tags, threshold
+        )
+
+    async def embed_query(self, text: str) -> List[float]:
+        """Embed a query with the model used at ingestion."""
+        if not self.settings.OPENAI_API_KEY:
+            raise ValueError("OPENAI_API_KEY not configured")
+
+        if self._http is None or self._http.is_closed:
+            self._http = httpx.AsyncClient(
+                headers={"Authorization": f"Bearer {self.settings.OPENAI_API_KEY}"},
+                timeout=10.0,
+            )
+        response = await self._http.post(
+            OPENAI_EMBEDDINGS_URL,
+            json={"model": self.settings.OPENAI_EMBEDDING_MODEL, "input": text},
+        )
+        response.raise_for_status()
+        return response.json()["data"][0]["embedding"]
+
+    async def warm_up(self):
+        """Load the local index ahead of the first query."""
+        if not self._enabled():
+            return
+        index = await self._get_index()
+        if index is not None:
+            logger.info(f"Knowledge index ready: {index.stats()}")
+
+    async def close(self):
+        """Close the shared HTTP client (app shutdown)."""
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+
+    def _enabled(self) -> bool:
+        """Queries can only be embedded with an OpenAI key; warn once without one."""
+        if self.settings.OPENAI_API_KEY:
+            return True
+        if not self._disabled_logged:
+            logger.warning("OPENAI_API_KEY not configured, knowledge retrieval disabled")
+            self._disabled_logged = True
+        return False
+
+    # ============================================================
+    # Local Index
+    # ============================================================
+
+    async def _get_index(self) -> Optional["VectorIndex"]:
+        if not (VECTOR_INDEX_AVAILABLE and self.settings.KNOWLEDGE_LOCAL_INDEX):
+            return None
+
+        if self._index is None:
+            async with self._load_lock:
+                if self._index is None and time.monotonic() >= self._retry_at:
+                    try:
+                        self._index = await asyncio.to_thread(self._open_index)
+                        # Results cached from the RPC may differ from the index's
+                        self.cache.invalidate()
+                    except Exception as e:
+                        logger.error(f"Knowledge index unavailable, using search_knowledge RPC: {e}")
+                        self._retry_at = time.monotonic() + self.settings.KNOWLEDGE_INDEX_REFRESH
+        return self._index
+
+    def _open_index(self) -> "VectorIndex":
+        """Snapshot (memory-mapped) if present, else built from Supabase."""
+        client = get_supabase_admin()
+        path = self.settings.KNOWLEDGE_INDEX_PATH
+
+        if snapshot_exists(path):
+            index = VectorIndex.load(path)
+            changes = sync_from_supabase(index, client)
+            logger.info(f"Knowledge index snapshot {path}: {len(index)} chunks ({changes})")
+            return index
+
+        index = load_from_supabase(client)
+        if path:
+            index.save(path)
+        return index
+
+    # ============================================================
+    # Refresh
+    # ============================================================
+
+    def _schedule_refresh(self):
+        due = time.monotonic() - self._refreshed_at >= self.settings.KNOWLEDGE_INDEX_REFRESH
+        if due and (self._refresh_task is None or self._refresh_task.done()):
+            self._refresh_task = asyncio.create_task(self._refresh())
+
+    async def _refresh(self):
+        """
+        Pick up ingestion changes: sync the local index with
+        ai_knowledge_chunks (and, when the knowledge version moved, the
+        title/category/tags/source_type of documents edited since) and
+        drop cached results if anything changed.
+        """
+        try:
+            client = get_supabase_admin()
+            previous = self._knowledge_version
+            version = await asyncio.to_thread(self._read_knowledge_version, client)
+            changed = previous is not None and version != previous
+            self._knowledge_version = version
+
+            if self._index is not None:
+                stale, rows = await asyncio.to_thread(diff_from_supabase, self._index, client)
+                documents = {}
+                if changed:
+                    # Edits that keep the chunks only move updated_at
+                    documents = await asyncio.to_thread(diff_documents, self._index, client, previous[1])
+                if stale or rows or documents:
+                    # Adding rows can retrain (k-means over every row): update
+                    # a copy in a worker thread, keep serving from the current one
+                    self._index, added, deleted, updated = await asyncio.to_thread(
+                        self._apply_changes, self._index, stale, rows, documents
+                    )
+                    logger.info(f"Knowledge index synced: +{added} -{deleted} chunks, {updated} rows updated")
+                    changed = True
+
+            if changed:
+                self.cache.invalidate()
+                logger.info("Knowledge base changed, query cache invalidated")
+        except Exception as e:
+            logger.warning(f"Knowledge refresh failed: {e}")
+        finally:
+            self._refreshed_at = time.monotonic()
+
+    @staticmethod
+    def _apply_changes(
+        index: "VectorIndex",
+        stale: List[str],
+        rows: List[Dict[str, Any]],
+        documents: Dict[str, Dict[str, Any]],
+    ):
+        """(updated copy of `index`, rows added, rows deleted, rows with new document fields)"""
+        index = index.copy()
+        deleted = index.delete(stale)
+        added = add_chunk_rows(index, rows)
+        updated = update_documents(index, documents)
+        return index, added, deleted, updated
+
+    def _read_knowledge_version(self, client) -> tuple:
+        """
+        (document count, latest updated_at, latest last_indexed_at).
+        knowledge_ingestion sets updated_at when it changes a document and
+        last_indexed_at once its chunks are stored. Documents never indexed
+        (NULL last_indexed_at) are skipped: DESC order puts NULLs first.
+        """
+        updated = (
+            client.table("ai_knowledge_documents")
+            .select("updated_at", count="exact")
+            .order("updated_at", desc=True)
+            .limit(1)
+            .execute()
+        )
+        indexed = (
+            client.table("ai_knowledge_documents")
+            .select("last_indexed_at")
+            .not_.is_("last_indexed_at", "null")
+            .order("last_indexed_at", desc=True)
+            .limit(1)
+            .execute()
+        )
+        return (
+            updated.count,
+            updated.data[0]["updated_at"] if updated.data else None,
+            indexed.data[0]["last_indexed_at"] if indexed.data else None,
+        )
+
+    # ============================================================
+    # pgvector Fallback
+    # ============================================================
+
+    def _search_rpc(
+        self,
+        embedding: List[float],
+        k: int,
+        category: Optional[str],
+        source_type: Optional[str],
+        tags: Optional[Sequence[str]],
+        threshold: float,
+    ) -> List[Dict[str, Any]]:
+        client = get_supabase_admin()
+        result = client.rpc(
+            "search_knowledge",
+            {
+                "query_embedding": embedding,
+                "match_threshold": threshold,
+                "match_count": k * RPC_TAG_OVERFETCH if tags else k,
+                "filter_source_type": source_type,
+                "filter_category": category,
+            },
+        ).execute()
+        rows = result.data or []
+
+        if tags and rows:
+            tagged = (
+                client.table("ai_knowledge_documents")
+                .select("id")
+                .in_("id", list({row["document_id"] for row in rows}))
+                .overlaps("tags", list(tags))
+                .execute()
+            )
+            document_ids = {row["id"] for row in tagged.data or []}
+            rows = [row for row in rows if row["document_id"] in document_ids]
+
+        return rows[:k]
+
+
+# Global instance
+knowledge_service = KnowledgeService()
@@ -45,7 +45,7 @@ class ChartGenerator:
             ))
         
         # Signals
-        signals = self._calculate_signals(df, pattern)
+        signals = self.calculate_signals(df, pattern)
         
         # Entry point
         if signals['entry']:
@@ -113,7 +113,7 @@ class ChartGenerator:
         
         return fig, signals
     
-    def _calculate_signals(self, df: pd.DataFrame, pattern: Dict) -> Dict:
+    def calculate_signals(self, df: pd.DataFrame, pattern: Dict) -> Dict:
         current_price = df['close'].iloc[-1]
         atr = self._calculate_atr(df)
         
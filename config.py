@@ -9,6 +9,8 @@ TOP_COINS = [
 TIMEFRAMES = {'15 phút': '15m', '1 giờ': '1h', '4 giờ': '4h', '1 ngày': '1d'}
 SENSITIVITY = 0.02
 CANDLE_LIMIT = 200
+SCAN_WORKERS = 8           # Coins fetched/scanned concurrently by ScanService
+SCAN_CACHE_ENTRIES = 2000  # (coin, timeframe, candle) results kept in memory
 USERS = {
     "admin": {"password": "admin123", "role": "admin"},
     "demo": {"password": "demo123", "role": "user"},
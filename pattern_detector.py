@@ -2,6 +2,8 @@ import numpy as np
 import pandas as pd
 from typing import List, Dict
 
+from pattern_kernels import find_peaks, find_troughs, linear_slope
+
 class PatternDetector:
     def __init__(self, sensitivity: float = 0.02):
         self.sensitivity = sensitivity
@@ -9,24 +11,27 @@ class PatternDetector:
     def detect_all_patterns(self, df: pd.DataFrame) -> List[Dict]:
         """Detect patterns - GUARANTEED to return at least 1 pattern for testing"""
         patterns = []
-        df = self._add_indicators(df)
+        # Plain float64 columns, extracted once (detectors slice them without copies)
+        high = df['high'].to_numpy(dtype=np.float64)
+        low = df['low'].to_numpy(dtype=np.float64)
+        close = df['close'].to_numpy(dtype=np.float64)
 
-        if self._detect_head_and_shoulders(df):
+        if self._detect_head_and_shoulders(high):
             patterns.append({'pattern': 'Head and Shoulders', 'type': 'Bearish', 'confidence': 75, 'description': 'Bearish reversal'})
-        if self._detect_double_top(df):
+        if self._detect_double_top(high):
             patterns.append({'pattern': 'Double Top', 'type': 'Bearish', 'confidence': 70, 'description': 'Bearish signal'})
-        if self._detect_double_bottom(df):
+        if self._detect_double_bottom(low):
             patterns.append({'pattern': 'Double Bottom', 'type': 'Bullish', 'confidence': 72, 'description': 'Bullish signal'})
-        if self._detect_ascending_triangle(df):
+        if self._detect_ascending_triangle(high):
             patterns.append({'pattern': 'Ascending Triangle', 'type': 'Bullish', 'confidence': 68, 'description': 'Bullish continuation'})
-        if self._detect_bull_flag(df):
+        if self._detect_bull_flag(close):
             patterns.append({'pattern': 'Bull Flag', 'type': 'Bullish', 'confidence': 65, 'description': 'Continuation pattern'})
 
         # TESTING MODE: If no patterns found, create a dummy pattern for debugging
         if not patterns:
             # Use price trend as simple pattern
-            recent_close = df['close'].tail(20)
-            trend = "Bullish" if recent_close.iloc[-1] > recent_close.iloc[0] else "Bearish"
+            recent_close = close[-20:]
+            trend = "Bullish" if recent_close[-1] > recent_close[0] else "Bearish"
             patterns.append({
                 'pattern': 'Price Trend',
                 'type': trend,
@@ -36,63 +41,48 @@ class PatternDetector:
 
         return patterns
     
-    def _add_indicators(self, df):
-        df = df.copy()
-        df['sma_20'] = df['close'].rolling(20).mean()
-        return df
-    
-    def _detect_head_and_shoulders(self, df):
+    def _detect_head_and_shoulders(self, high):
         # LOWERED: 60->40 candles, 3->2 peaks for easier detection
-        if len(df) < 40:
+        if len(high) < 40:
             return False
-        recent = df.tail(40)
-        highs = recent['high'].values
+        highs = high[-40:]
         peaks = self._find_peaks(highs, distance=3)
         return len(peaks) >= 2
 
-    def _detect_double_top(self, df):
+    def _detect_double_top(self, high):
         # LOWERED: 40->30 candles, 2->1 peak for easier detection
-        if len(df) < 30:
+        if len(high) < 30:
             return False
-        highs = df.tail(30)['high'].values
+        highs = high[-30:]
         peaks = self._find_peaks(highs, distance=3)
         return len(peaks) >= 1
 
-    def _detect_double_bottom(self, df):
+    def _detect_double_bottom(self, low):
         # LOWERED: 40->30 candles, 2->1 trough for easier detection
-        if len(df) < 30:
+        if len(low) < 30:
             return False
-        lows = df.tail(30)['low'].values
+        lows = low[-30:]
         troughs = self._find_troughs(lows, distance=3)
         return len(troughs) >= 1
 
-    def _detect_ascending_triangle(self, df):
+    def _detect_ascending_triangle(self, high):
         # LOWERED: 30->20 candles, relaxed slope for easier detection
-        if len(df) < 20:
+        if len(high) < 20:
             return False
-        recent = df.tail(20)
-        highs = recent['high'].values
-        high_trend = np.polyfit(range(len(highs)), highs, 1)
-        return abs(high_trend[0]) < 1.0  # More relaxed
+        high_slope = linear_slope(high[-20:])  # Same as np.polyfit(..., 1)[0]
+        return abs(high_slope) < 1.0  # More relaxed
 
-    def _detect_bull_flag(self, df):
+    def _detect_bull_flag(self, close):
         # LOWERED: 5% -> 2% increase for easier detection
-        if len(df) < 30:
+        if len(close) < 30:
             return False
-        closes = df.tail(30)['close'].values
+        closes = close[-30:]
         flagpole = closes[-30:-20]
         return (flagpole[-1] - flagpole[0]) / flagpole[0] > 0.02
     
     def _find_peaks(self, data, distance=5):
-        peaks = []
-        for i in range(distance, len(data) - distance):
-            if data[i] == max(data[i-distance:i+distance+1]):
-                peaks.append(i)
-        return peaks
+        # Sliding-window kernel (pattern_kernels.py), same indices as the old loop
+        return find_peaks(data, distance).tolist()
     
     def _find_troughs(self, data, distance=5):
-        troughs = []
-        for i in range(distance, len(data) - distance):
-            if data[i] == min(data[i-distance:i+distance+1]):
-                troughs.append(i)
-        return troughs
+        return find_troughs(data, distance).tolist()
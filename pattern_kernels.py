@@ -0,0 +1,218 @@
+"""
+Array kernels for PatternDetector
+Gem Holding © 2025
+
+Peak/trough search and trend slopes over plain float64 arrays. The NumPy
+backend uses sliding windows (no Python loop per candle) and a
+closed-form least-squares slope instead of np.polyfit; when numba is
+installed the same kernels are JIT-compiled loops. Both return exactly
+what the original list-based loops returned (finite input).
+
+Backend: PATTERN_KERNEL_BACKEND=numpy|numba (default: numba if available)
+
+Usage:
+    python pattern_kernels.py                      # parity check + benchmark
+    python pattern_kernels.py --symbols 500 --candles 200
+"""
+
+import os
+import time
+from typing import Optional
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Try to import numba, fallback to NumPy kernels if not available
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+BACKEND = os.getenv('PATTERN_KERNEL_BACKEND', 'numba' if NUMBA_AVAILABLE else 'numpy')
+
+def _as_float_array(data) -> np.ndarray:
+    return np.ascontiguousarray(data, dtype=np.float64)
+
+def _use_numba(backend: Optional[str]) -> bool:
+    return (backend or BACKEND) == 'numba' and NUMBA_AVAILABLE
+
+# ============================================
+# NUMPY KERNELS
+# ============================================
+
+def _extrema_mask_numpy(data: np.ndarray, distance: int, find_max: bool) -> np.ndarray:
+    """True at i if data[i] is the max (min) of data[i-distance:i+distance+1]."""
+    mask = np.zeros(data.shape, dtype=bool)
+    if data.shape[-1] < 2 * distance + 1:
+        return mask
+    windows = sliding_window_view(data, 2 * distance + 1, axis=-1)
+    extreme = windows.max(axis=-1) if find_max else windows.min(axis=-1)
+    mask[..., distance:data.shape[-1] - distance] = data[..., distance:data.shape[-1] - distance] == extreme
+    return mask
+
+def _slope_numpy(y: np.ndarray) -> np.ndarray:
+    n = y.shape[-1]
+    x = np.arange(n, dtype=np.float64) - (n - 1) / 2
+    return (y @ x) / (x @ x)
+
+# ============================================
+# NUMBA KERNELS
+# ============================================
+
+if NUMBA_AVAILABLE:
+    @njit(cache=True)
+    def _extrema_mask_numba(data, distance, find_max):
+        n = data.shape[0]
+        mask = np.zeros(n, dtype=np.bool_)
+        for i in range(distance, n - distance):
+            value = data[i]
+            is_extreme = True
+            for j in range(i - distance, i + distance + 1):
+                if (data[j] > value) if find_max else (data[j] < value):
+                    is_extreme = False
+                    break
+            mask[i] = is_extreme
+        return mask
+
+    @njit(cache=True)
+    def _slope_numba(y):
+        n = y.shape[0]
+        center = (n - 1) / 2.0
+        num = 0.0
+        den = 0.0
+        for i in range(n):
+            x = i - center
+            num += x * y[i]
+            den += x * x
+        return num / den
+
+# ============================================
+# PUBLIC API
+# ============================================
+
+def extrema_mask(data, distance: int = 5, find_max: bool = True, backend: Optional[str] = None) -> np.ndarray:
+    """
+    Boolean mask of local maxima (find_max) or minima: data[i] equals the
+    max (min) of the window of `distance` candles on each side. The first
+    and last `distance` candles are never marked. The NumPy backend also
+    accepts 2-D input (one series per row).
+    """
+    data = _as_float_array(data)
+    if data.ndim == 1 and _use_numba(backend):
+        return _extrema_mask_numba(data, distance, find_max)
+    return _extrema_mask_numpy(data, distance, find_max)
+
+def find_peaks(data, distance: int = 5, backend: Optional[str] = None) -> np.ndarray:
+    """Indices i where data[i] == max(data[i-distance:i+distance+1])."""
+    return np.flatnonzero(extrema_mask(data, distance, True, backend))
+
+def find_troughs(data, distance: int = 5, backend: Optional[str] = None) -> np.ndarray:
+    """Indices i where data[i] == min(data[i-distance:i+distance+1])."""
+    return np.flatnonzero(extrema_mask(data, distance, False, backend))
+
+def linear_slope(y, backend: Optional[str] = None):
+    """
+    Least-squares slope of y against 0..n-1 (np.polyfit(range(n), y, 1)[0]),
+    in closed form. 2-D input gives one slope per row (NumPy backend).
+    """
+    y = _as_float_array(y)
+    if y.shape[-1] < 2:
+        raise ValueError('linear_slope needs at least 2 points')
+    if y.ndim == 1 and _use_numba(backend):
+        return float(_slope_numba(y))
+    slope = _slope_numpy(y)
+    return float(slope) if y.ndim == 1 else slope
+
+# ============================================
+# PARITY CHECK + BENCHMARK
+# ============================================
+
+def _reference_peaks(data, distance=5):
+    """The original PatternDetector._find_peaks loop."""
+    return [i for i in range(distance, len(data) - distance) if data[i] == max(data[i-distance:i+distance+1])]
+
+def _reference_troughs(data, distance=5):
+    """The original PatternDetector._find_troughs loop."""
+    return [i for i in range(distance, len(data) - distance) if data[i] == min(data[i-distance:i+distance+1])]
+
+def _random_frames(symbols: int, candles: int, seed: int = 7):
+    import pandas as pd
+
+    rng = np.random.default_rng(seed)
+    frames = []
+    for _ in range(symbols):
+        close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, candles)))
+        close = np.round(close, 2)  # Exchange tick size: ties between candles happen
+        spread = np.round(close * rng.uniform(0, 0.01, candles), 2)
+        frames.append(pd.DataFrame({
+            'timestamp': pd.date_range('2024-01-01', periods=candles, freq='h'),
+            'open': close, 'high': close + spread, 'low': close - spread,
+            'close': close, 'volume': rng.uniform(1, 100, candles),
+        }))
+    return frames
+
+def check_parity(series: int = 2000, backends=None) -> bool:
+    """Kernels vs the original loops and np.polyfit on random and tied data."""
+    rng = np.random.default_rng(1)
+    backends = backends or ['numpy'] + (['numba'] if NUMBA_AVAILABLE else [])
+    ok = True
+
+    for backend in backends:
+        mismatches = 0
+        for k in range(series):
+            n = int(rng.integers(1, 80))
+            data = rng.normal(size=n) if k % 2 else np.round(rng.normal(size=n), 1)  # Half with ties
+            distance = int(rng.integers(1, 6))
+            if find_peaks(data, distance, backend).tolist() != _reference_peaks(data, distance):
+                mismatches += 1
+            if find_troughs(data, distance, backend).tolist() != _reference_troughs(data, distance):
+                mismatches += 1
+            if n >= 2 and not np.isclose(linear_slope(data, backend), np.polyfit(range(n), data, 1)[0], rtol=1e-9, atol=1e-12):
+                mismatches += 1
+        print(f'[Kernels] parity {backend}: {series} series, {mismatches} mismatches')
+        ok = ok and mismatches == 0
+
+    return ok
+
+def bench_scan(symbols: int = 500, candles: int = 200) -> float:
+    """PatternDetector.detect_all_patterns over `symbols` DataFrames, one core."""
+    from pattern_detector import PatternDetector
+
+    frames = _random_frames(symbols, candles)
+    detector = PatternDetector()
+    detector.detect_all_patterns(frames[0])  # JIT warm-up
+
+    start = time.perf_counter()
+    found = sum(len(detector.detect_all_patterns(df)) for df in frames)
+    elapsed = time.perf_counter() - start
+
+    highs = [df['high'].to_numpy() for df in frames]
+    start = time.perf_counter()
+    for high in highs:
+        _reference_peaks(high[-40:], 3)
+        _reference_peaks(high[-30:], 3)
+        np.polyfit(range(20), high[-20:], 1)
+    reference = time.perf_counter() - start
+    start = time.perf_counter()
+    for high in highs:
+        find_peaks(high[-40:], 3)
+        find_peaks(high[-30:], 3)
+        linear_slope(high[-20:])
+    kernels = time.perf_counter() - start
+
+    print(f'[Kernels] scan {symbols} symbols x {candles} candles ({BACKEND}): {elapsed * 1000:.0f} ms, '
+          f'{found} patterns | peak/slope primitives: loops + polyfit {reference * 1000:.1f} ms vs '
+          f'kernels {kernels * 1000:.1f} ms ({reference / kernels:.1f}x)')
+    return elapsed
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='PatternDetector kernel parity check and benchmark')
+    parser.add_argument('--symbols', type=int, default=500)
+    parser.add_argument('--candles', type=int, default=200)
+    args = parser.parse_args()
+
+    check_parity()
+    bench_scan(args.symbols, args.candles)
@@ -0,0 +1,234 @@
+"""
+Batched scan service for the Streamlit scanner
+Gem Holding © 2025
+
+One ScanService is shared by every session (see get_scan_service in
+app.py). A scan fetches OHLCV for all requested coins concurrently
+through a single exchange client and runs PatternDetector for each coin
+in the same worker pool. Each coin's result is cached under
+(coin, timeframe, candle open time, sensitivity): until the next candle
+opens, repeated scans - by any user - are answered from memory, and a
+coin already being scanned for another user is waited on, not fetched
+again.
+
+Results are compact dicts (no DataFrame); the candles behind a result
+stay in the cache and are handed out by chart_data() when a chart is
+opened.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from chart_utils import ChartGenerator
+from config import CANDLE_LIMIT, SENSITIVITY, SCAN_WORKERS, SCAN_CACHE_ENTRIES
+from pattern_detector import PatternDetector
+
+TIMEFRAME_UNIT_MS = {'m': 60_000, 'h': 3_600_000, 'd': 86_400_000, 'w': 604_800_000}
+WEEK_OFFSET_MS = 4 * 86_400_000  # Weekly candles open on Monday, the epoch was a Thursday
+
+CacheKey = Tuple[str, str, int, float]
+
+def timeframe_ms(timeframe: str) -> int:
+    return int(timeframe[:-1]) * TIMEFRAME_UNIT_MS[timeframe[-1]]
+
+def candle_time(timeframe: str, now_ms: Optional[int] = None) -> int:
+    """Open time (ms) of the candle forming at now_ms (default: now)."""
+    if now_ms is None:
+        now_ms = int(time.time() * 1000)
+    interval = timeframe_ms(timeframe)
+    offset = WEEK_OFFSET_MS if timeframe.endswith('w') else 0
+    return (now_ms - offset) // interval * interval + offset
+
+@dataclass
+class CoinScan:
+    """Patterns found for one coin in one candle, with the candles they came from."""
+    coin: str
+    timeframe: str
+    candle_time: int
+    sensitivity: float
+    candles: pd.DataFrame
+    results: List[Dict]
+
+@dataclass
+class ScanReport:
+    results: List[Dict]
+    errors: Dict[str, str]
+    cached: int     # Coins answered from the cache
+    fetched: int    # Coins fetched from the exchange by this scan
+    shared: int     # Coins joined while another scan was fetching them
+    seconds: float
+
+class ScanService:
+    """
+    Concurrent, cached multi-coin pattern scans.
+
+    Args:
+        exchange: ccxt exchange instance (default: a rate-limited ccxt.binance)
+        workers: Coins fetched and scanned at the same time
+        cache_entries: Coin results kept (least recently used dropped first)
+        candle_limit: Candles fetched per coin
+    """
+
+    def __init__(self, exchange=None, workers: int = SCAN_WORKERS,
+                 cache_entries: int = SCAN_CACHE_ENTRIES, candle_limit: int = CANDLE_LIMIT):
+        self._exchange = exchange
+        self._exchange_lock = threading.Lock()
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='scan')
+        self.cache_entries = cache_entries
+        self.candle_limit = candle_limit
+        self.chart = ChartGenerator()
+
+        self._cache: 'OrderedDict[CacheKey, CoinScan]' = OrderedDict()
+        self._inflight: Dict[CacheKey, Future] = {}
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def exchange(self):
+        """Shared exchange client, created (and its markets loaded) once."""
+        with self._exchange_lock:
+            if self._exchange is None:
+                import ccxt
+                exchange = ccxt.binance({'enableRateLimit': True})
+                exchange.load_markets()
+                self._exchange = exchange
+        return self._exchange
+
+    def scan(self, coins: List[str], timeframe: str, sensitivity: float = SENSITIVITY,
+             progress: Optional[Callable[[int, int], None]] = None) -> ScanReport:
+        """
+        Scan `coins` on `timeframe` (exchange notation, e.g. '1h').
+
+        Results keep the order of `coins`. progress(done, total) is called
+        from the calling thread as each coin finishes.
+        """
+        started = time.perf_counter()
+        current = candle_time(timeframe)
+        pending: Dict[str, object] = {}
+        fetched = shared = 0
+
+        with self._lock:
+            for coin in dict.fromkeys(coins):
+                key = (coin, timeframe, current, sensitivity)
+                entry = self._cache.get(key)
+                if entry is not None:
+                    self._cache.move_to_end(key)
+                    self.hits += 1
+                    pending[coin] = entry
+                    continue
+
+                self.misses += 1
+                future = self._inflight.get(key)
+                if future is None:
+                    future = self.pool.submit(self._scan_coin, coin, timeframe, sensitivity)
+                    self._inflight[key] = future
+                    future.add_done_callback(lambda f, key=key: self._finish(key, f))
+                    fetched += 1
+                else:
+                    shared += 1
+                pending[coin] = future
+
+        results: List[Dict] = []
+        errors: Dict[str, str] = {}
+        for done, (coin, item) in enumerate(pending.items(), 1):
+            if isinstance(item, Future):
+                try:
+                    item = item.result()
+                except Exception as e:
+                    errors[coin] = str(e)
+                    item = None
+            if item is not None:
+                # Copies: cached results are shared with other sessions
+                results.extend(dict(result) for result in item.results)
+            if progress:
+                progress(done, len(pending))
+
+        return ScanReport(
+            results=results,
+            errors=errors,
+            cached=len(pending) - fetched - shared,
+            fetched=fetched,
+            shared=shared,
+            seconds=time.perf_counter() - started,
+        )
+
+    def chart_data(self, result: Dict) -> pd.DataFrame:
+        """Candles behind a scan result: from the cache, else fetched again."""
+        key = (result['coin'], result['timeframe'], result['candle_time'], result['sensitivity'])
+        with self._lock:
+            entry = self._cache.get(key)
+        if entry is not None:
+            return entry.candles
+        return self._fetch(result['coin'], result['timeframe'])
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._cache),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'inflight': len(self._inflight),
+            }
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+    def _fetch(self, coin: str, timeframe: str) -> pd.DataFrame:
+        ohlcv = self.exchange.fetch_ohlcv(coin, timeframe, limit=self.candle_limit)
+        if not ohlcv:
+            raise ValueError('no candles returned')
+        df = pd.DataFrame(ohlcv, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
+        df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
+        return df
+
+    def _scan_coin(self, coin: str, timeframe: str, sensitivity: float) -> CoinScan:
+        df = self._fetch(coin, timeframe)
+        opened = int(df['timestamp'].iloc[-1].timestamp() * 1000)
+
+        results = []
+        for p in PatternDetector(sensitivity=sensitivity).detect_all_patterns(df):
+            pattern = {
+                'pattern': p.get('pattern', 'Unknown'),
+                'type': p.get('type', 'Neutral'),
+                'confidence': p.get('confidence', 0),
+            }
+            signals = self.chart.calculate_signals(df, pattern)
+            results.append({
+                'coin': coin,
+                'timeframe': timeframe,
+                'candle_time': opened,
+                'sensitivity': sensitivity,
+                'pattern': pattern['pattern'],
+                'signal': pattern['type'],
+                'confidence': pattern['confidence'],
+                'price': float(df['close'].iloc[-1]),
+                'entry': float(signals['entry']['price']),
+                'stop_loss': float(signals['stop_loss']),
+                'take_profits': [float(tp) for tp in signals['take_profit']],
+            })
+
+        return CoinScan(coin, timeframe, opened, sensitivity, df, results)
+
+    def _finish(self, key: CacheKey, future: Future):
+        with self._lock:
+            self._inflight.pop(key, None)
+            if future.cancelled() or future.exception() is not None:
+                return
+            scan = future.result()
+            # Right after a candle opens the exchange may still end on the
+            # previous one; only cache results of the candle they are keyed by
+            if scan.candle_time != key[2]:
+                return
+            self._cache[key] = scan
+            while len(self._cache) > self.cache_entries:
+                self._cache.popitem(last=False)
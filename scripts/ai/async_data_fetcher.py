@@ -0,0 +1,599 @@
+# scripts/ai/async_data_fetcher.py
+# Concurrent historical kline downloader (asyncio + aiohttp)
+# GEMRAL AI BRAIN - Phase 7
+#
+# Splits each (symbol, timeframe) range into 1000-candle pages and fetches
+# them concurrently over one pooled aiohttp session. Requests are paced by
+# a token bucket sized from the exchange's request-weight budget, and every
+# finished page is checkpointed to disk so an interrupted backfill resumes
+# where it stopped. Pages are aligned to fixed page-span boundaries, so a
+# rerun over an overlapping range (e.g. a new "now") reuses them too.
+#
+# Usage:
+#   python async_data_fetcher.py --symbols BTCUSDT ETHUSDT --timeframes 1h 4h --days 730
+#   python async_data_fetcher.py --base-url http://127.0.0.1:8000/api/v3   # fixture server
+
+import argparse
+import asyncio
+import os
+import shutil
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import List, Dict, Optional, Tuple
+
+import aiohttp
+import numpy as np
+
+from feature_extractor import CandleArray
+from historical_data_fetcher import (
+    HistoricalDataFetcher, TIMEFRAME_MINUTES, MAX_CANDLES_PER_REQUEST,
+    MAX_RETRIES, RETRY_DELAY, klines_base_url, closed_candles,
+)
+from candle_resampler import base_timeframe_for, covering_end, derive_range
+
+# ═══════════════════════════════════════════════════════════════════════════
+# CONFIGURATION
+# ═══════════════════════════════════════════════════════════════════════════
+
+# Request weight per rolling minute (Binance REQUEST_WEIGHT limits)
+SPOT_WEIGHT_LIMIT = 6000
+FUTURES_WEIGHT_LIMIT = 2400
+WEIGHT_SAFETY = 0.8             # Use at most 80% of the budget
+BURST_FRACTION = 0.2            # Bucket capacity, as a fraction of the per-minute budget
+
+USED_WEIGHT_HEADER = 'X-MBX-USED-WEIGHT-1M'
+
+DEFAULT_CONCURRENCY = 16        # In-flight requests across all streams
+REQUEST_TIMEOUT = 10
+
+CHECKPOINT_DIR = os.getenv(
+    'KLINE_CHECKPOINT_DIR',
+    os.path.join(os.path.expanduser('~'), '.cache', 'gemral', 'kline_checkpoints')
+)
+CHECKPOINT_MAX_AGE_DAYS = 7     # Checkpoint dirs untouched this long are pruned
+
+def kline_request_weight(limit: int, futures: bool = False) -> int:
+    """Request weight of one klines call."""
+    if not futures:
+        return 2
+    if limit < 100:
+        return 1
+    if limit < 500:
+        return 2
+    if limit <= 1000:
+        return 5
+    return 10
+
+# ═══════════════════════════════════════════════════════════════════════════
+# RATE LIMITER
+# ═══════════════════════════════════════════════════════════════════════════
+
+class WeightTokenBucket:
+    """
+    Token bucket in request-weight units.
+
+    Refills at weight_limit * safety per minute with a capacity of
+    BURST_FRACTION of that, so any 60s window stays under the limit even
+    starting from a full bucket. The server's used-weight header can drain
+    the bucket when other clients share the same IP budget.
+    """
+
+    def __init__(self, weight_limit: int, safety: float = WEIGHT_SAFETY, burst_fraction: float = BURST_FRACTION):
+        self.weight_limit = weight_limit
+        self.budget = weight_limit * safety
+        self.rate = self.budget / 60.0
+        self.capacity = max(self.budget * burst_fraction, 1.0)
+        self.tokens = self.capacity
+        self.waited = 0.0
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, weight: float):
+        """Wait until `weight` tokens are available and take them (FIFO)."""
+        weight = min(weight, self.capacity)
+        async with self._lock:
+            while True:
+                self._refill()
+                if self.tokens >= weight:
+                    self.tokens -= weight
+                    return
+                delay = (weight - self.tokens) / self.rate
+                self.waited += delay
+                await asyncio.sleep(delay)
+
+    def observe_used_weight(self, used: int):
+        """Drain the bucket when the server reports the budget is nearly spent."""
+        if used >= self.budget:
+            self._refill()
+            self.tokens = min(self.tokens, 0.0)
+
+    async def penalize(self, seconds: float):
+        """Block all requests for `seconds` (HTTP 429/418 Retry-After)."""
+        async with self._lock:
+            self.waited += seconds
+            await asyncio.sleep(seconds)
+            self._updated = time.monotonic()
+            self.tokens = 0.0
+
+# ═══════════════════════════════════════════════════════════════════════════
+# CHECKPOINTS
+# ═══════════════════════════════════════════════════════════════════════════
+
+class PageCheckpoint:
+    """
+    Finished pages of one stream, one .npz per aligned page start.
+
+    The directory is keyed by source, symbol and timeframe only; pages
+    start on multiples of the page span, so any rerun whose range overlaps
+    skips every complete page already on disk.
+    """
+
+    def __init__(self, root: str, source: str, symbol: str, timeframe: str):
+        safe_source = ''.join(c if c.isalnum() else '_' for c in source)
+        self.path = os.path.join(root, f'{safe_source}_{symbol}_{timeframe}')
+
+    def _page_path(self, page_start: int) -> str:
+        return os.path.join(self.path, f'{page_start}.npz')
+
+    def load(self, page_start: int) -> Optional[CandleArray]:
+        path = self._page_path(page_start)
+        if not os.path.exists(path):
+            return None
+        try:
+            with np.load(path) as data:
+                return CandleArray(*(data[name] for name in CandleArray.FIELDS))
+        except Exception as e:
+            print(f'[AsyncFetcher] Ignoring unreadable checkpoint {path}: {e}')
+            return None
+
+    def save(self, page_start: int, candles: CandleArray):
+        os.makedirs(self.path, exist_ok=True)
+        path = self._page_path(page_start)
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, **{name: getattr(candles, name) for name in CandleArray.FIELDS})
+        os.replace(tmp_path, path)
+
+    def clear(self):
+        shutil.rmtree(self.path, ignore_errors=True)
+
+    def discard(self, page_starts: List[int]):
+        """Remove these pages (and the dir once empty); other ranges' pages stay."""
+        for page_start in page_starts:
+            try:
+                os.remove(self._page_path(page_start))
+            except FileNotFoundError:
+                pass
+        try:
+            os.rmdir(self.path)
+        except OSError:
+            pass
+
+def prune_checkpoints(root: str, max_age_days: float = CHECKPOINT_MAX_AGE_DAYS) -> int:
+    """Remove checkpoint dirs with no page written in `max_age_days`; returns the count."""
+    if not os.path.isdir(root):
+        return 0
+    cutoff = time.time() - max_age_days * 86400
+    pruned = 0
+    for name in os.listdir(root):
+        path = os.path.join(root, name)
+        if not os.path.isdir(path):
+            continue
+        mtimes = [os.path.getmtime(os.path.join(path, f)) for f in os.listdir(path)]
+        if max(mtimes, default=os.path.getmtime(path)) < cutoff:
+            shutil.rmtree(path, ignore_errors=True)
+            pruned += 1
+    return pruned
+
+# ═══════════════════════════════════════════════════════════════════════════
+# DOWNLOADER
+# ═══════════════════════════════════════════════════════════════════════════
+
+@dataclass
+class DownloadStats:
+    requests: int = 0
+    resumed_pages: int = 0
+    candles: int = 0
+    retries: int = 0
+    throttled: int = 0
+    elapsed: float = 0.0
+
+    def summary(self) -> str:
+        rate = self.candles / self.elapsed if self.elapsed > 0 else 0.0
+        return (f'{self.candles} candles, {self.requests} requests, {self.resumed_pages} pages resumed, '
+                f'{self.retries} retries, {self.throttled} throttled, {self.elapsed:.1f}s ({rate:,.0f} candles/s)')
+
+class AsyncKlineDownloader:
+    """
+    Concurrent kline downloader over one pooled aiohttp session.
+
+    Args:
+        futures: Use the futures API (and its weight limit)
+        base_url: Any Binance-compatible API root; overrides `futures`
+            for the URL (a local fixture server in tests/benchmarks)
+        concurrency: Maximum in-flight requests across all streams
+        weight_limit: Request-weight budget per minute (default: the
+            exchange limit for spot/futures)
+        checkpoint_dir: Where finished pages are kept; None disables resume.
+            Dirs older than CHECKPOINT_MAX_AGE_DAYS are pruned on open
+        keep_checkpoints: Keep pages after a stream completes
+    """
+
+    def __init__(
+        self,
+        futures: bool = False,
+        base_url: Optional[str] = None,
+        concurrency: int = DEFAULT_CONCURRENCY,
+        weight_limit: Optional[int] = None,
+        checkpoint_dir: Optional[str] = CHECKPOINT_DIR,
+        keep_checkpoints: bool = False
+    ):
+        self.futures = futures
+        self.base_url = klines_base_url(futures, base_url)
+        self.concurrency = concurrency
+        self.weight_limit = weight_limit or (FUTURES_WEIGHT_LIMIT if futures else SPOT_WEIGHT_LIMIT)
+        self.checkpoint_dir = checkpoint_dir
+        self.keep_checkpoints = keep_checkpoints
+        self.stats = DownloadStats()
+
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._limiter: Optional[WeightTokenBucket] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+
+    async def __aenter__(self) -> 'AsyncKlineDownloader':
+        connector = aiohttp.TCPConnector(limit=self.concurrency)
+        self._session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=REQUEST_TIMEOUT),
+        )
+        self._limiter = WeightTokenBucket(self.weight_limit)
+        self._slots = asyncio.Semaphore(self.concurrency)
+        if self.checkpoint_dir:
+            pruned = prune_checkpoints(self.checkpoint_dir)
+            if pruned:
+                print(f'[AsyncFetcher] Pruned {pruned} stale checkpoint dirs')
+        return self
+
+    async def __aexit__(self, *exc):
+        await self._session.close()
+        self._session = None
+
+    async def fetch_klines(
+        self,
+        symbol: str,
+        timeframe: str,
+        start_time: int,
+        end_time: int,
+        limit: int = MAX_CANDLES_PER_REQUEST
+    ) -> List[List]:
+        """One klines request, rate-limited and retried."""
+        params = {
+            'symbol': symbol,
+            'interval': timeframe,
+            'startTime': start_time,
+            'endTime': end_time,
+            'limit': min(limit, MAX_CANDLES_PER_REQUEST),
+        }
+        weight = kline_request_weight(params['limit'], self.futures)
+
+        for attempt in range(MAX_RETRIES):
+            await self._limiter.acquire(weight)
+            try:
+                async with self._slots:
+                    async with self._session.get(f'{self.base_url}/klines', params=params) as response:
+                        self.stats.requests += 1
+
+                        used = response.headers.get(USED_WEIGHT_HEADER)
+                        if used is not None:
+                            self._limiter.observe_used_weight(int(used))
+
+                        if response.status in (418, 429):
+                            self.stats.throttled += 1
+                            retry_after = float(response.headers.get('Retry-After', RETRY_DELAY * (attempt + 1)))
+                            print(f'[AsyncFetcher] {symbol} {timeframe} throttled ({response.status}), waiting {retry_after:.0f}s')
+                            await self._limiter.penalize(retry_after)
+                            continue
+
+                        response.raise_for_status()
+                        return await response.json()
+
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                print(f'[AsyncFetcher] {symbol} {timeframe} attempt {attempt + 1} failed: {e}')
+                if attempt == MAX_RETRIES - 1:
+                    raise
+                self.stats.retries += 1
+                await asyncio.sleep(RETRY_DELAY * (attempt + 1))
+
+        raise RuntimeError(f'{symbol} {timeframe}: still throttled after {MAX_RETRIES} attempts')
+
+    async def download(
+        self,
+        symbol: str,
+        timeframe: str,
+        start_date: datetime,
+        end_date: datetime
+    ) -> CandleArray:
+        """All candles opening in [start_date, end_date], sorted and unique."""
+        return await self.download_range(
+            symbol, timeframe, int(start_date.timestamp() * 1000), int(end_date.timestamp() * 1000)
+        )
+
+    async def download_range(self, symbol: str, timeframe: str, start_ts: int, end_ts: int) -> CandleArray:
+        """download() for a millisecond range [start_ts, end_ts]."""
+        page_span = MAX_CANDLES_PER_REQUEST * TIMEFRAME_MINUTES.get(timeframe, 60) * 60 * 1000
+        # Only pages whose last candle has closed are final enough to checkpoint
+        checkpoint_until = min(end_ts + 1, int(time.time() * 1000))
+
+        checkpoint = None
+        if self.checkpoint_dir:
+            checkpoint = PageCheckpoint(self.checkpoint_dir, self.base_url, symbol, timeframe)
+
+        async def fetch_page(page_start: int) -> CandleArray:
+            if checkpoint:
+                cached = checkpoint.load(page_start)
+                if cached is not None:
+                    self.stats.resumed_pages += 1
+                    return cached
+
+            page_end = min(page_start + page_span - 1, end_ts)
+            klines = await self.fetch_klines(symbol, timeframe, page_start, page_end)
+            candles = CandleArray.from_klines(klines)
+
+            if checkpoint and page_start + page_span <= checkpoint_until:
+                checkpoint.save(page_start, candles)
+            return candles
+
+        page_starts = range(start_ts - start_ts % page_span, end_ts + 1, page_span)
+        pages = await asyncio.gather(*(fetch_page(s) for s in page_starts))
+
+        # Remove duplicates (first occurrence wins), sort, trim to the range
+        all_candles = CandleArray.concatenate(pages)
+        _, first_index = np.unique(all_candles.timestamp, return_index=True)
+        candles = all_candles.take(first_index)
+        in_range = (candles.timestamp >= start_ts) & (candles.timestamp <= end_ts)
+        candles = candles.take(np.flatnonzero(in_range))
+
+        if checkpoint and not self.keep_checkpoints:
+            checkpoint.discard(list(page_starts))
+
+        self.stats.candles += len(candles)
+        print(f'[AsyncFetcher] {symbol} {timeframe}: {len(candles)} candles in {len(pages)} pages')
+        return candles
+
+    async def download_all(
+        self,
+        symbols: List[str],
+        timeframes: List[str],
+        start_date: datetime,
+        end_date: datetime
+    ) -> Dict[str, Dict[str, CandleArray]]:
+        """
+        Download every (symbol, timeframe) concurrently.
+
+        A failed stream is reported and returned empty; finished pages stay
+        checkpointed, so rerunning picks it up where it stopped.
+        """
+        streams = [(symbol, timeframe) for symbol in symbols for timeframe in timeframes]
+
+        async def run(symbol: str, timeframe: str) -> CandleArray:
+            try:
+                return await self.download(symbol, timeframe, start_date, end_date)
+            except Exception as e:
+                print(f'[AsyncFetcher] Error {symbol} {timeframe}: {e}')
+                return CandleArray.empty()
+
+        start = time.perf_counter()
+        arrays = await asyncio.gather(*(run(symbol, timeframe) for symbol, timeframe in streams))
+        self.stats.elapsed += time.perf_counter() - start
+
+        result: Dict[str, Dict[str, CandleArray]] = {symbol: {} for symbol in symbols}
+        for (symbol, timeframe), candles in zip(streams, arrays):
+            result[symbol][timeframe] = candles
+        return result
+
+    async def download_ranges(self, ranges: List[Tuple[str, str, int, int]]) -> List[Optional[CandleArray]]:
+        """
+        Download (symbol, timeframe, start_ts, end_ts) ranges concurrently.
+        A failed range is reported and returned as None.
+        """
+        async def run(symbol: str, timeframe: str, start_ts: int, end_ts: int) -> Optional[CandleArray]:
+            try:
+                return await self.download_range(symbol, timeframe, start_ts, end_ts)
+            except Exception as e:
+                print(f'[AsyncFetcher] Error {symbol} {timeframe}: {e}')
+                return None
+
+        start = time.perf_counter()
+        arrays = await asyncio.gather(*(run(*r) for r in ranges))
+        self.stats.elapsed += time.perf_counter() - start
+        return list(arrays)
+
+# ═══════════════════════════════════════════════════════════════════════════
+# BATCH FETCHER
+# ═══════════════════════════════════════════════════════════════════════════
+
+async def download_all_symbols(
+    symbols: List[str],
+    timeframes: List[str],
+    start_date: datetime,
+    end_date: datetime,
+    **downloader_kwargs
+) -> Tuple[Dict[str, Dict[str, CandleArray]], DownloadStats]:
+    """Download a symbol x timeframe grid; returns (data, stats)."""
+    async with AsyncKlineDownloader(**downloader_kwargs) as downloader:
+        data = await downloader.download_all(symbols, timeframes, start_date, end_date)
+    print(f'[AsyncFetcher] {downloader.stats.summary()}')
+    return data, downloader.stats
+
+async def download_ranges(
+    ranges: List[Tuple[str, str, int, int]],
+    **downloader_kwargs
+) -> Tuple[List[Optional[CandleArray]], DownloadStats]:
+    """Download (symbol, timeframe, start_ts, end_ts) ranges; returns (data, stats)."""
+    async with AsyncKlineDownloader(**downloader_kwargs) as downloader:
+        data = await downloader.download_ranges(ranges)
+    print(f'[AsyncFetcher] {downloader.stats.summary()}')
+    return data, downloader.stats
+
+def fetch_all_symbols_async(
+    symbols: List[str],
+    timeframes: List[str],
+    start_date: datetime,
+    end_date: datetime,
+    futures: bool = False,
+    base_url: Optional[str] = None,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    save_to_db: bool = True,
+    derive_timeframes: bool = True
+) -> Dict[str, Dict[str, CandleArray]]:
+    """
+    Concurrent drop-in for fetch_all_symbols.
+
+    Each stream is read from the local disk cache, then Supabase for the
+    ranges the disk cache lacks; only the gaps left after both are
+    downloaded (all streams' gaps together) and saved back to both, as
+    fetch_all_symbols does. With derive_timeframes, only the finest
+    timeframe is loaded when the others are multiples of it, and they are
+    resampled from it.
+
+    Returns:
+        {symbol: {timeframe: candles}}
+    """
+    base = base_timeframe_for(timeframes) if derive_timeframes and len(set(timeframes)) > 1 else None
+    if base:
+        start_ts = int(start_date.timestamp() * 1000)
+        end_ts = int(end_date.timestamp() * 1000)
+        base_end = datetime.fromtimestamp(covering_end(end_ts, base, timeframes) / 1000)
+        print(f'[AsyncFetcher] Deriving {", ".join(tf for tf in timeframes if tf != base)} from {base}')
+        data = fetch_all_symbols_async(
+            symbols, [base], start_date, base_end, futures=futures, base_url=base_url,
+            concurrency=concurrency, save_to_db=save_to_db, derive_timeframes=False,
+        )
+        return {
+            symbol: {tf: derive_range(data[symbol][base], base, tf, start_ts, end_ts) for tf in timeframes}
+            for symbol in symbols
+        }
+
+    fetcher = HistoricalDataFetcher(use_cache=True, base_url=base_url)
+    result: Dict[str, Dict[str, CandleArray]] = {symbol: {} for symbol in symbols}
+    stored: Dict[Tuple[str, str], List[CandleArray]] = {}
+    holes: List[Tuple[str, str, int, int]] = []
+
+    start_ts = int(start_date.timestamp() * 1000)
+    end_ts = int(end_date.timestamp() * 1000)
+    source = fetcher._cache_source(futures)
+
+    # Same lookup as HistoricalDataFetcher._fetch_stream/_fetch_range: disk
+    # cache, then Supabase for what it lacks, then only the remaining gaps
+    for symbol in symbols:
+        for timeframe in timeframes:
+            parts: List[CandleArray] = []
+            missing = [(start_ts, end_ts)]
+            if fetcher.disk_cache:
+                candles, missing = fetcher.disk_cache.load(symbol, timeframe, start_ts, end_ts, source)
+                if not missing:
+                    print(f'[AsyncFetcher] Loaded {symbol} {timeframe} from disk cache: {len(candles)} candles')
+                    result[symbol][timeframe] = candles
+                    continue
+                parts.append(candles)
+
+            for range_start, range_end in missing:
+                db_candles = CandleArray.empty()
+                if fetcher.supabase:
+                    db_candles = closed_candles(fetcher._load_from_db(
+                        symbol, timeframe,
+                        datetime.fromtimestamp(range_start / 1000), datetime.fromtimestamp(range_end / 1000),
+                    ), timeframe)
+                    if len(db_candles):
+                        print(f'[AsyncFetcher] Loaded {symbol} {timeframe} from DB: {len(db_candles)} candles')
+                        parts.append(db_candles)
+                for hole_start, hole_end in fetcher._missing_ranges(db_candles, timeframe, range_start, range_end):
+                    holes.append((symbol, timeframe, hole_start, hole_end))
+            stored[(symbol, timeframe)] = parts
+
+    fetched: List[Optional[CandleArray]] = []
+    if holes:
+        fetched, _ = asyncio.run(download_ranges(
+            holes, futures=futures, base_url=base_url, concurrency=concurrency,
+        ))
+
+    complete = {key: True for key in stored}
+    for (symbol, timeframe, _, _), candles in zip(holes, fetched):
+        if candles is None:
+            complete[(symbol, timeframe)] = False
+            continue
+        stored[(symbol, timeframe)].append(candles)
+        if save_to_db and fetcher.supabase and len(candles):
+            fetcher._save_to_db(symbol, timeframe, candles)
+
+    for (symbol, timeframe), parts in stored.items():
+        all_candles = CandleArray.concatenate(parts)
+        _, first_index = np.unique(all_candles.timestamp, return_index=True)
+        candles = all_candles.take(first_index)
+        result[symbol][timeframe] = candles
+        fetcher.cache[f'{symbol}_{timeframe}'] = candles
+        if fetcher.disk_cache and len(candles):
+            # Failed gaps and the still-open candle stay uncovered
+            last_closed = int(time.time() * 1000) - TIMEFRAME_MINUTES.get(timeframe, 60) * 60 * 1000
+            ok = complete[(symbol, timeframe)] and start_ts <= last_closed
+            covered = [(start_ts, min(end_ts, last_closed))] if ok else []
+            fetcher.disk_cache.store(symbol, timeframe, candles, covered, source)
+
+    return result
+
+# ═══════════════════════════════════════════════════════════════════════════
+# CLI
+# ═══════════════════════════════════════════════════════════════════════════
+
+def main():
+    parser = argparse.ArgumentParser(description='Concurrent historical kline backfill')
+    parser.add_argument('--symbols', nargs='+', default=['BTCUSDT', 'ETHUSDT'])
+    parser.add_argument('--timeframes', nargs='+', default=['1h', '4h'])
+    parser.add_argument('--days', type=int, default=730)
+    parser.add_argument('--futures', action='store_true')
+    parser.add_argument('--base-url', default=None, help='Binance-compatible API root')
+    parser.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY)
+    parser.add_argument('--no-db', action='store_true', help='Do not save to Supabase')
+    parser.add_argument('--no-derive', action='store_true', help='Download every timeframe instead of resampling from the finest')
+    args = parser.parse_args()
+
+    end_date = datetime.now()
+    start_date = end_date - timedelta(days=args.days)
+
+    data = fetch_all_symbols_async(
+        args.symbols, args.timeframes, start_date, end_date,
+        futures=args.futures,
+        base_url=args.base_url,
+        concurrency=args.concurrency,
+        save_to_db=not args.no_db,
+        derive_timeframes=not args.no_derive,
+    )
+
+    for symbol, tfs in data.items():
+        for timeframe, candles in tfs.items():
+            print(f'{symbol:12s} {timeframe:4s} {len(candles):8d} candles')
+
+# ═══════════════════════════════════════════════════════════════════════════
+# EXPORT
+# ═══════════════════════════════════════════════════════════════════════════
+
+__all__ = [
+    'WeightTokenBucket',
+    'PageCheckpoint',
+    'prune_checkpoints',
+    'AsyncKlineDownloader',
+    'DownloadStats',
+    'download_all_symbols',
+    'download_ranges',
+    'fetch_all_symbols_async',
+    'kline_request_weight',
+]
+
+if __name__ == '__main__':
+    main()
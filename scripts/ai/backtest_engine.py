@@ -3,16 +3,21 @@
 # GEMRAL AI BRAIN - Phase 7
 
 import os
+import heapq
 from dataclasses import dataclass, field
 from datetime import datetime, timedelta
 from typing import List, Dict, Any, Optional, Tuple
 from enum import Enum
 import json
 
+import numpy as np
+
 from feature_extractor import (
     Candle, PatternFeatures, extract_features,
-    zone_retest_validation, calculate_atr
+    zone_retest_validation, calculate_atr, IndicatorState,
+    CandleArray, candle_column, SwingIndex, SwingView
 )
+from exit_simulator import simulate_exits, REASON_NAMES
 
 # ═══════════════════════════════════════════════════════════════════════════
 # CONFIGURATION
@@ -75,6 +80,10 @@ class BacktestConfig:
     take_profit_type: str = 'rr_ratio'  # 'pattern', 'rr_ratio', 'percent'
     take_profit_value: float = DEFAULT_RISK_REWARD_TARGET
 
+    use_trailing_stop: bool = False
+    trailing_stop_percent: float = 2.0  # Distance behind the best price since entry
+    max_holding_candles: Optional[int] = None  # Time exit at the close of entry + N candles
+
     # Filters (CRITICAL for win rate)
     use_filters: bool = True
     min_score_threshold: float = 0.5
@@ -175,6 +184,18 @@ class BacktestState:
 
     trade_counter: int = 0
 
+@dataclass
+class Signal:
+    """A pattern detected at one candle, before filters and position sizing."""
+    index: int
+    pattern_code: str
+    direction: TradeDirection
+    zone_price: float
+    zone_type: str
+    atr: float
+    features: Optional[PatternFeatures] = None
+    feature_error: Optional[str] = None
+
 # ═══════════════════════════════════════════════════════════════════════════
 # BACKTEST ENGINE
 # ═══════════════════════════════════════════════════════════════════════════
@@ -195,12 +216,22 @@ class BacktestEngine:
             equity_curve=[],
         )
 
-    def run(self, candles_data: Dict[str, Dict[str, List[Candle]]]) -> Dict:
+    def run(
+        self,
+        candles_data: Dict[str, Dict[str, List[Candle]]],
+        signals_data: Optional[Dict[str, Dict[str, List[Signal]]]] = None,
+        exit_cache: Optional[Dict] = None
+    ) -> Dict:
         """
         Run the backtest.
 
         Args:
-            candles_data: {symbol: {timeframe: [candles]}}
+            candles_data: {symbol: {timeframe: [candles] or CandleArray}}
+            signals_data: optional {symbol: {timeframe: [signals]}} from
+                collect_signals(); when given, detection is skipped and
+                only position management is replayed
+            exit_cache: optional dict shared between replays of the same
+                data (e.g. a parameter sweep) to reuse exit scans
 
         Returns:
             Backtest results summary
@@ -222,7 +253,10 @@ class BacktestEngine:
                     continue
 
                 candles = candles_data[symbol][timeframe]
-                self._process_candles(symbol, timeframe, candles)
+                if signals_data is None:
+                    self._process_candles(symbol, timeframe, candles)
+                else:
+                    self._replay_signals(symbol, timeframe, candles, signals_data[symbol][timeframe], exit_cache)
 
         # Close any remaining open positions at last price
         self._close_all_positions()
@@ -250,40 +284,300 @@ class BacktestEngine:
             print(f'[Backtest] Not enough candles for {symbol} {timeframe}')
             return
 
-        for i in range(200, len(candles)):
-            candle = candles[i]
+        # Indicators advance one candle at a time and `history` is a
+        # zero-copy view over the columnar array, so each bar costs O(1)
+        # instead of re-slicing the prefix. Swing points are indexed once for
+        # the whole series; a prefix view carries them for S/R features
+        data = CandleArray.from_candles(candles)
+        indicators = IndicatorState()
+        swings = SwingIndex(data)
+
+        # Each position's exit candle is simulated when it opens (see
+        # exit_simulator for the rules), so open positions
+        # cost nothing per candle. Positions still open from earlier series
+        # keep updating from candle 200
+        exits = self._scan_exits(self.state.open_positions, data, 200)
+        exit_heap = [e[0] for e in exits.values() if e[0] is not None]
+        heapq.heapify(exit_heap)
+
+        for i, candle in enumerate(data):
+            indicators.update(candle)
+
+            if i < 200:
+                continue
+
+            history = data[:i+1]
 
-            # Update open positions
-            self._update_positions(candle, candles[:i+1])
+            # Close positions exiting on this candle
+            if exit_heap and exit_heap[0] == i:
+                while exit_heap and exit_heap[0] == i:
+                    heapq.heappop(exit_heap)
+                self._close_exits(candle, i, exits)
 
             # Check for new patterns
             if len(self.state.open_positions) < self.config.max_concurrent_trades:
-                self._check_for_patterns(symbol, timeframe, candles[:i+1], i)
+                opened = len(self.state.open_positions)
+                self._check_for_patterns(symbol, timeframe, history, i, indicators, swings.view(0, i + 1))
+                if len(self.state.open_positions) > opened:
+                    position = self.state.open_positions[-1]
+                    exits[position.id] = self._scan_exit(position, data, i + 1)
+                    if exits[position.id][0] is not None:
+                        heapq.heappush(exit_heap, exits[position.id][0])
 
             # Record equity
             if i % 24 == 0:  # Sample every ~day for 1h candles
                 self._record_equity(candle.timestamp)
 
+        self._settle_exits(exits)
+
+    def collect_signals(self, candles: List[Candle]) -> List[Signal]:
+        """
+        Detect signals (with features) at every candle a backtest would check.
+
+        The result is config-independent and can be replayed through
+        run(..., signals_data) under any filter/risk settings.
+        """
+        signals = []
+        if len(candles) < 200:
+            return signals
+
+        data = CandleArray.from_candles(candles)
+        indicators = IndicatorState()
+        swings = SwingIndex(data)
+
+        for i, candle in enumerate(data):
+            indicators.update(candle)
+
+            if i < 200:
+                continue
+
+            signal = self._detect_signal(
+                data[:i+1], i, indicators, with_features=True, swings=swings.view(0, i + 1)
+            )
+            if signal is not None:
+                signals.append(signal)
+
+        return signals
+
+    def _replay_signals(
+        self,
+        symbol: str,
+        timeframe: str,
+        candles: List[Candle],
+        signals: List[Signal],
+        exit_cache: Optional[Dict] = None
+    ):
+        """
+        Event-driven equivalent of _process_candles for precomputed signals.
+
+        Instead of visiting every candle, each position's exit candle
+        (first stop-loss/take-profit touch) and its MFE/MAE are found with
+        a vectorized scan when it opens, and the loop only stops at signal,
+        exit and equity-sample candles. Opens, closes and equity samples
+        happen in the same order as the per-candle loop, so the results
+        are identical.
+
+        A fresh position's exit depends only on its entry candle, stop
+        loss and take profit, so `exit_cache` can share scans between
+        configs that open the same trade.
+        """
+        if exit_cache is None:
+            exit_cache = {}
+
+        print(f'[Backtest] Replaying {symbol} {timeframe}: {len(candles)} candles, {len(signals)} signals')
+
+        if len(candles) < 200:
+            print(f'[Backtest] Not enough candles for {symbol} {timeframe}')
+            return
+
+        data = CandleArray.from_candles(candles)
+        n = len(data)
+        # Filtered-out signals never change state, so they are not events
+        signals_by_index = {
+            signal.index: signal for signal in signals
+            if 200 <= signal.index < n and self._passes_filters(signal)
+        }
+        signal_bars = sorted(signals_by_index)
+        next_signal = 0
+        next_record = 216  # First multiple of 24 at or after candle 200
+
+        # Positions still open from earlier series keep updating from candle 200
+        exits = self._scan_exits(self.state.open_positions, data, 200)
+        exit_heap = [e[0] for e in exits.values() if e[0] is not None]
+        heapq.heapify(exit_heap)
+
+        while True:
+            candidates = []
+            if exit_heap:
+                candidates.append(exit_heap[0])
+            if next_signal < len(signal_bars):
+                candidates.append(signal_bars[next_signal])
+            if next_record < n:
+                candidates.append(next_record)
+            if not candidates:
+                break
+
+            i = min(candidates)
+            closing = False
+            while exit_heap and exit_heap[0] == i:
+                heapq.heappop(exit_heap)
+                closing = True
+            if next_signal < len(signal_bars) and signal_bars[next_signal] == i:
+                next_signal += 1
+            if next_record == i:
+                next_record += 24
+
+            # Close positions exiting on this candle, in open order
+            if closing:
+                self._close_exits(data[i], i, exits)
+
+            if len(self.state.open_positions) < self.config.max_concurrent_trades:
+                signal = signals_by_index.get(i)
+                if signal is not None:
+                    opened = len(self.state.open_positions)
+                    self._open_from_signal(symbol, timeframe, data[i], signal)
+                    if len(self.state.open_positions) > opened:
+                        position = self.state.open_positions[-1]
+                        key = (symbol, timeframe, i, position.direction, position.stop_loss, position.take_profit,
+                               self._exit_rules())
+                        if key not in exit_cache:
+                            exit_cache[key] = self._scan_exit(position, data, i + 1)
+                        exits[position.id] = exit_cache[key]
+                        if exits[position.id][0] is not None:
+                            heapq.heappush(exit_heap, exits[position.id][0])
+
+            if i % 24 == 0:
+                self._record_equity(int(data.timestamp[i]))
+
+        self._settle_exits(exits)
+
+    def _exit_rules(self) -> Tuple[Optional[float], Optional[int]]:
+        """Config settings besides SL/TP that decide exits: (trailing %, max holding candles)."""
+        return (
+            self.config.trailing_stop_percent if self.config.use_trailing_stop else None,
+            self.config.max_holding_candles,
+        )
+
+    def _scan_exits(
+        self,
+        positions: List[Position],
+        data: CandleArray,
+        start: int
+    ) -> Dict[str, Tuple[Optional[int], float, ExitReason, float, float, Optional[float]]]:
+        """
+        Find the first candle at or after `start` where each position
+        exits under the exit_simulator rules, for all of them at once.
+
+        Returns {position id: (exit_index or None, exit_price, exit_reason,
+        mfe, mae, trailing_stop)}, with MFE/MAE and the trailing stop
+        accumulated through the exit candle (or the end).
+        """
+        if not positions:
+            return {}
+
+        trailing_percent, max_holding = self._exit_rules()
+        batch = simulate_exits(
+            data,
+            start=start,
+            long=[p.direction == TradeDirection.LONG for p in positions],
+            entry_price=[p.entry_price for p in positions],
+            stop_loss=[p.stop_loss for p in positions],
+            take_profit=[p.take_profit for p in positions],
+            trailing_percent=trailing_percent,
+            trailing_stop=[np.nan if p.trailing_stop is None else p.trailing_stop for p in positions],
+            expire=None if max_holding is None else [p.entry_candle_index + max_holding for p in positions],
+            mfe=[p.max_favorable_excursion for p in positions],
+            mae=[p.max_adverse_excursion for p in positions],
+        )
+
+        exits = {}
+        for k, position in enumerate(positions):
+            index = int(batch.index[k])
+            trailing = float(batch.trailing[k])
+            exits[position.id] = (
+                index if index >= 0 else None,
+                float(batch.price[k]),
+                ExitReason(REASON_NAMES[int(batch.reason[k])]) if index >= 0 else ExitReason.STOP_LOSS,
+                float(batch.mfe[k]),
+                float(batch.mae[k]),
+                None if np.isnan(trailing) else trailing,
+            )
+        return exits
+
+    def _scan_exit(
+        self,
+        position: Position,
+        data: CandleArray,
+        start: int
+    ) -> Tuple[Optional[int], float, ExitReason, float, float, Optional[float]]:
+        """_scan_exits for one position."""
+        return self._scan_exits([position], data, start)[position.id]
+
+    def _close_exits(self, candle: Candle, index: int, exits: Dict):
+        """Close the positions whose simulated exit is candle `index`, in open order."""
+        for position in [p for p in self.state.open_positions if exits[p.id][0] == index]:
+            _, exit_price, exit_reason, mfe, mae, trailing = exits.pop(position.id)
+            position.max_favorable_excursion = mfe
+            position.max_adverse_excursion = mae
+            position.trailing_stop = trailing
+            self._close_position(position, candle, exit_price, exit_reason)
+
+    def _settle_exits(self, exits: Dict):
+        """Positions that never exited have seen every remaining candle."""
+        for position in self.state.open_positions:
+            _, _, _, mfe, mae, trailing = exits[position.id]
+            position.max_favorable_excursion = mfe
+            position.max_adverse_excursion = mae
+            position.trailing_stop = trailing
+
     def _check_for_patterns(
         self,
         symbol: str,
         timeframe: str,
         candles: List[Candle],
-        current_index: int
+        current_index: int,
+        indicators: Optional[IndicatorState] = None,
+        swings: Optional[SwingView] = None
     ):
-        """Check for pattern signals at current candle."""
+        """
+        Check for pattern signals at current candle.
+
+        candles ends at current_index; indicators, if given, has been
+        advanced through that candle, and swings, if given, is aligned
+        with candles.
+        """
+        signal = self._detect_signal(candles, current_index, indicators, swings=swings)
+        if signal is not None:
+            self._open_from_signal(symbol, timeframe, candles[-1], signal)
+
+    def _detect_signal(
+        self,
+        candles: List[Candle],
+        current_index: int,
+        indicators: Optional[IndicatorState] = None,
+        with_features: Optional[bool] = None,
+        swings: Optional[SwingView] = None
+    ) -> Optional[Signal]:
+        """
+        Detection half of _check_for_patterns: pattern, features and ATR.
+
+        Depends only on the candles (not on config thresholds or engine
+        state), so results can be cached and replayed with
+        _open_from_signal under other configs.
+        """
         # Simplified pattern detection for backtest
         # In production, this would call the full pattern detection engine
 
         # Example: Simple double bottom detection
         pattern = self._detect_simple_pattern(candles, current_index)
         if pattern is None:
-            return
+            return None
 
         pattern_code, direction, zone_price, zone_type = pattern
+        features = None
+        feature_error = None
 
-        # Check filters
-        if self.config.use_filters:
+        if self.config.use_filters if with_features is None else with_features:
             # Extract features
             try:
                 features = extract_features(
@@ -291,32 +585,71 @@ class BacktestEngine:
                     current_index - 20,  # Approximate pattern start
                     current_index,
                     zone_price,
-                    zone_type
+                    zone_type,
+                    indicators=indicators,
+                    swings=swings
                 )
+            except Exception as e:
+                print(f'[Backtest] Feature extraction error: {e}')
+                feature_error = str(e)
 
-                # Check score threshold
-                if features.overall_score < self.config.min_score_threshold:
-                    return
+        return Signal(
+            index=current_index,
+            pattern_code=pattern_code,
+            direction=direction,
+            zone_price=zone_price,
+            zone_type=zone_type,
+            atr=indicators.atr.value if indicators is not None else calculate_atr(candles)[-1],
+            features=features,
+            feature_error=feature_error,
+        )
 
-                # Check zone retest requirement (KEY)
-                if self.config.require_zone_retest and not features.has_zone_retest:
-                    return
+    def _passes_filters(self, signal: Signal) -> bool:
+        """Score threshold and zone retest checks (only when use_filters)."""
+        if not self.config.use_filters:
+            return True
 
-            except Exception as e:
-                print(f'[Backtest] Feature extraction error: {e}')
-                return
-        else:
-            features = None
+        features = signal.features
+        if features is None:
+            return False
+
+        # Check score threshold
+        if features.overall_score < self.config.min_score_threshold:
+            return False
+
+        # Check zone retest requirement (KEY)
+        if self.config.require_zone_retest and not features.has_zone_retest:
+            return False
+
+        return True
+
+    def _open_from_signal(
+        self,
+        symbol: str,
+        timeframe: str,
+        candle: Candle,
+        signal: Signal
+    ):
+        """Position half of _check_for_patterns: filters, sizing, SL/TP."""
+        pattern_code = signal.pattern_code
+        direction = signal.direction
+        current_index = signal.index
+
+        # Check filters
+        if not self._passes_filters(signal):
+            return
+
+        features = signal.features if self.config.use_filters else None
 
         # Calculate position size
-        position_size, position_value = self._calculate_position_size(candles[-1].close)
+        position_size, position_value = self._calculate_position_size(candle.close)
 
         if position_value <= 0:
             return
 
         # Calculate stop loss and take profit
-        current_price = candles[-1].close
-        atr = calculate_atr(candles)[-1]
+        current_price = candle.close
+        atr = signal.atr
 
         if direction == TradeDirection.LONG:
             stop_loss = current_price - (atr * 2)
@@ -333,7 +666,7 @@ class BacktestEngine:
             symbol=symbol,
             timeframe=timeframe,
             direction=direction,
-            entry_time=datetime.fromtimestamp(candles[-1].timestamp / 1000),
+            entry_time=datetime.fromtimestamp(candle.timestamp / 1000),
             entry_price=current_price,
             entry_score=features.overall_score if features else 0.5,
             entry_candle_index=current_index,
@@ -365,9 +698,9 @@ class BacktestEngine:
 
         # Look for simple price patterns
         recent = candles[-30:]
-        closes = [c.close for c in recent]
-        lows = [c.low for c in recent]
-        highs = [c.high for c in recent]
+        closes = candle_column(recent, 'close').tolist()
+        lows = candle_column(recent, 'low').tolist()
+        highs = candle_column(recent, 'high').tolist()
 
         # Simple double bottom check
         min_idx_1 = lows[:15].index(min(lows[:15]))
@@ -404,62 +737,6 @@ class BacktestEngine:
 
         return None
 
-    def _update_positions(self, candle: Candle, all_candles: List[Candle]):
-        """Update all open positions with current candle."""
-        positions_to_close = []
-
-        for position in self.state.open_positions:
-            current_price = candle.close
-            high_price = candle.high
-            low_price = candle.low
-
-            # Track MFE/MAE
-            if position.direction == TradeDirection.LONG:
-                unrealized_pnl = (current_price - position.entry_price) / position.entry_price
-                position.max_favorable_excursion = max(
-                    position.max_favorable_excursion,
-                    (high_price - position.entry_price) / position.entry_price
-                )
-                position.max_adverse_excursion = max(
-                    position.max_adverse_excursion,
-                    (position.entry_price - low_price) / position.entry_price
-                )
-
-                # Check stop loss
-                if low_price <= position.stop_loss:
-                    positions_to_close.append((position, position.stop_loss, ExitReason.STOP_LOSS))
-                    continue
-
-                # Check take profit
-                if high_price >= position.take_profit:
-                    positions_to_close.append((position, position.take_profit, ExitReason.TAKE_PROFIT))
-                    continue
-
-            else:  # SHORT
-                unrealized_pnl = (position.entry_price - current_price) / position.entry_price
-                position.max_favorable_excursion = max(
-                    position.max_favorable_excursion,
-                    (position.entry_price - low_price) / position.entry_price
-                )
-                position.max_adverse_excursion = max(
-                    position.max_adverse_excursion,
-                    (high_price - position.entry_price) / position.entry_price
-                )
-
-                # Check stop loss
-                if high_price >= position.stop_loss:
-                    positions_to_close.append((position, position.stop_loss, ExitReason.STOP_LOSS))
-                    continue
-
-                # Check take profit
-                if low_price <= position.take_profit:
-                    positions_to_close.append((position, position.take_profit, ExitReason.TAKE_PROFIT))
-                    continue
-
-        # Close positions
-        for position, exit_price, exit_reason in positions_to_close:
-            self._close_position(position, candle, exit_price, exit_reason)
-
     def _close_position(
         self,
         position: Position,
@@ -672,6 +949,7 @@ __all__ = [
     'BacktestEngine',
     'Position',
     'Trade',
+    'Signal',
     'TradeDirection',
     'TradeOutcome',
     'ExitReason',
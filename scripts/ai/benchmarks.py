@@ -0,0 +1,2072 @@
+# scripts/ai/benchmarks.py
+# Performance benchmarks for the AI Brain pipeline
+# GEMRAL AI BRAIN - Phase 7
+#
+# Usage:
+#   python benchmarks.py indicators [--sizes 10000 50000 200000]
+#   python benchmarks.py candles [--bars 1576800]
+#   python benchmarks.py parity
+#   python benchmarks.py vectorized [--sizes 10000 100000 1000000] [--symbols 25]
+#   python benchmarks.py parallel [--bars 5000] [--workers 1 2 4 8]
+#   python benchmarks.py sweep [--bars 5000] [--symbols 5]
+#   python benchmarks.py walkforward [--symbols 25] [--days 730] [--workers 8]
+#   python benchmarks.py exits [--bars 20000] [--positions 5 100 1000 5000]
+#   python benchmarks.py outcomes [--detections 20000] [--symbols 20] [--days 365]
+#   python benchmarks.py filters [--detections 100000] [--filters 50]
+#   python benchmarks.py scanner [--symbols 300] [--bars 100]
+#   python benchmarks.py swings [--bars 2000] [--window 500]
+#   python benchmarks.py zones [--bars 5000] [--levels 20 500]
+#   python benchmarks.py features [--bars 3000] [--step 5] [--consumers 2]
+#   python benchmarks.py history [--bars 100000] [--samples 1000]
+#   python benchmarks.py download [--symbols 10] [--days 365] [--latency 0.05]
+#   python benchmarks.py cache [--symbols 5] [--days 730]
+#   python benchmarks.py resample [--symbols 5] [--days 365] [--base-url https://api.binance.com/api/v3]
+#   python benchmarks.py ingest [--rows 500000] [--dsn postgresql://...]
+#   python benchmarks.py embeddings [--texts 2000] [--latency 0.2] [--in-flight 8]
+#   python benchmarks.py chunking [--markdown DIR] [--rounds 20]
+#   python benchmarks.py vectors [--chunks 20000] [--queries 200] [--nprobe 1 4 8 16]
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import time
+import tracemalloc
+from typing import List, Callable, Dict
+
+import numpy as np
+
+from feature_extractor import (
+    Candle, CandleArray, IndicatorState,
+    calculate_ema, calculate_rsi, calculate_atr, calculate_macd,
+)
+import vectorized_indicators as vi
+
+# ═══════════════════════════════════════════════════════════════════════════
+# SYNTHETIC DATA
+# ═══════════════════════════════════════════════════════════════════════════
+
+def synthetic_candles(
+    n: int,
+    seed: int = 42,
+    start_price: float = 100.0,
+    start_time: int = 1_577_836_800_000,  # 2020-01-01 UTC
+    interval_ms: int = 3_600_000,
+    volatility: float = 0.01
+) -> List[Candle]:
+    """Generate a reproducible random-walk candle series."""
+    rng = random.Random(seed)
+    candles = []
+    price = start_price
+
+    for i in range(n):
+        open_price = price
+        close_price = open_price * (1 + rng.gauss(0, volatility))
+        high = max(open_price, close_price) * (1 + rng.uniform(0, volatility))
+        low = min(open_price, close_price) * (1 - rng.uniform(0, volatility))
+        candles.append(Candle(
+            timestamp=start_time + i * interval_ms,
+            open=open_price,
+            high=high,
+            low=low,
+            close=close_price,
+            volume=rng.uniform(100, 1000),
+        ))
+        price = close_price
+
+    return candles
+
+def _timed(fn: Callable, *args, **kwargs) -> float:
+    """Run fn once and return elapsed seconds."""
+    start = time.perf_counter()
+    fn(*args, **kwargs)
+    return time.perf_counter() - start
+
+# ═══════════════════════════════════════════════════════════════════════════
+# INDICATORS: PER-BAR RECOMPUTATION VS STREAMING STATE
+# ═══════════════════════════════════════════════════════════════════════════
+
+def _list_indicators_at(candles: List[Candle], index: int):
+    """What the backtest used to do every bar: rebuild the prefix and recompute."""
+    prefix = candles[:index+1]
+    prices = [c.close for c in prefix]
+    calculate_atr(prefix)
+    for period in (20, 50, 200):
+        calculate_ema(prices, period)
+    calculate_rsi(prices)
+    calculate_macd(prices)
+
+def _stream_indicators(candles: List[Candle]):
+    state = IndicatorState()
+    for candle in candles:
+        state.update(candle)
+
+def bench_indicators(sizes: List[int], samples: int = 20) -> List[Dict]:
+    """
+    Compare a full pass of IndicatorState against per-bar list recomputation.
+
+    The list path is quadratic, so its total is estimated from `samples`
+    evenly spaced bars (cost is linear in prefix length).
+    """
+    results = []
+
+    for n in sizes:
+        candles = synthetic_candles(n)
+
+        stream_time = _timed(_stream_indicators, candles)
+
+        step = max(1, n // samples)
+        sample_indices = list(range(step - 1, n, step))
+        sampled = sum(_timed(_list_indicators_at, candles, i) for i in sample_indices)
+        list_time = sampled / len(sample_indices) * n
+
+        results.append({
+            'bars': n,
+            'streaming_s': stream_time,
+            'list_s_est': list_time,
+            'speedup': list_time / stream_time if stream_time > 0 else 0,
+        })
+
+        print(f'[Bench] indicators n={n:>7}: streaming {stream_time:8.3f}s | '
+              f'per-bar lists ~{list_time:10.1f}s | {list_time / stream_time:8.0f}x')
+
+    return results
+
+# ═══════════════════════════════════════════════════════════════════════════
+# CANDLES: List[Candle] VS COLUMNAR CandleArray
+# ═══════════════════════════════════════════════════════════════════════════
+
+def _traced_bytes(fn: Callable):
+    """Return (result, bytes still allocated by fn) using tracemalloc."""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = fn()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, after - before
+
+def bench_candles(bars: int = 1_576_800, detect_bars: int = 2_000, windows: int = 100) -> Dict:
+    """
+    Memory footprint of a multi-year 1m series (default 3 years) and
+    detect_all throughput on list vs columnar input.
+    """
+    from pattern_detection_engine import PatternDetectionEngine
+
+    candles, list_bytes = _traced_bytes(lambda: synthetic_candles(bars, interval_ms=60_000))
+    array, array_bytes = _traced_bytes(lambda: CandleArray.from_candles(candles))
+    del candles
+
+    print(f'[Bench] candles n={bars:>9}: List[Candle] {list_bytes / 1e6:8.1f} MB | '
+          f'CandleArray {array_bytes / 1e6:6.1f} MB | {list_bytes / array_bytes:5.1f}x smaller')
+
+    engine = PatternDetectionEngine(user_tier='TIER3')
+    sample = array[:detect_bars]
+    sample_list = sample.to_candles()
+    ends = range(200, detect_bars, max(1, (detect_bars - 200) // windows))
+
+    def run(data):
+        with contextlib.redirect_stdout(io.StringIO()):
+            for end in ends:
+                engine.detect_all(data[:end], min_confidence=0.0, require_zone_retest=False)
+
+    list_time = _timed(run, sample_list)
+    array_time = _timed(run, sample)
+
+    print(f'[Bench] detect_all x{len(ends)}: List[Candle] {list_time:6.2f}s | '
+          f'CandleArray {array_time:6.2f}s | {list_time / array_time:4.1f}x')
+
+    return {
+        'bars': bars,
+        'list_bytes': list_bytes,
+        'array_bytes': array_bytes,
+        'detect_list_s': list_time,
+        'detect_array_s': array_time,
+    }
+
+# ═══════════════════════════════════════════════════════════════════════════
+# VECTORIZED INDICATORS: PARITY AND THROUGHPUT
+# ═══════════════════════════════════════════════════════════════════════════
+
+def _assert_close(name: str, expected, actual, scale: float, rtol: float) -> float:
+    """Compare list and vectorized output; return the max abs error."""
+    expected = np.asarray(expected, dtype=np.float64)
+    actual = np.asarray(actual, dtype=np.float64)
+    if expected.shape != actual.shape:
+        raise AssertionError(f'{name}: shape {actual.shape} != {expected.shape}')
+    if expected.size == 0:
+        return 0.0
+    error = float(np.max(np.abs(expected - actual)))
+    if error > rtol * scale:
+        raise AssertionError(f'{name}: max error {error:.3e} exceeds {rtol * scale:.3e}')
+    return error
+
+def check_indicator_parity(
+    lengths: List[int] = None,
+    seeds: List[int] = None,
+    rtol: float = 1e-9
+) -> Dict[str, float]:
+    """
+    Check vectorized_indicators against the list implementations.
+
+    Covers the padding edge cases (empty, shorter than the period, exactly
+    the period), flat prices (RSI avg_loss == 0), non-default periods and
+    2-D batches. Raises AssertionError on the first mismatch and returns
+    the worst absolute error per indicator.
+    """
+    lengths = lengths or [0, 1, 2, 8, 9, 13, 14, 15, 25, 26, 27, 35, 200, 1000, 5000]
+    seeds = seeds or [1, 2, 3]
+    worst = {'ema': 0.0, 'rsi': 0.0, 'atr': 0.0, 'macd': 0.0, 'batch': 0.0}
+
+    cases = []
+    for n in lengths:
+        for seed in seeds:
+            cases.append(synthetic_candles(n, seed=seed, volatility=0.02))
+    flat = synthetic_candles(60, seed=9)
+    cases.append([Candle(c.timestamp, 100.0, 100.0, 100.0, 100.0, c.volume) for c in flat])
+
+    for candles in cases:
+        prices = [c.close for c in candles]
+        scale = max([abs(p) for p in prices] + [1.0])
+
+        for period in (1, 2, 9, 20, 50, 200):
+            worst['ema'] = max(worst['ema'], _assert_close(
+                f'ema({len(prices)}, {period})', calculate_ema(prices, period), vi.calculate_ema(prices, period), scale, rtol))
+
+        for period in (2, 14, 21):
+            worst['rsi'] = max(worst['rsi'], _assert_close(
+                f'rsi({len(prices)}, {period})', calculate_rsi(prices, period), vi.calculate_rsi(prices, period), 100.0, rtol))
+
+        for period in (1, 14, 30):
+            worst['atr'] = max(worst['atr'], _assert_close(
+                f'atr({len(prices)}, {period})', calculate_atr(candles, period), vi.calculate_atr(candles, period), scale, rtol))
+
+        if prices:
+            for name, expected, actual in zip(('macd', 'signal', 'histogram'), calculate_macd(prices), vi.calculate_macd(prices)):
+                worst['macd'] = max(worst['macd'], _assert_close(
+                    f'{name}({len(prices)})', expected, actual, scale, rtol))
+
+    # 2-D batches must equal row-by-row 1-D results
+    series = [CandleArray.from_candles(synthetic_candles(500, seed=s)) for s in range(8)]
+    closes = vi.stack_column(series, 'close')
+    batched = {
+        'ema': vi.calculate_ema(closes, 20),
+        'rsi': vi.calculate_rsi(closes),
+        'atr': vi.atr_from_columns(vi.stack_column(series, 'high'), vi.stack_column(series, 'low'), closes),
+        'macd': vi.calculate_macd(closes)[2],
+    }
+    for row, candles in enumerate(series):
+        single = {
+            'ema': vi.calculate_ema(candles.close, 20),
+            'rsi': vi.calculate_rsi(candles.close),
+            'atr': vi.calculate_atr(candles),
+            'macd': vi.calculate_macd(candles.close)[2],
+        }
+        for name in batched:
+            worst['batch'] = max(worst['batch'], _assert_close(
+                f'batch {name}[{row}]', single[name], batched[name][row], 1.0, rtol))
+
+    print(f'[Parity] {len(cases)} series OK | max abs error: ' +
+          ', '.join(f'{k}={v:.2e}' for k, v in worst.items()))
+
+    return worst
+
+def _list_indicator_pass(candles: List[Candle], prices: List[float]):
+    calculate_ema(prices, 20)
+    calculate_rsi(prices)
+    calculate_atr(candles)
+    calculate_macd(prices)
+
+def _vector_indicator_pass(candles: CandleArray):
+    vi.calculate_ema(candles.close, 20)
+    vi.calculate_rsi(candles.close)
+    vi.calculate_atr(candles)
+    vi.calculate_macd(candles.close)
+
+def _batch_indicator_pass(high: np.ndarray, low: np.ndarray, close: np.ndarray):
+    vi.calculate_ema(close, 20)
+    vi.calculate_rsi(close)
+    vi.atr_from_columns(high, low, close)
+    vi.calculate_macd(close)
+
+def bench_vectorized(sizes: List[int], symbols: int = 25) -> List[Dict]:
+    """
+    Throughput (candles/sec) of one EMA+RSI+ATR+MACD pass: list versions,
+    vectorized 1-D, and vectorized 2-D over `symbols` series at once.
+    """
+    results = []
+
+    for n in sizes:
+        candles = synthetic_candles(n)
+        prices = [c.close for c in candles]
+        array = CandleArray.from_candles(candles)
+
+        list_time = _timed(_list_indicator_pass, candles, prices)
+        vector_time = _timed(_vector_indicator_pass, array)
+
+        series = [array] * symbols
+        high, low, close = (vi.stack_column(series, f) for f in ('high', 'low', 'close'))
+        batch_time = _timed(_batch_indicator_pass, high, low, close)
+
+        result = {
+            'bars': n,
+            'list_cps': n / list_time,
+            'vector_cps': n / vector_time,
+            'batch_cps': n * symbols / batch_time,
+        }
+        results.append(result)
+
+        print(f'[Bench] vectorized n={n:>8}: list {result["list_cps"]:12,.0f} c/s | '
+              f'numpy {result["vector_cps"]:12,.0f} c/s | '
+              f'batch x{symbols} {result["batch_cps"]:12,.0f} c/s')
+
+    return results
+
+# ═══════════════════════════════════════════════════════════════════════════
+# PARALLEL BACKTEST SCALING
+# ═══════════════════════════════════════════════════════════════════════════
+
+def bench_parallel(bars: int = 5_000, workers: List[int] = None) -> List[Dict]:
+    """
+    Wall time of run_parallel_backtest over the 25-coin TOP_COINS universe
+    (one 1h shard per coin) for each worker count, a check that every
+    worker count produces the same summary, and the serial
+    BacktestEngine.run summary on the same universe side by side.
+    """
+    from datetime import datetime
+    from backtest_engine import BacktestConfig, BacktestEngine
+    from parallel_backtest import TOP_COINS, run_parallel_backtest
+
+    cpus = os.cpu_count() or 1
+    workers = sorted(workers or {1, 2, 4, 8, 16, cpus} & set(range(1, cpus + 1)))
+
+    candles_data = {
+        symbol: {'1h': CandleArray.from_candles(synthetic_candles(bars, seed=i, volatility=0.02))}
+        for i, symbol in enumerate(TOP_COINS)
+    }
+    config = BacktestConfig(
+        date_from=datetime(2020, 1, 1),
+        date_to=datetime(2021, 1, 1),
+        symbols=TOP_COINS,
+        timeframes=['1h'],
+        require_zone_retest=False,
+        min_score_threshold=0.0,
+    )
+
+    results = []
+    reference = None
+    base_time = None
+
+    for count in workers:
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            summary = run_parallel_backtest(config, candles_data, workers=count)
+            elapsed = time.perf_counter() - start
+
+        fingerprint = json.dumps(summary, sort_keys=True, default=str)
+        reference = reference or fingerprint
+        base_time = base_time or elapsed
+
+        # Relative to the first (smallest) worker count
+        speedup = base_time / elapsed
+        results.append({'workers': count, 'seconds': elapsed, 'speedup': speedup, 'identical': fingerprint == reference})
+
+        print(f'[Bench] parallel {len(TOP_COINS)} coins x {bars} bars, workers={count:>2}: '
+              f'{elapsed:7.2f}s | speedup {speedup:5.2f}x | '
+              f'{"same summary" if fingerprint == reference else "SUMMARY DIFFERS"}')
+
+    if cpus == 1:
+        print('[Bench] Only 1 CPU available: speedup cannot exceed 1x on this machine')
+
+    # Serial walks the coins one after another, so its concurrency cap only
+    # binds within a coin; the parallel merge applies it across all coins
+    # in time order, which trades far less on a wide universe
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        serial = BacktestEngine(config).run(candles_data)
+        serial_time = time.perf_counter() - start
+    parallel = json.loads(reference)
+    for name, summary, elapsed in (('serial', serial, serial_time), ('parallel', parallel, base_time)):
+        print(f'[Bench] parallel vs serial, {name:<8}: {elapsed:7.2f}s | {summary["total_trades"]:>5} trades | '
+              f'win rate {summary["win_rate"]:.2%} | return {summary.get("total_return_percent", 0):7.2f}% | '
+              f'max DD {summary.get("max_drawdown_percent", 0):5.2f}%')
+    return results
+
+# ═══════════════════════════════════════════════════════════════════════════
+# PARAMETER SWEEP VS SINGLE BACKTEST
+# ═══════════════════════════════════════════════════════════════════════════
+
+def bench_sweep(bars: int = 5_000, symbols: int = 5) -> Dict:
+    """
+    Time one full backtest against the 100-config DEFAULT_GRID sweep
+    (cold and warm signal cache), and check that a swept config matches
+    BacktestEngine.run for the same config exactly.
+    """
+    import tempfile
+    from dataclasses import replace
+    from datetime import datetime
+    from backtest_engine import BacktestConfig, BacktestEngine
+    from parameter_sweep import DEFAULT_GRID, expand_grid, run_parameter_sweep
+
+    names = [f'SYM{i}USDT' for i in range(symbols)]
+    candles_data = {
+        name: {'1h': CandleArray.from_candles(synthetic_candles(bars, seed=i, volatility=0.02))}
+        for i, name in enumerate(names)
+    }
+    base_config = BacktestConfig(
+        date_from=datetime(2020, 1, 1),
+        date_to=datetime(2021, 1, 1),
+        symbols=names,
+        timeframes=['1h'],
+    )
+    n_configs = len(expand_grid(DEFAULT_GRID))
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        single_time = _timed(BacktestEngine(base_config).run, candles_data)
+
+        with tempfile.TemporaryDirectory() as cache_dir:
+            start = time.perf_counter()
+            rows = run_parameter_sweep(base_config, DEFAULT_GRID, candles_data, cache_dir=cache_dir)
+            cold_time = time.perf_counter() - start
+
+            start = time.perf_counter()
+            run_parameter_sweep(base_config, DEFAULT_GRID, candles_data, cache_dir=cache_dir)
+            warm_time = time.perf_counter() - start
+
+        # Spot-check the best config against a from-scratch run
+        best = rows[0]
+        direct = BacktestEngine(replace(base_config, **best['params'])).run(candles_data)
+
+    matches = all(best[k] == direct[k] for k in ('total_trades', 'win_rate', 'profit_factor', 'max_drawdown'))
+
+    print(f'[Bench] sweep {symbols} symbols x {bars} bars: single backtest {single_time:6.2f}s | '
+          f'{n_configs} configs cold {cold_time:6.2f}s ({cold_time / single_time:4.2f}x) | '
+          f'warm {warm_time:6.2f}s ({warm_time / single_time:4.2f}x) | '
+          f'{"matches direct run" if matches else "MISMATCH vs direct run"}')
+
+    return {
+        'single_s': single_time,
+        'sweep_cold_s': cold_time,
+        'sweep_warm_s': warm_time,
+        'configs': n_configs,
+        'matches_direct_run': matches,
+    }
+
+# ═══════════════════════════════════════════════════════════════════════════
+# EXIT SIMULATION
+# ═══════════════════════════════════════════════════════════════════════════
+
+def _update_positions(engine, candle: Candle, all_candles: List[Candle]):
+    """
+    Per-candle reference for the exit rules exit_simulator applies in one
+    batch: update and close `engine`'s open positions on `candle`, the
+    last of all_candles. Only bench_exits uses it, to check the simulator.
+    """
+    from backtest_engine import ExitReason, TradeDirection
+
+    positions_to_close = []
+    current_index = len(all_candles) - 1
+    trailing_percent, max_holding = engine._exit_rules()
+
+    for position in engine.state.open_positions:
+        current_price = candle.close
+        high_price = candle.high
+        low_price = candle.low
+
+        # Track MFE/MAE
+        if position.direction == TradeDirection.LONG:
+            position.max_favorable_excursion = max(
+                position.max_favorable_excursion,
+                (high_price - position.entry_price) / position.entry_price
+            )
+            position.max_adverse_excursion = max(
+                position.max_adverse_excursion,
+                (position.entry_price - low_price) / position.entry_price
+            )
+
+            stop_loss = position.stop_loss
+            if position.trailing_stop is not None:
+                stop_loss = max(stop_loss, position.trailing_stop)
+
+            # Check stop loss
+            if low_price <= stop_loss:
+                reason = ExitReason.STOP_LOSS if stop_loss == position.stop_loss else ExitReason.TRAILING_STOP
+                positions_to_close.append((position, stop_loss, reason))
+                continue
+
+            # Check take profit
+            if high_price >= position.take_profit:
+                positions_to_close.append((position, position.take_profit, ExitReason.TAKE_PROFIT))
+                continue
+
+            trail_level = high_price * (1 - trailing_percent / 100) if trailing_percent is not None else None
+
+        else:  # SHORT
+            position.max_favorable_excursion = max(
+                position.max_favorable_excursion,
+                (position.entry_price - low_price) / position.entry_price
+            )
+            position.max_adverse_excursion = max(
+                position.max_adverse_excursion,
+                (high_price - position.entry_price) / position.entry_price
+            )
+
+            stop_loss = position.stop_loss
+            if position.trailing_stop is not None:
+                stop_loss = min(stop_loss, position.trailing_stop)
+
+            # Check stop loss
+            if high_price >= stop_loss:
+                reason = ExitReason.STOP_LOSS if stop_loss == position.stop_loss else ExitReason.TRAILING_STOP
+                positions_to_close.append((position, stop_loss, reason))
+                continue
+
+            # Check take profit
+            if low_price <= position.take_profit:
+                positions_to_close.append((position, position.take_profit, ExitReason.TAKE_PROFIT))
+                continue
+
+            trail_level = low_price * (1 + trailing_percent / 100) if trailing_percent is not None else None
+
+        # Check holding time
+        if max_holding is not None and current_index == position.entry_candle_index + max_holding:
+            positions_to_close.append((position, current_price, ExitReason.TIME_EXIT))
+            continue
+
+        # Trail the stop behind this candle's best price
+        if trail_level is not None:
+            if position.trailing_stop is None:
+                position.trailing_stop = trail_level
+            elif position.direction == TradeDirection.LONG:
+                position.trailing_stop = max(position.trailing_stop, trail_level)
+            else:
+                position.trailing_stop = min(position.trailing_stop, trail_level)
+
+    # Close positions
+    for position, exit_price, exit_reason in positions_to_close:
+        engine._close_position(position, candle, exit_price, exit_reason)
+
+def bench_exits(bars: int = 20_000, positions: List[int] = None) -> List[Dict]:
+    """
+    Position management for N positions with random entries: the
+    per-candle _update_positions loop vs one
+    exit_simulator.simulate_exits batch, with plain SL/TP, a 2% trailing
+    stop and a 48-candle time exit. Exit candle, price, reason and MFE/MAE
+    must be identical.
+    """
+    from datetime import datetime
+    from backtest_engine import BacktestConfig, BacktestEngine, Position, TradeDirection
+    from exit_simulator import simulate_exits, REASON_NAMES
+
+    data = CandleArray.from_candles(synthetic_candles(bars, seed=5, volatility=0.01))
+    rng = np.random.default_rng(0)
+    rules = {
+        'sl/tp': {},
+        'trailing': {'use_trailing_stop': True, 'trailing_stop_percent': 2.0},
+        'time': {'max_holding_candles': 48},
+    }
+    results = []
+
+    for count in positions or [5, 100, 1_000, 5_000]:
+        entries = np.sort(rng.integers(200, bars - 1, count))
+        longs = rng.random(count) < 0.5
+        risk = rng.uniform(0.01, 0.05, count)
+
+        def open_positions():
+            opened = []
+            for k, (i, is_long, r) in enumerate(zip(entries.tolist(), longs.tolist(), risk.tolist())):
+                price = float(data.close[i])
+                side = 1 if is_long else -1
+                opened.append(Position(
+                    id=str(k), pattern_code='bench', symbol='X', timeframe='1h',
+                    direction=TradeDirection.LONG if is_long else TradeDirection.SHORT,
+                    entry_time=datetime.fromtimestamp(int(data.timestamp[i]) / 1000),
+                    entry_price=price, entry_score=0.5, entry_candle_index=i,
+                    position_size=1.0, position_value=price,
+                    stop_loss=price * (1 - side * r), take_profit=price * (1 + side * 2.5 * r),
+                ))
+            return opened
+
+        for name, settings in rules.items():
+            config = BacktestConfig(date_from=datetime(2020, 1, 1), date_to=datetime(2021, 1, 1),
+                                    initial_capital=1e12, **settings)
+
+            # Per-candle loop, positions joining after their entry candle
+            engine = BacktestEngine(config)
+            queue = open_positions()
+            exit_bars = {}
+            start = time.perf_counter()
+            nxt = 0
+            for i in range(int(entries[0]) + 1, bars):
+                # Positions entered on earlier candles update from this one
+                while nxt < len(queue) and queue[nxt].entry_candle_index < i:
+                    engine.state.open_positions.append(queue[nxt])
+                    nxt += 1
+                _update_positions(engine, data[i], data[:i+1])
+                for trade in engine.state.closed_trades[len(exit_bars):]:
+                    exit_bars[trade.id] = i
+            loop_time = time.perf_counter() - start
+
+            expected = {t.id: (exit_bars[t.id], t.exit_price, t.exit_reason.value, t.max_favorable_excursion,
+                               t.max_adverse_excursion) for t in engine.state.closed_trades}
+            expected.update({p.id: (None, None, None, p.max_favorable_excursion, p.max_adverse_excursion)
+                             for p in engine.state.open_positions})
+
+            # One batch
+            batch_positions = open_positions()
+            trailing_percent, max_holding = BacktestEngine(config)._exit_rules()
+            start = time.perf_counter()
+            batch = simulate_exits(
+                data,
+                start=entries + 1,
+                long=longs,
+                entry_price=[p.entry_price for p in batch_positions],
+                stop_loss=[p.stop_loss for p in batch_positions],
+                take_profit=[p.take_profit for p in batch_positions],
+                trailing_percent=trailing_percent,
+                expire=None if max_holding is None else entries + max_holding,
+            )
+            batch_time = time.perf_counter() - start
+
+            got = {}
+            for k, p in enumerate(batch_positions):
+                index = int(batch.index[k])
+                got[p.id] = (
+                    index if index >= 0 else None,
+                    float(batch.price[k]) if index >= 0 else None,
+                    REASON_NAMES[int(batch.reason[k])] if index >= 0 else None,
+                    float(batch.mfe[k]), float(batch.mae[k]),
+                )
+
+            matches = got == expected
+            print(f'[Bench] exits {count:5d} positions, {name:8s}: {loop_time * 1000:8.1f} ms per-candle | '
+                  f'{batch_time * 1000:7.1f} ms simulated | {loop_time / batch_time:6.1f}x | match={matches}')
+            results.append({'positions': count, 'rules': name, 'loop_s': loop_time,
+                            'batch_s': batch_time, 'matches': matches})
+
+    return results
+
+# ═══════════════════════════════════════════════════════════════════════════
+# FEATURE CACHE
+# ═══════════════════════════════════════════════════════════════════════════
+
+def bench_features(bars: int = 3_000, step: int = 5, consumers: int = 2) -> Dict:
+    """
+    Features for every zone detection detect_all finds every `step` bars,
+    extracted by `consumers` consumers (e.g. detect_all and a backtest):
+    extract_features per detection vs bar contexts from one FeatureCache
+    (pattern-independent part once per bar). Features must be identical.
+    """
+    import dataclasses
+    from feature_extractor import FeatureCache, extract_features
+    from pattern_detection_engine import PatternDetectionEngine
+
+    candles = CandleArray.from_candles(synthetic_candles(bars, seed=3, volatility=0.02))
+    engine = PatternDetectionEngine(user_tier='TIER3')
+    jobs = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for end in range(250, bars, step):
+            for d in engine.detect_all(candles[:end], min_confidence=0.0, require_zone_retest=False):
+                if d.zone_price and d.zone_type:
+                    jobs.append((end, d.start_index, d.end_index, d.zone_price, d.zone_type))
+
+    start = time.perf_counter()
+    expected = [
+        extract_features(candles[:end], s, e, zp, zt)
+        for _ in range(consumers) for end, s, e, zp, zt in jobs
+    ]
+    plain_time = time.perf_counter() - start
+
+    cache = FeatureCache()
+    start = time.perf_counter()
+    got = [
+        extract_features(candles[:end], s, e, zp, zt,
+                         context=cache.context(candles[:end], e, symbol='X', timeframe='1h'))
+        for _ in range(consumers) for end, s, e, zp, zt in jobs
+    ]
+    cached_time = time.perf_counter() - start
+
+    matches = [dataclasses.asdict(f) for f in expected] == [dataclasses.asdict(f) for f in got]
+    bar_count = len({end for end, *_ in jobs})
+
+    print(f'[Bench] features {len(jobs)} detections on {bar_count} bars x {consumers} consumers: '
+          f'per detection {plain_time * 1000:8.1f} ms | FeatureCache {cached_time * 1000:8.1f} ms | '
+          f'{plain_time / cached_time:5.1f}x | hit rate {cache.hit_rate:.1%} | match={matches}')
+
+    return {
+        'detections': len(jobs),
+        'plain_s': plain_time,
+        'cached_s': cached_time,
+        'hit_rate': cache.hit_rate,
+        'matches': matches,
+    }
+
+# ═══════════════════════════════════════════════════════════════════════════
+# OUTCOME RESOLUTION
+# ═══════════════════════════════════════════════════════════════════════════
+
+def _scan_outcome(candles: CandleArray, detection: Dict) -> Dict:
+    """One detection, candle by candle (reference for resolve_detections)."""
+    from outcome_resolver import to_millis, from_millis
+
+    entry, sl, tp = detection['entry_price'], detection['stop_loss_price'], detection['take_profit_price']
+    long = tp > entry
+    start = int(np.searchsorted(candles.timestamp, to_millis(detection['detected_at']), side='left'))
+    for i in range(start, len(candles)):
+        high, low = float(candles.high[i]), float(candles.low[i])
+        if (low <= sl) if long else (high >= sl):
+            price, reason = sl, 'stop_loss'
+        elif (high >= tp) if long else (low <= tp):
+            price, reason = tp, 'take_profit'
+        else:
+            continue
+        pl = (price - entry) / entry * 100 * (1 if long else -1)
+        return {'id': detection['id'], 'outcome': 'win' if pl > 0 else 'loss' if pl < 0 else 'breakeven',
+                'exit_price': price, 'profit_loss_percent': pl, 'exit_reason': reason,
+                'exited_at': from_millis(int(candles.timestamp[i]))}
+    return None
+
+def bench_outcomes(detections: int = 20_000, symbols: int = 20, days: int = 365, sample: int = 1_000) -> Dict:
+    """
+    Nightly outcome resolution for `detections` pending detections over
+    `symbols` synthetic 1h series in a fresh local candle cache:
+    OutcomeResolver (one candle load + one batch per symbol) vs loading
+    candles and scanning them per detection, timed on `sample` detections.
+    Outcomes must be identical.
+    """
+    import tempfile
+    from datetime import datetime, timezone
+    from candle_cache import CandleDiskCache
+    from historical_data_fetcher import HistoricalDataFetcher
+    from outcome_resolver import OutcomeResolver, from_millis, to_millis
+
+    names = [f'SYM{i}USDT' for i in range(symbols)]
+    start_ts = int(datetime(2023, 1, 1, tzinfo=timezone.utc).timestamp() * 1000)
+    bars = days * 24
+    end_ts = start_ts + bars * 3_600_000
+    rng = np.random.default_rng(0)
+
+    with tempfile.TemporaryDirectory() as root:
+        cache = CandleDiskCache(os.path.join(root, 'candles'))
+        closes = {}
+        with contextlib.redirect_stdout(io.StringIO()):
+            for i, name in enumerate(names):
+                candles = CandleArray.from_candles(synthetic_candles(bars, seed=i, start_time=start_ts, volatility=0.02))
+                cache.store(name, '1h', candles, [(start_ts, end_ts - 1)])
+                closes[name] = candles.close
+
+        # Pending detections spread over the series, half long, half short
+        pending = []
+        for k in range(detections):
+            name = names[int(rng.integers(symbols))]
+            bar = int(rng.integers(bars - 24))
+            entry = float(closes[name][bar])
+            risk = float(rng.uniform(0.01, 0.05)) * (1 if rng.random() < 0.5 else -1)
+            pending.append({
+                'id': f'det-{k}', 'symbol': name, 'timeframe': '1h', 'entry_price': entry,
+                'stop_loss_price': entry * (1 - risk), 'take_profit_price': entry * (1 + 2 * risk),
+                'detected_at': from_millis(start_ts + (bar + 1) * 3_600_000),
+            })
+        now = datetime.fromtimestamp(end_ts / 1000, tz=timezone.utc)
+
+        resolver = OutcomeResolver(HistoricalDataFetcher(use_cache=False, disk_cache=cache))
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            outcomes = resolver.resolve(pending, now=now)
+        batch_time = time.perf_counter() - start
+
+        # Per detection: its own candle load and scan
+        checked = pending[:sample]
+        start = time.perf_counter()
+        expected = []
+        for detection in checked:
+            candles, _ = cache.load(detection['symbol'], '1h', to_millis(detection['detected_at']), end_ts - 3_600_000)
+            expected.append(_scan_outcome(candles, detection))
+        loop_time = time.perf_counter() - start
+
+    by_id = {o['id']: o for o in outcomes}
+    matches = all(by_id.get(d['id']) == e for d, e in zip(checked, expected))
+    batch_rate = detections / batch_time
+    loop_rate = len(checked) / loop_time
+
+    print(f'[Bench] outcomes {detections:,} detections x {symbols} symbols x {days}d: '
+          f'per-detection {loop_rate:8,.0f}/s | resolver {batch_rate:9,.0f}/s ({batch_time:5.2f}s, '
+          f'load {resolver.stats["load_seconds"]:4.2f}s) | {batch_rate / loop_rate:5.1f}x | '
+          f'{len(outcomes):,} resolved | match={matches}')
+
+    return {
+        'batch_s': batch_time,
+        'per_detection_rate': loop_rate,
+        'resolver_rate': batch_rate,
+        'resolved': len(outcomes),
+        'matches': matches,
+    }
+
+# ═══════════════════════════════════════════════════════════════════════════
+# FILTER EVALUATION
+# ═══════════════════════════════════════════════════════════════════════════
+
+def _synthetic_detection_rows(count: int, seed: int = 0) -> List[Dict]:
+    """Resolved detections with embedded pattern_features, some missing."""
+    rng = random.Random(seed)
+    rows = []
+    for k in range(count):
+        features = None
+        if rng.random() < 0.95:
+            features = {
+                'volume_breakout_ratio': rng.uniform(0.5, 3.5),
+                'rsi_value': rng.uniform(10, 90) if rng.random() < 0.98 else None,
+                'pattern_quality_score': rng.random(),
+                'overall_score': rng.random(),
+                'trend_strength': rng.random(),
+                'retest_quality_score': rng.random(),
+                'trend_direction': rng.choice(['up', 'down', 'sideways']),
+                'has_zone_retest': rng.random() < 0.4,
+            }
+        quality = features['overall_score'] if features else 0.5
+        rows.append({
+            'id': f'det-{k}', 'pattern_id': f'pattern-{k % 8}',
+            'outcome': 'win' if rng.random() < 0.4 + 0.4 * quality else 'loss',
+            'pattern_features': [features] if features else [],
+        })
+    return rows
+
+def _synthetic_filters(count: int, seed: int = 1) -> List[Dict]:
+    rng = random.Random(seed)
+    filters = []
+    for k in range(count):
+        conditions = {}
+        if rng.random() < 0.5:
+            conditions['volume_ratio_min'] = round(rng.uniform(1.0, 2.5), 2)
+        if rng.random() < 0.3:
+            conditions['rsi_min'] = rng.choice([30, 40, 50])
+        if rng.random() < 0.3:
+            conditions['rsi_max'] = rng.choice([60, 70, 80])
+        if rng.random() < 0.3:
+            conditions['pattern_quality_min'] = round(rng.uniform(0.3, 0.8), 2)
+        if rng.random() < 0.2:
+            conditions['trend_direction'] = rng.choice(['up', 'down'])
+        if rng.random() < 0.3:
+            conditions['require_zone_retest'] = True
+        filters.append({'id': f'filter-{k}', 'filter_name': f'filter {k}', 'conditions': conditions})
+    return filters
+
+def _row_passes(features: Dict, conditions: Dict) -> bool:
+    """One detection against one filter, SQL NULL semantics."""
+    from filter_evaluation import RANGE_CONDITIONS
+    if not features:
+        return False
+    for key, (feature, kind) in RANGE_CONDITIONS.items():
+        bound = conditions.get(key)
+        if bound is None:
+            continue
+        value = features.get(feature)
+        if value is None or (value < bound if kind == 'min' else value > bound):
+            return False
+    if conditions.get('trend_direction') is not None and features.get('trend_direction') != conditions['trend_direction']:
+        return False
+    if conditions.get('require_zone_retest') and features.get('has_zone_retest') is not True:
+        return False
+    return True
+
+def bench_filters(detections: int = 100_000, filters: int = 50) -> Dict:
+    """
+    Evaluate `filters` filters plus threshold candidates for 4 features
+    over `detections` resolved detections: per-filter row loops (what each
+    get_filtered_win_rate call does, base win rate recomputed per filter)
+    vs FilterEvaluator on one columnar frame. Statistics must be identical.
+    """
+    from filter_evaluation import DetectionFrame, FilterEvaluator
+
+    rows = _synthetic_detection_rows(detections)
+    active = _synthetic_filters(filters)
+    features = ['pattern_quality_score', 'overall_score', 'volume_breakout_ratio', 'trend_strength']
+
+    # Per filter: a filtered pass and a base pass over every row
+    start = time.perf_counter()
+    expected = []
+    for f in active:
+        passed = passed_wins = total = wins = 0
+        for row in rows:
+            row_features = row['pattern_features'][0] if row['pattern_features'] else None
+            win = row['outcome'] == 'win'
+            if row_features:
+                total += 1
+                wins += win
+            if _row_passes(row_features, f['conditions']):
+                passed += 1
+                passed_wins += win
+        expected.append((passed, passed_wins / passed if passed else 0.0, wins / total if total else 0.0))
+    loop_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    frame = DetectionFrame.from_rows(rows)
+    frame_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    evaluator = FilterEvaluator(frame)
+    stats = evaluator.evaluate(active)
+    for feature in features:
+        evaluator.threshold_candidates(feature)
+    evaluator.zone_retest_impact()
+    eval_time = time.perf_counter() - start
+
+    got = [(s['passed'], s['passed_win_rate'], s['base_win_rate']) for s in stats]
+    matches = got == expected
+
+    print(f'[Bench] filters {filters} filters x {detections:,} detections: per-filter loops {loop_time:6.2f}s | '
+          f'frame build {frame_time:5.2f}s | evaluate {eval_time * 1000:7.1f} ms (+ thresholds, retest) | '
+          f'{loop_time / (frame_time + eval_time):6.1f}x | match={matches}')
+
+    return {
+        'loop_s': loop_time,
+        'frame_s': frame_time,
+        'evaluate_s': eval_time,
+        'matches': matches,
+    }
+
+# ═══════════════════════════════════════════════════════════════════════════
+# WALK-FORWARD
+# ═══════════════════════════════════════════════════════════════════════════
+
+def bench_walkforward(symbols: int = 25, days: int = 730, workers: int = None) -> Dict:
+    """
+    Offline walk-forward run over `symbols` synthetic 1h series of `days`
+    days: candles loaded from a fresh local candle cache, the DEFAULT_GRID
+    optimized per 180/30-day window. Signal collection is timed cold and
+    again from the signal cache.
+    """
+    import tempfile
+    from datetime import datetime, timedelta
+    from backtest_engine import BacktestConfig
+    from candle_cache import CandleDiskCache
+    from parameter_sweep import load_or_collect_signals
+    from walk_forward import load_cached_candles, run_walk_forward
+
+    names = [f'SYM{i}USDT' for i in range(symbols)]
+    date_from = datetime(2022, 1, 1)
+    date_to = date_from + timedelta(days=days)
+    start_ts = int(date_from.timestamp() * 1000)
+    bars = days * 24
+    config = BacktestConfig(date_from=date_from, date_to=date_to, symbols=names, timeframes=['1h'])
+
+    with tempfile.TemporaryDirectory() as root:
+        cache = CandleDiskCache(os.path.join(root, 'candles'))
+        with contextlib.redirect_stdout(io.StringIO()):
+            for i, name in enumerate(names):
+                candles = CandleArray.from_candles(synthetic_candles(bars, seed=i, start_time=start_ts, volatility=0.02))
+                cache.store(name, '1h', candles, [(start_ts, start_ts + bars * 3_600_000 - 1)])
+
+        start = time.perf_counter()
+        candles_data = load_cached_candles(names, ['1h'], date_from, date_to, cache=cache)
+        load_time = time.perf_counter() - start
+
+        signal_dir = os.path.join(root, 'signals')
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            report = run_walk_forward(config, candles_data, workers=workers, cache_dir=signal_dir)
+        total_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for name in names:
+            load_or_collect_signals(candles_data[name]['1h'], signal_dir, config)
+        warm_signals = time.perf_counter() - start
+
+    timing = report['timing']
+    stability = report['stability']
+    print(f'[Bench] walkforward {symbols} x 1h x {days}d, {len(report["windows"])} windows x '
+          f'{report["settings"]["configs"]} configs, workers={workers or os.cpu_count()}: '
+          f'load {load_time:5.2f}s | signals {timing["signals_s"]:6.1f}s cold, {warm_signals:5.2f}s cached | '
+          f'windows {timing["windows_s"]:6.1f}s | total {total_time:6.1f}s')
+    print(f'[Bench] walkforward OOS {stability["oos_trades"]} trades, '
+          f'{stability["oos_return_percent"]:.2f}% return, WFE {stability["walk_forward_efficiency"]:.2f}')
+
+    return {
+        'load_s': load_time,
+        'signals_cold_s': timing['signals_s'],
+        'signals_cached_s': warm_signals,
+        'windows_s': timing['windows_s'],
+        'total_s': total_time,
+        'windows': len(report['windows']),
+    }
+
+# ═══════════════════════════════════════════════════════════════════════════
+# LIVE SCANNER LOAD TEST
+# ═══════════════════════════════════════════════════════════════════════════
+
+def bench_scanner(symbols: int = 300, bars: int = 100, timeframe: str = '1h') -> Dict:
+    """
+    Replay `bars` candles for `symbols` synthetic streams through
+    LiveScanner (seeded with 200 candles each, in-memory publisher) and
+    report candle-close events/sec and per-scan latency.
+    """
+    import asyncio
+    from live_scanner import LiveScanner, MemoryPublisher, ReplayCandleFeed, MIN_SCAN_CANDLES
+
+    candles_data = {
+        f'SYM{i}USDT': {timeframe: CandleArray.from_candles(synthetic_candles(MIN_SCAN_CANDLES + bars, seed=i, volatility=0.02))}
+        for i in range(symbols)
+    }
+    feed = ReplayCandleFeed(candles_data, start_index=MIN_SCAN_CANDLES)
+    publisher = MemoryPublisher(keep=0)
+    scanner = LiveScanner(publisher, min_confidence=0.0, require_zone_retest=False)
+
+    for symbol in candles_data:
+        scanner.seed(symbol, timeframe, feed.history(symbol, timeframe))
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        asyncio.run(scanner.run(feed, report_every=float('inf')))
+        elapsed = time.perf_counter() - start
+
+    stats = scanner.stats
+    avg_ms = stats.scan_seconds / stats.scans * 1000 if stats.scans else 0.0
+    print(f'[Bench] scanner {symbols} streams x {bars} closes: {stats.events / elapsed:8.0f} events/s | '
+          f'{avg_ms:6.2f} ms/scan | {publisher.published} published')
+
+    return {
+        'streams': symbols,
+        'events': stats.events,
+        'events_per_s': stats.events / elapsed,
+        'scan_ms': avg_ms,
+        'published': publisher.published,
+    }
+
+# ═══════════════════════════════════════════════════════════════════════════
+# SHARED SWING INDEX
+# ═══════════════════════════════════════════════════════════════════════════
+
+def bench_swings(bars: int = 2_000, window: int = 500, seeds: int = 3) -> Dict:
+    """
+    Per-call cost of the pattern detectors plus S/R confluence on a sliding
+    window, each scanning its own tail vs querying one SwingIndex that is
+    appended to bar by bar. Results must be identical.
+    """
+    from feature_extractor import SwingIndex, support_resistance_confluence
+    from pattern_detection_engine import PatternDetectionEngine
+
+    detectors = list(PatternDetectionEngine(user_tier='TIER3').detectors.values())
+
+    def stage(candles, swings=None):
+        found = [detector(candles, swings=swings) for detector in detectors]
+        sr = support_resistance_confluence(
+            candles, float(candles.close[-1]), swings=swings.tail(100) if swings is not None else None
+        )
+        return [d and (d.pattern_type, d.start_index, d.confidence, d.zone_price) for d in found], sr
+
+    calls = 0
+    own_time = shared_time = 0.0
+    matches = True
+
+    for seed in range(seeds):
+        data = CandleArray.from_candles(synthetic_candles(bars, seed=seed, volatility=0.02))
+        index = SwingIndex(data[:window - 1], max_length=window)
+
+        for end in range(window, bars + 1):
+            candles = data[end - window:end]
+
+            start = time.perf_counter()
+            expected = stage(candles)
+            own_time += time.perf_counter() - start
+
+            start = time.perf_counter()
+            index.append(data[end - 1])
+            got = stage(candles, index.view(-window))
+            shared_time += time.perf_counter() - start
+
+            matches = matches and got == expected
+            calls += 1
+
+    own_us = own_time / calls * 1e6
+    shared_us = shared_time / calls * 1e6
+    print(f'[Bench] swings detectors+S/R per call: {own_us:7.1f} us own scans | '
+          f'{shared_us:7.1f} us shared index | {own_us / shared_us:4.1f}x | match={matches}')
+
+    return {
+        'calls': calls,
+        'own_us': own_us,
+        'shared_us': shared_us,
+        'speedup': own_us / shared_us,
+        'matches': matches,
+    }
+
+def bench_zones(bars: int = 5_000, levels: List[int] = None) -> List[Dict]:
+    """
+    Per-bar cost of HFZ + LFZ touch counting: scanning the 100-bar window
+    at each level vs a ZoneIndex appended to bar by bar (update included).
+    At 20 levels the index must reproduce the detectors' output exactly.
+    """
+    from pattern_detection_engine import ZoneIndex, ZONE_LEVELS, ZONE_LOOKBACK, _best_zone
+
+    levels = levels or [ZONE_LEVELS, 500]
+    data = CandleArray.from_candles(synthetic_candles(bars, seed=3, volatility=0.02))
+    steps = range(ZONE_LOOKBACK, bars + 1)
+
+    def scan(end, count):
+        found = []
+        for values in (data.low[end - ZONE_LOOKBACK:end], data.high[end - ZONE_LOOKBACK:end]):
+            tolerance = float(data.close[end - 1]) * 0.015
+            test_levels = np.linspace(values.min(), values.max(), count)
+            touch_counts = np.count_nonzero(np.abs(values[None, :] - test_levels[:, None]) < tolerance, axis=1)
+            found.append(_best_zone(test_levels, touch_counts))
+        return found
+
+    def indexed(index, end):
+        index.append(data[end - 1])
+        found = []
+        for side in ('low', 'high'):
+            tolerance = float(data.close[end - 1]) * 0.015
+            found.append(index.best_zone(side, tolerance))
+        return found
+
+    results = []
+    for count in levels:
+        start = time.perf_counter()
+        expected = [scan(end, count) for end in steps]
+        scan_us = (time.perf_counter() - start) / len(steps) * 1e6
+
+        index = ZoneIndex(data[:ZONE_LOOKBACK - 1], levels=count)
+        start = time.perf_counter()
+        got = [indexed(index, end) for end in steps]
+        index_us = (time.perf_counter() - start) / len(steps) * 1e6
+
+        matches = got == expected
+        print(f'[Bench] zones {count:4d} levels: {scan_us:7.1f} us scan | {index_us:7.1f} us index | '
+              f'{scan_us / index_us:4.1f}x | match={matches}')
+        results.append({'levels': count, 'scan_us': scan_us, 'index_us': index_us, 'matches': matches})
+
+    # The detectors end to end, including pattern_data
+    from pattern_detection_engine import detect_hfz, detect_lfz
+    index = ZoneIndex(data[:ZONE_LOOKBACK - 1])
+    same = True
+    for end in steps:
+        index.append(data[end - 1])
+        candles = data[:end]
+        for detector in (detect_hfz, detect_lfz):
+            own, shared = detector(candles), detector(candles, zones=index)
+            same = same and (own is None) == (shared is None) and (
+                own is None or (own.confidence, own.zone_price, own.pattern_data)
+                == (shared.confidence, shared.zone_price, shared.pattern_data))
+    print(f'[Bench] zones detect_hfz/detect_lfz with index: match={same}')
+    results.append({'detectors_match': same})
+    return results
+
+# ═══════════════════════════════════════════════════════════════════════════
+# FULL-HISTORY BATCH DETECTION
+# ═══════════════════════════════════════════════════════════════════════════
+
+def bench_history(bars: int = 100_000, samples: int = 1_000) -> Dict:
+    """
+    detect_all_history over `bars` candles vs calling every detector on
+    each growing prefix. The per-bar loop is timed on `samples` evenly
+    spaced bars and extrapolated; those bars are also checked for
+    identical detections.
+    """
+    from pattern_detection_engine import PatternDetectionEngine
+    from pattern_history import history_detections
+
+    engine = PatternDetectionEngine(user_tier='TIER3')
+    patterns = [p for p in engine.available_patterns if p in engine.detectors]
+    candle_list = synthetic_candles(bars, seed=1, volatility=0.02)
+    data = CandleArray.from_candles(candle_list)
+
+    start = time.perf_counter()
+    history = engine.detect_all_history(data, min_confidence=0.0, min_bars=0)
+    history_time = time.perf_counter() - start
+
+    fields = ('pattern_type', 'confidence', 'start_index', 'entry_price', 'stop_loss', 'take_profit', 'zone_price')
+    by_bar: Dict[int, list] = {}
+    for detection in history_detections(history):
+        by_bar.setdefault(detection.end_index, []).append(tuple(getattr(detection, f) for f in fields))
+
+    sample_bars = np.linspace(200, bars - 1, samples).astype(int)
+    result = {'bars': bars, 'detections': len(history), 'history_s': history_time}
+    matches = True
+
+    for name, candles in (('list', candle_list), ('array', data)):
+        start = time.perf_counter()
+        for i in sample_bars:
+            prefix = candles[:i+1]
+            found = [engine.detect_pattern(prefix, p) for p in patterns]
+            expected = [tuple(getattr(d, f) for f in fields) for d in found if d is not None]
+            matches = matches and expected == by_bar.get(int(i), [])
+        per_bar_time = (time.perf_counter() - start) / samples * bars
+        result[f'per_bar_{name}_s'] = per_bar_time
+        print(f'[Bench] history {bars} bars: {history_time:6.2f}s batch | {per_bar_time:7.1f}s per-bar '
+              f'({name} prefixes, est.) | {per_bar_time / history_time:5.0f}x')
+
+    print(f'[Bench] history {len(history)} detections | match={matches}')
+    result['matches'] = matches
+    return result
+
+# ═══════════════════════════════════════════════════════════════════════════
+# HISTORICAL DOWNLOAD
+# ═══════════════════════════════════════════════════════════════════════════
+
+def bench_download(
+    symbols: int = 10,
+    timeframes: List[str] = None,
+    days: int = 365,
+    latency: float = 0.05,
+    concurrency: int = 16
+) -> Dict:
+    """
+    Backfill from a local fixture server with simulated latency: the
+    serial HistoricalDataFetcher path vs AsyncKlineDownloader, then a
+    resumed rerun from checkpoints. Checks both return the same candles.
+    """
+    import asyncio
+    import tempfile
+    from datetime import datetime, timedelta
+    from async_data_fetcher import download_all_symbols
+    from historical_data_fetcher import HistoricalDataFetcher
+    from kline_fixture_server import KlineFixtureServer
+
+    timeframes = timeframes or ['1h', '4h']
+    names = [f'SYM{i}USDT' for i in range(symbols)]
+    end_date = datetime(2024, 1, 1)
+    start_date = end_date - timedelta(days=days)
+
+    with KlineFixtureServer(latency=latency) as server, tempfile.TemporaryDirectory() as checkpoint_dir:
+        with contextlib.redirect_stdout(io.StringIO()):
+            fetcher = HistoricalDataFetcher(use_cache=False, base_url=server.url)
+            start = time.perf_counter()
+            serial = {
+                name: {tf: fetcher.fetch_historical(name, tf, start_date, end_date, save_to_db=False) for tf in timeframes}
+                for name in names
+            }
+            serial_time = time.perf_counter() - start
+            serial_requests = server.requests
+
+            kwargs = dict(base_url=server.url, concurrency=concurrency, checkpoint_dir=checkpoint_dir, keep_checkpoints=True)
+            start = time.perf_counter()
+            concurrent, stats = asyncio.run(download_all_symbols(names, timeframes, start_date, end_date, **kwargs))
+            async_time = time.perf_counter() - start
+
+            start = time.perf_counter()
+            resumed, resume_stats = asyncio.run(download_all_symbols(names, timeframes, start_date, end_date, **kwargs))
+            resume_time = time.perf_counter() - start
+
+    candles = sum(len(serial[n][tf]) for n in names for tf in timeframes)
+    matches = all(
+        np.array_equal(getattr(serial[n][tf], field), getattr(other[n][tf], field))
+        for other in (concurrent, resumed) for n in names for tf in timeframes for field in CandleArray.FIELDS
+    )
+
+    print(f'[Bench] download {symbols} symbols x {len(timeframes)} tf x {days}d ({candles:,} candles, {latency * 1000:.0f} ms RTT): '
+          f'serial {serial_time:6.2f}s ({serial_requests} req) | async {async_time:6.2f}s ({stats.requests} req, '
+          f'{serial_time / async_time:5.1f}x) | resumed {resume_time:5.2f}s ({resume_stats.resumed_pages} pages) | '
+          f'{"identical" if matches else "MISMATCH"}')
+
+    return {
+        'candles': candles,
+        'serial_s': serial_time,
+        'async_s': async_time,
+        'resume_s': resume_time,
+        'matches': matches,
+    }
+
+# ═══════════════════════════════════════════════════════════════════════════
+# LOCAL CANDLE CACHE
+# ═══════════════════════════════════════════════════════════════════════════
+
+def bench_cache(symbols: int = 5, days: int = 730, timeframe: str = '1h', latency: float = 0.02) -> Dict:
+    """
+    HistoricalDataFetcher against a fixture server with a fresh disk
+    cache: cold fetch, warm load (new fetcher, empty memory cache), then a
+    range extended by 30 days, which should only request the new tail.
+    """
+    import tempfile
+    from datetime import datetime, timedelta
+    from candle_cache import CandleDiskCache
+    from historical_data_fetcher import HistoricalDataFetcher
+    from kline_fixture_server import KlineFixtureServer
+
+    names = [f'SYM{i}USDT' for i in range(symbols)]
+    end_date = datetime(2024, 1, 1)
+    start_date = end_date - timedelta(days=days)
+    extended_end = end_date + timedelta(days=30)
+
+    def fetch_all(server, cache_dir, date_to):
+        fetcher = HistoricalDataFetcher(use_cache=False, base_url=server.url, disk_cache=CandleDiskCache(cache_dir))
+        requests_before = server.requests
+        start = time.perf_counter()
+        data = {name: fetcher.fetch_historical(name, timeframe, start_date, date_to, save_to_db=False) for name in names}
+        return data, time.perf_counter() - start, server.requests - requests_before, fetcher.disk_cache
+
+    with KlineFixtureServer(latency=latency) as server, tempfile.TemporaryDirectory() as cache_dir:
+        with contextlib.redirect_stdout(io.StringIO()):
+            cold, cold_time, cold_requests, _ = fetch_all(server, cache_dir, end_date)
+            warm, warm_time, warm_requests, cache = fetch_all(server, cache_dir, end_date)
+            extended, extended_time, extended_requests, _ = fetch_all(server, cache_dir, extended_end)
+            problems = cache.verify(repair=False)
+            stats = cache.stats()
+
+    matches = all(
+        np.array_equal(getattr(cold[n], field), getattr(warm[n], field)) and
+        np.array_equal(getattr(cold[n], field), getattr(extended[n], field)[:len(cold[n])])
+        for n in names for field in CandleArray.FIELDS
+    )
+    candles = sum(len(c) for c in cold.values())
+
+    print(f'[Bench] cache {symbols} x {timeframe} x {days}d ({candles:,} candles): '
+          f'cold {cold_time:6.2f}s ({cold_requests} req) | warm {warm_time * 1000:7.1f} ms ({warm_requests} req) | '
+          f'+30d {extended_time:5.2f}s ({extended_requests} req) | {stats["partitions"]} partitions, '
+          f'{stats["bytes"] / 1024 ** 2:.1f} MB | {len(problems)} integrity problems | '
+          f'{"identical" if matches else "MISMATCH"}')
+
+    return {
+        'cold_s': cold_time,
+        'warm_s': warm_time,
+        'warm_requests': warm_requests,
+        'extended_requests': extended_requests,
+        'matches': matches,
+        'problems': problems,
+    }
+
+# ═══════════════════════════════════════════════════════════════════════════
+# MULTI-TIMEFRAME RESAMPLING
+# ═══════════════════════════════════════════════════════════════════════════
+
+def bench_resample(
+    symbols: int = 5,
+    timeframes: List[str] = None,
+    days: int = 365,
+    parity_days: int = 3,
+    base_url: str = None
+) -> Dict:
+    """
+    Parity of candles resampled from 1m (batch resample() and the
+    incremental CandleResampler, forming bar included) against the
+    exchange's own bars for the last parity_days, then the requests a
+    backfill and a live poll cycle need when every timeframe is fetched
+    vs only the finest. Uses a local fixture server unless base_url points
+    at a real Binance-compatible API (parity only, volumes compared to
+    1e-9 relative since the exchange sums decimals).
+    """
+    import asyncio
+    import tempfile
+    from datetime import datetime, timedelta
+    from candle_cache import CandleDiskCache
+    from candle_resampler import CandleResampler, base_timeframe_for, covering_end, resample
+    from historical_data_fetcher import HistoricalDataFetcher, TIMEFRAME_MINUTES
+    from kline_fixture_server import KlineFixtureServer
+    from live_scanner import PollingKlineFeed
+    from walk_forward import load_cached_candles
+
+    timeframes = timeframes or ['15m', '1h', '4h', '1d']
+    names = [f'SYM{i}USDT' for i in range(symbols)] if base_url is None else ['BTCUSDT', 'ETHUSDT'][:symbols]
+    parity_timeframes = sorted(set(['5m', '15m', '1h', '4h', '1d'] + timeframes), key=lambda tf: TIMEFRAME_MINUTES[tf])
+
+    def same(a: CandleArray, b: CandleArray) -> bool:
+        return len(a) == len(b) and all(
+            np.array_equal(getattr(a, f), getattr(b, f)) if f != 'volume' or base_url is None
+            else np.allclose(a.volume, b.volume, rtol=1e-9, atol=0)
+            for f in CandleArray.FIELDS
+        )
+
+    def parity(url: str) -> Dict[str, bool]:
+        fetcher = HistoricalDataFetcher(use_cache=False, base_url=url)
+        now = datetime.now()
+        start = now - timedelta(days=parity_days)
+        results = {}
+        for name in names:
+            direct = {tf: fetcher.fetch_historical(name, tf, start, now, save_to_db=False) for tf in parity_timeframes}
+            first = min(int(direct[tf].timestamp[0]) for tf in parity_timeframes)
+            base = fetcher.fetch_historical(name, '1m', datetime.fromtimestamp(first / 1000), now, save_to_db=False)
+
+            incremental = CandleResampler('1m', parity_timeframes)
+            closed = {tf: [] for tf in parity_timeframes}
+            for candle in base[:-1]:
+                for update in incremental.update(candle):
+                    if update.closed:
+                        closed[update.timeframe].append(update.candle)
+            incremental.update(base[-1], closed=False)  # Still forming
+
+            for tf in parity_timeframes:
+                expected = direct[tf]
+                batch = resample(base, '1m', tf)
+                stream = CandleArray.from_candles(closed[tf] + [incremental.current(tf)])
+                batch = batch[np.searchsorted(batch.timestamp, expected.timestamp[0]):]
+                stream = stream[np.searchsorted(stream.timestamp, expected.timestamp[0]):]
+                results[(name, tf)] = same(batch, expected) and same(stream, expected)
+        return results
+
+    def poll_cycles(url: str, base_timeframe) -> List[int]:
+        """Requests of two live poll cycles after seeding."""
+        feed = PollingKlineFeed(names, timeframes, poll_interval=3600, base_timeframe=base_timeframe, base_url=url)
+        for name in names:
+            for tf in timeframes:
+                feed.history(name, tf, 300)
+
+        async def cycle():
+            events = feed.__aiter__()
+            try:
+                await asyncio.wait_for(events.__anext__(), timeout=2.0)
+            except asyncio.TimeoutError:
+                pass
+
+        counts = []
+        for _ in range(2):
+            before = feed.poll_requests
+            asyncio.run(cycle())
+            counts.append(feed.poll_requests - before)
+        return counts
+
+    if base_url is not None:
+        with contextlib.redirect_stdout(io.StringIO()):
+            results = parity(base_url)
+        print(f'[Bench] resample parity vs {base_url}: {sum(results.values())}/{len(results)} streams identical')
+        return {'parity': results}
+
+    end_date = datetime(2024, 1, 1)
+    start_date = end_date - timedelta(days=days)
+    base = base_timeframe_for(timeframes)
+
+    with KlineFixtureServer() as server, contextlib.redirect_stdout(io.StringIO()):
+        results = parity(server.url)
+
+        fetcher = HistoricalDataFetcher(use_cache=False, base_url=server.url)
+        before = server.requests
+        start = time.perf_counter()
+        direct = {n: {tf: fetcher.fetch_historical(n, tf, start_date, end_date, save_to_db=False) for tf in timeframes} for n in names}
+        direct_time = time.perf_counter() - start
+        direct_requests = server.requests - before
+
+        fetcher = HistoricalDataFetcher(use_cache=False, base_url=server.url)
+        before = server.requests
+        start = time.perf_counter()
+        derived = {n: fetcher.fetch_timeframes(n, timeframes, start_date, end_date, save_to_db=False) for n in names}
+        derived_time = time.perf_counter() - start
+        derived_requests = server.requests - before
+
+        # Offline reload: the cache holds only the base timeframe, as
+        # fetch_all_symbols leaves it; load_cached_candles resamples the rest
+        start_ts, end_ts = int(start_date.timestamp() * 1000), int(end_date.timestamp() * 1000)
+        base_end = covering_end(end_ts, base, timeframes)
+        with tempfile.TemporaryDirectory() as root:
+            cache = CandleDiskCache(root)
+            for n in names:
+                candles = fetcher.fetch_historical(n, base, start_date, datetime.fromtimestamp(base_end / 1000), save_to_db=False)
+                cache.store(n, base, candles, [(start_ts, base_end)])
+            reloaded = load_cached_candles(names, timeframes, start_date, end_date + timedelta(milliseconds=1), cache=cache)
+
+        polled = poll_cycles(server.url, None)
+        resampled = poll_cycles(server.url, base)
+
+    matches = all(same(direct[n][tf], derived[n][tf]) for n in names for tf in timeframes)
+    cache_matches = all(same(derived[n][tf], reloaded[n][tf]) for n in names for tf in timeframes)
+    candles = sum(len(direct[n][tf]) for n in names for tf in timeframes)
+
+    print(f'[Bench] resample parity (1m -> {" ".join(parity_timeframes)}, last {parity_days}d, batch + incremental): '
+          f'{sum(results.values())}/{len(results)} streams identical')
+    print(f'[Bench] resample backfill {symbols} x {" ".join(timeframes)} x {days}d ({candles:,} candles): '
+          f'per timeframe {direct_time:5.2f}s ({direct_requests} req) | from {base} {derived_time:5.2f}s '
+          f'({derived_requests} req, {1 - derived_requests / direct_requests:.0%} fewer) | '
+          f'{"identical" if matches else "MISMATCH"}')
+    print(f'[Bench] resample offline reload ({base} disk cache -> {" ".join(timeframes)}): '
+          f'{"identical" if cache_matches else "MISMATCH"}')
+    print(f'[Bench] resample live poll cycle: per timeframe {polled[1]} req | from {base} {resampled[1]} req '
+          f'({resampled[0]} on the first cycle)')
+
+    return {
+        'parity': results,
+        'direct_requests': direct_requests,
+        'derived_requests': derived_requests,
+        'poll_requests': polled[1],
+        'resampled_poll_requests': resampled[1],
+        'matches': matches,
+        'cache_matches': cache_matches,
+    }
+
+# ═══════════════════════════════════════════════════════════════════════════
+# CANDLE INGEST
+# ═══════════════════════════════════════════════════════════════════════════
+
+LEGACY_UPSERT_SQL = '''
+INSERT INTO ai_historical_candles (symbol, timeframe, exchange, open_time, open, high, low, close, volume)
+SELECT symbol, timeframe, exchange, open_time, open, high, low, close, volume
+FROM json_populate_recordset(NULL::ai_historical_candles, $1::json)
+ON CONFLICT (symbol, timeframe, exchange, open_time) DO UPDATE SET
+  open = EXCLUDED.open, high = EXCLUDED.high, low = EXCLUDED.low,
+  close = EXCLUDED.close, volume = EXCLUDED.volume
+'''
+
+def _legacy_batches(symbol: str, timeframe: str, candles: CandleArray, batch_size: int = 500):
+    """The JSON bodies HistoricalDataFetcher._save_to_db sends, batch by batch."""
+    from datetime import datetime
+
+    records = []
+    for ts, o, h, l, c, v in zip(
+        candles.timestamp.tolist(), candles.open.tolist(), candles.high.tolist(),
+        candles.low.tolist(), candles.close.tolist(), candles.volume.tolist()
+    ):
+        records.append({
+            'symbol': symbol,
+            'timeframe': timeframe,
+            'exchange': 'binance',
+            'open_time': datetime.fromtimestamp(ts / 1000).isoformat(),
+            'open': o,
+            'high': h,
+            'low': l,
+            'close': c,
+            'volume': v,
+        })
+    return [json.dumps(records[i:i + batch_size]) for i in range(0, len(records), batch_size)]
+
+def bench_ingest(rows: int = 500_000, dsn: str = None, concurrency: int = 4) -> Dict:
+    """
+    Encoding throughput of the legacy JSON upsert batches vs binary COPY
+    payloads. With a DSN (any Postgres, e.g. a local stand-in), also time
+    the writes: sequential 500-row JSON upserts (what PostgREST runs for
+    the legacy path) vs BulkCandleWriter, and check the stored rows.
+    """
+    import asyncio
+    from bulk_candle_writer import CANDLE_TABLE_SQL, encode_copy_binary, write_candles_async
+
+    candles = CandleArray.from_candles(synthetic_candles(rows, interval_ms=60_000))
+
+    legacy_encode = _timed(_legacy_batches, 'BENCHUSDT', '1m', candles)
+    copy_encode = _timed(lambda: [encode_copy_binary(candles[i:i + 50_000]) for i in range(0, rows, 50_000)])
+
+    print(f'[Bench] ingest encode {rows:,} rows: legacy JSON {rows / legacy_encode:12,.0f} rows/s | '
+          f'binary COPY {rows / copy_encode:12,.0f} rows/s ({legacy_encode / copy_encode:6.1f}x)')
+
+    result = {'rows': rows, 'legacy_encode_rows_s': rows / legacy_encode, 'copy_encode_rows_s': rows / copy_encode}
+    if not dsn:
+        return result
+
+    import asyncpg
+
+    async def legacy_write():
+        conn = await asyncpg.connect(dsn)
+        try:
+            for body in _legacy_batches('LEGACYUSDT', '1m', candles):
+                await conn.execute(LEGACY_UPSERT_SQL, body)
+        finally:
+            await conn.close()
+
+    async def run_db():
+        conn = await asyncpg.connect(dsn)
+        await conn.execute(CANDLE_TABLE_SQL)
+        await conn.execute("DELETE FROM ai_historical_candles WHERE symbol IN ('LEGACYUSDT', 'BULKUSDT')")
+        await conn.close()
+
+        start = time.perf_counter()
+        await legacy_write()
+        legacy_time = time.perf_counter() - start
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            stats = await write_candles_async({'BULKUSDT': {'1m': candles}}, dsn, concurrency=concurrency)
+            rerun = await write_candles_async({'BULKUSDT': {'1m': candles}}, dsn, concurrency=concurrency)
+
+        conn = await asyncpg.connect(dsn)
+        stored = await conn.fetch(
+            "SELECT (EXTRACT(EPOCH FROM open_time) * 1000)::BIGINT AS ts, close FROM ai_historical_candles "
+            "WHERE symbol = 'BULKUSDT' ORDER BY open_time"
+        )
+        await conn.close()
+        return legacy_time, stats, rerun, stored
+
+    legacy_time, stats, rerun, stored = asyncio.run(run_db())
+    matches = (
+        len(stored) == rows and
+        np.array_equal(np.array([r['ts'] for r in stored], dtype=np.int64), candles.timestamp) and
+        np.array_equal(np.array([r['close'] for r in stored]), candles.close)
+    )
+
+    print(f'[Bench] ingest write {rows:,} rows: legacy upserts {rows / legacy_time:10,.0f} rows/s | '
+          f'bulk COPY x{concurrency} {stats.rows_per_second:10,.0f} rows/s ({legacy_time / stats.elapsed:5.1f}x) | '
+          f're-ingest {rerun.rows_per_second:10,.0f} rows/s ({rerun.rows_inserted} new/changed) | '
+          f'{"stored rows match" if matches else "STORED ROWS MISMATCH"}')
+
+    result.update({
+        'legacy_write_rows_s': rows / legacy_time,
+        'bulk_write_rows_s': stats.rows_per_second,
+        'reingest_rows_s': rerun.rows_per_second,
+        'matches': matches,
+    })
+    return result
+
+# ═══════════════════════════════════════════════════════════════════════════
+# EMBEDDING PIPELINE
+# ═══════════════════════════════════════════════════════════════════════════
+
+def bench_embeddings(
+    texts: int = 2_000,
+    latency: float = 0.2,
+    per_input: float = 0.002,
+    in_flight: int = 8,
+    fail_every: int = 5
+) -> Dict:
+    """
+    Embedding throughput against a local fixture server: one batch of
+    BATCH_SIZE texts at a time (the previous sequential loop) vs
+    EmbeddingPipeline with token-budget batches and `in_flight`
+    concurrent requests, then the pipeline with every `fail_every`-th
+    request failing. Checks each text gets its own vector, in order.
+    """
+    import asyncio
+    from embedding_fixture_server import EmbeddingFixtureServer, fake_embedding
+    from embedding_service import BATCH_SIZE, OpenAIEmbeddingBackend, count_tokens, embed_texts_async
+
+    dimensions = 64  # Small vectors: time the pipeline, not JSON encoding
+    rng = random.Random(11)
+    vocab = ['gem', 'crystal', 'trend', 'zone', 'breakout', 'support', 'volume', 'pattern', 'entry', 'risk']
+    corpus = [
+        f'{i} ' + ' '.join(rng.choice(vocab) for _ in range(rng.randint(20, 480)))
+        for i in range(texts)
+    ]
+    token_counts = [count_tokens(t) for t in corpus]
+    expected = [fake_embedding(t, dimensions) for t in corpus]
+
+    def run(server: EmbeddingFixtureServer, **pipeline_kwargs):
+        backend = OpenAIEmbeddingBackend(api_key=None, base_url=server.url, connections=pipeline_kwargs['max_in_flight'])
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            embeddings, stats = asyncio.run(embed_texts_async(corpus, token_counts, backend, **pipeline_kwargs))
+        return time.perf_counter() - start, embeddings == expected, stats
+
+    with EmbeddingFixtureServer(latency=latency, per_input=per_input, dimensions=dimensions) as server:
+        sequential_time, sequential_ok, sequential = run(server, max_in_flight=1, batch_tokens=10 ** 9)
+        pipeline_time, pipeline_ok, pipelined = run(server, max_in_flight=in_flight)
+        peak = server.max_in_flight
+
+    with EmbeddingFixtureServer(latency=latency, per_input=per_input, fail_every=fail_every, dimensions=dimensions) as server:
+        faulty_time, faulty_ok, faulty = run(server, max_in_flight=in_flight, retry_delay=0.05)
+
+    matches = sequential_ok and pipeline_ok and faulty_ok
+    print(f'[Bench] embeddings {texts} texts ({sum(token_counts):,} tokens, {latency * 1000:.0f} ms + '
+          f'{per_input * 1000:.0f} ms/text): sequential x{BATCH_SIZE} {sequential_time:6.2f}s ({sequential.requests} req) | '
+          f'pipeline x{in_flight} {pipeline_time:6.2f}s ({pipelined.requests} req, peak {peak} in flight, '
+          f'{sequential_time / pipeline_time:4.1f}x) | 1/{fail_every} failing {faulty_time:6.2f}s '
+          f'({faulty.retries} retries, {faulty.failed} lost) | {"ordered, identical" if matches else "MISMATCH"}')
+
+    return {
+        'texts': texts,
+        'sequential_s': sequential_time,
+        'pipeline_s': pipeline_time,
+        'faulty_s': faulty_time,
+        'peak_in_flight': peak,
+        'matches': matches,
+    }
+
+# ═══════════════════════════════════════════════════════════════════════════
+# CHUNKING
+# ═══════════════════════════════════════════════════════════════════════════
+
+def _legacy_smart_chunk_text(text: str) -> List[Dict]:
+    """smart_chunk_text before single-pass tokenization (parity reference)."""
+    from embedding_service import CHUNK_SIZE, chunk_text, count_tokens
+
+    if not text or not text.strip():
+        return []
+
+    chunks = []
+    current_chunk = []
+    current_tokens = 0
+
+    def flush(paragraphs: List[str]):
+        chunk_text_str = '\n\n'.join(paragraphs)
+        chunks.append({'text': chunk_text_str, 'index': len(chunks), 'token_count': count_tokens(chunk_text_str)})
+
+    for para in text.split('\n\n'):
+        para = para.strip()
+        if not para:
+            continue
+
+        para_tokens = count_tokens(para)
+        if para_tokens > CHUNK_SIZE:
+            if current_chunk:
+                flush(current_chunk)
+                current_chunk, current_tokens = [], 0
+            for sub_chunk in chunk_text(para):
+                chunks.append({'text': sub_chunk, 'index': len(chunks), 'token_count': count_tokens(sub_chunk)})
+        elif current_tokens + para_tokens > CHUNK_SIZE:
+            if current_chunk:
+                flush(current_chunk)
+            current_chunk, current_tokens = [para], para_tokens
+        else:
+            current_chunk.append(para)
+            current_tokens += para_tokens
+
+    if current_chunk:
+        flush(current_chunk)
+    return chunks
+
+def _gemral_corpus(markdown: str = None) -> List[Dict]:
+    """Documents knowledge_ingestion.main() ingests, plus *.md files under `markdown`."""
+    from pathlib import Path
+    import knowledge_ingestion as ki
+
+    documents = []
+    ingest_document = ki.ingest_document
+    ki.ingest_document = lambda doc, source_type, show_progress=True: documents.append(doc) or True
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            ki.ingest_gemral_spiritual_knowledge()
+            ki.ingest_gemral_trading_knowledge()
+            ki.ingest_gemral_product_knowledge()
+            ki.ingest_gem_master_response_guidelines()
+            ki.ingest_partnership_knowledge()
+    finally:
+        ki.ingest_document = ingest_document
+
+    for path in sorted(Path(markdown).glob('**/*.md')) if markdown else []:
+        try:
+            documents.append(ki.load_markdown_file(str(path)))
+        except (OSError, UnicodeDecodeError):
+            pass  # Skipped like in ingest_directory
+    return documents
+
+class _CountingTokenizer:
+    """Tokenizer proxy counting the characters passed to encode()."""
+
+    def __init__(self, inner):
+        self.inner = inner
+        self.chars = 0
+
+    def encode(self, text: str, *args, **kwargs):
+        self.chars += len(text)
+        return self.inner.encode(text, *args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self.inner, name)
+
+def bench_chunking(markdown: str = None, rounds: int = 20) -> Dict:
+    """
+    smart_chunk_text over the Gemral knowledge corpus: the per-paragraph
+    plus per-chunk count_tokens version vs single-pass ParagraphTokens.
+    Checks both produce the same chunks (text, index, token_count) and
+    reports how many times the corpus went through the tokenizer.
+    """
+    import embedding_service as es
+
+    texts = [doc['content'] for doc in _gemral_corpus(markdown)]
+    chars = sum(len(t) for t in texts)
+    es.initialize()
+
+    legacy = [_legacy_smart_chunk_text(t) for t in texts]
+    current = [
+        [{key: chunk[key] for key in ('text', 'index', 'token_count')} for chunk in es.smart_chunk_text(t)]
+        for t in texts
+    ]
+    mismatched = sum(1 for a, b in zip(legacy, current) if a != b)
+
+    counting = _CountingTokenizer(es.tokenizer)
+    es.tokenizer = counting
+    try:
+        for t in texts:
+            _legacy_smart_chunk_text(t)
+        legacy_chars, counting.chars = counting.chars, 0
+        es._separator_tail.cache_clear()
+        for t in texts:
+            es.smart_chunk_text(t)
+        single_chars = counting.chars
+    finally:
+        es.tokenizer = counting.inner
+
+    legacy_time = _timed(lambda: [_legacy_smart_chunk_text(t) for _ in range(rounds) for t in texts]) / rounds
+    single_time = _timed(lambda: [es.smart_chunk_text(t) for _ in range(rounds) for t in texts]) / rounds
+
+    chunks = sum(len(c) for c in current)
+    print(f'[Bench] chunking {len(texts)} documents ({chars / 1024:,.0f} KB, {chunks} chunks): '
+          f'legacy {legacy_time * 1000:7.2f} ms ({legacy_chars / chars:.2f}x text tokenized) | '
+          f'single pass {single_time * 1000:7.2f} ms ({single_chars / chars:.2f}x, '
+          f'{legacy_time / single_time:4.1f}x) | '
+          f'{"identical chunks" if not mismatched else f"{mismatched} DOCUMENTS DIFFER"}')
+
+    return {
+        'documents': len(texts),
+        'chunks': chunks,
+        'legacy_ms': legacy_time * 1000,
+        'single_pass_ms': single_time * 1000,
+        'legacy_tokenized': legacy_chars / chars,
+        'single_pass_tokenized': single_chars / chars,
+        'matches': not mismatched,
+    }
+
+# ═══════════════════════════════════════════════════════════════════════════
+# VECTOR INDEX
+# ═══════════════════════════════════════════════════════════════════════════
+
+def _clustered_embeddings(n: int, dim: int, rng: np.random.Generator, topics: np.ndarray) -> np.ndarray:
+    """Unit vectors around topic centres (nearby texts share a topic, as embeddings do)."""
+    vectors = topics[rng.integers(0, len(topics), n)] + rng.standard_normal((n, dim)) / np.sqrt(dim) * 1.5
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+def bench_vectors(
+    chunks: int = 20_000,
+    dim: int = 1536,
+    queries: int = 200,
+    k: int = 5,
+    nprobes: List[int] = None
+) -> Dict:
+    """
+    Knowledge retrieval over `chunks` synthetic embeddings: exact float32
+    brute force (what every query costs without an index) vs VectorIndex
+    (IVF lists, float16) at several nprobe values, unfiltered and with a
+    category filter. Recall@k is measured against the exact top-k. Also
+    times snapshot save / memory-mapped load and incremental add/delete.
+    """
+    import tempfile
+    from vector_index import VectorIndex
+
+    nprobes = nprobes or [1, 4, 8, 16]
+    rng = np.random.default_rng(5)
+    topics = rng.standard_normal((chunks // 40, dim))
+    topics /= np.linalg.norm(topics, axis=1, keepdims=True)
+    vectors = _clustered_embeddings(chunks, dim, rng, topics).astype(np.float32)
+    query_vectors = _clustered_embeddings(queries, dim, rng, topics).astype(np.float32)
+    categories = ['trading', 'spiritual', 'product', 'partnership']
+    ids = [f'chunk-{i}' for i in range(chunks)]
+    metadata = [
+        {'document_id': f'doc-{i // 20}', 'chunk_text': '', 'category': categories[i % 4], 'tags': [f'tag-{i % 25}']}
+        for i in range(chunks)
+    ]
+    trading = np.array([i % 4 == 0 for i in range(chunks)])
+
+    def brute_force(q: np.ndarray, mask: np.ndarray = None) -> List[str]:
+        scores = vectors @ q
+        if mask is not None:
+            scores = np.where(mask, scores, -np.inf)
+        top = np.argpartition(-scores, k - 1)[:k]
+        return [ids[i] for i in top[np.argsort(-scores[top])]]
+
+    def measure(search, truth: List[List[str]]):
+        start = time.perf_counter()
+        found = [search(q) for q in query_vectors]
+        elapsed = (time.perf_counter() - start) / queries
+        recall = np.mean([len(set(f) & set(t)) / k for f, t in zip(found, truth)])
+        return elapsed * 1000, float(recall)
+
+    exact_ms, _ = measure(brute_force, [brute_force(q) for q in query_vectors])
+    truth = [brute_force(q) for q in query_vectors]
+    truth_filtered = [brute_force(q, trading) for q in query_vectors]
+
+    print(f'[Bench] vectors {chunks:,} x {dim}, {queries} queries: exact float32 top-{k} {exact_ms:6.2f} ms/query')
+    results = {'chunks': chunks, 'exact_ms': exact_ms}
+    for dtype in ('float32', 'float16'):
+        index = VectorIndex(dim=dim, dtype=dtype)
+        build_time = _timed(lambda: index.add(ids, vectors, metadata))
+        results[dtype] = {'build_s': build_time, 'mb': index.vectors.nbytes / 1024 ** 2, 'nprobe': {}}
+        print(f'  {dtype} index: {index.nlist} lists, {index.vectors.nbytes / 1024 ** 2:.0f} MB, built in {build_time:.2f}s')
+        for nprobe in nprobes:
+            ivf_ms, recall = measure(lambda q: [r['id'] for r in index.search(q, k, nprobe=nprobe)], truth)
+            filtered_ms, filtered_recall = measure(
+                lambda q: [r['id'] for r in index.search(q, k, category='trading', nprobe=nprobe)], truth_filtered
+            )
+            results[dtype]['nprobe'][nprobe] = {
+                'ms': ivf_ms, 'recall': recall, 'filtered_ms': filtered_ms, 'filtered_recall': filtered_recall,
+            }
+            print(f'    nprobe {nprobe:3d}: {ivf_ms:6.2f} ms/query, recall@{k} {recall:.3f} ({exact_ms / ivf_ms:5.1f}x) | '
+                  f'category filter {filtered_ms:6.2f} ms, recall@{k} {filtered_recall:.3f}')
+
+    with tempfile.TemporaryDirectory() as path:
+        save_time = _timed(lambda: index.save(path))
+        start = time.perf_counter()
+        loaded = VectorIndex.load(path)
+        load_time = time.perf_counter() - start
+        same = all(
+            [r['id'] for r in loaded.search(q, k)] == [r['id'] for r in index.search(q, k)]
+            for q in query_vectors[:20]
+        )
+
+        fresh = _clustered_embeddings(1_000, dim, rng, topics)
+        add_time = _timed(lambda: loaded.add(
+            [f'new-{i}' for i in range(len(fresh))], fresh, [{'category': 'trading'}] * len(fresh)
+        ))
+        delete_time = _timed(lambda: loaded.delete(ids[:1_000]))
+        del loaded
+
+    results.update({'save_s': save_time, 'load_s': load_time, 'add_1000_s': add_time,
+                    'delete_1000_s': delete_time, 'snapshot_matches': same})
+    print(f'  float16 snapshot save {save_time:.2f}s, mmap load {load_time:.2f}s '
+          f'({"same results" if same else "RESULTS DIFFER"}) | add 1,000 {add_time * 1000:.0f} ms, '
+          f'delete 1,000 {delete_time * 1000:.0f} ms')
+    return results
+
+# ═══════════════════════════════════════════════════════════════════════════
+# CLI
+# ═══════════════════════════════════════════════════════════════════════════
+
+def main():
+    parser = argparse.ArgumentParser(description='GEMRAL AI Brain benchmarks')
+    sub = parser.add_subparsers(dest='bench', required=True)
+
+    p = sub.add_parser('indicators', help='Streaming vs list-based indicators')
+    p.add_argument('--sizes', type=int, nargs='+', default=[10_000, 50_000, 200_000])
+
+    p = sub.add_parser('candles', help='List[Candle] vs CandleArray memory and detection')
+    p.add_argument('--bars', type=int, default=1_576_800)
+
+    sub.add_parser('parity', help='Vectorized vs list indicator parity checks')
+
+    p = sub.add_parser('vectorized', help='Indicator throughput in candles/sec')
+    p.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    p.add_argument('--symbols', type=int, default=25)
+
+    p = sub.add_parser('parallel', help='Parallel backtest scaling over TOP_COINS')
+    p.add_argument('--bars', type=int, default=5_000)
+    p.add_argument('--workers', type=int, nargs='+', default=None)
+
+    p = sub.add_parser('sweep', help='100-config parameter sweep vs one backtest')
+    p.add_argument('--bars', type=int, default=5_000)
+    p.add_argument('--symbols', type=int, default=5)
+
+    p = sub.add_parser('exits', help='Per-candle position updates vs the vectorized exit simulator')
+    p.add_argument('--bars', type=int, default=20_000)
+    p.add_argument('--positions', type=int, nargs='+', default=[5, 100, 1_000, 5_000])
+
+    p = sub.add_parser('outcomes', help='Pending detection outcomes: per-detection scan vs OutcomeResolver')
+    p.add_argument('--detections', type=int, default=20_000)
+    p.add_argument('--symbols', type=int, default=20)
+    p.add_argument('--days', type=int, default=365)
+
+    p = sub.add_parser('filters', help='Per-filter win rate loops vs FilterEvaluator masks')
+    p.add_argument('--detections', type=int, default=100_000)
+    p.add_argument('--filters', type=int, default=50)
+
+    p = sub.add_parser('walkforward', help='Offline walk-forward run from the local candle cache')
+    p.add_argument('--symbols', type=int, default=25)
+    p.add_argument('--days', type=int, default=730)
+    p.add_argument('--workers', type=int, default=None)
+
+    p = sub.add_parser('scanner', help='Live scanner replay load test')
+    p.add_argument('--symbols', type=int, default=300)
+    p.add_argument('--bars', type=int, default=100)
+
+    p = sub.add_parser('swings', help='Detectors + S/R with and without a shared swing index')
+    p.add_argument('--bars', type=int, default=2_000)
+    p.add_argument('--window', type=int, default=500)
+
+    p = sub.add_parser('zones', help='HFZ/LFZ touch counts: window scan vs ZoneIndex')
+    p.add_argument('--bars', type=int, default=5_000)
+    p.add_argument('--levels', type=int, nargs='+', default=[20, 500])
+
+    p = sub.add_parser('features', help='extract_features per detection vs shared FeatureCache bar contexts')
+    p.add_argument('--bars', type=int, default=3_000)
+    p.add_argument('--step', type=int, default=5)
+    p.add_argument('--consumers', type=int, default=2)
+
+    p = sub.add_parser('history', help='detect_all_history vs per-bar detector calls')
+    p.add_argument('--bars', type=int, default=100_000)
+    p.add_argument('--samples', type=int, default=1_000)
+
+    p = sub.add_parser('download', help='Serial vs async historical backfill against a fixture server')
+    p.add_argument('--symbols', type=int, default=10)
+    p.add_argument('--timeframes', nargs='+', default=['1h', '4h'])
+    p.add_argument('--days', type=int, default=365)
+    p.add_argument('--latency', type=float, default=0.05)
+    p.add_argument('--concurrency', type=int, default=16)
+
+    p = sub.add_parser('cache', help='Local disk candle cache: cold, warm and extended-range fetches')
+    p.add_argument('--symbols', type=int, default=5)
+    p.add_argument('--days', type=int, default=730)
+
+    p = sub.add_parser('resample', help='Higher timeframes resampled from 1m vs exchange bars, and API calls saved')
+    p.add_argument('--symbols', type=int, default=5)
+    p.add_argument('--timeframes', nargs='+', default=['15m', '1h', '4h', '1d'])
+    p.add_argument('--days', type=int, default=365)
+    p.add_argument('--parity-days', type=int, default=3)
+    p.add_argument('--base-url', default=None, help='Check parity against this API instead of the fixture server')
+
+    p = sub.add_parser('ingest', help='Legacy JSON upserts vs bulk binary COPY')
+    p.add_argument('--rows', type=int, default=500_000)
+    p.add_argument('--dsn', default=os.getenv('DATABASE_URL'), help='Postgres to write to (encode-only without)')
+    p.add_argument('--concurrency', type=int, default=4)
+
+    p = sub.add_parser('embeddings', help='Sequential embedding batches vs the concurrent EmbeddingPipeline')
+    p.add_argument('--texts', type=int, default=2_000)
+    p.add_argument('--latency', type=float, default=0.2)
+    p.add_argument('--per-input', type=float, default=0.002)
+    p.add_argument('--in-flight', type=int, default=8)
+    p.add_argument('--fail-every', type=int, default=5)
+
+    p = sub.add_parser('chunking', help='smart_chunk_text: repeated count_tokens vs single-pass tokenization')
+    p.add_argument('--markdown', default=None, help='Also chunk every *.md under this directory')
+    p.add_argument('--rounds', type=int, default=20)
+
+    p = sub.add_parser('vectors', help='Exact brute-force retrieval vs the IVF VectorIndex: latency and recall')
+    p.add_argument('--chunks', type=int, default=20_000)
+    p.add_argument('--dim', type=int, default=1536)
+    p.add_argument('--queries', type=int, default=200)
+    p.add_argument('--k', type=int, default=5)
+    p.add_argument('--nprobe', type=int, nargs='+', default=[1, 4, 8, 16])
+
+    args = parser.parse_args()
+
+    if args.bench == 'indicators':
+        bench_indicators(args.sizes)
+    elif args.bench == 'candles':
+        bench_candles(args.bars)
+    elif args.bench == 'parity':
+        check_indicator_parity()
+    elif args.bench == 'vectorized':
+        bench_vectorized(args.sizes, args.symbols)
+    elif args.bench == 'parallel':
+        bench_parallel(args.bars, args.workers)
+    elif args.bench == 'sweep':
+        bench_sweep(args.bars, args.symbols)
+    elif args.bench == 'exits':
+        bench_exits(args.bars, args.positions)
+    elif args.bench == 'outcomes':
+        bench_outcomes(args.detections, args.symbols, args.days)
+    elif args.bench == 'filters':
+        bench_filters(args.detections, args.filters)
+    elif args.bench == 'walkforward':
+        bench_walkforward(args.symbols, args.days, args.workers)
+    elif args.bench == 'scanner':
+        bench_scanner(args.symbols, args.bars)
+    elif args.bench == 'swings':
+        bench_swings(args.bars, args.window)
+    elif args.bench == 'zones':
+        bench_zones(args.bars, args.levels)
+    elif args.bench == 'features':
+        bench_features(args.bars, args.step, args.consumers)
+    elif args.bench == 'history':
+        bench_history(args.bars, args.samples)
+    elif args.bench == 'download':
+        bench_download(args.symbols, args.timeframes, args.days, args.latency, args.concurrency)
+    elif args.bench == 'cache':
+        bench_cache(args.symbols, args.days)
+    elif args.bench == 'resample':
+        bench_resample(args.symbols, args.timeframes, args.days, args.parity_days, args.base_url)
+    elif args.bench == 'ingest':
+        bench_ingest(args.rows, args.dsn, args.concurrency)
+    elif args.bench == 'embeddings':
+        bench_embeddings(args.texts, args.latency, args.per_input, args.in_flight, args.fail_every)
+    elif args.bench == 'chunking':
+        bench_chunking(args.markdown, args.rounds)
+    elif args.bench == 'vectors':
+        bench_vectors(args.chunks, args.dim, args.queries, args.k, args.nprobe)
+
+__all__ = [
+    'synthetic_candles',
+    'bench_indicators',
+    'bench_candles',
+    'check_indicator_parity',
+    'bench_vectorized',
+    'bench_parallel',
+    'bench_sweep',
+    'bench_exits',
+    'bench_outcomes',
+    'bench_filters',
+    'bench_walkforward',
+    'bench_scanner',
+    'bench_swings',
+    'bench_zones',
+    'bench_features',
+    'bench_history',
+    'bench_download',
+    'bench_cache',
+    'bench_resample',
+    'bench_ingest',
+    'bench_embeddings',
+    'bench_chunking',
+    'bench_vectors',
+]
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,344 @@
+# scripts/ai/bulk_candle_writer.py
+# Bulk candle persistence via binary COPY (asyncpg)
+# GEMRAL AI BRAIN - Phase 7
+#
+# Encodes candle columns straight into PostgreSQL's binary COPY format with
+# NumPy (no per-row dicts, datetimes or JSON), streams batches over a pool
+# of connections concurrently, and upserts server side (like the
+# PostgREST upsert it replaces, so a stored candle can be corrected):
+#
+#   COPY -> temp staging table -> INSERT ... ON CONFLICT DO UPDATE
+#
+# Works against Supabase's Postgres (SUPABASE_DB_URL: the direct connection
+# string or the PgBouncer pooler, session or transaction mode) or any local
+# Postgres with the ai_historical_candles table. Each batch creates its own
+# staging table inside its transaction, so no session state is assumed.
+#
+# Usage:
+#   python bulk_candle_writer.py --dsn postgresql://postgres@localhost/postgres --create-table \
+#       --symbols BTCUSDT --timeframes 1m --days 30
+
+import argparse
+import asyncio
+import io
+import os
+import struct
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import List, Dict, Optional
+
+import asyncpg
+import numpy as np
+
+from feature_extractor import CandleArray
+
+# ═══════════════════════════════════════════════════════════════════════════
+# CONFIGURATION
+# ═══════════════════════════════════════════════════════════════════════════
+
+DATABASE_URL = os.getenv('SUPABASE_DB_URL') or os.getenv('DATABASE_URL')
+
+CANDLE_TABLE = 'ai_historical_candles'
+STAGE_TABLE = '_candle_stage'
+
+DEFAULT_BATCH_ROWS = 50_000
+DEFAULT_CONCURRENCY = 4
+PROGRESS_EVERY = 1_000_000      # Rows between progress lines
+
+# Standalone definition for a local Postgres stand-in (same columns and
+# unique key as supabase/migrations/20251216_005_backtesting_tables.sql)
+CANDLE_TABLE_SQL = f'''
+CREATE TABLE IF NOT EXISTS {CANDLE_TABLE} (
+  id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+  symbol TEXT NOT NULL,
+  timeframe TEXT NOT NULL,
+  exchange TEXT DEFAULT 'binance',
+  open_time TIMESTAMPTZ NOT NULL,
+  open FLOAT NOT NULL,
+  high FLOAT NOT NULL,
+  low FLOAT NOT NULL,
+  close FLOAT NOT NULL,
+  volume FLOAT NOT NULL,
+  created_at TIMESTAMPTZ DEFAULT NOW(),
+  UNIQUE(symbol, timeframe, exchange, open_time)
+);
+'''
+
+# Created per batch transaction: under transaction pooling, consecutive
+# transactions may run on different server connections
+STAGE_TABLE_SQL = f'''
+CREATE TEMP TABLE {STAGE_TABLE} (
+  open_time_ms BIGINT,
+  open FLOAT8,
+  high FLOAT8,
+  low FLOAT8,
+  close FLOAT8,
+  volume FLOAT8
+) ON COMMIT DROP
+'''
+
+MERGE_SQL = f'''
+INSERT INTO {CANDLE_TABLE} (symbol, timeframe, exchange, open_time, open, high, low, close, volume)
+SELECT DISTINCT ON (open_time_ms)
+  $1, $2, $3, TIMESTAMPTZ 'epoch' + open_time_ms * INTERVAL '1 millisecond', open, high, low, close, volume
+FROM {STAGE_TABLE}
+ORDER BY open_time_ms
+ON CONFLICT (symbol, timeframe, exchange, open_time) DO UPDATE SET
+  open = EXCLUDED.open,
+  high = EXCLUDED.high,
+  low = EXCLUDED.low,
+  close = EXCLUDED.close,
+  volume = EXCLUDED.volume
+WHERE ({CANDLE_TABLE}.open, {CANDLE_TABLE}.high, {CANDLE_TABLE}.low, {CANDLE_TABLE}.close, {CANDLE_TABLE}.volume)
+  IS DISTINCT FROM (EXCLUDED.open, EXCLUDED.high, EXCLUDED.low, EXCLUDED.close, EXCLUDED.volume)
+'''
+
+# ═══════════════════════════════════════════════════════════════════════════
+# BINARY COPY ENCODING
+# ═══════════════════════════════════════════════════════════════════════════
+
+COPY_HEADER = b'PGCOPY\n\xff\r\n\x00' + struct.pack('>ii', 0, 0)
+COPY_TRAILER = struct.pack('>h', -1)
+
+# One tuple: field count, then (length, value) per column, all big-endian
+COPY_ROW_DTYPE = np.dtype([
+    ('fields', '>i2'),
+    ('timestamp_len', '>i4'), ('timestamp', '>i8'),
+    ('open_len', '>i4'), ('open', '>f8'),
+    ('high_len', '>i4'), ('high', '>f8'),
+    ('low_len', '>i4'), ('low', '>f8'),
+    ('close_len', '>i4'), ('close', '>f8'),
+    ('volume_len', '>i4'), ('volume', '>f8'),
+])
+
+def encode_copy_binary(candles: CandleArray) -> bytes:
+    """
+    PostgreSQL binary COPY payload for the staging table columns
+    (open_time_ms BIGINT, open..volume FLOAT8), built column-wise.
+    """
+    rows = np.empty(len(candles), dtype=COPY_ROW_DTYPE)
+    rows['fields'] = len(CandleArray.FIELDS)
+    for name in CandleArray.FIELDS:
+        rows[f'{name}_len'] = 8
+        rows[name] = getattr(candles, name)
+    return COPY_HEADER + rows.tobytes() + COPY_TRAILER
+
+# ═══════════════════════════════════════════════════════════════════════════
+# WRITER
+# ═══════════════════════════════════════════════════════════════════════════
+
+@dataclass
+class BulkWriteStats:
+    rows_sent: int = 0
+    rows_inserted: int = 0      # New or changed rows (identical rows are not rewritten)
+    batches: int = 0
+    bytes_sent: int = 0
+    encode_seconds: float = 0.0
+    elapsed: float = 0.0
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows_sent / self.elapsed if self.elapsed > 0 else 0.0
+
+    def summary(self) -> str:
+        return (f'{self.rows_sent:,} rows sent, {self.rows_inserted:,} new/changed, {self.batches} batches, '
+                f'{self.bytes_sent / 1024 ** 2:.1f} MB in {self.elapsed:.2f}s ({self.rows_per_second:,.0f} rows/s)')
+
+class BulkCandleWriter:
+    """
+    Pipelined bulk writer.
+
+    write() splits candles into batches and queues them; `concurrency`
+    workers, each on its own pooled connection with its own temp staging
+    table, COPY and merge batches in parallel. Rows already in the table
+    are skipped by the unique key, so re-ingesting a range is cheap.
+
+        async with BulkCandleWriter(dsn) as writer:
+            await writer.write('BTCUSDT', '1m', candles)
+        print(writer.stats.summary())
+    """
+
+    def __init__(
+        self,
+        dsn: Optional[str] = DATABASE_URL,
+        concurrency: int = DEFAULT_CONCURRENCY,
+        batch_rows: int = DEFAULT_BATCH_ROWS,
+        exchange: str = 'binance',
+        create_table: bool = False,
+        verbose: bool = True
+    ):
+        if not dsn:
+            raise ValueError('No database DSN: pass dsn or set SUPABASE_DB_URL / DATABASE_URL')
+        self.dsn = dsn
+        self.concurrency = concurrency
+        self.batch_rows = batch_rows
+        self.exchange = exchange
+        self.create_table = create_table
+        self.verbose = verbose
+        self.stats = BulkWriteStats()
+
+        self._pool: Optional[asyncpg.Pool] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self._started = 0.0
+        self._next_report = PROGRESS_EVERY
+
+    async def __aenter__(self) -> 'BulkCandleWriter':
+        self._pool = await asyncpg.create_pool(
+            self.dsn,
+            min_size=self.concurrency,
+            max_size=self.concurrency,
+            statement_cache_size=0,  # No prepared statements across PgBouncer transactions
+        )
+        if self.create_table:
+            async with self._pool.acquire() as conn:
+                await conn.execute(CANDLE_TABLE_SQL)
+
+        # Bounded queue: encoding stays at most a few batches ahead of the DB
+        self._queue = asyncio.Queue(maxsize=2 * self.concurrency)
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.concurrency)]
+        self._started = time.perf_counter()
+        return self
+
+    async def __aexit__(self, exc_type, *exc):
+        try:
+            if exc_type is None:
+                await self.flush()
+        finally:
+            for task in self._workers:
+                task.cancel()
+            await asyncio.gather(*self._workers, return_exceptions=True)
+            await self._pool.close()
+            self.stats.elapsed = time.perf_counter() - self._started
+            if self.verbose:
+                print(f'[BulkWriter] {self.stats.summary()}')
+
+    async def write(self, symbol: str, timeframe: str, candles: CandleArray):
+        """Queue candles for one stream (returns once all batches are queued)."""
+        candles = CandleArray.from_candles(candles)
+        for start in range(0, len(candles), self.batch_rows):
+            batch = candles[start:start + self.batch_rows]
+
+            encode_start = time.perf_counter()
+            payload = encode_copy_binary(batch)
+            self.stats.encode_seconds += time.perf_counter() - encode_start
+
+            for task in self._workers:
+                if task.done():
+                    task.result()  # A worker died: raise instead of blocking on a full queue
+            await self._queue.put((symbol, timeframe, len(batch), payload))
+
+    async def flush(self):
+        """Wait until every queued batch is written; re-raise a worker failure."""
+        waiter = asyncio.ensure_future(self._queue.join())
+        done, _ = await asyncio.wait([waiter, *self._workers], return_when=asyncio.FIRST_COMPLETED)
+        if waiter not in done:
+            waiter.cancel()
+            for task in done:
+                task.result()  # A worker died: raise its exception
+
+    async def _worker(self):
+        async with self._pool.acquire() as conn:
+            while True:
+                symbol, timeframe, rows, payload = await self._queue.get()
+                try:
+                    async with conn.transaction():
+                        await conn.execute(STAGE_TABLE_SQL)
+                        await conn.copy_to_table(STAGE_TABLE, source=io.BytesIO(payload), format='binary')
+                        status = await conn.execute(MERGE_SQL, symbol, timeframe, self.exchange)
+                finally:
+                    self._queue.task_done()
+
+                self.stats.batches += 1
+                self.stats.rows_sent += rows
+                self.stats.rows_inserted += int(status.split()[-1])
+                self.stats.bytes_sent += len(payload)
+                self._report()
+
+    def _report(self):
+        if not self.verbose or self.stats.rows_sent < self._next_report:
+            return
+        self._next_report += PROGRESS_EVERY
+        elapsed = time.perf_counter() - self._started
+        print(f'[BulkWriter] {self.stats.rows_sent:,} rows ({self.stats.rows_inserted:,} new/changed), '
+              f'{self.stats.rows_sent / elapsed:,.0f} rows/s')
+
+# ═══════════════════════════════════════════════════════════════════════════
+# CONVENIENCE
+# ═══════════════════════════════════════════════════════════════════════════
+
+async def write_candles_async(
+    candles_data: Dict[str, Dict[str, CandleArray]],
+    dsn: Optional[str] = DATABASE_URL,
+    **writer_kwargs
+) -> BulkWriteStats:
+    """Bulk-write {symbol: {timeframe: candles}}."""
+    async with BulkCandleWriter(dsn, **writer_kwargs) as writer:
+        for symbol, timeframes in candles_data.items():
+            for timeframe, candles in timeframes.items():
+                await writer.write(symbol, timeframe, candles)
+    return writer.stats
+
+def write_candles(
+    symbol: str,
+    timeframe: str,
+    candles: CandleArray,
+    dsn: Optional[str] = DATABASE_URL,
+    **writer_kwargs
+) -> BulkWriteStats:
+    """Blocking bulk write of one stream (for synchronous callers)."""
+    return asyncio.run(write_candles_async({symbol: {timeframe: candles}}, dsn, **writer_kwargs))
+
+# ═══════════════════════════════════════════════════════════════════════════
+# CLI
+# ═══════════════════════════════════════════════════════════════════════════
+
+def main():
+    parser = argparse.ArgumentParser(description='Bulk-load historical candles into Postgres')
+    parser.add_argument('--dsn', default=DATABASE_URL)
+    parser.add_argument('--symbols', nargs='+', default=['BTCUSDT'])
+    parser.add_argument('--timeframes', nargs='+', default=['1m'])
+    parser.add_argument('--days', type=int, default=30)
+    parser.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY)
+    parser.add_argument('--batch-rows', type=int, default=DEFAULT_BATCH_ROWS)
+    parser.add_argument('--create-table', action='store_true', help='Create ai_historical_candles if missing')
+    args = parser.parse_args()
+
+    from historical_data_fetcher import HistoricalDataFetcher
+
+    end_date = datetime.now()
+    start_date = end_date - timedelta(days=args.days)
+    fetcher = HistoricalDataFetcher(use_cache=False)
+
+    candles_data = {
+        symbol: {
+            timeframe: fetcher.fetch_historical(symbol, timeframe, start_date, end_date, save_to_db=False)
+            for timeframe in args.timeframes
+        }
+        for symbol in args.symbols
+    }
+
+    asyncio.run(write_candles_async(
+        candles_data,
+        args.dsn,
+        concurrency=args.concurrency,
+        batch_rows=args.batch_rows,
+        create_table=args.create_table,
+    ))
+
+# ═══════════════════════════════════════════════════════════════════════════
+# EXPORT
+# ═══════════════════════════════════════════════════════════════════════════
+
+__all__ = [
+    'BulkCandleWriter',
+    'BulkWriteStats',
+    'encode_copy_binary',
+    'write_candles',
+    'write_candles_async',
+    'CANDLE_TABLE_SQL',
+]
+
+if __name__ == '__main__':
+    main()
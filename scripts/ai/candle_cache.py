@@ -0,0 +1,481 @@
+# scripts/ai/candle_cache.py
+# Local on-disk candle cache (memory-mapped .npy partitions)
+# GEMRAL AI BRAIN - Phase 7
+#
+# One partition per source/symbol/timeframe/month:
+#
+#   <root>/<source>/<symbol>/<timeframe>/<YYYY-MM>.npy
+#
+# Each partition is a structured NumPy array (timestamp int64 + OHLCV
+# float64) opened with mmap_mode='r', so a load only pages in the rows it
+# slices. index.json records, per partition, the row count, size, CRC32,
+# last access and which time ranges are known to be complete ("covered"),
+# which is how callers find the ranges still missing.
+#
+# Usage:
+#   python candle_cache.py stats
+#   python candle_cache.py verify [--repair]
+#   python candle_cache.py evict --max-gb 1
+
+import argparse
+import io
+import json
+import os
+import time
+import zlib
+from typing import List, Dict, Any, Optional, Tuple
+
+import numpy as np
+
+from feature_extractor import CandleArray
+
+# ═══════════════════════════════════════════════════════════════════════════
+# CONFIGURATION
+# ═══════════════════════════════════════════════════════════════════════════
+
+CANDLE_CACHE_DIR = os.getenv(
+    'CANDLE_CACHE_DIR',
+    os.path.join(os.path.expanduser('~'), '.cache', 'gemral', 'candles')
+)
+CANDLE_CACHE_MAX_BYTES = int(os.getenv('CANDLE_CACHE_MAX_BYTES', str(2 * 1024 ** 3)))
+
+PARTITION_DTYPE = np.dtype([
+    ('timestamp', '<i8'),
+    ('open', '<f8'),
+    ('high', '<f8'),
+    ('low', '<f8'),
+    ('close', '<f8'),
+    ('volume', '<f8'),
+])
+
+INDEX_FILE = 'index.json'
+
+Range = Tuple[int, int]  # Inclusive [start_ms, end_ms] of candle open times
+
+# ═══════════════════════════════════════════════════════════════════════════
+# HELPERS
+# ═══════════════════════════════════════════════════════════════════════════
+
+def month_start(ts: int) -> int:
+    """Open time (ms, UTC) of the month containing ts."""
+    return int(np.datetime64(ts, 'ms').astype('datetime64[M]').astype('datetime64[ms]').astype(np.int64))
+
+def next_month_start(ts: int) -> int:
+    month = np.datetime64(ts, 'ms').astype('datetime64[M]') + 1
+    return int(month.astype('datetime64[ms]').astype(np.int64))
+
+def month_label(ts: int) -> str:
+    return str(np.datetime64(ts, 'ms').astype('datetime64[M]'))
+
+def months_between(start_ts: int, end_ts: int) -> List[Range]:
+    """[(month_start, month_end)] for every month overlapping [start_ts, end_ts]."""
+    months = []
+    current = month_start(start_ts)
+    while current <= end_ts:
+        following = next_month_start(current)
+        months.append((current, following - 1))
+        current = following
+    return months
+
+def merge_ranges(ranges: List[Range]) -> List[Range]:
+    """Sort and merge overlapping or touching ranges."""
+    merged: List[List[int]] = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return [(start, end) for start, end in merged]
+
+def subtract_ranges(start_ts: int, end_ts: int, covered: List[Range]) -> List[Range]:
+    """Parts of [start_ts, end_ts] not in `covered`."""
+    missing = []
+    cursor = start_ts
+    for start, end in merge_ranges(covered):
+        if end < cursor:
+            continue
+        if start > end_ts:
+            break
+        if start > cursor:
+            missing.append((cursor, start - 1))
+        cursor = max(cursor, end + 1)
+    if cursor <= end_ts:
+        missing.append((cursor, end_ts))
+    return missing
+
+def _to_records(candles: CandleArray) -> np.ndarray:
+    records = np.empty(len(candles), dtype=PARTITION_DTYPE)
+    for name in CandleArray.FIELDS:
+        records[name] = getattr(candles, name)
+    return records
+
+# ═══════════════════════════════════════════════════════════════════════════
+# CACHE
+# ═══════════════════════════════════════════════════════════════════════════
+
+class CandleDiskCache:
+    """
+    Size-bounded local candle store in front of Supabase / the exchange.
+
+    load() returns the cached candles for a range plus the sub-ranges
+    that are not covered; store() merges new candles into the monthly
+    partitions, marks the given ranges covered and evicts the least
+    recently used partitions past max_bytes.
+    """
+
+    def __init__(self, root: str = CANDLE_CACHE_DIR, max_bytes: int = CANDLE_CACHE_MAX_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.partial_hits = 0
+        self.misses = 0
+        self.candles_loaded = 0
+        self.load_seconds = 0.0
+        self.evicted = 0
+        self._index_path = os.path.join(root, INDEX_FILE)
+        self._index_stamp = None
+        self._index: Dict[str, Dict[str, Any]] = {}
+        self._refresh()
+
+    # ─────────────────────────────────────────────────────────────────────
+    # Index
+    # ─────────────────────────────────────────────────────────────────────
+
+    def _stamp(self):
+        try:
+            stat = os.stat(self._index_path)
+            return stat.st_mtime_ns, stat.st_size
+        except FileNotFoundError:
+            return None
+
+    def _refresh(self):
+        """Re-read index.json if another cache instance or process rewrote it."""
+        stamp = self._stamp()
+        if stamp == self._index_stamp:
+            return
+        self._index_stamp = stamp
+        if stamp is None:
+            self._index = {}
+            return
+        try:
+            with open(self._index_path) as f:
+                self._index = json.load(f)
+        except Exception as e:
+            print(f'[CandleCache] Ignoring unreadable index {self._index_path}: {e}')
+            self._index = {}
+
+    def _write_index(self):
+        os.makedirs(self.root, exist_ok=True)
+        tmp_path = f'{self._index_path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self._index, f)
+        os.replace(tmp_path, self._index_path)
+        self._index_stamp = self._stamp()
+
+    @staticmethod
+    def _key(source: str, symbol: str, timeframe: str, month_ts: int) -> str:
+        return f'{source}/{symbol}/{timeframe}/{month_label(month_ts)}'
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, *key.split('/')) + '.npy'
+
+    def _drop(self, key: str):
+        self._index.pop(key, None)
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    # ─────────────────────────────────────────────────────────────────────
+    # Read / write
+    # ─────────────────────────────────────────────────────────────────────
+
+    def load(
+        self,
+        symbol: str,
+        timeframe: str,
+        start_ts: int,
+        end_ts: int,
+        source: str = 'binance'
+    ) -> Tuple[CandleArray, List[Range]]:
+        """
+        Cached candles opening in [start_ts, end_ts] and the sub-ranges
+        still missing (not covered by any earlier store()).
+        """
+        started = time.perf_counter()
+        self._refresh()
+        parts: List[np.ndarray] = []
+        covered: List[Range] = []
+        now = time.time()
+        dirty = False
+
+        for month_from, month_to in months_between(start_ts, end_ts):
+            key = self._key(source, symbol, timeframe, month_from)
+            entry = self._index.get(key)
+            if entry is None:
+                continue
+
+            try:
+                records = np.load(self._path(key), mmap_mode='r')
+                if records.dtype != PARTITION_DTYPE or len(records) != entry['rows']:
+                    raise ValueError('partition does not match index')
+            except Exception as e:
+                print(f'[CandleCache] Dropping {key}: {e}')
+                self._drop(key)
+                dirty = True
+                continue
+
+            timestamps = records['timestamp']
+            lo = np.searchsorted(timestamps, start_ts, side='left')
+            hi = np.searchsorted(timestamps, end_ts, side='right')
+            if hi > lo:
+                parts.append(records[lo:hi])
+            covered.extend((a, b) for a, b in entry['covered'])
+            entry['last_access'] = now
+            dirty = True
+
+        if dirty:
+            self._write_index()
+
+        if parts:
+            candles = CandleArray(*(np.concatenate([p[name] for p in parts]) for name in CandleArray.FIELDS))
+        else:
+            candles = CandleArray.empty()
+
+        missing = subtract_ranges(start_ts, end_ts, covered)
+        if not missing:
+            self.hits += 1
+        elif len(candles):
+            self.partial_hits += 1
+        else:
+            self.misses += 1
+        self.candles_loaded += len(candles)
+        self.load_seconds += time.perf_counter() - started
+
+        return candles, missing
+
+    def store(
+        self,
+        symbol: str,
+        timeframe: str,
+        candles: CandleArray,
+        covered: List[Range],
+        source: str = 'binance'
+    ):
+        """
+        Merge candles into their monthly partitions (new rows replace
+        cached rows with the same timestamp) and mark `covered` complete.
+        """
+        candles = CandleArray.from_candles(candles)
+        self._refresh()
+        touched: Dict[int, List[Range]] = {}
+
+        for start, end in covered:
+            for month_from, month_to in months_between(start, end):
+                touched.setdefault(month_from, []).append((max(start, month_from), min(end, month_to)))
+
+        if len(candles):
+            for month_from, _ in months_between(int(candles.timestamp[0]), int(candles.timestamp[-1])):
+                touched.setdefault(month_from, [])
+
+        written = set()
+        for month_from, new_ranges in sorted(touched.items()):
+            month_to = next_month_start(month_from) - 1
+            key = self._key(source, symbol, timeframe, month_from)
+            entry = self._index.get(key)
+
+            lo = np.searchsorted(candles.timestamp, month_from, side='left')
+            hi = np.searchsorted(candles.timestamp, month_to, side='right')
+            new_records = _to_records(candles[lo:hi])
+
+            old_records = np.empty(0, dtype=PARTITION_DTYPE)
+            if entry is not None:
+                try:
+                    old_records = np.load(self._path(key))
+                except Exception as e:
+                    print(f'[CandleCache] Rewriting unreadable {key}: {e}')
+                    entry = None
+
+            if len(old_records) and len(new_records):
+                # Later rows win on duplicate timestamps: keep old rows not in new
+                keep = ~np.isin(old_records['timestamp'], new_records['timestamp'])
+                records = np.concatenate([old_records[keep], new_records])
+                records = records[np.argsort(records['timestamp'], kind='stable')]
+            elif len(new_records):
+                records = new_records
+            elif new_ranges:
+                records = old_records
+            else:
+                continue
+
+            old_ranges = [tuple(r) for r in entry['covered']] if entry else []
+            payload = self._save(key, records)
+            self._index[key] = {
+                'rows': int(len(records)),
+                'bytes': len(payload),
+                'crc32': zlib.crc32(payload),
+                'covered': [list(r) for r in merge_ranges(old_ranges + new_ranges)],
+                'last_access': time.time(),
+            }
+            written.add(key)
+
+        self.evict(protect=written)
+        self._write_index()
+
+    def _save(self, key: str, records: np.ndarray) -> bytes:
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        buffer = io.BytesIO()
+        np.save(buffer, records)
+        payload = buffer.getvalue()
+
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(payload)
+        os.replace(tmp_path, path)
+        return payload
+
+    # ─────────────────────────────────────────────────────────────────────
+    # Maintenance
+    # ─────────────────────────────────────────────────────────────────────
+
+    def total_bytes(self) -> int:
+        return sum(entry['bytes'] for entry in self._index.values())
+
+    def evict(self, max_bytes: Optional[int] = None, protect: Optional[set] = None) -> int:
+        """Remove least recently used partitions until under max_bytes. Returns bytes freed."""
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        protect = protect or set()
+        total = self.total_bytes()
+        freed = 0
+
+        for key in sorted(self._index, key=lambda k: self._index[k]['last_access']):
+            if total <= max_bytes:
+                break
+            if key in protect:
+                continue
+            size = self._index[key]['bytes']
+            self._drop(key)
+            total -= size
+            freed += size
+            self.evicted += 1
+
+        if freed:
+            self._write_index()
+            print(f'[CandleCache] Evicted {freed:,} bytes')
+        return freed
+
+    def verify(self, repair: bool = True) -> List[str]:
+        """
+        Check every partition against the index: file present, CRC32,
+        dtype, row count, timestamps strictly increasing and inside the
+        partition's month. Files missing from the index are reported too.
+        With repair=True, bad partitions and orphan files are deleted.
+        """
+        self._refresh()
+        problems = []
+        bad = []
+
+        for key, entry in self._index.items():
+            path = self._path(key)
+            try:
+                with open(path, 'rb') as f:
+                    payload = f.read()
+                if zlib.crc32(payload) != entry['crc32']:
+                    raise ValueError('checksum mismatch')
+
+                records = np.load(path, mmap_mode='r')
+                if records.dtype != PARTITION_DTYPE or len(records) != entry['rows']:
+                    raise ValueError('dtype or row count mismatch')
+
+                timestamps = np.asarray(records['timestamp'])
+                if len(timestamps):
+                    if np.any(np.diff(timestamps) <= 0):
+                        raise ValueError('timestamps not strictly increasing')
+                    month_from = month_start(int(timestamps[0]))
+                    if month_label(month_from) != key.rsplit('/', 1)[1] or timestamps[-1] >= next_month_start(month_from):
+                        raise ValueError('rows outside partition month')
+            except Exception as e:
+                problems.append(f'{key}: {e}')
+                bad.append(key)
+
+        indexed = {os.path.normpath(self._path(key)) for key in self._index}
+        orphans = []
+        for directory, _, files in os.walk(self.root):
+            for name in files:
+                path = os.path.normpath(os.path.join(directory, name))
+                if name.endswith('.npy') and path not in indexed:
+                    problems.append(f'{path}: not in index')
+                    orphans.append(path)
+
+        if repair and (bad or orphans):
+            for key in bad:
+                self._drop(key)
+            for path in orphans:
+                os.remove(path)
+            self._write_index()
+
+        return problems
+
+    def clear(self):
+        for key in list(self._index):
+            self._drop(key)
+        self._write_index()
+
+    def stats(self) -> Dict[str, Any]:
+        self._refresh()
+        streams = {key.rsplit('/', 1)[0] for key in self._index}
+        lookups = self.hits + self.partial_hits + self.misses
+        return {
+            'root': self.root,
+            'partitions': len(self._index),
+            'streams': len(streams),
+            'rows': sum(entry['rows'] for entry in self._index.values()),
+            'bytes': self.total_bytes(),
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'partial_hits': self.partial_hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'candles_loaded': self.candles_loaded,
+            'load_seconds': self.load_seconds,
+            'evicted_partitions': self.evicted,
+        }
+
+# ═══════════════════════════════════════════════════════════════════════════
+# EXPORT
+# ═══════════════════════════════════════════════════════════════════════════
+
+__all__ = [
+    'CandleDiskCache',
+    'CANDLE_CACHE_DIR',
+    'merge_ranges',
+    'subtract_ranges',
+    'months_between',
+]
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Local candle cache maintenance')
+    parser.add_argument('command', choices=['stats', 'verify', 'evict', 'clear'])
+    parser.add_argument('--root', default=CANDLE_CACHE_DIR)
+    parser.add_argument('--repair', action='store_true', help='verify: delete bad partitions')
+    parser.add_argument('--max-gb', type=float, default=None, help='evict: target size')
+    args = parser.parse_args()
+
+    cache = CandleDiskCache(args.root)
+
+    if args.command == 'stats':
+        for name, value in cache.stats().items():
+            print(f'{name:20s} {value}')
+    elif args.command == 'verify':
+        problems = cache.verify(repair=args.repair)
+        for problem in problems:
+            print(f'[CandleCache] {problem}')
+        print(f'[CandleCache] {len(problems)} problems in {len(cache._index)} partitions')
+    elif args.command == 'evict':
+        max_bytes = int(args.max_gb * 1024 ** 3) if args.max_gb is not None else None
+        cache.evict(max_bytes)
+        print(f'[CandleCache] {cache.total_bytes():,} bytes in {len(cache._index)} partitions')
+    elif args.command == 'clear':
+        cache.clear()
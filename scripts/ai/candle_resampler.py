@@ -0,0 +1,297 @@
+# scripts/ai/candle_resampler.py
+# Derive higher-timeframe candles from a single base-resolution stream
+# GEMRAL AI BRAIN - Phase 7
+#
+# A target bar covers the base candles whose open time falls in its bucket
+# [start, start + target interval). Buckets are aligned like Binance's:
+# to the epoch for intraday and daily intervals, to Monday 00:00 UTC for
+# 1w. OHLCV follows the exchange's aggregation: open of the first base
+# candle, highest high, lowest low, close of the last base candle, summed
+# volume, stamped with the bucket start.
+#
+# resample() converts a whole CandleArray at once (sorted, de-duplicated
+# input); CandleResampler updates the derived bars of every target
+# timeframe as base candles arrive, including the still-forming one.
+#
+# A bucket that the base stream does not reach to its last slot is
+# partial: it is what the exchange returns for the current bar, so both
+# keep it by default and mark it open.
+
+from dataclasses import dataclass
+from typing import List, Dict, Optional
+
+import numpy as np
+
+from feature_extractor import Candle, CandleArray
+from historical_data_fetcher import TIMEFRAME_MINUTES
+
+# ═══════════════════════════════════════════════════════════════════════════
+# CONFIGURATION
+# ═══════════════════════════════════════════════════════════════════════════
+
+# Weekly bars open on Monday; the epoch (1970-01-01) was a Thursday
+BUCKET_OFFSETS_MS = {
+    '1w': 4 * 24 * 60 * 60 * 1000,
+}
+
+# ═══════════════════════════════════════════════════════════════════════════
+# BUCKETS
+# ═══════════════════════════════════════════════════════════════════════════
+
+def timeframe_ms(timeframe: str) -> int:
+    return TIMEFRAME_MINUTES[timeframe] * 60 * 1000
+
+def can_derive(base_timeframe: str, timeframe: str) -> bool:
+    """True if whole base candles tile every `timeframe` bucket."""
+    if base_timeframe not in TIMEFRAME_MINUTES or timeframe not in TIMEFRAME_MINUTES:
+        return False
+    base_ms, target_ms = timeframe_ms(base_timeframe), timeframe_ms(timeframe)
+    return (
+        target_ms % base_ms == 0 and
+        (BUCKET_OFFSETS_MS.get(timeframe, 0) - BUCKET_OFFSETS_MS.get(base_timeframe, 0)) % base_ms == 0
+    )
+
+def bucket_start(ts, timeframe: str):
+    """Open time of the `timeframe` bar containing ts (int or int64 array)."""
+    interval = timeframe_ms(timeframe)
+    offset = BUCKET_OFFSETS_MS.get(timeframe, 0)
+    return (ts - offset) // interval * interval + offset
+
+def base_timeframe_for(timeframes: List[str]) -> Optional[str]:
+    """
+    Finest of `timeframes` if every other one can be derived from it,
+    else None (fetch each timeframe on its own).
+    """
+    known = [tf for tf in timeframes if tf in TIMEFRAME_MINUTES]
+    if len(known) != len(timeframes) or not known:
+        return None
+    base = min(known, key=lambda tf: TIMEFRAME_MINUTES[tf])
+    return base if all(can_derive(base, tf) for tf in known) else None
+
+# ═══════════════════════════════════════════════════════════════════════════
+# BATCH
+# ═══════════════════════════════════════════════════════════════════════════
+
+def resample(
+    candles: CandleArray,
+    base_timeframe: str,
+    timeframe: str,
+    include_partial: bool = True
+) -> CandleArray:
+    """
+    `timeframe` bars from sorted, unique `base_timeframe` candles.
+
+    Args:
+        candles: Base candles (CandleArray or List[Candle])
+        base_timeframe: Interval of `candles`
+        timeframe: Target interval (must be derivable, see can_derive)
+        include_partial: Keep the last bar when its bucket extends past
+            the last base candle (the forming bar); False drops it
+
+    Returns:
+        CandleArray of target bars, one per bucket with base candles
+    """
+    if not can_derive(base_timeframe, timeframe):
+        raise ValueError(f'Cannot derive {timeframe} candles from {base_timeframe}')
+
+    candles = CandleArray.from_candles(candles)
+    if timeframe == base_timeframe or not len(candles):
+        return candles
+
+    buckets = bucket_start(candles.timestamp, timeframe)
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    ends = np.r_[starts[1:], len(candles)] - 1
+
+    bars = CandleArray(
+        buckets[starts],
+        candles.open[starts],
+        np.maximum.reduceat(candles.high, starts),
+        np.minimum.reduceat(candles.low, starts),
+        candles.close[ends],
+        np.add.reduceat(candles.volume, starts),
+    )
+
+    if not include_partial:
+        last_slot = bars.timestamp[-1] + timeframe_ms(timeframe) - timeframe_ms(base_timeframe)
+        if candles.timestamp[-1] < last_slot:
+            bars = bars[:-1]
+    return bars
+
+def covering_end(end_ts: int, base_timeframe: str, timeframes: List[str]) -> int:
+    """
+    Open time of the last base candle needed so that the bar of every
+    timeframe containing end_ts is complete.
+    """
+    base_ms = timeframe_ms(base_timeframe)
+    return max(
+        [int(bucket_start(end_ts, tf)) + timeframe_ms(tf) - base_ms for tf in timeframes] +
+        [int(bucket_start(end_ts, base_timeframe))]
+    )
+
+def derive_range(
+    candles: CandleArray,
+    base_timeframe: str,
+    timeframe: str,
+    start_ts: int,
+    end_ts: int
+) -> CandleArray:
+    """
+    `timeframe` bars opening in [start_ts, end_ts], like a direct fetch of
+    that range. Bars opening before start_ts are dropped: the base
+    candles they would need start at start_ts.
+    """
+    bars = resample(candles, base_timeframe, timeframe)
+    lo = np.searchsorted(bars.timestamp, start_ts, side='left')
+    hi = np.searchsorted(bars.timestamp, end_ts, side='right')
+    return bars[lo:hi]
+
+def resample_all(
+    candles: CandleArray,
+    base_timeframe: str,
+    timeframes: List[str],
+    include_partial: bool = True
+) -> Dict[str, CandleArray]:
+    """{timeframe: bars} for each of `timeframes` from one base series."""
+    return {tf: resample(candles, base_timeframe, tf, include_partial) for tf in timeframes}
+
+# ═══════════════════════════════════════════════════════════════════════════
+# INCREMENTAL
+# ═══════════════════════════════════════════════════════════════════════════
+
+@dataclass
+class BarUpdate:
+    """A derived bar after a base candle arrived; closed once its bucket is complete."""
+    timeframe: str
+    candle: Candle
+    closed: bool
+
+class _Bucket:
+    """Closed base candles of one target bucket, plus the forming one."""
+
+    __slots__ = ('start', 'open', 'high', 'low', 'close', 'volume', 'count', 'emitted')
+
+    def __init__(self, start: int):
+        self.start = start
+        self.open = self.high = self.low = self.close = None
+        self.volume = 0.0
+        self.count = 0
+        self.emitted = False  # Closed bar already reported
+
+    def add(self, candle: Candle):
+        if self.count == 0:
+            self.open, self.high, self.low = candle.open, candle.high, candle.low
+        else:
+            self.high = max(self.high, candle.high)
+            self.low = min(self.low, candle.low)
+        self.close = candle.close
+        self.volume += candle.volume
+        self.count += 1
+
+    def bar(self, forming: Optional[Candle] = None) -> Candle:
+        if forming is None:
+            return Candle(self.start, self.open, self.high, self.low, self.close, self.volume)
+        if self.count == 0:
+            return Candle(self.start, forming.open, forming.high, forming.low, forming.close, forming.volume)
+        return Candle(
+            self.start, self.open,
+            max(self.high, forming.high), min(self.low, forming.low),
+            forming.close, self.volume + forming.volume,
+        )
+
+class CandleResampler:
+    """
+    Incremental resampler: feed base candles in time order with update()
+    and get the derived bar of every target timeframe they touch.
+
+    A base candle may be sent repeatedly while it forms (closed=False,
+    e.g. from a kline stream) and once more when it closes; only closed
+    base candles are folded into the bucket. A target bar closes when the
+    last base slot of its bucket closes, or, if the stream skips it, when
+    a base candle of a later bucket arrives.
+    """
+
+    def __init__(self, base_timeframe: str, timeframes: List[str]):
+        for timeframe in timeframes:
+            if not can_derive(base_timeframe, timeframe):
+                raise ValueError(f'Cannot derive {timeframe} candles from {base_timeframe}')
+        self.base_timeframe = base_timeframe
+        self.timeframes = list(timeframes)
+        self.base_ms = timeframe_ms(base_timeframe)
+        self._interval = {tf: timeframe_ms(tf) for tf in self.timeframes}
+        self._buckets: Dict[str, Optional[_Bucket]] = {tf: None for tf in self.timeframes}
+        self._forming: Optional[Candle] = None
+        self._last_closed: Optional[int] = None
+
+    def update(self, candle: Candle, closed: bool = True) -> List[BarUpdate]:
+        """
+        Add one base candle. Returns the bars it changed: for each target,
+        a bar closed by skipping past its bucket (if any), then the bar the
+        candle falls into, closed if the candle completes it.
+        """
+        if self._last_closed is not None and candle.timestamp <= self._last_closed:
+            return []  # Already folded in
+
+        updates: List[BarUpdate] = []
+        forming = self._forming
+        if forming is not None and forming.timestamp < candle.timestamp:
+            # The stream moved on without closing it: take the last state as final
+            updates.extend(self._fold(forming, close_current=False))
+        self._forming = None
+
+        if closed:
+            updates.extend(self._fold(candle, close_current=True))
+        else:
+            self._forming = candle
+            for timeframe in self.timeframes:
+                bucket = self._advance(timeframe, candle.timestamp, updates)
+                updates.append(BarUpdate(timeframe, bucket.bar(candle), False))
+        return updates
+
+    def current(self, timeframe: str) -> Optional[Candle]:
+        """The bar currently forming in `timeframe` (None before any data)."""
+        bucket = self._buckets[timeframe]
+        if bucket is None or (bucket.count == 0 and self._forming is None):
+            return None
+        if self._forming is not None and bucket_start(self._forming.timestamp, timeframe) == bucket.start:
+            return bucket.bar(self._forming)
+        return bucket.bar()
+
+    def _fold(self, candle: Candle, close_current: bool) -> List[BarUpdate]:
+        updates: List[BarUpdate] = []
+        self._last_closed = candle.timestamp
+        for timeframe in self.timeframes:
+            bucket = self._advance(timeframe, candle.timestamp, updates)
+            bucket.add(candle)
+            complete = candle.timestamp + self.base_ms == bucket.start + self._interval[timeframe]
+            if complete:
+                bucket.emitted = True
+            if close_current or complete:
+                updates.append(BarUpdate(timeframe, bucket.bar(), complete))
+        return updates
+
+    def _advance(self, timeframe: str, ts: int, updates: List[BarUpdate]) -> _Bucket:
+        """Bucket of ts in `timeframe`, closing the previous one if it never completed."""
+        start = bucket_start(ts, timeframe)
+        bucket = self._buckets[timeframe]
+        if bucket is None or bucket.start != start:
+            if bucket is not None and bucket.count and not bucket.emitted:
+                updates.append(BarUpdate(timeframe, bucket.bar(), True))
+            bucket = self._buckets[timeframe] = _Bucket(start)
+        return bucket
+
+# ═══════════════════════════════════════════════════════════════════════════
+# EXPORT
+# ═══════════════════════════════════════════════════════════════════════════
+
+__all__ = [
+    'BarUpdate',
+    'CandleResampler',
+    'base_timeframe_for',
+    'bucket_start',
+    'can_derive',
+    'covering_end',
+    'derive_range',
+    'resample',
+    'resample_all',
+    'timeframe_ms',
+]
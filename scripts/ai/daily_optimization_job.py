@@ -8,6 +8,9 @@ from typing import List, Dict, Any, Optional
 from dataclasses import dataclass
 import json
 
+from filter_evaluation import FilterEvaluator, load_detection_frame
+from outcome_resolver import OutcomeResolver, load_pending_detections, write_outcomes
+
 # ═══════════════════════════════════════════════════════════════════════════
 # CONFIGURATION
 # ═══════════════════════════════════════════════════════════════════════════
@@ -73,6 +76,7 @@ class DailyOptimizationJob:
 
     def __init__(self):
         self.supabase = None
+        self._evaluator: Optional[FilterEvaluator] = None
         if SUPABASE_URL and SUPABASE_SERVICE_KEY:
             from supabase import create_client
             self.supabase = create_client(SUPABASE_URL, SUPABASE_SERVICE_KEY)
@@ -89,6 +93,9 @@ class DailyOptimizationJob:
         5. Auto-adjust filters if improvement > threshold
         6. Generate report
         """
+        # Outcomes change between runs: rebuild the filter frame each time
+        self._evaluator = None
+
         print('='*60)
         print('GEMRAL AI BRAIN - Daily Optimization Job')
         print(f'Time: {datetime.utcnow().isoformat()}')
@@ -185,71 +192,26 @@ class DailyOptimizationJob:
     def _collect_outcomes(self) -> int:
         """
         Update outcomes for detections that have matured.
-        Check if price hit TP or SL.
+        Check if price hit TP or SL in the candles after detection
+        (OutcomeResolver: one candle load per symbol/timeframe, bulk write).
         """
         if not self.supabase:
             return 0
 
         # Get pending detections from 24+ hours ago
         cutoff = (datetime.utcnow() - timedelta(hours=24)).isoformat()
+        detections = load_pending_detections(self.supabase, cutoff)
 
-        result = self.supabase.table('ai_pattern_detections').select(
-            'id, symbol, timeframe, entry_price, stop_loss_price, take_profit_price, detected_at'
-        ).eq('outcome', 'pending').lt('detected_at', cutoff).limit(100).execute()
-
-        if not result.data:
+        if not detections:
             return 0
 
-        updated = 0
-
-        for detection in result.data:
-            outcome = self._check_outcome(detection)
-            if outcome:
-                self.supabase.table('ai_pattern_detections').update({
-                    'outcome': outcome['outcome'],
-                    'exit_price': outcome['exit_price'],
-                    'profit_loss_percent': outcome['profit_loss_percent'],
-                    'exit_reason': outcome['exit_reason'],
-                    'exited_at': outcome['exited_at'],
-                }).eq('id', detection['id']).execute()
-                updated += 1
-
-        return updated
-
-    def _check_outcome(self, detection: Dict) -> Optional[Dict]:
-        """Check if a detection hit TP or SL using historical data."""
-        # In production, this would fetch candles after detection time
-        # and check if price hit TP or SL
-
-        # Simplified: random outcome for testing
-        import random
-
-        entry = detection['entry_price']
-        sl = detection.get('stop_loss_price')
-        tp = detection.get('take_profit_price')
-
-        if not sl or not tp:
-            return None
+        resolver = OutcomeResolver()
+        outcomes = resolver.resolve(detections)
+        stats = resolver.stats
+        print(f'  Resolved {len(outcomes)}/{len(detections)} pending detections over {stats["groups"]} '
+              f'symbol/timeframes (candles {stats["load_seconds"]:.1f}s, resolve {stats["resolve_seconds"]:.2f}s)')
 
-        # Random outcome weighted toward win rate target (68%)
-        is_win = random.random() < 0.68
-
-        if is_win:
-            return {
-                'outcome': 'win',
-                'exit_price': tp,
-                'profit_loss_percent': (tp - entry) / entry * 100,
-                'exit_reason': 'take_profit',
-                'exited_at': datetime.utcnow().isoformat(),
-            }
-        else:
-            return {
-                'outcome': 'loss',
-                'exit_price': sl,
-                'profit_loss_percent': (sl - entry) / entry * 100,
-                'exit_reason': 'stop_loss',
-                'exited_at': datetime.utcnow().isoformat(),
-            }
+        return write_outcomes(self.supabase, outcomes)
 
     # ═══════════════════════════════════════════════════════════════════════
     # STEP 2: CALCULATE METRICS
@@ -355,57 +317,40 @@ class DailyOptimizationJob:
         if not result.data:
             return []
 
-        evaluations = []
+        evaluator = self._filter_evaluator()
+        if evaluator is None:
+            return []
 
-        for f in result.data:
-            eval_result = self._evaluate_filter(f)
-            if eval_result:
-                evaluations.append(eval_result)
+        # All filters against the same frame and base win rate
+        evaluations = []
+        for f, stats in zip(result.data, evaluator.evaluate(result.data)):
+            evaluations.append(FilterEvaluation(
+                filter_id=f['id'],
+                filter_name=f['filter_name'],
+                total_patterns=stats['total'],
+                patterns_passed=stats['passed'],
+                patterns_filtered=stats['failed'],
+                passed_win_rate=stats['passed_win_rate'],
+                filtered_win_rate=stats['failed_win_rate'],
+                improvement_percent=stats['improvement_percent'],
+                is_beneficial=stats['improvement_percent'] > 0,
+            ))
 
         return evaluations
 
-    def _evaluate_filter(self, filter_config: Dict) -> Optional[FilterEvaluation]:
-        """Evaluate a single filter's performance."""
-        # Call the database function to get win rate with this filter
-        try:
-            result = self.supabase.rpc('get_filtered_win_rate', {
-                'p_pattern_id': None,  # All patterns
-                'p_filter_conditions': filter_config['conditions'],
-                'p_days_back': LOOKBACK_DAYS,
-            }).execute()
-
-            if not result.data or len(result.data) == 0:
-                return None
-
-            data = result.data[0]
-
-            # Get base win rate (without filter)
-            base_result = self.supabase.rpc('get_filtered_win_rate', {
-                'p_pattern_id': None,
-                'p_filter_conditions': {},
-                'p_days_back': LOOKBACK_DAYS,
-            }).execute()
-
-            base_win_rate = base_result.data[0]['win_rate'] if base_result.data else 0
-            filtered_win_rate = data['win_rate']
-
-            improvement = (filtered_win_rate - base_win_rate) * 100
-
-            return FilterEvaluation(
-                filter_id=filter_config['id'],
-                filter_name=filter_config['filter_name'],
-                total_patterns=data['total_trades'],
-                patterns_passed=data['total_trades'],
-                patterns_filtered=0,  # Would need separate query
-                passed_win_rate=filtered_win_rate,
-                filtered_win_rate=base_win_rate,
-                improvement_percent=improvement,
-                is_beneficial=improvement > 0,
-            )
-
-        except Exception as e:
-            print(f'[Filter Eval] Error: {e}')
-            return None
+    def _filter_evaluator(self) -> Optional[FilterEvaluator]:
+        """
+        FilterEvaluator over the resolved detections of the last
+        LOOKBACK_DAYS, read once per run and shared by steps 3 and 4.
+        """
+        if self._evaluator is None and self.supabase:
+            try:
+                frame = load_detection_frame(self.supabase, LOOKBACK_DAYS)
+                print(f'  Loaded {len(frame)} resolved detections ({LOOKBACK_DAYS} days)')
+                self._evaluator = FilterEvaluator(frame)
+            except Exception as e:
+                print(f'[Filter Eval] Error: {e}')
+        return self._evaluator
 
     # ═══════════════════════════════════════════════════════════════════════
     # STEP 4: FIND FILTER CANDIDATES
@@ -441,91 +386,58 @@ class DailyOptimizationJob:
         filter_type: str
     ) -> Optional[OptimizationSuggestion]:
         """Test optimal threshold for a feature."""
-        if not self.supabase:
+        evaluator = self._filter_evaluator()
+        if evaluator is None:
             return None
 
-        try:
-            result = self.supabase.rpc('find_optimal_filter_threshold', {
-                'p_pattern_id': None,
-                'p_feature_name': feature_name,
-                'p_min_trades': MIN_TRADES_FOR_ANALYSIS,
-            }).execute()
-
-            if not result.data or len(result.data) == 0:
-                return None
-
-            best = result.data[0]
-
-            if best['improvement'] < MIN_IMPROVEMENT_PERCENT / 100:
-                return None
-
-            return OptimizationSuggestion(
-                pattern_id=None,
-                suggestion_type=f'{filter_type}_threshold',
-                current_value={'threshold': 0},
-                suggested_value={'threshold': best['threshold_value']},
-                reasoning=f'Setting {feature_name} >= {best["threshold_value"]:.2f} improves win rate by {best["improvement"]*100:.1f}%',
-                expected_win_rate_change=best['improvement'] * 100,
-                confidence=min(1.0, best['trades_passed'] / 100),
-            )
+        candidates = evaluator.threshold_candidates(feature_name, min_trades=MIN_TRADES_FOR_ANALYSIS)
+        if not candidates:
+            return None
 
-        except Exception as e:
-            print(f'[Threshold Test] Error: {e}')
+        best = candidates[0]
+
+        if best['improvement'] < MIN_IMPROVEMENT_PERCENT / 100:
             return None
 
+        return OptimizationSuggestion(
+            pattern_id=None,
+            suggestion_type=f'{filter_type}_threshold',
+            current_value={'threshold': 0},
+            suggested_value={'threshold': best['threshold_value']},
+            reasoning=f'Setting {feature_name} >= {best["threshold_value"]:.2f} improves win rate by {best["improvement"]*100:.1f}%',
+            expected_win_rate_change=best['improvement'] * 100,
+            confidence=min(1.0, best['trades_passed'] / 100),
+        )
+
     def _test_zone_retest_impact(self) -> Optional[OptimizationSuggestion]:
         """Test impact of zone retest requirement."""
-        if not self.supabase:
+        evaluator = self._filter_evaluator()
+        if evaluator is None:
             return None
 
-        try:
-            result = self.supabase.rpc('get_zone_retest_impact', {
-                'p_days_back': LOOKBACK_DAYS,
-            }).execute()
-
-            if not result.data:
-                return None
+        impact = evaluator.zone_retest_impact()
 
-            # Aggregate across all patterns
-            total_with = sum(r['trades_with_retest'] for r in result.data)
-            total_without = sum(r['trades_without_retest'] for r in result.data)
-
-            if total_with < MIN_TRADES_FOR_ANALYSIS:
-                return None
-
-            wins_with = sum(
-                r['trades_with_retest'] * r['win_rate_with_retest']
-                for r in result.data
-                if r['trades_with_retest'] > 0
-            )
-            wins_without = sum(
-                r['trades_without_retest'] * r['win_rate_without_retest']
-                for r in result.data
-                if r['trades_without_retest'] > 0
-            )
-
-            wr_with = wins_with / total_with if total_with > 0 else 0
-            wr_without = wins_without / total_without if total_without > 0 else 0
-
-            improvement = (wr_with - wr_without) * 100
+        if impact['trades_with_retest'] < MIN_TRADES_FOR_ANALYSIS:
+            return None
 
-            if improvement < MIN_IMPROVEMENT_PERCENT:
-                return None
+        wr_with = impact['win_rate_with_retest']
+        wr_without = impact['win_rate_without_retest']
 
-            return OptimizationSuggestion(
-                pattern_id=None,
-                suggestion_type='zone_retest_requirement',
-                current_value={'require_zone_retest': False},
-                suggested_value={'require_zone_retest': True},
-                reasoning=f'Requiring zone retest improves win rate by {improvement:.1f}% ({wr_with:.1%} vs {wr_without:.1%})',
-                expected_win_rate_change=improvement,
-                confidence=0.95,  # High confidence for this key feature
-            )
+        improvement = (wr_with - wr_without) * 100
 
-        except Exception as e:
-            print(f'[Zone Retest Test] Error: {e}')
+        if improvement < MIN_IMPROVEMENT_PERCENT:
             return None
 
+        return OptimizationSuggestion(
+            pattern_id=None,
+            suggestion_type='zone_retest_requirement',
+            current_value={'require_zone_retest': False},
+            suggested_value={'require_zone_retest': True},
+            reasoning=f'Requiring zone retest improves win rate by {improvement:.1f}% ({wr_with:.1%} vs {wr_without:.1%})',
+            expected_win_rate_change=improvement,
+            confidence=0.95,  # High confidence for this key feature
+        )
+
     # ═══════════════════════════════════════════════════════════════════════
     # STEP 5: AUTO-ADJUST FILTERS
     # ═══════════════════════════════════════════════════════════════════════
@@ -0,0 +1,159 @@
+# scripts/ai/embedding_cache.py
+# Local embedding cache keyed by (model, content hash)
+# GEMRAL AI BRAIN - Phase 1
+#
+# One SQLite file holds every embedding the pipeline has paid for, keyed by
+# the embedding model and generate_content_hash() of the exact text sent.
+# Re-ingesting a document only calls the API for chunk texts never seen
+# with that model; vectors are stored as little-endian float64, so a hit
+# returns exactly the floats the API returned.
+#
+# Usage:
+#   python embedding_cache.py stats
+#   python embedding_cache.py clear [--model text-embedding-3-small]
+
+import argparse
+import os
+import sqlite3
+import threading
+import time
+from typing import List, Dict, Any, Optional
+
+import numpy as np
+
+# ═══════════════════════════════════════════════════════════════════════════
+# CONFIGURATION
+# ═══════════════════════════════════════════════════════════════════════════
+
+EMBEDDING_CACHE_PATH = os.getenv(
+    'EMBEDDING_CACHE_PATH',
+    os.path.join(os.path.expanduser('~'), '.cache', 'gemral', 'embeddings.sqlite')
+)
+
+SQLITE_MAX_VARIABLES = 900  # Stay under SQLite's bound-parameter limit per query
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS embeddings (
+    model TEXT NOT NULL,
+    content_hash TEXT NOT NULL,
+    dimensions INTEGER NOT NULL,
+    vector BLOB NOT NULL,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (model, content_hash)
+)
+'''
+
+# ═══════════════════════════════════════════════════════════════════════════
+# CACHE
+# ═══════════════════════════════════════════════════════════════════════════
+
+class EmbeddingCache:
+    """
+    (model, content hash) -> embedding, persisted in SQLite.
+
+    Safe to share between threads; counts hits and misses of get_many().
+    """
+
+    def __init__(self, path: str = EMBEDDING_CACHE_PATH):
+        self.path = path
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute(SCHEMA)
+        self._conn.commit()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_many(self, model: str, hashes: List[str]) -> Dict[str, List[float]]:
+        """Cached embeddings for the hashes that have one."""
+        found: Dict[str, List[float]] = {}
+        unique = list(dict.fromkeys(hashes))
+        with self._lock:
+            for i in range(0, len(unique), SQLITE_MAX_VARIABLES):
+                part = unique[i:i + SQLITE_MAX_VARIABLES]
+                rows = self._conn.execute(
+                    f'SELECT content_hash, vector FROM embeddings WHERE model = ? '
+                    f'AND content_hash IN ({",".join("?" * len(part))})',
+                    [model, *part],
+                ).fetchall()
+                for content_hash, vector in rows:
+                    found[content_hash] = np.frombuffer(vector, dtype='<f8').tolist()
+            self.hits += sum(1 for h in hashes if h in found)
+            self.misses += sum(1 for h in hashes if h not in found)
+        return found
+
+    def put_many(self, model: str, embeddings: Dict[str, List[float]]):
+        """Store embeddings by content hash (None values are skipped)."""
+        now = time.time()
+        rows = [
+            (model, content_hash, len(vector), np.asarray(vector, dtype='<f8').tobytes(), now)
+            for content_hash, vector in embeddings.items() if vector is not None
+        ]
+        if not rows:
+            return
+        with self._lock:
+            self._conn.executemany('INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?, ?, ?)', rows)
+            self._conn.commit()
+
+    def clear(self, model: Optional[str] = None):
+        with self._lock:
+            if model is None:
+                self._conn.execute('DELETE FROM embeddings')
+            else:
+                self._conn.execute('DELETE FROM embeddings WHERE model = ?', (model,))
+            self._conn.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            models = self._conn.execute(
+                'SELECT model, COUNT(*), SUM(LENGTH(vector)) FROM embeddings GROUP BY model'
+            ).fetchall()
+        lookups = self.hits + self.misses
+        return {
+            'path': self.path,
+            'models': {model: {'entries': count, 'bytes': size} for model, count, size in models},
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+# ═══════════════════════════════════════════════════════════════════════════
+# CLI
+# ═══════════════════════════════════════════════════════════════════════════
+
+def main():
+    parser = argparse.ArgumentParser(description='Local embedding cache maintenance')
+    parser.add_argument('--path', default=EMBEDDING_CACHE_PATH)
+    sub = parser.add_subparsers(dest='command', required=True)
+    sub.add_parser('stats', help='Entries and size per model')
+    p = sub.add_parser('clear', help='Delete cached embeddings')
+    p.add_argument('--model', default=None, help='Only this model')
+    args = parser.parse_args()
+
+    cache = EmbeddingCache(args.path)
+    if args.command == 'stats':
+        stats = cache.stats()
+        print(f'[EmbeddingCache] {stats["path"]}')
+        for model, info in stats['models'].items():
+            print(f'  {model}: {info["entries"]} embeddings, {info["bytes"] / 1024 ** 2:.1f} MB')
+    elif args.command == 'clear':
+        cache.clear(args.model)
+        print(f'[EmbeddingCache] Cleared {args.model or "all models"}')
+
+# ═══════════════════════════════════════════════════════════════════════════
+# EXPORT
+# ═══════════════════════════════════════════════════════════════════════════
+
+__all__ = [
+    'EmbeddingCache',
+    'EMBEDDING_CACHE_PATH',
+]
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,202 @@
+# scripts/ai/embedding_fixture_server.py
+# Local OpenAI-compatible embeddings server for tests and benchmarks
+# GEMRAL AI BRAIN - Phase 1
+#
+# Answers POST /v1/embeddings like the OpenAI API, with deterministic
+# unit vectors derived from each input's MD5 (the same text always gets
+# the same vector, whatever batch it arrives in). Per-request and
+# per-input latency simulate the API's response time; fail_every makes
+# every Nth request answer 500 to exercise retries. Point the embedding
+# pipeline at it with OpenAIEmbeddingBackend(base_url=server.url) or
+# OPENAI_BASE_URL.
+#
+# Usage:
+#   python embedding_fixture_server.py --port 8001 --latency 0.2 --per-input 0.002
+
+import argparse
+import hashlib
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Optional
+
+import numpy as np
+
+# ═══════════════════════════════════════════════════════════════════════════
+# CONFIGURATION
+# ═══════════════════════════════════════════════════════════════════════════
+
+DEFAULT_DIMENSIONS = 1536
+MAX_INPUTS_PER_REQUEST = 2048  # OpenAI's limit on inputs per embeddings call
+
+# ═══════════════════════════════════════════════════════════════════════════
+# DATA
+# ═══════════════════════════════════════════════════════════════════════════
+
+def fake_embedding(text: str, dimensions: int = DEFAULT_DIMENSIONS) -> List[float]:
+    """Deterministic unit vector for `text`."""
+    seed = int.from_bytes(hashlib.md5(text.encode('utf-8')).digest()[:8], 'little')
+    vector = np.random.default_rng(seed).standard_normal(dimensions)
+    return (vector / np.linalg.norm(vector)).tolist()
+
+# ═══════════════════════════════════════════════════════════════════════════
+# SERVER
+# ═══════════════════════════════════════════════════════════════════════════
+
+class EmbeddingFixtureServer:
+    """
+    Threaded fixture server.
+
+    Args:
+        port: 0 picks a free port
+        latency: Seconds to sleep before each response
+        per_input: Extra seconds per input text (larger batches take longer)
+        fail_every: Answer HTTP 500 to every Nth request (0 = never)
+        dimensions: Vector size when the request does not set `dimensions`
+    """
+
+    def __init__(
+        self,
+        host: str = '127.0.0.1',
+        port: int = 0,
+        latency: float = 0.0,
+        per_input: float = 0.0,
+        fail_every: int = 0,
+        dimensions: int = DEFAULT_DIMENSIONS
+    ):
+        self.latency = latency
+        self.per_input = per_input
+        self.fail_every = fail_every
+        self.dimensions = dimensions
+        self.requests = 0
+        self.inputs = 0
+        self.failed = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), self._handler())
+        self._httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f'http://{host}:{port}/v1'
+
+    def _begin(self) -> bool:
+        """Count a request; return True if it should fail."""
+        with self._lock:
+            self.requests += 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            fail = self.fail_every > 0 and self.requests % self.fail_every == 0
+            if fail:
+                self.failed += 1
+            return fail
+
+    def _end(self, inputs: int = 0):
+        with self._lock:
+            self.in_flight -= 1
+            self.inputs += inputs
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                if not self.path.rstrip('/').endswith('/embeddings'):
+                    self._send(404, {'error': {'message': 'Not found', 'type': 'invalid_request_error'}})
+                    return
+
+                fail = server._begin()
+                served = 0
+                try:
+                    length = int(self.headers.get('Content-Length', 0))
+                    try:
+                        body = json.loads(self.rfile.read(length))
+                        inputs = body['input']
+                        if isinstance(inputs, str):
+                            inputs = [inputs]
+                        dimensions = int(body.get('dimensions', server.dimensions))
+                    except (KeyError, ValueError, TypeError) as e:
+                        self._send(400, {'error': {'message': f'Bad request: {e}', 'type': 'invalid_request_error'}})
+                        return
+
+                    time.sleep(server.latency + server.per_input * len(inputs))
+                    if fail:
+                        self._send(500, {'error': {'message': 'Injected failure', 'type': 'server_error'}})
+                        return
+                    if not inputs or len(inputs) > MAX_INPUTS_PER_REQUEST or not all(isinstance(t, str) and t for t in inputs):
+                        self._send(400, {'error': {'message': 'Invalid input', 'type': 'invalid_request_error'}})
+                        return
+
+                    tokens = sum(len(t.split()) for t in inputs)
+                    self._send(200, {
+                        'object': 'list',
+                        'data': [
+                            {'object': 'embedding', 'index': i, 'embedding': fake_embedding(text, dimensions)}
+                            for i, text in enumerate(inputs)
+                        ],
+                        'model': body.get('model', ''),
+                        'usage': {'prompt_tokens': tokens, 'total_tokens': tokens},
+                    })
+                    served = len(inputs)
+                finally:
+                    server._end(served)
+
+            def _send(self, status, body):
+                payload = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def start(self) -> 'EmbeddingFixtureServer':
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self) -> 'EmbeddingFixtureServer':
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+# ═══════════════════════════════════════════════════════════════════════════
+# EXPORT
+# ═══════════════════════════════════════════════════════════════════════════
+
+__all__ = [
+    'EmbeddingFixtureServer',
+    'fake_embedding',
+]
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Local OpenAI-compatible embeddings fixture server')
+    parser.add_argument('--port', type=int, default=8001)
+    parser.add_argument('--latency', type=float, default=0.0)
+    parser.add_argument('--per-input', type=float, default=0.0)
+    parser.add_argument('--fail-every', type=int, default=0)
+    parser.add_argument('--dimensions', type=int, default=DEFAULT_DIMENSIONS)
+    args = parser.parse_args()
+
+    server = EmbeddingFixtureServer(
+        port=args.port, latency=args.latency, per_input=args.per_input,
+        fail_every=args.fail_every, dimensions=args.dimensions,
+    )
+    print(f'[FixtureServer] Serving {server.url}/embeddings')
+    try:
+        server._httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
@@ -2,25 +2,40 @@
 # Service để generate embeddings từ OpenAI
 # GEMRAL AI BRAIN - Phase 1
 
+import asyncio
 import os
 import time
 import hashlib
-from typing import List, Dict, Any, Optional
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from functools import lru_cache
+from typing import List, Dict, Any, Optional, Tuple
+
+import aiohttp
 from openai import OpenAI
 import tiktoken
 
+from embedding_cache import EmbeddingCache
+
 # ═══════════════════════════════════════════════════════════════════════════
 # CONFIGURATION
 # ═══════════════════════════════════════════════════════════════════════════
 
 OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
+OPENAI_BASE_URL = os.getenv('OPENAI_BASE_URL', 'https://api.openai.com/v1')
 EMBEDDING_MODEL = 'text-embedding-3-small'
 EMBEDDING_DIMENSIONS = 1536
 CHUNK_SIZE = 500  # tokens
 CHUNK_OVERLAP = 100  # tokens
-BATCH_SIZE = 100  # texts per API call
+PARAGRAPH_SEPARATOR = '\n\n'
+BATCH_SIZE = 100  # max texts per API call
+BATCH_TOKEN_BUDGET = 20000  # max tokens per API call
+MAX_IN_FLIGHT = 4  # concurrent API calls
 MAX_RETRIES = 3
-RETRY_DELAY = 1  # seconds
+RETRY_DELAY = 1  # seconds, doubled per retry
+REQUEST_TIMEOUT = 60  # seconds
 
 # ═══════════════════════════════════════════════════════════════════════════
 # INITIALIZATION
@@ -28,6 +43,10 @@ RETRY_DELAY = 1  # seconds
 
 client = None
 tokenizer = None
+embedding_cache: Optional[EmbeddingCache] = None
+
+# Embedding API usage of this process
+embedding_stats = {'requests': 0, 'texts': 0}
 
 def initialize():
     """Initialize OpenAI client and tokenizer."""
@@ -37,6 +56,13 @@ def initialize():
     if tokenizer is None:
         tokenizer = tiktoken.get_encoding('cl100k_base')
 
+def get_embedding_cache() -> EmbeddingCache:
+    """Shared local embedding cache (EMBEDDING_CACHE_PATH)."""
+    global embedding_cache
+    if embedding_cache is None:
+        embedding_cache = EmbeddingCache()
+    return embedding_cache
+
 # ═══════════════════════════════════════════════════════════════════════════
 # TEXT PROCESSING
 # ═══════════════════════════════════════════════════════════════════════════
@@ -71,7 +97,10 @@ def chunk_text(
     if not text or not text.strip():
         return []
 
-    tokens = tokenizer.encode(text)
+    return _token_windows(tokenizer.encode(text), chunk_size, overlap)
+
+def _token_windows(tokens: List[int], chunk_size: int, overlap: int) -> List[str]:
+    """Decoded windows of chunk_size tokens, each starting `overlap` tokens before the previous end."""
     chunks = []
 
     start = 0
@@ -94,15 +123,92 @@ def chunk_text(
 
     return chunks
 
+def _trailing_symbols(paragraph: str) -> str:
+    """
+    Final run of symbols (not letter, number or whitespace) of a stripped
+    paragraph, with the single space before it: its last pre-token in
+    cl100k_base's split pattern. '' if the paragraph ends in a letter or
+    number.
+    """
+    i = len(paragraph)
+    while i > 0 and not (paragraph[i - 1].isalnum() or paragraph[i - 1].isspace()):
+        i -= 1
+    if 0 < i < len(paragraph) and paragraph[i - 1] == ' ':
+        i -= 1
+    return paragraph[i:]
+
+@lru_cache(maxsize=4096)
+def _separator_tail(symbols: str) -> Tuple[bytes, int, Tuple[int, ...]]:
+    """(bytes, token count) of symbols + separator, and the tokens of symbols alone."""
+    joined = symbols + PARAGRAPH_SEPARATOR
+    return joined.encode('utf-8'), len(tokenizer.encode(joined)), tuple(tokenizer.encode(symbols))
+
+class ParagraphTokens:
+    """
+    One tokenization of paragraphs joined by PARAGRAPH_SEPARATOR.
+
+    cl100k_base never merges tokens across a pre-token boundary, and every
+    paragraph (stripped, non-empty) starts one, so the joined text's
+    tokens are each 'paragraph + separator' encoded in turn and offsets[k]
+    is where paragraph k starts. The separator only changes a paragraph's
+    own tokens when it ends in a symbol run, which absorbs the newlines
+    (a final '.' and the separator are one token); those few tail tokens
+    are swapped for the run's own encoding (cached per run) to get the
+    paragraph's count and tokens without encoding it again.
+    """
+
+    def __init__(self, paragraphs: List[str]):
+        initialize()
+        self.tokens: List[int] = []
+        self.offsets: List[int] = []
+        self._keep: List[int] = []            # Leading tokens shared with the paragraph alone
+        self._tail: List[Tuple[int, ...]] = []  # Tokens that finish the paragraph alone
+
+        last = len(paragraphs) - 1
+        for k, paragraph in enumerate(paragraphs):
+            self.offsets.append(len(self.tokens))
+            if k == last:
+                region = tokenizer.encode(paragraph)
+                keep, tail = len(region), ()
+            else:
+                region = tokenizer.encode(paragraph + PARAGRAPH_SEPARATOR)
+                joined_bytes, joined_count, tail = _separator_tail(_trailing_symbols(paragraph))
+                keep = len(region) - joined_count
+                if keep < 0 or tokenizer.decode_bytes(region[keep:]) != joined_bytes:
+                    # Not split where expected (unusual whitespace): encode on its own
+                    keep, tail = 0, tuple(tokenizer.encode(paragraph))
+            self.tokens.extend(region)
+            self._keep.append(keep)
+            self._tail.append(tail)
+        self.offsets.append(len(self.tokens))
+
+    def count(self, k: int) -> int:
+        """count_tokens(paragraphs[k])."""
+        return self._keep[k] + len(self._tail[k])
+
+    def paragraph_tokens(self, k: int) -> List[int]:
+        """tokenizer.encode(paragraphs[k])."""
+        start = self.offsets[k]
+        return self.tokens[start:start + self._keep[k]] + list(self._tail[k])
+
+    def span_count(self, first: int, last: int) -> int:
+        """count_tokens of paragraphs first..last joined by PARAGRAPH_SEPARATOR."""
+        return self.offsets[last] - self.offsets[first] + self.count(last)
+
 def smart_chunk_text(text: str) -> List[Dict[str, Any]]:
     """
     Chunk text thông minh, giữ nguyên semantic boundaries.
 
+    Text chỉ được tokenize một lần (ParagraphTokens): token count của
+    paragraphs và chunks lấy từ token offsets; paragraph quá dài được
+    chia trực tiếp từ tokens của nó (chỉ các windows được đếm lại).
+
     Returns:
         List of {
             'text': chunk text,
             'index': chunk index,
-            'token_count': number of tokens
+            'token_count': number of tokens,
+            'content_hash': generate_content_hash(text)
         }
     """
     initialize()
@@ -111,73 +217,63 @@ def smart_chunk_text(text: str) -> List[Dict[str, Any]]:
         return []
 
     # Split by paragraphs first
-    paragraphs = text.split('\n\n')
+    paragraphs = [p.strip() for p in text.split(PARAGRAPH_SEPARATOR)]
+    paragraphs = [p for p in paragraphs if p]
+    document = ParagraphTokens(paragraphs)
 
     chunks = []
-    current_chunk = []
+    current_chunk: List[int] = []  # Paragraph numbers
     current_tokens = 0
-    chunk_index = 0
 
-    for para in paragraphs:
-        para = para.strip()
-        if not para:
-            continue
+    def group_chunk(group: List[int]) -> Dict[str, Any]:
+        return {
+            'text': PARAGRAPH_SEPARATOR.join(paragraphs[k] for k in group),
+            'index': len(chunks),
+            'token_count': document.span_count(group[0], group[-1])
+        }
 
-        para_tokens = count_tokens(para)
+    for k in range(len(paragraphs)):
+        para_tokens = document.count(k)
 
         # If single paragraph is too long, split it
         if para_tokens > CHUNK_SIZE:
             # Flush current chunk first
             if current_chunk:
-                chunk_text_str = '\n\n'.join(current_chunk)
-                chunks.append({
-                    'text': chunk_text_str,
-                    'index': chunk_index,
-                    'token_count': count_tokens(chunk_text_str)
-                })
-                chunk_index += 1
+                chunks.append(group_chunk(current_chunk))
                 current_chunk = []
                 current_tokens = 0
 
-            # Split long paragraph
-            sub_chunks = chunk_text(para)
-            for sub_chunk in sub_chunks:
+            # Split long paragraph (windows are re-counted: decoding can
+            # cut a word or character at the window edges)
+            for sub_chunk in _token_windows(document.paragraph_tokens(k), CHUNK_SIZE, CHUNK_OVERLAP):
                 chunks.append({
                     'text': sub_chunk,
-                    'index': chunk_index,
+                    'index': len(chunks),
                     'token_count': count_tokens(sub_chunk)
                 })
-                chunk_index += 1
 
         # If adding this paragraph exceeds limit
         elif current_tokens + para_tokens > CHUNK_SIZE:
             # Save current chunk
             if current_chunk:
-                chunk_text_str = '\n\n'.join(current_chunk)
-                chunks.append({
-                    'text': chunk_text_str,
-                    'index': chunk_index,
-                    'token_count': count_tokens(chunk_text_str)
-                })
-                chunk_index += 1
+                chunks.append(group_chunk(current_chunk))
 
             # Start new chunk
-            current_chunk = [para]
+            current_chunk = [k]
             current_tokens = para_tokens
 
         else:
             # Add to current chunk
-            current_chunk.append(para)
+            current_chunk.append(k)
             current_tokens += para_tokens
 
     # Don't forget last chunk
     if current_chunk:
-        chunk_text_str = '\n\n'.join(current_chunk)
-        chunks.append({
-            'text': chunk_text_str,
-            'index': chunk_index,
-            'token_count': count_tokens(chunk_text_str)
-        })
+        chunks.append(group_chunk(current_chunk))
+
+    # Chunk identity for incremental re-ingestion
+    for chunk in chunks:
+        chunk['content_hash'] = generate_content_hash(chunk['text'])
 
     return chunks
 
@@ -202,6 +298,8 @@ def get_embedding(text: str) -> Optional[List[float]]:
 
     for attempt in range(MAX_RETRIES):
         try:
+            embedding_stats['requests'] += 1
+            embedding_stats['texts'] += 1
             response = client.embeddings.create(
                 model=EMBEDDING_MODEL,
                 input=text.strip(),
@@ -216,74 +314,396 @@ def get_embedding(text: str) -> Optional[List[float]]:
                 print(f'[Embedding] All retries failed for text: {text[:100]}...')
                 return None
 
+# ═══════════════════════════════════════════════════════════════════════════
+# EMBEDDING BACKENDS
+# ═══════════════════════════════════════════════════════════════════════════
+
+class EmbeddingRequestError(Exception):
+    """An embeddings request the backend answered with an error."""
+
+    def __init__(self, status: int, message: str, retry_after: Optional[float] = None):
+        super().__init__(f'HTTP {status}: {message}')
+        self.status = status
+        self.retry_after = retry_after
+
+    @property
+    def retryable(self) -> bool:
+        return self.status == 429 or self.status >= 500
+
+    @property
+    def rejected(self) -> bool:
+        """The input was refused (malformed, too large): a smaller batch may pass."""
+        return self.status in (400, 413, 422)
+
+    @property
+    def fatal(self) -> bool:
+        """Bad API key or base_url: no request of this run can succeed."""
+        return self.status in (401, 403, 404)
+
+def _parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds from a Retry-After header (delta-seconds or HTTP-date); None if unparseable."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+class EmbeddingBackend(ABC):
+    """
+    Where EmbeddingPipeline sends batches. Subclasses must implement embed();
+    open() and close() wrap a pipeline run (connection pools etc.).
+    """
+
+    async def open(self):
+        pass
+
+    async def close(self):
+        pass
+
+    @abstractmethod
+    async def embed(self, texts: List[str]) -> List[List[float]]:
+        """One embedding per text, in order. Raise on failure."""
+
+class OpenAIEmbeddingBackend(EmbeddingBackend):
+    """
+    OpenAI-compatible /embeddings endpoint over a pooled aiohttp session:
+    the OpenAI API, or a local EmbeddingFixtureServer via base_url.
+    """
+
+    def __init__(
+        self,
+        api_key: Optional[str] = OPENAI_API_KEY,
+        base_url: str = OPENAI_BASE_URL,
+        model: str = EMBEDDING_MODEL,
+        connections: int = MAX_IN_FLIGHT,
+        timeout: float = REQUEST_TIMEOUT
+    ):
+        self.api_key = api_key
+        self.base_url = base_url.rstrip('/')
+        self.model = model
+        self.connections = connections
+        self.timeout = timeout
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    async def open(self):
+        headers = {'Authorization': f'Bearer {self.api_key}'} if self.api_key else {}
+        self._session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=self.connections),
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+            headers=headers,
+        )
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def embed(self, texts: List[str]) -> List[List[float]]:
+        payload = {'model': self.model, 'input': texts}
+        async with self._session.post(f'{self.base_url}/embeddings', json=payload) as response:
+            if response.status >= 400:
+                raise EmbeddingRequestError(
+                    response.status,
+                    (await response.text())[:200],
+                    _parse_retry_after(response.headers.get('Retry-After')),
+                )
+            body = await response.json()
+
+        data = sorted(body['data'], key=lambda item: item['index'])
+        if len(data) != len(texts):
+            raise EmbeddingRequestError(502, f'{len(data)} embeddings for {len(texts)} inputs')
+        return [item['embedding'] for item in data]
+
+# ═══════════════════════════════════════════════════════════════════════════
+# EMBEDDING PIPELINE
+# ═══════════════════════════════════════════════════════════════════════════
+
+@dataclass
+class EmbeddingPipelineStats:
+    requests: int = 0
+    texts: int = 0
+    tokens: int = 0
+    retries: int = 0
+    splits: int = 0
+    failed: int = 0
+    elapsed: float = 0.0
+
+    def summary(self) -> str:
+        rate = self.texts / self.elapsed if self.elapsed > 0 else 0.0
+        return (f'{self.texts} texts ({self.tokens:,} tokens), {self.requests} requests, {self.retries} retries, '
+                f'{self.splits} splits, {self.failed} failed, {self.elapsed:.1f}s ({rate:,.0f} texts/s)')
+
+def plan_batches(
+    token_counts: List[int],
+    max_texts: int = BATCH_SIZE,
+    max_tokens: int = BATCH_TOKEN_BUDGET
+) -> List[List[int]]:
+    """
+    Split positions 0..n-1 into consecutive batches of at most max_texts
+    texts and max_tokens tokens (a single text over the budget goes alone).
+    """
+    batches: List[List[int]] = []
+    current: List[int] = []
+    current_tokens = 0
+    for i, tokens in enumerate(token_counts):
+        if current and (len(current) >= max_texts or current_tokens + tokens > max_tokens):
+            batches.append(current)
+            current, current_tokens = [], 0
+        current.append(i)
+        current_tokens += tokens
+    if current:
+        batches.append(current)
+    return batches
+
+class EmbeddingPipeline:
+    """
+    Concurrent embedding requests with ordered results.
+
+    Texts are grouped into batches by token budget, up to max_in_flight
+    batches are sent at the same time, and each batch is retried with
+    exponential backoff on throttling, server and network errors. A
+    batch whose input the API rejects (400/413/422) is split in half and
+    the halves sent again, so one bad text only loses its own embedding.
+    Auth and not-found errors (401/403/404) stop the run: embed() raises
+    instead of sending the remaining batches.
+
+    Args:
+        backend: EmbeddingBackend (default: OpenAIEmbeddingBackend)
+        max_in_flight: Concurrent requests
+        batch_size: Maximum texts per request
+        batch_tokens: Maximum tokens per request
+        max_retries: Attempts per batch
+        retry_delay: First backoff in seconds (doubles per attempt)
+    """
+
+    def __init__(
+        self,
+        backend: Optional[EmbeddingBackend] = None,
+        max_in_flight: int = MAX_IN_FLIGHT,
+        batch_size: int = BATCH_SIZE,
+        batch_tokens: int = BATCH_TOKEN_BUDGET,
+        max_retries: int = MAX_RETRIES,
+        retry_delay: float = RETRY_DELAY
+    ):
+        self.backend = backend or OpenAIEmbeddingBackend(connections=max_in_flight)
+        self.max_in_flight = max_in_flight
+        self.batch_size = batch_size
+        self.batch_tokens = batch_tokens
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.stats = EmbeddingPipelineStats()
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._fatal: Optional[EmbeddingRequestError] = None
+
+    async def __aenter__(self) -> 'EmbeddingPipeline':
+        await self.backend.open()
+        self._slots = asyncio.Semaphore(self.max_in_flight)
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.backend.close()
+
+    async def embed(
+        self,
+        texts: List[str],
+        token_counts: Optional[List[int]] = None,
+        show_progress: bool = True
+    ) -> List[Optional[List[float]]]:
+        """
+        Embeddings for `texts`, in input order (None for empty texts and
+        texts that failed).
+
+        Args:
+            texts: Texts to embed (stripped before sending)
+            token_counts: count_tokens() of each text, if already known
+            show_progress: Print each finished batch
+
+        Raises:
+            EmbeddingRequestError: the API refused the key or endpoint
+        """
+        started = time.perf_counter()
+        self._fatal = None
+        cleaned_texts = [t.strip() if t else '' for t in texts]
+        positions = [i for i, t in enumerate(cleaned_texts) if t]
+        results: List[Optional[List[float]]] = [None] * len(texts)
+
+        if token_counts is None:
+            tokens = [count_tokens(cleaned_texts[i]) for i in positions]
+        else:
+            tokens = [token_counts[i] for i in positions]
+
+        batches = [
+            [positions[j] for j in batch]
+            for batch in plan_batches(tokens, self.batch_size, self.batch_tokens)
+        ]
+        token_of = dict(zip(positions, tokens))
+        done = 0
+
+        async def run(batch: List[int]):
+            nonlocal done
+            await self._run_batch(batch, cleaned_texts, token_of, results)
+            done += 1
+            if show_progress:
+                print(f'  Batch {done}/{len(batches)} completed ({len(batch)} texts)')
+
+        await asyncio.gather(*(run(batch) for batch in batches))
+        self.stats.elapsed += time.perf_counter() - started
+        if self._fatal is not None:
+            raise self._fatal
+        return results
+
+    async def _run_batch(
+        self,
+        batch: List[int],
+        texts: List[str],
+        token_of: Dict[int, int],
+        results: List[Optional[List[float]]]
+    ):
+        try:
+            embeddings = await self._send([texts[i] for i in batch], sum(token_of[i] for i in batch))
+        except Exception as e:
+            if isinstance(e, EmbeddingRequestError) and e.fatal:
+                self.stats.failed += len(batch)
+                if self._fatal is None:
+                    self._fatal = e
+                    print(f'[Embedding] {e}: check OPENAI_API_KEY / base_url, aborting remaining batches')
+                return
+            rejected = isinstance(e, EmbeddingRequestError) and e.rejected
+            if not rejected or len(batch) == 1:
+                self.stats.failed += len(batch)
+                print(f'[Embedding] Batch of {len(batch)} failed: {e} (first text: {texts[batch[0]][:100]}...)')
+                return
+            # Rejected input: retry the halves to isolate the bad text
+            self.stats.splits += 1
+            middle = len(batch) // 2
+            await asyncio.gather(
+                self._run_batch(batch[:middle], texts, token_of, results),
+                self._run_batch(batch[middle:], texts, token_of, results),
+            )
+            return
+
+        for i, embedding in zip(batch, embeddings):
+            results[i] = embedding
+
+    async def _send(self, texts: List[str], tokens: int) -> List[List[float]]:
+        """One batch, retried with exponential backoff on retryable errors."""
+        for attempt in range(self.max_retries):
+            try:
+                async with self._slots:
+                    if self._fatal is not None:
+                        raise self._fatal
+                    self.stats.requests += 1
+                    embedding_stats['requests'] += 1
+                    embedding_stats['texts'] += len(texts)
+                    embeddings = await self.backend.embed(texts)
+                self.stats.texts += len(texts)
+                self.stats.tokens += tokens
+                return embeddings
+
+            except (EmbeddingRequestError, aiohttp.ClientError, asyncio.TimeoutError) as e:
+                if isinstance(e, EmbeddingRequestError) and not e.retryable:
+                    raise
+                if attempt == self.max_retries - 1:
+                    raise
+                delay = self.retry_delay * 2 ** attempt
+                if isinstance(e, EmbeddingRequestError) and e.retry_after:
+                    delay = max(delay, e.retry_after)
+                print(f'[Embedding] Batch of {len(texts)} attempt {attempt + 1} failed: {e}, retrying in {delay:.1f}s')
+                self.stats.retries += 1
+                await asyncio.sleep(delay)
+
+async def embed_texts_async(
+    texts: List[str],
+    token_counts: Optional[List[int]] = None,
+    backend: Optional[EmbeddingBackend] = None,
+    show_progress: bool = True,
+    **pipeline_kwargs
+) -> Tuple[List[Optional[List[float]]], EmbeddingPipelineStats]:
+    """Run one EmbeddingPipeline over `texts`; returns (embeddings, stats)."""
+    async with EmbeddingPipeline(backend, **pipeline_kwargs) as pipeline:
+        embeddings = await pipeline.embed(texts, token_counts, show_progress)
+    if show_progress:
+        print(f'  [EMBED] {pipeline.stats.summary()}')
+    return embeddings, pipeline.stats
+
 def batch_get_embeddings(
     texts: List[str],
     batch_size: int = BATCH_SIZE,
-    show_progress: bool = True
+    show_progress: bool = True,
+    token_counts: Optional[List[int]] = None,
+    backend: Optional[EmbeddingBackend] = None,
+    max_in_flight: int = MAX_IN_FLIGHT
 ) -> List[Optional[List[float]]]:
     """
-    Get embeddings cho nhiều texts với batching.
+    Get embeddings cho nhiều texts qua EmbeddingPipeline (concurrent batches).
 
     Args:
         texts: List texts cần embed
-        batch_size: Số texts per API call
+        batch_size: Số texts tối đa per API call
         show_progress: Show progress output
+        token_counts: Token count của mỗi text nếu đã có (bỏ qua count_tokens)
+        backend: EmbeddingBackend (default: OpenAI API)
+        max_in_flight: Số requests chạy đồng thời
 
     Returns:
-        List embeddings (có thể chứa None nếu lỗi)
+        List embeddings theo thứ tự texts (có thể chứa None nếu lỗi)
     """
     initialize()
 
     if not texts:
         return []
 
-    # Filter empty texts
-    cleaned_texts = [t.strip() if t else '' for t in texts]
-
-    all_embeddings = []
-    total_batches = (len(cleaned_texts) + batch_size - 1) // batch_size
-
-    for batch_idx in range(0, len(cleaned_texts), batch_size):
-        batch = cleaned_texts[batch_idx:batch_idx + batch_size]
-        current_batch = batch_idx // batch_size + 1
+    embeddings, _ = asyncio.run(embed_texts_async(
+        texts, token_counts, backend, show_progress,
+        batch_size=batch_size, max_in_flight=max_in_flight,
+    ))
+    return embeddings
 
-        # Skip empty batch
-        valid_batch = [t for t in batch if t]
-        if not valid_batch:
-            all_embeddings.extend([None] * len(batch))
-            continue
+def cached_batch_get_embeddings(
+    texts: List[str],
+    cache: Optional[EmbeddingCache] = None,
+    batch_size: int = BATCH_SIZE,
+    show_progress: bool = True,
+    backend: Optional[EmbeddingBackend] = None
+) -> List[Optional[List[float]]]:
+    """
+    batch_get_embeddings qua local embedding cache: chỉ texts chưa có
+    embedding (cho EMBEDDING_MODEL) mới được gửi lên API, mỗi text một lần.
 
-        for attempt in range(MAX_RETRIES):
-            try:
-                response = client.embeddings.create(
-                    model=EMBEDDING_MODEL,
-                    input=valid_batch,
-                )
+    Returns:
+        List embeddings theo thứ tự texts (None nếu lỗi hoặc text rỗng)
+    """
+    if not texts:
+        return []
 
-                # Map results back
-                valid_idx = 0
-                for text in batch:
-                    if text:
-                        all_embeddings.append(response.data[valid_idx].embedding)
-                        valid_idx += 1
-                    else:
-                        all_embeddings.append(None)
+    cache = cache or get_embedding_cache()
+    cleaned_texts = [t.strip() if t else '' for t in texts]
+    hashes = [generate_content_hash(t) if t else None for t in cleaned_texts]
 
-                if show_progress:
-                    print(f'  Batch {current_batch}/{total_batches} completed ({len(valid_batch)} texts)')
+    found = cache.get_many(EMBEDDING_MODEL, [h for h in hashes if h])
+    missing = {h: t for h, t in zip(hashes, cleaned_texts) if h and h not in found}
 
-                break  # Success, exit retry loop
+    if show_progress:
+        cached = sum(1 for h in hashes if h in found)
+        print(f'  [CACHE] {cached}/{len(texts)} embeddings cached, {len(missing)} to embed')
 
-            except Exception as e:
-                print(f'[Embedding] Batch {current_batch} attempt {attempt + 1} failed: {e}')
-                if attempt < MAX_RETRIES - 1:
-                    time.sleep(RETRY_DELAY * (attempt + 1))
-                else:
-                    # All retries failed, add None for this batch
-                    all_embeddings.extend([None] * len(batch))
-                    print(f'[Embedding] Batch {current_batch} failed after all retries')
+    if missing:
+        fresh = batch_get_embeddings(
+            list(missing.values()), batch_size=batch_size, show_progress=show_progress, backend=backend
+        )
+        new = {h: e for h, e in zip(missing, fresh) if e is not None}
+        cache.put_many(EMBEDDING_MODEL, new)
+        found.update(new)
 
-    return all_embeddings
+    return [found.get(h) if h else None for h in hashes]
 
 # ═══════════════════════════════════════════════════════════════════════════
 # EXPORT
@@ -294,8 +714,19 @@ __all__ = [
     'generate_content_hash',
     'chunk_text',
     'smart_chunk_text',
+    'ParagraphTokens',
     'get_embedding',
     'batch_get_embeddings',
+    'cached_batch_get_embeddings',
+    'embed_texts_async',
+    'plan_batches',
+    'EmbeddingBackend',
+    'OpenAIEmbeddingBackend',
+    'EmbeddingPipeline',
+    'EmbeddingPipelineStats',
+    'EmbeddingRequestError',
+    'get_embedding_cache',
+    'embedding_stats',
     'EMBEDDING_MODEL',
     'EMBEDDING_DIMENSIONS',
     'CHUNK_SIZE',
@@ -0,0 +1,314 @@
+# scripts/ai/exit_simulator.py
+# Vectorized exit search for backtest positions
+# GEMRAL AI BRAIN - Phase 7
+#
+# For a batch of positions (first candle to check, direction, stop loss,
+# take profit, optional trailing stop and holding limit), finds the candle
+# each one exits on and its MFE/MAE over the held range, with the same
+# rules and float results as a per-candle loop (benchmarks._update_positions):
+#
+#   - stop loss is checked before take profit on the same candle
+#   - a trailing stop trails the best high (long) / low (short) of the
+#     candles before the current one by trailing_percent
+#   - a time exit closes at the close of the holding-limit candle
+#   - MFE/MAE include the exit candle
+#
+# Short positions are handled as longs on negated prices (negation is
+# exact), so one code path serves both directions. Candles are scanned in
+# growing windows for all unresolved positions at once, so the cost
+# hardly depends on how many positions are open.
+
+from dataclasses import dataclass
+from typing import Optional, Union
+
+import numpy as np
+
+from feature_extractor import CandleArray
+
+# ═══════════════════════════════════════════════════════════════════════════
+# CONFIGURATION
+# ═══════════════════════════════════════════════════════════════════════════
+
+# Exit codes (backtest_engine maps them to ExitReason)
+NO_EXIT = -1
+STOP_LOSS = 0
+TAKE_PROFIT = 1
+TRAILING_STOP = 2
+TIME_EXIT = 3
+
+# Exit code -> ExitReason value in backtest_engine
+REASON_NAMES = {
+    STOP_LOSS: 'stop_loss',
+    TAKE_PROFIT: 'take_profit',
+    TRAILING_STOP: 'trailing_stop',
+    TIME_EXIT: 'time_exit',
+}
+
+SCALAR_CANDLES = 64  # Candles per position checked in plain Python first
+FIRST_WINDOW = 64    # Then vectorized windows, growing 4x
+
+ArrayLike = Union[np.ndarray, list, float, int, bool]
+
+# ═══════════════════════════════════════════════════════════════════════════
+# RESULT
+# ═══════════════════════════════════════════════════════════════════════════
+
+@dataclass
+class ExitBatch:
+    """Per-position exit results (one entry per simulated position)."""
+    index: np.ndarray    # Exit candle, -1 if the data ends first
+    price: np.ndarray    # Exit price (0.0 when there is no exit)
+    reason: np.ndarray   # STOP_LOSS / TAKE_PROFIT / TRAILING_STOP / TIME_EXIT / NO_EXIT
+    mfe: np.ndarray      # Max favorable excursion through the exit (or last) candle
+    mae: np.ndarray      # Max adverse excursion through the exit (or last) candle
+    trailing: np.ndarray # Trailing stop level after the last candle seen (nan if unused)
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+# ═══════════════════════════════════════════════════════════════════════════
+# SIMULATOR
+# ═══════════════════════════════════════════════════════════════════════════
+
+def simulate_exits(
+    candles: CandleArray,
+    start: ArrayLike,
+    long: ArrayLike,
+    entry_price: ArrayLike,
+    stop_loss: ArrayLike,
+    take_profit: ArrayLike,
+    trailing_percent: Optional[float] = None,
+    trailing_stop: Optional[ArrayLike] = None,
+    expire: Optional[ArrayLike] = None,
+    mfe: Optional[ArrayLike] = None,
+    mae: Optional[ArrayLike] = None
+) -> ExitBatch:
+    """
+    Exit candle, price, reason and MFE/MAE for each position.
+
+    Args:
+        candles: CandleArray the positions trade on
+        start: First candle checked per position (the one after entry)
+        long: True for long positions, False for short
+        entry_price, stop_loss, take_profit: Per-position levels
+        trailing_percent: Trail the stop this many percent behind the best
+            price of earlier candles (None disables trailing)
+        trailing_stop: Current trailing level per position (nan = none yet)
+        expire: Candle index whose close is a time exit (-1 = no limit)
+        mfe, mae: Excursions already accumulated before `start`
+
+    Scalars apply to every position.
+
+    Returns:
+        ExitBatch, positions in the order given
+    """
+    n = len(candles)
+    count = max((len(v) for v in (start, long, entry_price, stop_loss, take_profit) if _is_column(v)), default=1)
+
+    def column(values, default):
+        values = default if values is None else values
+        if not _is_column(values):
+            return [values] * count
+        return values.tolist() if isinstance(values, np.ndarray) else list(values)
+
+    timed = expire is not None
+    trailing = trailing_percent is not None
+    long_factor = 1 - trailing_percent / 100 if trailing else None
+    short_factor = 1 + trailing_percent / 100 if trailing else None
+
+    # Per position, in long-equivalent prices (shorts negated)
+    state = []
+    for first, is_long, entry, stop, target, last, trail in zip(
+        column(start, 0), column(long, True), column(entry_price, 0.0), column(stop_loss, 0.0),
+        column(take_profit, 0.0), column(expire, -1), column(trailing_stop, np.nan)
+    ):
+        sign = 1.0 if is_long else -1.0
+        trail = -np.inf if not trailing or np.isnan(trail) else trail * sign
+        expiry = int(last)  # Time exit only if the limit candle exists
+        last = min(expiry, n - 1) if expiry >= 0 else n - 1
+        state.append([int(first), is_long, sign, entry, stop * sign, target * sign, last, trail, expiry])
+
+    best = [-np.inf] * count
+    worst = [np.inf] * count
+    out_index = [-1] * count
+    out_price = [0.0] * count
+    out_reason = [NO_EXIT] * count
+    pending = []
+
+    # Most positions exit within a few candles: check the first
+    # SCALAR_CANDLES of each in plain Python, vectorize the rest
+    for p, (first, is_long, sign, entry, stop, target, last, trail, expiry) in enumerate(state):
+        end = min(first + SCALAR_CANDLES, last + 1)
+        if end <= first:
+            continue
+        highs = candles.high[first:end].tolist()
+        lows = candles.low[first:end].tolist()
+        factor = long_factor if is_long else short_factor
+        high_seen, low_seen = best[p], worst[p]
+
+        for k in range(end - first):
+            if is_long:
+                up, down = highs[k], lows[k]
+            else:
+                up, down = -lows[k], -highs[k]
+            if up > high_seen:
+                high_seen = up
+            if down < low_seen:
+                low_seen = down
+
+            effective = trail if trail > stop else stop
+            if down <= effective:
+                out_reason[p] = TRAILING_STOP if effective > stop else STOP_LOSS
+                out_price[p] = effective * sign
+            elif up >= target:
+                out_reason[p] = TAKE_PROFIT
+                out_price[p] = target * sign
+            elif timed and first + k == expiry:
+                out_reason[p] = TIME_EXIT
+                out_price[p] = float(candles.close[first + k])
+            else:
+                if trailing and up * factor > trail:
+                    trail = up * factor
+                continue
+            out_index[p] = first + k
+            break
+
+        best[p], worst[p] = high_seen, low_seen
+        state[p][7] = trail
+        if out_index[p] < 0 and end <= last:
+            pending.append(p)
+
+    if pending:
+        _scan_windows(candles, state, pending, timed, trailing, long_factor, short_factor,
+                      best, worst, out_index, out_price, out_reason)
+
+    mfe_out, mae_out, trailing_out = [], [], []
+    for p, (_, _, sign, entry, _, _, _, trail, _), mfe_before, mae_before in zip(
+        range(count), state, column(mfe, 0.0), column(mae, 0.0)
+    ):
+        # Exact: (x - entry) / entry is monotonic in x
+        signed_entry = entry * sign
+        mfe_out.append(max(mfe_before, (best[p] - signed_entry) / entry))
+        mae_out.append(max(mae_before, (signed_entry - worst[p]) / entry))
+        trailing_out.append(trail * sign if trail != -np.inf else np.nan)
+
+    return ExitBatch(
+        index=np.array(out_index, dtype=np.int64),
+        price=np.array(out_price),
+        reason=np.array(out_reason, dtype=np.int8),
+        mfe=np.array(mfe_out),
+        mae=np.array(mae_out),
+        trailing=np.array(trailing_out),
+    )
+
+def _is_column(values) -> bool:
+    """Per-position values (vs one scalar for all); cheaper than np.ndim."""
+    return isinstance(values, (list, tuple)) or (isinstance(values, np.ndarray) and values.ndim > 0)
+
+def _scan_windows(candles, state, pending, timed, trailing, long_factor, short_factor,
+                  best, worst, out_index, out_price, out_reason):
+    """
+    Vectorized continuation of simulate_exits for the positions still
+    open after SCALAR_CANDLES: windows of candles for all of them at once,
+    growing 4x until every position exits or runs out of candles.
+    """
+    n = len(candles)
+    pending = np.array(pending)
+    rows_state = list(zip(*state))
+    first_all, long_all, sign_all = (np.array(rows_state[i]) for i in range(3))
+    stop_all, target_all, last_all, trail_all, expiry_all = (np.array(rows_state[i]) for i in range(4, 9))
+    best_all, worst_all = np.array(best), np.array(worst)
+    factor_all = np.where(long_all, long_factor, short_factor) if trailing else None
+    all_long, all_short = bool(long_all.all()), not long_all.any()
+
+    offset = SCALAR_CANDLES
+    width = FIRST_WINDOW
+
+    while len(pending):
+        columns = first_all[pending, None] + np.arange(offset, offset + width)
+        valid = columns <= last_all[pending, None]
+        np.minimum(columns, n - 1, out=columns)
+
+        high = candles.high[columns]
+        low = candles.low[columns]
+        if all_long:
+            up, down = high, low
+        elif all_short:
+            up, down = -low, -high
+        else:
+            is_long = long_all[pending, None]
+            up, down = np.where(is_long, high, -low), np.where(is_long, low, -high)
+        if not valid.all():
+            up[~valid] = -np.inf
+            down[~valid] = np.inf
+
+        # Effective stop per candle: trailing level from earlier candles only
+        stop = stop_all[pending, None]
+        if trailing:
+            levels = up * factor_all[pending, None]
+            earlier = np.empty_like(levels)
+            earlier[:, 0] = trail_all[pending]
+            np.maximum.accumulate(levels[:, :-1], axis=1, out=earlier[:, 1:])
+            np.maximum(earlier[:, 1:], trail_all[pending, None], out=earlier[:, 1:])
+            effective = np.maximum(earlier, stop)
+        else:
+            effective = stop
+
+        stopped = down <= effective
+        hit = stopped | (up >= target_all[pending, None])
+        if timed:
+            hit |= valid & (columns == expiry_all[pending, None])
+        found = hit.any(axis=1)
+        first = np.argmax(hit, axis=1)
+
+        # Prices seen through the exit candle (or the whole window)
+        through = np.where(found, first, width - 1)
+        rows = np.arange(len(pending))
+        best_all[pending] = np.maximum(best_all[pending], np.maximum.accumulate(up, axis=1)[rows, through])
+        worst_all[pending] = np.minimum(worst_all[pending], np.minimum.accumulate(down, axis=1)[rows, through])
+        if trailing:
+            trail_all[pending] = np.where(
+                found, earlier[rows, through], np.maximum(earlier[rows, through], levels[rows, through])
+            )
+
+        if found.any():
+            done, at, k = pending[found], rows[found], first[found]
+            level = np.broadcast_to(effective, hit.shape)[at, k]
+            is_stop = stopped[at, k]
+            is_target = up[at, k] >= target_all[done]
+            index = columns[at, k]
+            reason = np.where(
+                is_stop, np.where(level > stop_all[done], TRAILING_STOP, STOP_LOSS),
+                np.where(is_target, TAKE_PROFIT, TIME_EXIT)
+            )
+            price = np.where(
+                is_stop, level * sign_all[done],
+                np.where(is_target, target_all[done] * sign_all[done], candles.close[index])
+            )
+            for p, i, r, x in zip(done.tolist(), index.tolist(), reason.tolist(), price.tolist()):
+                out_index[p], out_reason[p], out_price[p] = i, r, x
+            pending = pending[~found]
+
+        # Positions without an exit continue while they have candles left
+        offset += width
+        width *= 4
+        pending = pending[first_all[pending] + offset <= last_all[pending]]
+
+    for p in range(len(state)):
+        best[p], worst[p] = float(best_all[p]), float(worst_all[p])
+        state[p][7] = float(trail_all[p])
+
+# ═══════════════════════════════════════════════════════════════════════════
+# EXPORT
+# ═══════════════════════════════════════════════════════════════════════════
+
+__all__ = [
+    'NO_EXIT',
+    'STOP_LOSS',
+    'TAKE_PROFIT',
+    'TRAILING_STOP',
+    'TIME_EXIT',
+    'REASON_NAMES',
+    'ExitBatch',
+    'simulate_exits',
+]
@@ -2,7 +2,10 @@
 # Feature extraction for pattern detection AI
 # GEMRAL AI BRAIN - Phase 6
 
+import os
+
 import numpy as np
+from collections import OrderedDict, deque
 from typing import List, Dict, Any, Optional, Tuple
 from dataclasses import dataclass
 from enum import Enum
@@ -18,6 +21,8 @@ MACD_FAST = 12
 MACD_SLOW = 26
 MACD_SIGNAL = 9
 
+FEATURE_CACHE_SIZE = int(os.getenv('FEATURE_CACHE_SIZE', '4096'))  # BarContext entries per FeatureCache
+
 # ═══════════════════════════════════════════════════════════════════════════
 # DATA CLASSES
 # ═══════════════════════════════════════════════════════════════════════════
@@ -32,6 +37,120 @@ class Candle:
     close: float
     volume: float
 
+class CandleArray:
+    """
+    Columnar candle storage backed by contiguous NumPy arrays.
+
+    Columns: timestamp (int64 ms), open/high/low/close/volume (float64).
+    Slicing returns a zero-copy view; integer indexing and iteration yield
+    Candle objects, so code written against List[Candle] keeps working.
+    """
+
+    FIELDS = ('timestamp', 'open', 'high', 'low', 'close', 'volume')
+
+    __slots__ = FIELDS
+
+    def __init__(self, timestamp, open, high, low, close, volume):
+        self.timestamp = np.asarray(timestamp, dtype=np.int64)
+        self.open = np.asarray(open, dtype=np.float64)
+        self.high = np.asarray(high, dtype=np.float64)
+        self.low = np.asarray(low, dtype=np.float64)
+        self.close = np.asarray(close, dtype=np.float64)
+        self.volume = np.asarray(volume, dtype=np.float64)
+
+        n = len(self.timestamp)
+        for name in self.FIELDS[1:]:
+            if len(getattr(self, name)) != n:
+                raise ValueError(f'CandleArray column {name} has length {len(getattr(self, name))}, expected {n}')
+
+    @classmethod
+    def empty(cls) -> 'CandleArray':
+        return cls([], [], [], [], [], [])
+
+    @classmethod
+    def from_candles(cls, candles: List[Candle]) -> 'CandleArray':
+        """Build from Candle objects (returns the input if it already is a CandleArray)."""
+        if isinstance(candles, CandleArray):
+            return candles
+        return cls(
+            np.fromiter((c.timestamp for c in candles), dtype=np.int64, count=len(candles)),
+            np.fromiter((c.open for c in candles), dtype=np.float64, count=len(candles)),
+            np.fromiter((c.high for c in candles), dtype=np.float64, count=len(candles)),
+            np.fromiter((c.low for c in candles), dtype=np.float64, count=len(candles)),
+            np.fromiter((c.close for c in candles), dtype=np.float64, count=len(candles)),
+            np.fromiter((c.volume for c in candles), dtype=np.float64, count=len(candles)),
+        )
+
+    @classmethod
+    def from_klines(cls, klines: List[List]) -> 'CandleArray':
+        """Build from raw Binance klines ([open_time, open, high, low, close, volume, ...])."""
+        if not klines:
+            return cls.empty()
+        table = np.array([k[:6] for k in klines], dtype=object)
+        return cls(
+            table[:, 0].astype(np.int64),
+            table[:, 1].astype(np.float64),
+            table[:, 2].astype(np.float64),
+            table[:, 3].astype(np.float64),
+            table[:, 4].astype(np.float64),
+            table[:, 5].astype(np.float64),
+        )
+
+    @classmethod
+    def concatenate(cls, arrays: List['CandleArray']) -> 'CandleArray':
+        if not arrays:
+            return cls.empty()
+        return cls(*(np.concatenate([getattr(a, name) for a in arrays]) for name in cls.FIELDS))
+
+    def __len__(self) -> int:
+        return len(self.timestamp)
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return CandleArray(*(getattr(self, name)[key] for name in self.FIELDS))
+        return Candle(
+            timestamp=int(self.timestamp[key]),
+            open=float(self.open[key]),
+            high=float(self.high[key]),
+            low=float(self.low[key]),
+            close=float(self.close[key]),
+            volume=float(self.volume[key]),
+        )
+
+    def __iter__(self):
+        """Compatibility iterator yielding Candle objects."""
+        for row in zip(
+            self.timestamp.tolist(), self.open.tolist(), self.high.tolist(),
+            self.low.tolist(), self.close.tolist(), self.volume.tolist()
+        ):
+            yield Candle(*row)
+
+    def __repr__(self) -> str:
+        if len(self) == 0:
+            return 'CandleArray(0 candles)'
+        return f'CandleArray({len(self)} candles, {self.timestamp[0]}..{self.timestamp[-1]})'
+
+    def take(self, indices) -> 'CandleArray':
+        """Select rows by index array or boolean mask (copies)."""
+        return CandleArray(*(getattr(self, name)[indices] for name in self.FIELDS))
+
+    def to_candles(self) -> List[Candle]:
+        return list(self)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(getattr(self, name).nbytes for name in self.FIELDS)
+
+def candle_column(candles, field: str) -> np.ndarray:
+    """
+    One OHLCV column as a NumPy array.
+    Zero-copy for CandleArray; builds an array for List[Candle].
+    """
+    if isinstance(candles, CandleArray):
+        return getattr(candles, field)
+    dtype = np.int64 if field == 'timestamp' else np.float64
+    return np.fromiter((getattr(c, field) for c in candles), dtype=dtype, count=len(candles))
+
 @dataclass
 class PatternFeatures:
     """Extracted features for a pattern."""
@@ -134,15 +253,17 @@ def calculate_atr(candles: List[Candle], period: int = ATR_PERIOD) -> List[float
     if len(candles) < 2:
         return [0.0] * len(candles)
 
-    true_ranges = [candles[0].high - candles[0].low]
+    highs = candle_column(candles, 'high').tolist()
+    lows = candle_column(candles, 'low').tolist()
+    closes = candle_column(candles, 'close').tolist()
 
-    for i in range(1, len(candles)):
-        c = candles[i]
-        prev_close = candles[i-1].close
+    true_ranges = [highs[0] - lows[0]]
+
+    for high, low, prev_close in zip(highs[1:], lows[1:], closes[:-1]):
         tr = max(
-            c.high - c.low,
-            abs(c.high - prev_close),
-            abs(c.low - prev_close)
+            high - low,
+            abs(high - prev_close),
+            abs(low - prev_close)
         )
         true_ranges.append(tr)
 
@@ -167,6 +288,364 @@ def calculate_macd(prices: List[float]) -> Tuple[List[float], List[float], List[
 
     return macd_line, signal_line, histogram
 
+# ═══════════════════════════════════════════════════════════════════════════
+# STREAMING INDICATORS
+# ═══════════════════════════════════════════════════════════════════════════
+# O(1)-per-candle versions of the indicators above. After N updates each
+# `value` equals the last element of the list-based function called on the
+# first N prices/candles, so callers walking a series bar by bar (backtests,
+# live scanners) don't have to rebuild the whole prefix every bar.
+
+class StreamingEMA:
+    """EMA advanced one price at a time (matches calculate_ema(prices)[-1])."""
+
+    def __init__(self, period: int):
+        self.period = period
+        self.multiplier = 2 / (period + 1)
+        self.count = 0
+        self.value: Optional[float] = None
+        self._first: Optional[float] = None
+        self._seed_sum = 0
+
+    def update(self, price: float) -> float:
+        self.count += 1
+
+        if self.count == 1:
+            self._first = price
+
+        if self.count < self.period:
+            # Not enough data yet: list version returns prices[0]
+            self._seed_sum += price
+            self.value = self._first
+        elif self.count == self.period:
+            # Seed with SMA of the first `period` prices
+            self._seed_sum += price
+            self.value = self._seed_sum / self.period
+        else:
+            self.value = (price - self.value) * self.multiplier + self.value
+
+        return self.value
+
+class StreamingRSI:
+    """Wilder RSI advanced one price at a time (matches calculate_rsi(prices)[-1])."""
+
+    def __init__(self, period: int = RSI_PERIOD, history: int = 20):
+        self.period = period
+        self.count = 0
+        self.value = 50.0
+        self.history: deque = deque(maxlen=history)  # Recent RSI values, oldest first
+        self._prev_price: Optional[float] = None
+        self._gain_sum = 0
+        self._loss_sum = 0
+        self._avg_gain = 0.0
+        self._avg_loss = 0.0
+
+    def update(self, price: float) -> float:
+        self.count += 1
+
+        if self._prev_price is not None:
+            delta = price - self._prev_price
+            gain = delta if delta > 0 else 0
+            loss = -delta if delta < 0 else 0
+            n_deltas = self.count - 1
+
+            if n_deltas <= self.period:
+                self._gain_sum += gain
+                self._loss_sum += loss
+                if n_deltas == self.period:
+                    self._avg_gain = self._gain_sum / self.period
+                    self._avg_loss = self._loss_sum / self.period
+            else:
+                self._avg_gain = (self._avg_gain * (self.period - 1) + gain) / self.period
+                self._avg_loss = (self._avg_loss * (self.period - 1) + loss) / self.period
+
+                if self._avg_loss == 0:
+                    self.value = 100.0
+                else:
+                    rs = self._avg_gain / self._avg_loss
+                    self.value = 100 - (100 / (1 + rs))
+
+        self._prev_price = price
+        self.history.append(self.value)
+        return self.value
+
+class StreamingATR:
+    """ATR advanced one candle at a time (matches calculate_atr(candles)[-1])."""
+
+    def __init__(self, period: int = ATR_PERIOD, history: int = 20):
+        self.period = period
+        self.count = 0
+        self.value = 0.0
+        self.history: deque = deque(maxlen=history)  # Recent ATR values, oldest first
+        self._true_ranges: deque = deque(maxlen=period)
+        self._prev_close: Optional[float] = None
+
+    def update(self, candle: Candle) -> float:
+        self.count += 1
+
+        if self._prev_close is None:
+            tr = candle.high - candle.low
+        else:
+            tr = max(
+                candle.high - candle.low,
+                abs(candle.high - self._prev_close),
+                abs(candle.low - self._prev_close)
+            )
+        self._true_ranges.append(tr)
+        self._prev_close = candle.close
+
+        # Summing the (at most `period`) window keeps results bit-identical
+        # to the list version, which re-sums the slice every index
+        atr = sum(self._true_ranges) / len(self._true_ranges)
+        self.history.append(atr)
+
+        # calculate_atr returns zeros for fewer than 2 candles
+        self.value = atr if self.count >= 2 else 0.0
+        return self.value
+
+class StreamingMACD:
+    """MACD advanced one price at a time (matches calculate_macd(prices))."""
+
+    def __init__(self):
+        self.fast = StreamingEMA(MACD_FAST)
+        self.slow = StreamingEMA(MACD_SLOW)
+        self.signal_multiplier = 2 / (MACD_SIGNAL + 1)
+        self.macd = 0.0
+        self.signal = 0.0
+        self.histogram = 0.0
+        self.prev_histogram: Optional[float] = None
+
+        # calculate_ema pads its head with the first SMA, so until the slow
+        # EMA is seeded the early MACD values still change with every new
+        # price. Recompute those few bars with the list version.
+        self._warmup_prices: Optional[List[float]] = []
+
+    def update(self, price: float) -> float:
+        fast = self.fast.update(price)
+        slow = self.slow.update(price)
+
+        if self._warmup_prices is not None:
+            self._warmup_prices.append(price)
+            macd_line, signal_line, histogram = calculate_macd(self._warmup_prices)
+            self.macd = macd_line[-1]
+            self.signal = signal_line[-1]
+            self.prev_histogram = histogram[-2] if len(histogram) >= 2 else None
+            self.histogram = histogram[-1]
+
+            if len(self._warmup_prices) >= MACD_SLOW:
+                self._warmup_prices = None
+        else:
+            self.macd = fast - slow
+            self.signal = (self.macd - self.signal) * self.signal_multiplier + self.signal
+            self.prev_histogram = self.histogram
+            self.histogram = self.macd - self.signal
+
+        return self.histogram
+
+class IndicatorState:
+    """
+    Rolling indicator state for a single candle stream.
+
+    Call update() once per candle in order; the current ATR, EMA 20/50/200,
+    RSI and MACD values are then available in O(1).
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.emas: Dict[int, StreamingEMA] = {p: StreamingEMA(p) for p in EMA_PERIODS}
+        self.rsi = StreamingRSI()
+        self.atr = StreamingATR()
+        self.macd = StreamingMACD()
+
+    def update(self, candle: Candle):
+        """Advance all indicators by one candle."""
+        self.count += 1
+        for ema in self.emas.values():
+            ema.update(candle.close)
+        self.rsi.update(candle.close)
+        self.atr.update(candle)
+        self.macd.update(candle.close)
+
+    def ema(self, period: int) -> float:
+        """Current EMA value for one of EMA_PERIODS."""
+        return self.emas[period].value
+
+    @property
+    def avg_atr(self) -> float:
+        """Average of the last 20 ATR values (as used for volatility_ratio)."""
+        if self.count >= 20:
+            return sum(self.atr.history) / 20
+        return self.atr.value
+
+# ═══════════════════════════════════════════════════════════════════════════
+# SWING INDEX
+# ═══════════════════════════════════════════════════════════════════════════
+# Swing highs/lows are 2-bar fractals: a high strictly above the two highs
+# on each side (a low strictly below the two lows on each side). Whether
+# bar p is a swing depends only on bars p-2..p+2, so flags computed once
+# for a series hold for every window of it; a window just ignores its
+# first and last two bars. Detectors and S/R confluence query one shared
+# index instead of each rescanning the tail.
+
+def _swing_flags(values: np.ndarray, greater: bool) -> np.ndarray:
+    """Fractal flags for bars 2..n-3 of `values`."""
+    inner = values[2:-2]
+    if greater:
+        return (inner > values[1:-3]) & (inner > values[:-4]) & (inner > values[3:-1]) & (inner > values[4:])
+    return (inner < values[1:-3]) & (inner < values[:-4]) & (inner < values[3:-1]) & (inner < values[4:])
+
+class SwingView:
+    """
+    A window of a SwingIndex: high/low/close column views plus swing
+    flags. Positions are relative to the window.
+
+    Built with from_candles (no index), the flags are computed on first
+    use, so callers that only need the columns pay nothing for them.
+    """
+
+    __slots__ = ('high', 'low', 'close', '_is_high', '_is_low')
+
+    def __init__(self, high, low, close, is_high=None, is_low=None):
+        self.high = high
+        self.low = low
+        self.close = close
+        self._is_high = is_high
+        self._is_low = is_low
+
+    @classmethod
+    def from_candles(cls, candles) -> 'SwingView':
+        return cls(
+            candle_column(candles, 'high'),
+            candle_column(candles, 'low'),
+            candle_column(candles, 'close'),
+        )
+
+    def __len__(self) -> int:
+        return len(self.close)
+
+    def window(self, start: int, end: int) -> 'SwingView':
+        """Sub-window [start, end), same rules as slicing a list."""
+        if self._is_high is None:
+            return SwingView(self.high[start:end], self.low[start:end], self.close[start:end])
+        return SwingView(
+            self.high[start:end], self.low[start:end], self.close[start:end],
+            self._is_high[start:end], self._is_low[start:end],
+        )
+
+    def tail(self, lookback: int) -> 'SwingView':
+        """The last `lookback` bars (like candles[-lookback:])."""
+        return self.window(-lookback, None) if lookback else self
+
+    def pivot_highs(self) -> np.ndarray:
+        """Positions of swing highs with two bars on each side inside the window."""
+        if self._is_high is None:
+            return _swing_flags(self.high, True).nonzero()[0] + 2
+        return self._is_high[2:-2].nonzero()[0] + 2
+
+    def pivot_lows(self) -> np.ndarray:
+        """Positions of swing lows with two bars on each side inside the window."""
+        if self._is_low is None:
+            return _swing_flags(self.low, False).nonzero()[0] + 2
+        return self._is_low[2:-2].nonzero()[0] + 2
+
+class SwingIndex:
+    """
+    Swing high/low flags and high/low/close columns for one candle
+    stream, built once (vectorized) and extended bar by bar.
+
+    max_length bounds memory for live streams: older bars are dropped
+    once twice that many are held. Views are valid until the next change.
+    """
+
+    def __init__(self, candles=None, max_length: Optional[int] = None):
+        self.max_length = max_length
+        self._n = 0
+        self._high = np.empty(0)
+        self._low = np.empty(0)
+        self._close = np.empty(0)
+        self._is_high = np.zeros(0, dtype=bool)
+        self._is_low = np.zeros(0, dtype=bool)
+        if candles is not None and len(candles):
+            self.extend(candles)
+
+    def __len__(self) -> int:
+        return self._n
+
+    def _reserve(self, extra: int):
+        needed = self._n + extra
+        if self.max_length and needed > 2 * self.max_length:
+            # Drop the oldest bars, keeping at least max_length
+            drop = max(0, self._n - self.max_length)
+            for name in ('_high', '_low', '_close', '_is_high', '_is_low'):
+                column = getattr(self, name)
+                column[:self._n - drop] = column[drop:self._n]
+            self._n -= drop
+            needed -= drop
+
+        capacity = len(self._close)
+        if needed > capacity:
+            capacity = max(needed, 2 * capacity, 256)
+            for name in ('_high', '_low', '_close', '_is_high', '_is_low'):
+                column = getattr(self, name)
+                grown = np.zeros(capacity, dtype=column.dtype)
+                grown[:self._n] = column[:self._n]
+                setattr(self, name, grown)
+
+    def extend(self, candles):
+        """Append many candles (vectorized)."""
+        count = len(candles)
+        if count == 0:
+            return
+        self._reserve(count)
+        old_n, new_n = self._n, self._n + count
+        self._high[old_n:new_n] = candle_column(candles, 'high')
+        self._low[old_n:new_n] = candle_column(candles, 'low')
+        self._close[old_n:new_n] = candle_column(candles, 'close')
+        self._n = new_n
+
+        # Bars from old_n - 2 on now have (more) right-hand neighbours
+        first = max(2, old_n - 2)
+        if new_n - 2 > first:
+            self._is_high[first:new_n - 2] = _swing_flags(self._high[first - 2:new_n], True)
+            self._is_low[first:new_n - 2] = _swing_flags(self._low[first - 2:new_n], False)
+        self._is_high[max(0, new_n - 2):new_n] = False
+        self._is_low[max(0, new_n - 2):new_n] = False
+
+    def append(self, candle: Candle):
+        """Append one closed candle; confirms the swing flags of bar n-3."""
+        self._reserve(1)
+        n = self._n
+        self._high[n] = candle.high
+        self._low[n] = candle.low
+        self._close[n] = candle.close
+        self._is_high[n] = False
+        self._is_low[n] = False
+        self._n = n + 1
+        self._confirm(n - 2)
+
+    def replace_last(self, candle: Candle):
+        """Overwrite the last bar (an update to the still-open candle)."""
+        n = self._n
+        self._high[n - 1] = candle.high
+        self._low[n - 1] = candle.low
+        self._close[n - 1] = candle.close
+        self._confirm(n - 3)
+
+    def _confirm(self, p: int):
+        if p < 2 or p + 2 >= self._n:
+            return
+        h = self._high
+        l = self._low
+        self._is_high[p] = h[p] > h[p - 1] and h[p] > h[p - 2] and h[p] > h[p + 1] and h[p] > h[p + 2]
+        self._is_low[p] = l[p] < l[p - 1] and l[p] < l[p - 2] and l[p] < l[p + 1] and l[p] < l[p + 2]
+
+    def view(self, start: int = 0, end: Optional[int] = None) -> SwingView:
+        """Window [start, end) of the held bars (negative values count from the end)."""
+        n = self._n
+        return SwingView(
+            self._high[:n], self._low[:n], self._close[:n], self._is_high[:n], self._is_low[:n],
+        ).window(start, end)
+
 # ═══════════════════════════════════════════════════════════════════════════
 # TIER2+ ENHANCEMENT FEATURES
 # ═══════════════════════════════════════════════════════════════════════════
@@ -188,13 +667,14 @@ def volume_confirmation(
         }
 
     # Calculate average volume before breakout
-    avg_volume = sum(c.volume for c in candles[breakout_index-lookback:breakout_index]) / lookback
-    breakout_volume = candles[breakout_index].volume
+    volumes = candle_column(candles[breakout_index-lookback:breakout_index+1], 'volume').tolist()
+    avg_volume = sum(volumes[:-1]) / lookback
+    breakout_volume = volumes[-1]
 
     ratio = breakout_volume / avg_volume if avg_volume > 0 else 1.0
 
     # Determine volume trend
-    recent_volumes = [c.volume for c in candles[breakout_index-5:breakout_index]]
+    recent_volumes = volumes[-6:-1]
     if len(recent_volumes) >= 3:
         if recent_volumes[-1] > recent_volumes[0] * 1.2:
             trend = 'increasing'
@@ -213,10 +693,12 @@ def volume_confirmation(
 
 def trend_context(
     candles: List[Candle],
-    current_index: int
+    current_index: int,
+    indicators: Optional[IndicatorState] = None
 ) -> Dict[str, Any]:
     """
     Analyze trend context using EMAs.
+    Reads the EMAs from `indicators` when it has been advanced to current_index.
     """
     if current_index < 200:
         return {
@@ -227,12 +709,18 @@ def trend_context(
             'ema_200_position': 'crossing'
         }
 
-    prices = [c.close for c in candles[:current_index+1]]
-    current_price = prices[-1]
+    if indicators is not None:
+        current_price = candles[current_index].close
+        ema_20 = indicators.ema(20)
+        ema_50 = indicators.ema(50)
+        ema_200 = indicators.ema(200)
+    else:
+        prices = candle_column(candles[:current_index+1], 'close').tolist()
+        current_price = prices[-1]
 
-    ema_20 = calculate_ema(prices, 20)[-1]
-    ema_50 = calculate_ema(prices, 50)[-1]
-    ema_200 = calculate_ema(prices, 200)[-1]
+        ema_20 = calculate_ema(prices, 20)[-1]
+        ema_50 = calculate_ema(prices, 50)[-1]
+        ema_200 = calculate_ema(prices, 200)[-1]
 
     # Determine trend direction
     if current_price > ema_20 > ema_50 > ema_200:
@@ -326,59 +814,43 @@ def zone_retest_validation(
 def support_resistance_confluence(
     candles: List[Candle],
     current_price: float,
-    lookback: int = 100
+    lookback: int = 100,
+    swings: Optional[SwingView] = None
 ) -> Dict[str, Any]:
     """
     Find nearby support/resistance levels and their strength.
+
+    swings: optional SwingView aligned with candles; its pivots are reused
+    instead of rescanning the last `lookback` candles.
     """
-    if len(candles) < lookback:
-        lookback = len(candles)
-
-    recent_candles = candles[-lookback:]
-
-    # Find pivot highs and lows
-    pivot_highs = []
-    pivot_lows = []
-
-    for i in range(2, len(recent_candles) - 2):
-        c = recent_candles[i]
-        # Pivot high
-        if (c.high > recent_candles[i-1].high and
-            c.high > recent_candles[i-2].high and
-            c.high > recent_candles[i+1].high and
-            c.high > recent_candles[i+2].high):
-            pivot_highs.append(c.high)
-        # Pivot low
-        if (c.low < recent_candles[i-1].low and
-            c.low < recent_candles[i-2].low and
-            c.low < recent_candles[i+1].low and
-            c.low < recent_candles[i+2].low):
-            pivot_lows.append(c.low)
-
-    # Find nearest S/R
-    nearest_support = None
-    nearest_resistance = None
-    support_strength = 0
-    resistance_strength = 0
+    if swings is None:
+        swings = SwingView.from_candles(candles[-lookback:])
+    else:
+        swings = swings.tail(lookback)
+
+    highs = swings.high
+    lows = swings.low
+
+    # Pivot highs and lows (strictly above/below 2 candles on each side)
+    pivot_highs = highs[swings.pivot_highs()]
+    pivot_lows = lows[swings.pivot_lows()]
 
     tolerance = current_price * 0.02  # 2% tolerance
 
-    for low in pivot_lows:
-        if low < current_price:
-            if nearest_support is None or low > nearest_support:
-                nearest_support = low
-            # Count touches
-            touches = sum(1 for c in recent_candles if abs(c.low - low) < tolerance)
-            if touches > support_strength:
-                support_strength = touches
-
-    for high in pivot_highs:
-        if high > current_price:
-            if nearest_resistance is None or high < nearest_resistance:
-                nearest_resistance = high
-            touches = sum(1 for c in recent_candles if abs(c.high - high) < tolerance)
-            if touches > resistance_strength:
-                resistance_strength = touches
+    # Nearest S/R and the most touched level on each side
+    supports = pivot_lows[pivot_lows < current_price]
+    nearest_support = float(supports.max()) if len(supports) else None
+    support_strength = 0
+    if len(supports):
+        touches = (np.abs(lows[None, :] - supports[:, None]) < tolerance).sum(axis=1)
+        support_strength = int(touches.max())
+
+    resistances = pivot_highs[pivot_highs > current_price]
+    nearest_resistance = float(resistances.min()) if len(resistances) else None
+    resistance_strength = 0
+    if len(resistances):
+        touches = (np.abs(highs[None, :] - resistances[:, None]) < tolerance).sum(axis=1)
+        resistance_strength = int(touches.max())
 
     distance_to_support = ((current_price - nearest_support) / current_price * 100) if nearest_support else 100
     distance_to_resistance = ((nearest_resistance - current_price) / current_price * 100) if nearest_resistance else 100
@@ -394,18 +866,23 @@ def support_resistance_confluence(
 
 def rsi_divergence_check(
     candles: List[Candle],
-    lookback: int = 20
+    lookback: int = 20,
+    rsi_values: Optional[List[float]] = None
 ) -> str:
     """
     Check for RSI divergence.
     Bullish: Price makes lower low, RSI makes higher low
     Bearish: Price makes higher high, RSI makes lower high
+
+    rsi_values: precomputed RSI series aligned to the end of candles
+    (at least `lookback` values); computed from candles if omitted.
     """
     if len(candles) < lookback + RSI_PERIOD:
         return 'none'
 
-    prices = [c.close for c in candles]
-    rsi_values = calculate_rsi(prices)
+    prices = candle_column(candles, 'close').tolist()
+    if rsi_values is None:
+        rsi_values = calculate_rsi(prices)
 
     recent_prices = prices[-lookback:]
     recent_rsi = rsi_values[-lookback:]
@@ -508,6 +985,196 @@ def calculate_quality_grade(features: PatternFeatures) -> str:
     else:
         return 'F'
 
+# ═══════════════════════════════════════════════════════════════════════════
+# BAR CONTEXT
+# ═══════════════════════════════════════════════════════════════════════════
+
+@dataclass
+class BarContext:
+    """
+    Pattern-independent features of one bar: volatility, volume, trend,
+    S/R, momentum and time. Shared by every detection ending on the bar.
+    """
+    bar: int
+    atr: float
+    volatility_ratio: float
+    vol_info: Dict[str, Any]
+    trend_info: Dict[str, Any]
+    sr_info: Dict[str, Any]
+    rsi: float
+    divergence: str
+    macd_histogram: float
+    macd_signal: str
+    timestamp: int
+    entry_timing_score: float
+    risk_reward_score: float
+
+def bar_context(
+    candles: List[Candle],
+    bar: int,
+    indicators: Optional[IndicatorState] = None,
+    swings: Optional[SwingView] = None
+) -> BarContext:
+    """
+    Pattern-independent part of extract_features for candles[bar]
+    (indicators / swings as in extract_features).
+    """
+    if len(candles) < 200:
+        raise ValueError("Need at least 200 candles for feature extraction")
+
+    if indicators is not None and indicators.count != bar + 1:
+        raise ValueError(
+            f"IndicatorState is at candle {indicators.count - 1}, expected {bar}"
+        )
+
+    swing_offset = len(candles) - len(swings) if swings is not None else 0
+    if swing_offset < 0:
+        raise ValueError(f"SwingView has {len(swings)} bars, candles only {len(candles)}")
+
+    current_candle = candles[bar]
+
+    if indicators is not None:
+        current_atr = indicators.atr.value
+        avg_atr = indicators.avg_atr
+    else:
+        prices = candle_column(candles[:bar+1], 'close').tolist()
+        atr_values = calculate_atr(candles[:bar+1])
+        current_atr = atr_values[-1]
+        avg_atr = sum(atr_values[-20:]) / 20 if len(atr_values) >= 20 else current_atr
+    volatility_ratio = current_atr / avg_atr if avg_atr > 0 else 1.0
+
+    # Volume features
+    vol_info = volume_confirmation(candles, bar)
+
+    # Trend context
+    trend_info = trend_context(candles, bar, indicators)
+
+    # S/R (only the last 100 candles are used)
+    sr_start = max(0, bar - 99)
+    sr_info = support_resistance_confluence(
+        candles[sr_start:bar+1], current_candle.close,
+        swings=(swings.window(sr_start - swing_offset, bar + 1 - swing_offset)
+                if swings is not None and sr_start >= swing_offset else None)
+    )
+
+    # Momentum
+    if indicators is not None:
+        current_rsi = indicators.rsi.value
+        divergence_window = len(indicators.rsi.history) + RSI_PERIOD
+        divergence = rsi_divergence_check(
+            candles[bar + 1 - divergence_window:bar+1],
+            rsi_values=list(indicators.rsi.history)
+        )
+        current_histogram = indicators.macd.histogram
+        prev_histogram = indicators.macd.prev_histogram
+    else:
+        rsi_values = calculate_rsi(prices)
+        current_rsi = rsi_values[-1]
+        divergence = rsi_divergence_check(candles[:bar+1])
+
+        macd_line, signal_line, histogram = calculate_macd(prices)
+        current_histogram = histogram[-1]
+        prev_histogram = histogram[-2] if len(histogram) >= 2 else None
+
+    macd_sig = 'none'
+    if prev_histogram is not None:
+        if current_histogram > 0 and prev_histogram <= 0:
+            macd_sig = 'bullish_cross'
+        elif current_histogram < 0 and prev_histogram >= 0:
+            macd_sig = 'bearish_cross'
+
+    return BarContext(
+        bar=bar,
+        atr=current_atr,
+        volatility_ratio=volatility_ratio,
+        vol_info=vol_info,
+        trend_info=trend_info,
+        sr_info=sr_info,
+        rsi=current_rsi,
+        divergence=divergence,
+        macd_histogram=current_histogram,
+        macd_signal=macd_sig,
+        timestamp=current_candle.timestamp,
+        entry_timing_score=calculate_entry_timing_score(current_rsi, divergence, macd_sig),
+        risk_reward_score=calculate_rr_score(sr_info, trend_info),
+    )
+
+class FeatureCache:
+    """
+    LRU of BarContext keyed by (symbol, timeframe, bar).
+
+    A bar is identified by its open time plus the open time of the first
+    candle (prefix-computed indicators depend on where the history starts)
+    and whether an IndicatorState supplied the indicators, so a context is
+    only reused for the same inputs. Without a symbol the entries are
+    only valid for one candle series; detect_all then uses a cache per call.
+
+    Reuse across calls needs the same bar under the same history start:
+    several consumers of one series (detect_all and a backtest, a sweep,
+    detect_all_history). A sliding window such as live_scanner's ring
+    buffer gets no hits across scans. Each scan is at a new bar, and only
+    volume and S/R would stay valid once the window start moves. So the
+    scanner shares contexts only within one detect_all call.
+    """
+
+    def __init__(self, max_entries: int = FEATURE_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries: 'OrderedDict[tuple, BarContext]' = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def context(
+        self,
+        candles: List[Candle],
+        bar: int,
+        indicators: Optional[IndicatorState] = None,
+        swings: Optional[SwingView] = None,
+        symbol: Optional[str] = None,
+        timeframe: Optional[str] = None
+    ) -> BarContext:
+        """Cached bar_context(candles, bar, indicators, swings)."""
+        if isinstance(candles, CandleArray):
+            first_ts, bar_ts = int(candles.timestamp[0]), int(candles.timestamp[bar])
+        else:
+            first_ts, bar_ts = candles[0].timestamp, candles[bar].timestamp
+        key = (symbol, timeframe, first_ts, bar_ts, indicators is not None)
+
+        context = self._entries.get(key)
+        if context is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return context
+
+        self.misses += 1
+        context = bar_context(candles, bar, indicators, swings)
+        self._entries[key] = context
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+        return context
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'entries': len(self._entries),
+            'max_entries': self.max_entries,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hit_rate,
+        }
+
+    def clear(self):
+        self._entries.clear()
+
 # ═══════════════════════════════════════════════════════════════════════════
 # MAIN FEATURE EXTRACTION
 # ═══════════════════════════════════════════════════════════════════════════
@@ -517,58 +1184,51 @@ def extract_features(
     pattern_start: int,
     pattern_end: int,
     zone_price: Optional[float] = None,
-    zone_type: Optional[str] = None
+    zone_type: Optional[str] = None,
+    indicators: Optional[IndicatorState] = None,
+    swings: Optional[SwingView] = None,
+    context: Optional[BarContext] = None
 ) -> PatternFeatures:
     """
     Extract all features for a detected pattern.
+
+    indicators: optional IndicatorState advanced through candles[pattern_end].
+    ATR/EMA/RSI/MACD are read from it instead of being recomputed over the
+    whole prefix, which keeps per-bar callers (backtests) linear.
+
+    swings: optional SwingView over the last len(swings) candles; S/R
+    confluence reads its pivots instead of rescanning when it covers the
+    S/R window.
+
+    context: BarContext of pattern_end (e.g. from a FeatureCache); only
+    the pattern-specific features (price change, height, duration, zone
+    retest, scores) are computed when given.
     """
-    from datetime import datetime
+    if context is None:
+        context = bar_context(candles, pattern_end, indicators, swings)
+    elif context.bar != pattern_end:
+        raise ValueError(f"BarContext is for candle {context.bar}, expected {pattern_end}")
 
-    if len(candles) < 200:
-        raise ValueError("Need at least 200 candles for feature extraction")
+    from datetime import datetime
 
     current_candle = candles[pattern_end]
-    prices = [c.close for c in candles[:pattern_end+1]]
 
     # Price features
     price_change = (current_candle.close - candles[pattern_start].close) / candles[pattern_start].close * 100
 
-    atr_values = calculate_atr(candles[:pattern_end+1])
-    current_atr = atr_values[-1]
-    avg_atr = sum(atr_values[-20:]) / 20 if len(atr_values) >= 20 else current_atr
-    volatility_ratio = current_atr / avg_atr if avg_atr > 0 else 1.0
-
-    # Volume features
-    vol_info = volume_confirmation(candles, pattern_end)
-
     # Pattern structure
     pattern_duration = pattern_end - pattern_start
-    pattern_high = max(c.high for c in candles[pattern_start:pattern_end+1])
-    pattern_low = min(c.low for c in candles[pattern_start:pattern_end+1])
+    pattern_window = candles[pattern_start:pattern_end+1]
+    pattern_high = float(candle_column(pattern_window, 'high').max())
+    pattern_low = float(candle_column(pattern_window, 'low').min())
     pattern_height = (pattern_high - pattern_low) / pattern_low * 100
 
-    # Trend context
-    trend_info = trend_context(candles, pattern_end)
-
-    # S/R
-    sr_info = support_resistance_confluence(candles[:pattern_end+1], current_candle.close)
-
-    # Momentum
-    rsi_values = calculate_rsi(prices)
-    current_rsi = rsi_values[-1]
-    divergence = rsi_divergence_check(candles[:pattern_end+1])
-
-    macd_line, signal_line, histogram = calculate_macd(prices)
-    current_histogram = histogram[-1]
-    macd_sig = 'none'
-    if len(histogram) >= 2:
-        if histogram[-1] > 0 and histogram[-2] <= 0:
-            macd_sig = 'bullish_cross'
-        elif histogram[-1] < 0 and histogram[-2] >= 0:
-            macd_sig = 'bearish_cross'
+    vol_info = context.vol_info
+    trend_info = context.trend_info
+    sr_info = context.sr_info
 
     # Time features
-    dt = datetime.fromtimestamp(current_candle.timestamp / 1000)
+    dt = datetime.fromtimestamp(context.timestamp / 1000)
 
     # Zone Retest (CRITICAL)
     retest_info = {'has_retest': False, 'retest_candles_ago': 0, 'retest_quality': 0.0}
@@ -579,8 +1239,8 @@ def extract_features(
     pattern_quality = calculate_pattern_quality_score(
         vol_info, trend_info, sr_info, pattern_height, pattern_duration
     )
-    entry_timing = calculate_entry_timing_score(current_rsi, divergence, macd_sig)
-    rr_score = calculate_rr_score(sr_info, trend_info)
+    entry_timing = context.entry_timing_score
+    rr_score = context.risk_reward_score
 
     # Overall score with Zone Retest bonus
     overall = (pattern_quality * 0.4 + entry_timing * 0.3 + rr_score * 0.3)
@@ -589,8 +1249,8 @@ def extract_features(
 
     return PatternFeatures(
         price_change_percent=price_change,
-        volatility_atr=current_atr,
-        volatility_ratio=volatility_ratio,
+        volatility_atr=context.atr,
+        volatility_ratio=context.volatility_ratio,
         volume_avg=vol_info.get('volume_avg', 0),
         volume_breakout_ratio=vol_info['volume_ratio'],
         volume_trend=vol_info['volume_trend'],
@@ -609,10 +1269,10 @@ def extract_features(
             sr_info['distance_to_resistance_percent']
         ),
         sr_strength=max(sr_info['support_strength'], sr_info['resistance_strength']),
-        rsi_value=current_rsi,
-        rsi_divergence=divergence,
-        macd_histogram=current_histogram,
-        macd_signal=macd_sig,
+        rsi_value=context.rsi,
+        rsi_divergence=context.divergence,
+        macd_histogram=context.macd_histogram,
+        macd_signal=context.macd_signal,
         hour_of_day=dt.hour,
         day_of_week=dt.weekday(),
         is_weekend=dt.weekday() >= 5,
@@ -705,12 +1365,24 @@ def calculate_rr_score(
 
 __all__ = [
     'Candle',
+    'CandleArray',
+    'candle_column',
     'PatternFeatures',
     'extract_features',
+    'BarContext',
+    'bar_context',
+    'FeatureCache',
     'calculate_ema',
     'calculate_rsi',
     'calculate_atr',
     'calculate_macd',
+    'StreamingEMA',
+    'StreamingRSI',
+    'StreamingATR',
+    'StreamingMACD',
+    'IndicatorState',
+    'SwingIndex',
+    'SwingView',
     'volume_confirmation',
     'trend_context',
     'zone_retest_validation',
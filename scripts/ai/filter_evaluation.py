@@ -0,0 +1,296 @@
+# scripts/ai/filter_evaluation.py
+# In-process filter evaluation over a columnar detection/outcome frame
+# GEMRAL AI BRAIN - Phase 8
+#
+# The resolved detections of the lookback window and their pattern
+# features are read once into a DetectionFrame (one NumPy column per
+# field). Every filter's conditions become a boolean mask over it, so the
+# pass/fail win rates of all active filters, the base win rate, threshold
+# candidates and the zone retest impact come from the same frame, instead
+# of one get_filtered_win_rate / find_optimal_filter_threshold RPC (and a
+# repeated base win rate) per filter.
+#
+# Conditions follow get_filtered_win_rate: a key that is absent or null
+# does not constrain, and a missing feature value fails the comparison
+# (SQL NULL). Filter and threshold statistics count detections that have
+# pattern features (the RPCs inner-join pattern_features).
+#
+# Differences from the SQL functions this replaces:
+# - trend_strength_min is applied, as FilterEngine does at detection time;
+#   get_filtered_win_rate ignored it.
+# - Threshold candidates use the lookback window and detections with
+#   features, base win rate included; find_optimal_filter_threshold used
+#   all-time detections and an all-time base rate without the features join.
+# - volume_breakout_ratio is scanned over 1.0-3.0 (a ratio); the SQL grid
+#   0.1-0.9 passed nearly every detection at every threshold.
+
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import List, Dict, Any, Optional
+
+import numpy as np
+
+# ═══════════════════════════════════════════════════════════════════════════
+# CONFIGURATION
+# ═══════════════════════════════════════════════════════════════════════════
+
+PAGE_SIZE = 1000  # PostgREST max rows per select
+
+NUMERIC_FEATURES = [
+    'volume_breakout_ratio',
+    'rsi_value',
+    'pattern_quality_score',
+    'overall_score',
+    'trend_strength',
+    'retest_quality_score',
+]
+
+# Condition key -> (feature, comparison)
+RANGE_CONDITIONS = {
+    'volume_ratio_min': ('volume_breakout_ratio', 'min'),
+    'volume_ratio_max': ('volume_breakout_ratio', 'max'),
+    'rsi_min': ('rsi_value', 'min'),
+    'rsi_max': ('rsi_value', 'max'),
+    'pattern_quality_min': ('pattern_quality_score', 'min'),
+    'trend_strength_min': ('trend_strength', 'min'),
+}
+
+# Threshold grid per feature (find_optimal_filter_threshold tests 0.1-0.9
+# for every feature)
+DEFAULT_THRESHOLDS = np.round(np.arange(0.1, 1.0, 0.1), 1)
+FEATURE_THRESHOLDS = {
+    'volume_breakout_ratio': np.arange(1.0, 3.01, 0.25),
+}
+
+# ═══════════════════════════════════════════════════════════════════════════
+# FRAME
+# ═══════════════════════════════════════════════════════════════════════════
+
+@dataclass
+class DetectionFrame:
+    """Resolved (win/loss) detections with their features, one array per column."""
+    id: np.ndarray                 # object
+    pattern_id: np.ndarray         # object (None if unknown)
+    win: np.ndarray                # bool, outcome == 'win'
+    has_features: np.ndarray       # bool, a pattern_features row exists
+    features: Dict[str, np.ndarray]  # NUMERIC_FEATURES -> float64, nan if missing
+    trend_direction: np.ndarray    # object (None if missing)
+    has_zone_retest: np.ndarray    # bool
+
+    def __len__(self) -> int:
+        return len(self.id)
+
+    @classmethod
+    def from_rows(cls, rows: List[Dict]) -> 'DetectionFrame':
+        """
+        Frame from ai_pattern_detections rows with an embedded
+        pattern_features(...) object or list (first row used).
+        """
+        ids, pattern_ids, wins, present, directions, retests = [], [], [], [], [], []
+        values = {name: [] for name in NUMERIC_FEATURES}
+
+        for row in rows:
+            features = row.get('pattern_features')
+            if isinstance(features, list):
+                features = features[0] if features else None
+            features = features or {}
+
+            ids.append(row['id'])
+            pattern_ids.append(row.get('pattern_id'))
+            wins.append(row.get('outcome') == 'win')
+            present.append(bool(features))
+            directions.append(features.get('trend_direction'))
+            retests.append(features.get('has_zone_retest') is True)
+            for name in NUMERIC_FEATURES:
+                value = features.get(name)
+                values[name].append(np.nan if value is None else float(value))
+
+        return cls(
+            id=np.array(ids, dtype=object),
+            pattern_id=np.array(pattern_ids, dtype=object),
+            win=np.array(wins, dtype=bool),
+            has_features=np.array(present, dtype=bool),
+            features={name: np.array(column, dtype=np.float64) for name, column in values.items()},
+            trend_direction=np.array(directions, dtype=object),
+            has_zone_retest=np.array(retests, dtype=bool),
+        )
+
+    def subset(self, mask: np.ndarray) -> 'DetectionFrame':
+        return DetectionFrame(
+            id=self.id[mask],
+            pattern_id=self.pattern_id[mask],
+            win=self.win[mask],
+            has_features=self.has_features[mask],
+            features={name: column[mask] for name, column in self.features.items()},
+            trend_direction=self.trend_direction[mask],
+            has_zone_retest=self.has_zone_retest[mask],
+        )
+
+def load_detection_frame(supabase, days_back: int, now: Optional[datetime] = None) -> DetectionFrame:
+    """
+    Win/loss detections of the last days_back days with their pattern
+    features: one paged select with pattern_features embedded.
+    """
+    since = ((now or datetime.now(timezone.utc)) - timedelta(days=days_back)).isoformat()
+    columns = ', '.join(NUMERIC_FEATURES + ['trend_direction', 'has_zone_retest'])
+    rows: List[Dict] = []
+    last_id = None
+
+    while True:
+        query = supabase.table('ai_pattern_detections').select(
+            f'id, pattern_id, outcome, pattern_features({columns})'
+        ).in_('outcome', ['win', 'loss']).gt('detected_at', since)
+        if last_id is not None:
+            query = query.gt('id', last_id)
+        page = query.order('id').limit(PAGE_SIZE).execute().data or []
+        rows.extend(page)
+        if len(page) < PAGE_SIZE:
+            break
+        last_id = page[-1]['id']
+
+    return DetectionFrame.from_rows(rows)
+
+# ═══════════════════════════════════════════════════════════════════════════
+# MASKS
+# ═══════════════════════════════════════════════════════════════════════════
+
+def condition_mask(frame: DetectionFrame, conditions: Dict[str, Any]) -> np.ndarray:
+    """Detections passing every condition (get_filtered_win_rate semantics)."""
+    mask = frame.has_features.copy()
+
+    for key, (feature, kind) in RANGE_CONDITIONS.items():
+        bound = conditions.get(key)
+        if bound is None:
+            continue
+        column = frame.features[feature]
+        # nan compares False, like NULL in SQL
+        mask &= column >= float(bound) if kind == 'min' else column <= float(bound)
+
+    direction = conditions.get('trend_direction')
+    if direction is not None:
+        mask &= frame.trend_direction == direction
+
+    if _truthy(conditions.get('require_zone_retest')):
+        mask &= frame.has_zone_retest
+
+    return mask
+
+def _truthy(value: Any) -> bool:
+    if isinstance(value, str):
+        return value.strip().lower() in ('true', 't', '1', 'yes', 'on')
+    return bool(value)
+
+def _rates(wins: np.ndarray, totals: np.ndarray) -> np.ndarray:
+    return np.divide(wins, totals, out=np.zeros(len(totals)), where=totals > 0)
+
+# ═══════════════════════════════════════════════════════════════════════════
+# EVALUATOR
+# ═══════════════════════════════════════════════════════════════════════════
+
+class FilterEvaluator:
+    """
+    Filter statistics from one DetectionFrame.
+
+    evaluate() scores all filters at once, threshold_candidates() scans
+    the threshold grid of a feature, zone_retest_impact() compares
+    detections with and without a zone retest.
+    """
+
+    def __init__(self, frame: DetectionFrame, pattern_id: Optional[str] = None):
+        if pattern_id is not None:
+            frame = frame.subset(frame.pattern_id == pattern_id)
+        self.frame = frame
+        self.base_total = int(frame.has_features.sum())
+        self.base_wins = int((frame.win & frame.has_features).sum())
+        self.base_win_rate = self.base_wins / self.base_total if self.base_total else 0.0
+
+    def evaluate(self, filters: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Pass/fail counts and win rates for each filter ({'conditions': ...}).
+
+        improvement_percent is the passed win rate minus the base win rate,
+        in percentage points.
+        """
+        if not filters:
+            return []
+
+        masks = np.stack([condition_mask(self.frame, f.get('conditions') or {}) for f in filters])
+        wins = self.frame.win.astype(np.int64)
+
+        passed = masks.sum(axis=1)
+        passed_wins = masks.astype(np.int64) @ wins
+        failed = self.base_total - passed
+        failed_wins = self.base_wins - passed_wins
+        passed_rate = _rates(passed_wins, passed)
+        failed_rate = _rates(failed_wins, failed)
+
+        return [
+            {
+                'total': self.base_total,
+                'passed': int(passed[k]),
+                'failed': int(failed[k]),
+                'passed_win_rate': float(passed_rate[k]),
+                'failed_win_rate': float(failed_rate[k]),
+                'base_win_rate': self.base_win_rate,
+                'improvement_percent': float((passed_rate[k] - self.base_win_rate) * 100),
+            }
+            for k in range(len(filters))
+        ]
+
+    def threshold_candidates(
+        self,
+        feature: str,
+        thresholds: Optional[np.ndarray] = None,
+        min_trades: int = 30
+    ) -> List[Dict[str, float]]:
+        """
+        Win rate of `feature >= threshold` for each threshold with at least
+        min_trades detections, best first (find_optimal_filter_threshold,
+        but over this frame's window; see the module header).
+        """
+        if thresholds is None:
+            thresholds = FEATURE_THRESHOLDS.get(feature, DEFAULT_THRESHOLDS)
+        thresholds = np.asarray(thresholds, dtype=np.float64)
+
+        values = self.frame.features[feature]
+        present = self.frame.has_features
+        passing = (values[None, :] >= thresholds[:, None]) & present
+        trades = passing.sum(axis=1)
+        wins = passing.astype(np.int64) @ self.frame.win.astype(np.int64)
+        rates = _rates(wins, trades)
+
+        candidates = [
+            {
+                'threshold_value': float(thresholds[k]),
+                'trades_passed': int(trades[k]),
+                'win_rate': float(rates[k]),
+                'improvement': float(rates[k] - self.base_win_rate),
+            }
+            for k in np.flatnonzero(trades >= min_trades)
+        ]
+        candidates.sort(key=lambda c: c['win_rate'], reverse=True)
+        return candidates
+
+    def zone_retest_impact(self) -> Dict[str, float]:
+        """Win rates with and without a zone retest (all resolved detections)."""
+        retest = self.frame.has_zone_retest
+        win = self.frame.win
+        with_total, without_total = int(retest.sum()), int((~retest).sum())
+        with_wins, without_wins = int((win & retest).sum()), int((win & ~retest).sum())
+        return {
+            'trades_with_retest': with_total,
+            'trades_without_retest': without_total,
+            'win_rate_with_retest': with_wins / with_total if with_total else 0.0,
+            'win_rate_without_retest': without_wins / without_total if without_total else 0.0,
+        }
+
+# ═══════════════════════════════════════════════════════════════════════════
+# EXPORT
+# ═══════════════════════════════════════════════════════════════════════════
+
+__all__ = [
+    'DetectionFrame',
+    'FilterEvaluator',
+    'condition_mask',
+    'load_detection_frame',
+]
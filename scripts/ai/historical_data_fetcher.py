@@ -6,17 +6,21 @@ import os
 import time
 import requests
 from datetime import datetime, timedelta
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 from dataclasses import dataclass
 
-from feature_extractor import Candle
+import numpy as np
+
+from feature_extractor import Candle, CandleArray, candle_column
+from candle_cache import CandleDiskCache
 
 # ═══════════════════════════════════════════════════════════════════════════
 # CONFIGURATION
 # ═══════════════════════════════════════════════════════════════════════════
 
-BINANCE_API_URL = 'https://api.binance.com/api/v3'
-BINANCE_FUTURES_URL = 'https://fapi.binance.com/fapi/v1'
+# Override to point at a mirror or a local fixture server
+BINANCE_API_URL = os.getenv('BINANCE_API_URL', 'https://api.binance.com/api/v3')
+BINANCE_FUTURES_URL = os.getenv('BINANCE_FUTURES_URL', 'https://fapi.binance.com/fapi/v1')
 
 # Rate limiting
 MAX_CANDLES_PER_REQUEST = 1000
@@ -44,17 +48,30 @@ TIMEFRAME_MINUTES = {
 SUPABASE_URL = os.getenv('SUPABASE_URL')
 SUPABASE_SERVICE_KEY = os.getenv('SUPABASE_SERVICE_ROLE_KEY')
 
+# Direct Postgres connection string; enables the bulk COPY save path
+SUPABASE_DB_URL = os.getenv('SUPABASE_DB_URL')
+
 # ═══════════════════════════════════════════════════════════════════════════
 # BINANCE API
 # ═══════════════════════════════════════════════════════════════════════════
 
+# Pooled HTTP connections for the synchronous fetch path
+_session = requests.Session()
+
+def klines_base_url(futures: bool = False, base_url: Optional[str] = None) -> str:
+    """Kline source: explicit base_url, else the spot/futures API URL."""
+    if base_url:
+        return base_url.rstrip('/')
+    return BINANCE_FUTURES_URL if futures else BINANCE_API_URL
+
 def fetch_binance_klines(
     symbol: str,
     timeframe: str,
     start_time: Optional[int] = None,
     end_time: Optional[int] = None,
     limit: int = 1000,
-    futures: bool = False
+    futures: bool = False,
+    base_url: Optional[str] = None
 ) -> List[List]:
     """
     Fetch klines from Binance API.
@@ -66,12 +83,13 @@ def fetch_binance_klines(
         end_time: End timestamp in milliseconds
         limit: Number of candles (max 1000)
         futures: Use futures API instead of spot
+        base_url: Any Binance-compatible API root (e.g. a local fixture
+            server); overrides `futures`
 
     Returns:
         List of kline data
     """
-    base_url = BINANCE_FUTURES_URL if futures else BINANCE_API_URL
-    endpoint = f'{base_url}/klines'
+    endpoint = f'{klines_base_url(futures, base_url)}/klines'
 
     params = {
         'symbol': symbol,
@@ -86,7 +104,7 @@ def fetch_binance_klines(
 
     for attempt in range(MAX_RETRIES):
         try:
-            response = requests.get(endpoint, params=params, timeout=10)
+            response = _session.get(endpoint, params=params, timeout=10)
             response.raise_for_status()
             return response.json()
         except Exception as e:
@@ -109,17 +127,43 @@ def parse_kline(kline: List) -> Candle:
         volume=float(kline[5]),
     )
 
+def closed_candles(candles: CandleArray, timeframe: str, now_ms: Optional[int] = None) -> CandleArray:
+    """Candles whose bar has closed (open_time + timeframe <= now)."""
+    candles = CandleArray.from_candles(candles)
+    now_ms = int(time.time() * 1000) if now_ms is None else now_ms
+    timeframe_ms = TIMEFRAME_MINUTES.get(timeframe, 60) * 60 * 1000
+    return candles.take(np.flatnonzero(candles.timestamp + timeframe_ms <= now_ms))
+
 # ═══════════════════════════════════════════════════════════════════════════
 # HISTORICAL DATA FETCHER
 # ═══════════════════════════════════════════════════════════════════════════
 
 class HistoricalDataFetcher:
-    """Fetch and manage historical candle data."""
+    """
+    Fetch and manage historical candle data.
 
-    def __init__(self, use_cache: bool = True):
+    Lookup order: in-memory cache, local disk cache (CandleDiskCache),
+    Supabase, Binance. Only ranges the disk cache does not cover go to
+    Supabase, and only gaps in what Supabase returns go to Binance.
+
+    With a base_timeframe, every timeframe that is a multiple of it is
+    resampled from base candles (candle_resampler.py), so only the base
+    resolution is fetched and cached.
+    """
+
+    def __init__(
+        self,
+        use_cache: bool = True,
+        base_url: Optional[str] = None,
+        disk_cache: Optional[CandleDiskCache] = None,
+        base_timeframe: Optional[str] = None
+    ):
         self.use_cache = use_cache
-        self.cache: Dict[str, List[Candle]] = {}
+        self.base_url = base_url
+        self.base_timeframe = base_timeframe
+        self.cache: Dict[str, CandleArray] = {}
         self.supabase = None
+        self.disk_cache = disk_cache if disk_cache is not None else (CandleDiskCache() if use_cache else None)
 
         if use_cache and SUPABASE_URL and SUPABASE_SERVICE_KEY:
             from supabase import create_client
@@ -133,7 +177,7 @@ class HistoricalDataFetcher:
         end_date: datetime,
         futures: bool = False,
         save_to_db: bool = True
-    ) -> List[Candle]:
+    ) -> CandleArray:
         """
         Fetch historical candles for a date range.
 
@@ -146,37 +190,216 @@ class HistoricalDataFetcher:
             save_to_db: Save to database cache
 
         Returns:
-            List of Candle objects
+            CandleArray sorted by timestamp
         """
+        if self.base_timeframe and timeframe != self.base_timeframe:
+            from candle_resampler import can_derive
+            if can_derive(self.base_timeframe, timeframe):
+                return self.fetch_timeframes(symbol, [timeframe], start_date, end_date, futures, save_to_db)[timeframe]
+
+        return self._fetch_stream(symbol, timeframe, start_date, end_date, futures, save_to_db)
+
+    def _fetch_stream(
+        self,
+        symbol: str,
+        timeframe: str,
+        start_date: datetime,
+        end_date: datetime,
+        futures: bool,
+        save_to_db: bool
+    ) -> CandleArray:
+        """fetch_historical for one stream as served by the exchange (no resampling)."""
         print(f'[DataFetcher] Fetching {symbol} {timeframe} from {start_date} to {end_date}')
 
         # Check cache first
         cache_key = f'{symbol}_{timeframe}'
         if cache_key in self.cache:
             cached = self.cache[cache_key]
-            # Filter to date range
+            # Filter to date range (cache is sorted, so this is a view)
             start_ts = int(start_date.timestamp() * 1000)
             end_ts = int(end_date.timestamp() * 1000)
-            filtered = [c for c in cached if start_ts <= c.timestamp <= end_ts]
+            lo = np.searchsorted(cached.timestamp, start_ts, side='left')
+            hi = np.searchsorted(cached.timestamp, end_ts, side='right')
+            filtered = cached[lo:hi]
             if len(filtered) > 0:
                 print(f'[DataFetcher] Using cache: {len(filtered)} candles')
                 return filtered
 
+        start_ts = int(start_date.timestamp() * 1000)
+        end_ts = int(end_date.timestamp() * 1000)
+        source = self._cache_source(futures)
+
+        # Check local disk cache
+        parts = []
+        missing = [(start_ts, end_ts)]
+        if self.disk_cache:
+            cached, missing = self.disk_cache.load(symbol, timeframe, start_ts, end_ts, source)
+            if not missing:
+                print(f'[DataFetcher] Loaded from disk cache: {len(cached)} candles')
+                self.cache[cache_key] = cached
+                return cached
+            parts.append(cached)
+            if len(cached):
+                print(f'[DataFetcher] Disk cache: {len(cached)} candles, {len(missing)} missing ranges')
+
+        for range_start, range_end in missing:
+            parts.append(self._fetch_range(symbol, timeframe, range_start, range_end, futures, save_to_db, source))
+
+        # Remove duplicates (first occurrence wins) and sort
+        all_candles = CandleArray.concatenate(parts)
+        _, first_index = np.unique(all_candles.timestamp, return_index=True)
+        unique_candles = all_candles.take(first_index)
+
+        print(f'[DataFetcher] Total: {len(unique_candles)} unique candles')
+
+        # Save to cache
+        self.cache[cache_key] = unique_candles
+
+        return unique_candles
+
+    def fetch_timeframes(
+        self,
+        symbol: str,
+        timeframes: List[str],
+        start_date: datetime,
+        end_date: datetime,
+        futures: bool = False,
+        save_to_db: bool = True,
+        base_timeframe: Optional[str] = None
+    ) -> Dict[str, CandleArray]:
+        """
+        Candles of several timeframes of one symbol.
+
+        Timeframes derivable from the base timeframe (argument, else
+        self.base_timeframe, else the finest of `timeframes` if all others
+        are multiples of it) are resampled from a single base fetch; it
+        runs to the end of the last bucket, so the last bar of each
+        timeframe is as complete as the exchange's. The rest are fetched
+        directly.
+
+        Returns:
+            {timeframe: CandleArray}, bars opening in [start_date, end_date]
+        """
+        from candle_resampler import base_timeframe_for, can_derive, covering_end, derive_range
+
+        base = base_timeframe or self.base_timeframe or base_timeframe_for(timeframes)
+        derived = [tf for tf in timeframes if base and can_derive(base, tf)]
+        result: Dict[str, CandleArray] = {}
+
+        if derived:
+            start_ts = int(start_date.timestamp() * 1000)
+            end_ts = int(end_date.timestamp() * 1000)
+            base_end = datetime.fromtimestamp(covering_end(end_ts, base, derived) / 1000)
+            print(f'[DataFetcher] Deriving {symbol} {", ".join(tf for tf in derived if tf != base) or base} from {base}')
+            candles = self._fetch_stream(symbol, base, start_date, base_end, futures, save_to_db)
+            for timeframe in derived:
+                result[timeframe] = derive_range(candles, base, timeframe, start_ts, end_ts)
+
+        for timeframe in timeframes:
+            if timeframe not in result:
+                result[timeframe] = self.fetch_historical(symbol, timeframe, start_date, end_date, futures, save_to_db)
+        return result
+
+    def _cache_source(self, futures: bool) -> str:
+        """Disk cache namespace, so spot, futures and custom sources never mix."""
+        source = 'binance-futures' if futures else 'binance'
+        if self.base_url:
+            source += '-' + ''.join(c if c.isalnum() else '_' for c in self.base_url.split('://')[-1])
+        return source
+
+    def _fetch_range(
+        self,
+        symbol: str,
+        timeframe: str,
+        start_ts: int,
+        end_ts: int,
+        futures: bool,
+        save_to_db: bool,
+        source: str
+    ) -> CandleArray:
+        """
+        Candles for one range the disk cache is missing: Supabase first,
+        then Binance for whatever Supabase does not have. Completed
+        (closed-candle) ranges are written back to the disk cache.
+        """
+        timeframe_ms = TIMEFRAME_MINUTES.get(timeframe, 60) * 60 * 1000
+        parts = []
+        holes = [(start_ts, end_ts)]
+
         # Check database cache
         if self.use_cache and self.supabase:
-            db_candles = self._load_from_db(symbol, timeframe, start_date, end_date)
+            db_candles = self._load_from_db(
+                symbol, timeframe,
+                datetime.fromtimestamp(start_ts / 1000), datetime.fromtimestamp(end_ts / 1000)
+            )
+            # A bar still forming is refetched, whatever the DB holds for it
+            db_candles = closed_candles(db_candles, timeframe)
             if db_candles:
                 print(f'[DataFetcher] Loaded from DB: {len(db_candles)} candles')
-                return db_candles
+                parts.append(db_candles)
+                holes = self._missing_ranges(db_candles, timeframe, start_ts, end_ts)
 
-        # Fetch from Binance
-        all_candles = []
-        current_start = int(start_date.timestamp() * 1000)
-        end_ts = int(end_date.timestamp() * 1000)
+        complete = True
+        for hole_start, hole_end in holes:
+            fetched, hole_complete = self._fetch_from_exchange(symbol, timeframe, hole_start, hole_end, futures)
+            complete = complete and hole_complete
+            parts.append(fetched)
+
+            # Save to database
+            if save_to_db and self.supabase and fetched:
+                self._save_to_db(symbol, timeframe, fetched)
+
+        candles = CandleArray.concatenate(parts)
+        _, first_index = np.unique(candles.timestamp, return_index=True)
+        candles = candles.take(first_index)
+
+        if self.disk_cache:
+            # The still-open candle may change, so never mark it covered
+            last_closed = int(time.time() * 1000) - timeframe_ms
+            covered = [(start_ts, min(end_ts, last_closed))] if complete and start_ts <= last_closed else []
+            self.disk_cache.store(symbol, timeframe, candles, covered, source)
+
+        return candles
+
+    def _missing_ranges(
+        self,
+        candles: CandleArray,
+        timeframe: str,
+        start_ts: int,
+        end_ts: int
+    ) -> List[Tuple[int, int]]:
+        """Ranges of [start_ts, end_ts] that `candles` leaves uncovered (head, gaps, tail)."""
+        timeframe_ms = TIMEFRAME_MINUTES.get(timeframe, 60) * 60 * 1000
+        if len(candles) == 0:
+            return [(start_ts, end_ts)]
+
+        timestamps = candle_column(candles, 'timestamp')
+        ranges = []
+        if timestamps[0] - start_ts >= timeframe_ms:
+            ranges.append((start_ts, int(timestamps[0]) - 1))
+        for gap_start, gap_end in self.detect_gaps(candles, timeframe):
+            ranges.append((int(gap_start.timestamp() * 1000) + timeframe_ms, int(gap_end.timestamp() * 1000) - 1))
+        if end_ts - timestamps[-1] >= timeframe_ms:
+            ranges.append((int(timestamps[-1]) + timeframe_ms, end_ts))
+        return ranges
+
+    def _fetch_from_exchange(
+        self,
+        symbol: str,
+        timeframe: str,
+        start_ts: int,
+        end_ts: int,
+        futures: bool
+    ) -> Tuple[CandleArray, bool]:
+        """Page through Binance klines; returns (candles, completed without errors)."""
+        batches: List[CandleArray] = []
+        fetched = 0
+        current_start = start_ts
+        complete = True
 
         timeframe_ms = TIMEFRAME_MINUTES.get(timeframe, 60) * 60 * 1000
 
-        while current_start < end_ts:
+        while current_start <= end_ts:
             try:
                 klines = fetch_binance_klines(
                     symbol=symbol,
@@ -184,14 +407,15 @@ class HistoricalDataFetcher:
                     start_time=current_start,
                     end_time=end_ts,
                     limit=MAX_CANDLES_PER_REQUEST,
-                    futures=futures
+                    futures=futures,
+                    base_url=self.base_url
                 )
 
                 if not klines:
                     break
 
-                candles = [parse_kline(k) for k in klines]
-                all_candles.extend(candles)
+                batches.append(CandleArray.from_klines(klines))
+                fetched += len(klines)
 
                 # Move to next batch
                 current_start = klines[-1][0] + timeframe_ms
@@ -199,32 +423,17 @@ class HistoricalDataFetcher:
                 # Rate limiting
                 time.sleep(REQUEST_DELAY)
 
-                print(f'[DataFetcher] Fetched {len(all_candles)} candles so far...')
+                print(f'[DataFetcher] Fetched {fetched} candles so far...')
 
             except Exception as e:
                 print(f'[DataFetcher] Error fetching: {e}')
+                complete = False
                 break
 
-        # Remove duplicates and sort
-        seen_timestamps = set()
-        unique_candles = []
-        for c in all_candles:
-            if c.timestamp not in seen_timestamps:
-                seen_timestamps.add(c.timestamp)
-                unique_candles.append(c)
-
-        unique_candles.sort(key=lambda x: x.timestamp)
-
-        print(f'[DataFetcher] Total: {len(unique_candles)} unique candles')
-
-        # Save to cache
-        self.cache[cache_key] = unique_candles
-
-        # Save to database
-        if save_to_db and self.supabase and unique_candles:
-            self._save_to_db(symbol, timeframe, unique_candles)
-
-        return unique_candles
+        # Remove duplicates (first occurrence wins) and sort
+        all_candles = CandleArray.concatenate(batches)
+        _, first_index = np.unique(all_candles.timestamp, return_index=True)
+        return all_candles.take(first_index), complete
 
     def _load_from_db(
         self,
@@ -232,7 +441,7 @@ class HistoricalDataFetcher:
         timeframe: str,
         start_date: datetime,
         end_date: datetime
-    ) -> List[Candle]:
+    ) -> CandleArray:
         """Load candles from database cache."""
         try:
             result = self.supabase.rpc('get_candles_for_backtest', {
@@ -243,46 +452,56 @@ class HistoricalDataFetcher:
             }).execute()
 
             if not result.data:
-                return []
-
-            candles = []
-            for row in result.data:
-                candles.append(Candle(
-                    timestamp=int(datetime.fromisoformat(row['open_time'].replace('Z', '+00:00')).timestamp() * 1000),
-                    open=row['open'],
-                    high=row['high'],
-                    low=row['low'],
-                    close=row['close'],
-                    volume=row['volume'],
-                ))
-
-            return candles
+                return CandleArray.empty()
+
+            rows = result.data
+            return CandleArray(
+                [int(datetime.fromisoformat(row['open_time'].replace('Z', '+00:00')).timestamp() * 1000) for row in rows],
+                [row['open'] for row in rows],
+                [row['high'] for row in rows],
+                [row['low'] for row in rows],
+                [row['close'] for row in rows],
+                [row['volume'] for row in rows],
+            )
 
         except Exception as e:
             print(f'[DataFetcher] DB load error: {e}')
-            return []
+            return CandleArray.empty()
 
     def _save_to_db(
         self,
         symbol: str,
         timeframe: str,
-        candles: List[Candle],
+        candles: CandleArray,
         batch_size: int = 500
     ):
-        """Save candles to database cache."""
+        """
+        Save candles to database cache. Only closed candles are stored:
+        _load_from_db treats every stored row as final.
+        """
+        candles = closed_candles(candles, timeframe)
+        if not len(candles):
+            return
+        if SUPABASE_DB_URL:
+            self._bulk_save_to_db(symbol, timeframe, candles)
+            return
+
         try:
             records = []
-            for c in candles:
+            for ts, o, h, l, c, v in zip(
+                candles.timestamp.tolist(), candles.open.tolist(), candles.high.tolist(),
+                candles.low.tolist(), candles.close.tolist(), candles.volume.tolist()
+            ):
                 records.append({
                     'symbol': symbol,
                     'timeframe': timeframe,
                     'exchange': 'binance',
-                    'open_time': datetime.fromtimestamp(c.timestamp / 1000).isoformat(),
-                    'open': c.open,
-                    'high': c.high,
-                    'low': c.low,
-                    'close': c.close,
-                    'volume': c.volume,
+                    'open_time': datetime.fromtimestamp(ts / 1000).isoformat(),
+                    'open': o,
+                    'high': h,
+                    'low': l,
+                    'close': c,
+                    'volume': v,
                 })
 
             # Insert in batches
@@ -299,9 +518,21 @@ class HistoricalDataFetcher:
         except Exception as e:
             print(f'[DataFetcher] DB save error: {e}')
 
+    def _bulk_save_to_db(self, symbol: str, timeframe: str, candles: CandleArray):
+        """Save candles with binary COPY over a direct Postgres connection."""
+        try:
+            from bulk_candle_writer import write_candles
+
+            stats = write_candles(symbol, timeframe, candles, SUPABASE_DB_URL, verbose=False)
+            print(f'[DataFetcher] Bulk-saved {stats.rows_sent} candles to DB '
+                  f'({stats.rows_inserted} new/changed, {stats.rows_per_second:,.0f} rows/s)')
+
+        except Exception as e:
+            print(f'[DataFetcher] DB bulk save error: {e}')
+
     def detect_gaps(
         self,
-        candles: List[Candle],
+        candles: CandleArray,
         timeframe: str
     ) -> List[Tuple[datetime, datetime]]:
         """
@@ -314,18 +545,15 @@ class HistoricalDataFetcher:
             return []
 
         expected_interval_ms = TIMEFRAME_MINUTES.get(timeframe, 60) * 60 * 1000
-        gaps = []
-
-        for i in range(1, len(candles)):
-            actual_interval = candles[i].timestamp - candles[i-1].timestamp
+        timestamps = candle_column(candles, 'timestamp')
 
-            # Allow 10% tolerance
-            if actual_interval > expected_interval_ms * 1.1:
-                gap_start = datetime.fromtimestamp(candles[i-1].timestamp / 1000)
-                gap_end = datetime.fromtimestamp(candles[i].timestamp / 1000)
-                gaps.append((gap_start, gap_end))
+        # Allow 10% tolerance
+        gap_index = np.flatnonzero(np.diff(timestamps) > expected_interval_ms * 1.1)
 
-        return gaps
+        return [
+            (datetime.fromtimestamp(start / 1000), datetime.fromtimestamp(end / 1000))
+            for start, end in zip(timestamps[gap_index].tolist(), timestamps[gap_index + 1].tolist())
+        ]
 
     def fill_gaps(
         self,
@@ -367,20 +595,49 @@ def fetch_all_symbols(
     timeframes: List[str],
     start_date: datetime,
     end_date: datetime,
-    futures: bool = False
-) -> Dict[str, Dict[str, List[Candle]]]:
+    futures: bool = False,
+    concurrent: bool = False,
+    base_url: Optional[str] = None,
+    derive_timeframes: bool = True
+) -> Dict[str, Dict[str, CandleArray]]:
     """
     Fetch historical data for multiple symbols and timeframes.
 
+    concurrent=True downloads all streams at once with the asyncio
+    downloader (see async_data_fetcher.py); the default fetches them one
+    page at a time.
+
+    derive_timeframes=True fetches only the finest timeframe when every
+    other one is a multiple of it, and resamples the rest from it.
+
     Returns:
         {symbol: {timeframe: [candles]}}
     """
-    fetcher = HistoricalDataFetcher(use_cache=True)
+    if concurrent:
+        from async_data_fetcher import fetch_all_symbols_async
+        return fetch_all_symbols_async(
+            symbols, timeframes, start_date, end_date, futures=futures, base_url=base_url,
+            derive_timeframes=derive_timeframes,
+        )
+
+    from candle_resampler import base_timeframe_for
+
+    fetcher = HistoricalDataFetcher(use_cache=True, base_url=base_url)
+    base = base_timeframe_for(timeframes) if derive_timeframes and len(set(timeframes)) > 1 else None
     result = {}
 
     for symbol in symbols:
         result[symbol] = {}
 
+        if base:
+            print(f'\n[BatchFetch] {symbol} {" ".join(timeframes)} (from {base})')
+            try:
+                result[symbol] = fetcher.fetch_timeframes(symbol, timeframes, start_date, end_date, futures, base_timeframe=base)
+            except Exception as e:
+                print(f'[BatchFetch] Error: {e}')
+                result[symbol] = {timeframe: CandleArray.empty() for timeframe in timeframes}
+            continue
+
         for timeframe in timeframes:
             print(f'\n[BatchFetch] {symbol} {timeframe}')
 
@@ -397,7 +654,7 @@ def fetch_all_symbols(
 
             except Exception as e:
                 print(f'[BatchFetch] Error: {e}')
-                result[symbol][timeframe] = []
+                result[symbol][timeframe] = CandleArray.empty()
 
     return result
 
@@ -408,7 +665,9 @@ def fetch_all_symbols(
 __all__ = [
     'HistoricalDataFetcher',
     'fetch_binance_klines',
+    'klines_base_url',
     'parse_kline',
+    'closed_candles',
     'fetch_all_symbols',
     'TIMEFRAME_MINUTES',
 ]
@@ -436,4 +695,5 @@ if __name__ == '__main__':
     if candles:
         print(f'First: {datetime.fromtimestamp(candles[0].timestamp / 1000)}')
         print(f'Last: {datetime.fromtimestamp(candles[-1].timestamp / 1000)}')
-        print(f'Price range: {min(c.low for c in candles):.2f} - {max(c.high for c in candles):.2f}')
+        print(f'Price range: {candles.low.min():.2f} - {candles.high.max():.2f}')
+        print(f'Memory: {candles.nbytes:,} bytes')
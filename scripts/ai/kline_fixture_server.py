@@ -0,0 +1,242 @@
+# scripts/ai/kline_fixture_server.py
+# Local Binance-compatible klines server for tests and benchmarks
+# GEMRAL AI BRAIN - Phase 7
+#
+# Serves deterministic candles at /api/v3/klines (and /fapi/v1/klines) with
+# Binance's startTime/endTime/limit semantics, an optional per-request
+# latency, and request-weight accounting (X-MBX-USED-WEIGHT-1M header,
+# HTTP 429 + Retry-After past the limit). All intervals are aggregated from
+# one 1m series, as on the exchange. Point fetch_binance_klines or
+# AsyncKlineDownloader at it with base_url=server.url.
+#
+# Usage:
+#   python kline_fixture_server.py --port 8000 --latency 0.05
+
+import argparse
+import json
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Optional
+from urllib.parse import urlparse, parse_qs
+
+import numpy as np
+
+from historical_data_fetcher import TIMEFRAME_MINUTES, MAX_CANDLES_PER_REQUEST
+
+# ═══════════════════════════════════════════════════════════════════════════
+# CONFIGURATION
+# ═══════════════════════════════════════════════════════════════════════════
+
+LISTING_TIME = 1_483_228_800_000   # 2017-01-01 UTC: no candles before this
+KLINE_WEIGHT = 2
+MINUTE = 60 * 1000
+WEEK_OFFSET = 4 * 24 * 60 * MINUTE  # Weekly klines open on Monday (the epoch was a Thursday)
+
+# ═══════════════════════════════════════════════════════════════════════════
+# DATA
+# ═══════════════════════════════════════════════════════════════════════════
+
+def _minute_series(seed: int, first_minute: int, count: int):
+    """open/high/low/close/volume of `count` 1m candles from minute index first_minute."""
+    minute = np.arange(first_minute, first_minute + count, dtype=np.float64)
+    base = 50.0 + seed % 1000
+
+    def price(m):
+        return base * (1 + 0.2 * np.sin(m / (97 * 60) + seed) + 0.05 * np.sin(m / (7 * 60)) + 0.003 * np.sin(m / 3))
+
+    close = price(minute)
+    open_price = price(minute - 1)
+    high = np.maximum(open_price, close) * (1 + 0.0004 * (1 + np.sin(minute * 1.7)))
+    low = np.minimum(open_price, close) * (1 - 0.0004 * (1 + np.cos(minute * 1.3)))
+    volume = 1 + (minute.astype(np.int64) * 7919 + seed) % 90  # Integral, so sums are exact
+    return open_price, high, low, close, volume.astype(np.float64)
+
+def fixture_klines(
+    symbol: str,
+    timeframe: str,
+    start_time: Optional[int],
+    end_time: Optional[int],
+    limit: int = 500
+) -> List[List]:
+    """
+    Deterministic klines for any symbol, in Binance's response format.
+
+    Every interval is aggregated from one underlying 1m series (first
+    open, max high, min low, last close, summed volume), and the current
+    bar only covers the minutes up to now, like the exchange's forming
+    candle; so resampled 1m data must reproduce the higher intervals.
+    """
+    interval = TIMEFRAME_MINUTES[timeframe] * 60 * 1000
+    offset = WEEK_OFFSET if timeframe == '1w' else 0
+    limit = max(1, min(limit, MAX_CANDLES_PER_REQUEST))
+    now_minute = int(time.time() * 1000) // MINUTE * MINUTE
+    now = (now_minute - offset) // interval * interval + offset
+
+    end = min(end_time if end_time is not None else now, now)
+    end = (end - offset) // interval * interval + offset
+    if start_time is None:
+        start = end - (limit - 1) * interval
+    else:
+        start = -(-(start_time - offset) // interval) * interval + offset
+    first_listed = (LISTING_TIME - offset) // interval * interval + offset
+    start = max(start, first_listed)
+
+    opens = list(range(start, end + 1, interval))[:limit]
+    if not opens:
+        return []
+
+    # Minutes covered by the bars: after listing, up to the current minute
+    span_start = max(opens[0], LISTING_TIME)
+    span_end = min(opens[-1] + interval, now_minute + MINUTE)
+    seed = zlib.crc32(symbol.encode())
+    o, h, l, c, v = _minute_series(seed, span_start // MINUTE, (span_end - span_start) // MINUTE)
+
+    minute_ts = np.arange(span_start, span_end, MINUTE, dtype=np.int64)
+    bar = (minute_ts - offset) // interval
+    first = np.flatnonzero(np.r_[True, bar[1:] != bar[:-1]])
+    last = np.r_[first[1:], len(bar)] - 1
+
+    klines = []
+    for ts, open_price, high, low, close, volume in zip(
+        opens, o[first].tolist(), np.maximum.reduceat(h, first).tolist(), np.minimum.reduceat(l, first).tolist(),
+        c[last].tolist(), np.add.reduceat(v, first).tolist()
+    ):
+        klines.append([
+            ts, f'{open_price:.8f}', f'{high:.8f}', f'{low:.8f}', f'{close:.8f}', f'{volume:.8f}',
+            ts + interval - 1, '0', 0, '0', '0', '0',
+        ])
+
+    return klines
+
+# ═══════════════════════════════════════════════════════════════════════════
+# SERVER
+# ═══════════════════════════════════════════════════════════════════════════
+
+class KlineFixtureServer:
+    """
+    Threaded fixture server.
+
+    Args:
+        port: 0 picks a free port
+        latency: Seconds to sleep before each response (simulated RTT)
+        weight_limit: Request weight per minute before answering 429
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, latency: float = 0.0, weight_limit: int = 6000):
+        self.latency = latency
+        self.weight_limit = weight_limit
+        self.requests = 0
+        self.throttled = 0
+        self._window = 0
+        self._used = 0
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), self._handler())
+        self._httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f'http://{host}:{port}/api/v3'
+
+    def _charge(self, weight: int):
+        """Add weight to the current minute; return (used, over_limit)."""
+        with self._lock:
+            window = int(time.time() // 60)
+            if window != self._window:
+                self._window, self._used = window, 0
+            self._used += weight
+            self.requests += 1
+            over = self._used > self.weight_limit
+            if over:
+                self.throttled += 1
+            return self._used, over
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlparse(self.path)
+                if not url.path.endswith('/klines'):
+                    self._send(404, {'code': -1, 'msg': 'Not found'})
+                    return
+
+                used, over = server._charge(KLINE_WEIGHT)
+                if server.latency:
+                    time.sleep(server.latency)
+                if over:
+                    self._send(429, {'code': -1003, 'msg': 'Too many requests'}, used, retry_after=60 - int(time.time()) % 60)
+                    return
+
+                query = {k: v[0] for k, v in parse_qs(url.query).items()}
+                try:
+                    klines = fixture_klines(
+                        query['symbol'],
+                        query['interval'],
+                        int(query['startTime']) if 'startTime' in query else None,
+                        int(query['endTime']) if 'endTime' in query else None,
+                        int(query.get('limit', 500)),
+                    )
+                except (KeyError, ValueError) as e:
+                    self._send(400, {'code': -1100, 'msg': f'Bad parameter: {e}'}, used)
+                    return
+
+                self._send(200, klines, used)
+
+            def _send(self, status, body, used=None, retry_after=None):
+                payload = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                if used is not None:
+                    self.send_header('X-MBX-USED-WEIGHT-1M', str(used))
+                if retry_after is not None:
+                    self.send_header('Retry-After', str(retry_after))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def start(self) -> 'KlineFixtureServer':
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self) -> 'KlineFixtureServer':
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+# ═══════════════════════════════════════════════════════════════════════════
+# EXPORT
+# ═══════════════════════════════════════════════════════════════════════════
+
+__all__ = [
+    'KlineFixtureServer',
+    'fixture_klines',
+]
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Local Binance klines fixture server')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--latency', type=float, default=0.0)
+    parser.add_argument('--weight-limit', type=int, default=6000)
+    args = parser.parse_args()
+
+    server = KlineFixtureServer(port=args.port, latency=args.latency, weight_limit=args.weight_limit)
+    print(f'[FixtureServer] Serving {server.url}/klines')
+    try:
+        server._httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
@@ -1,20 +1,27 @@
 # scripts/ai/knowledge_ingestion.py
 # Pipeline để ingest knowledge vào database
 # GEMRAL AI BRAIN - Phase 1
+#
+# Với VECTOR_INDEX_PATH, local vector index snapshot (xem vector_index.py)
+# được cập nhật cùng lúc: chunks insert/xoá trong database cũng được
+# add/delete trong index, snapshot lưu lại khi ingestion xong.
 
 import os
 import json
+from collections import defaultdict
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 from datetime import datetime
 from supabase import create_client, Client
 
 from embedding_service import (
     smart_chunk_text,
-    batch_get_embeddings,
+    cached_batch_get_embeddings,
+    embedding_stats,
     generate_content_hash,
     count_tokens
 )
+from vector_index import VectorIndex, load_from_supabase, snapshot_exists, sync_from_supabase, VECTOR_INDEX_PATH
 
 # ═══════════════════════════════════════════════════════════════════════════
 # CONFIGURATION
@@ -23,9 +30,15 @@ from embedding_service import (
 SUPABASE_URL = os.getenv('SUPABASE_URL')
 SUPABASE_SERVICE_KEY = os.getenv('SUPABASE_SERVICE_ROLE_KEY')
 
+CHUNK_WRITE_BATCH = 50    # Chunks per insert/upsert call
+CHUNK_DELETE_BATCH = 100  # Chunk ids per delete call
+
 # Initialize Supabase client
 supabase: Client = None
 
+# Local vector index (open_local_index), None khi không dùng
+local_index: Optional[VectorIndex] = None
+
 def initialize():
     """Initialize Supabase client."""
     global supabase
@@ -125,8 +138,7 @@ def upsert_document(
             'updated_at': datetime.utcnow().isoformat(),
         }).eq('id', doc_id).execute()
 
-        # Delete old chunks
-        supabase.table('ai_knowledge_chunks').delete().eq('document_id', doc_id).execute()
+        # Chunks are diffed by content hash in ingest_document, not rebuilt
 
         print(f'  [UPDATE] Updated existing document: {doc["title"]}')
         return doc_id
@@ -179,14 +191,15 @@ def insert_chunks(
             'chunk_index': chunk['index'],
             'embedding': embedding,
             'token_count': chunk['token_count'],
+            'content_hash': chunk.get('content_hash') or generate_content_hash(chunk['text']),
             'metadata': {},
         })
 
     if not records:
         return 0
 
-    # Insert in batches of 50
-    batch_size = 50
+    # Insert in batches
+    batch_size = CHUNK_WRITE_BATCH
     inserted = 0
 
     for i in range(0, len(records), batch_size):
@@ -195,11 +208,106 @@ def insert_chunks(
             result = supabase.table('ai_knowledge_chunks').insert(batch).execute()
             if result.data:
                 inserted += len(result.data)
+                if local_index is not None:
+                    local_index.add(
+                        [row['id'] for row in result.data],
+                        [record['embedding'] for record in batch],
+                        [
+                            {'document_id': document_id, 'chunk_text': record['chunk_text'], 'chunk_index': record['chunk_index']}
+                            for record in batch
+                        ],
+                    )
         except Exception as e:
             print(f'  [ERROR] Error inserting chunk batch: {e}')
 
     return inserted
 
+def load_chunk_hashes(document_id: str) -> List[Dict[str, Any]]:
+    """id, chunk_index, content_hash của các chunks đang lưu cho document."""
+    initialize()
+
+    result = supabase.table('ai_knowledge_chunks').select(
+        'id, chunk_index, content_hash'
+    ).eq('document_id', document_id).order('chunk_index').execute()
+    return result.data or []
+
+def diff_chunks(
+    chunks: List[Dict[str, Any]],
+    existing: List[Dict[str, Any]]
+) -> Tuple[List[Dict[str, Any]], List[Tuple[str, Dict[str, Any]]], List[str]]:
+    """
+    So khớp chunks mới với chunks đang lưu theo content_hash (mỗi row chỉ
+    dùng một lần, ưu tiên row cùng chunk_index).
+
+    Returns:
+        (chunks cần embed + insert,
+         [(row id, chunk)] giữ embedding nhưng đổi chunk_index,
+         row ids cần xoá - kể cả rows chưa có content_hash)
+    """
+    available: Dict[Optional[str], List[Dict[str, Any]]] = defaultdict(list)
+    for row in existing:
+        available[row.get('content_hash')].append(row)
+
+    new_chunks, moved = [], []
+    for chunk in chunks:
+        rows = available.get(chunk['content_hash'])
+        if not rows:
+            new_chunks.append(chunk)
+            continue
+        row = next((r for r in rows if r['chunk_index'] == chunk['index']), rows[0])
+        rows.remove(row)
+        if row['chunk_index'] != chunk['index']:
+            moved.append((row['id'], chunk))
+
+    stale_ids = [row['id'] for rows in available.values() for row in rows]
+    return new_chunks, moved, stale_ids
+
+def reindex_chunks(document_id: str, moved: List[Tuple[str, Dict[str, Any]]]) -> int:
+    """Cập nhật chunk_index của chunks không đổi nội dung (giữ nguyên embedding)."""
+    initialize()
+
+    records = [
+        {
+            'id': row_id,
+            'document_id': document_id,
+            'chunk_text': chunk['text'],
+            'chunk_index': chunk['index'],
+            'token_count': chunk['token_count'],
+            'content_hash': chunk['content_hash'],
+        }
+        for row_id, chunk in moved
+    ]
+
+    updated = 0
+    for i in range(0, len(records), CHUNK_WRITE_BATCH):
+        batch = records[i:i + CHUNK_WRITE_BATCH]
+        try:
+            # Only the columns sent are updated on conflict; embedding is kept
+            result = supabase.table('ai_knowledge_chunks').upsert(batch, on_conflict='id').execute()
+            if result.data:
+                updated += len(result.data)
+        except Exception as e:
+            print(f'  [ERROR] Error re-indexing chunk batch: {e}')
+
+    return updated
+
+def delete_chunks(chunk_ids: List[str]) -> int:
+    """Xoá chunks không còn trong document."""
+    initialize()
+
+    deleted = 0
+    for i in range(0, len(chunk_ids), CHUNK_DELETE_BATCH):
+        batch = chunk_ids[i:i + CHUNK_DELETE_BATCH]
+        try:
+            supabase.table('ai_knowledge_chunks').delete().in_('id', batch).execute()
+            deleted += len(batch)
+            if local_index is not None:
+                local_index.delete(batch)
+        except Exception as e:
+            print(f'  [ERROR] Error deleting chunk batch: {e}')
+
+    return deleted
+
 def update_document_indexed(document_id: str):
     """Update last_indexed_at timestamp."""
     initialize()
@@ -208,6 +316,50 @@ def update_document_indexed(document_id: str):
         'last_indexed_at': datetime.utcnow().isoformat()
     }).eq('id', document_id).execute()
 
+# ═══════════════════════════════════════════════════════════════════════════
+# LOCAL VECTOR INDEX
+# ═══════════════════════════════════════════════════════════════════════════
+
+def open_local_index():
+    """Mở snapshot tại VECTOR_INDEX_PATH (sync với database), hoặc build từ database."""
+    global local_index
+    if not VECTOR_INDEX_PATH or local_index is not None:
+        return
+    initialize()
+
+    if snapshot_exists(VECTOR_INDEX_PATH):
+        try:
+            local_index = VectorIndex.load(VECTOR_INDEX_PATH)
+        except ValueError as e:
+            print(f'[INDEX] Snapshot unusable, rebuilding: {e}')
+
+    if local_index is not None:
+        changes = sync_from_supabase(local_index, supabase)
+        print(f'[INDEX] Loaded {VECTOR_INDEX_PATH}: {len(local_index)} chunks '
+              f'(+{changes["added"]} -{changes["deleted"]} since snapshot)')
+    else:
+        local_index = load_from_supabase(supabase)
+        print(f'[INDEX] Built from database: {len(local_index)} chunks')
+
+def save_local_index():
+    """Lưu snapshot sau khi ingest."""
+    if local_index is None:
+        return
+    local_index.save(VECTOR_INDEX_PATH)
+    stats = local_index.stats()
+    print(f'[INDEX] Saved {VECTOR_INDEX_PATH}: {stats["rows"]} chunks, {stats["nlist"]} lists')
+
+def index_document_metadata(doc_id: str, doc: Dict[str, Any], source_type: str):
+    """Title/category/tags của document cho mọi chunk của nó trong local index."""
+    if local_index is not None:
+        local_index.update_document(
+            doc_id,
+            title=doc['title'],
+            source_type=source_type,
+            category=doc.get('category'),
+            tags=doc.get('tags', []),
+        )
+
 # ═══════════════════════════════════════════════════════════════════════════
 # MAIN INGESTION FUNCTION
 # ═══════════════════════════════════════════════════════════════════════════
@@ -220,13 +372,17 @@ def ingest_document(
     """
     Ingest một document hoàn chỉnh.
 
+    Chunks được so với chunks đang lưu theo content_hash: chỉ chunks mới
+    hoặc đã sửa được embed (local embedding cache trước) và insert, chunks
+    không còn bị xoá, chunks không đổi giữ nguyên embedding.
+
     Args:
         doc: Document dict với title, content, source_url
         source_type: spiritual, trading, product, etc.
         show_progress: Show progress output
 
     Returns:
-        True nếu thành công
+        True nếu tất cả chunks của document đã được lưu
     """
     if show_progress:
         print(f'\n[DOC] Processing: {doc.get("title", "Unknown")}')
@@ -242,30 +398,43 @@ def ingest_document(
         print(f'  [WARN] No chunks created (empty content?)')
         return False
 
+    # Step 3: Diff against stored chunks
+    new_chunks, moved, stale_ids = diff_chunks(chunks, load_chunk_hashes(doc_id))
     if show_progress:
-        print(f'  [CHUNK] Created {len(chunks)} chunks')
-
-    # Step 3: Generate embeddings
-    chunk_texts = [c['text'] for c in chunks]
-    embeddings = batch_get_embeddings(chunk_texts, show_progress=show_progress)
-
-    # Count successful embeddings
-    valid_count = sum(1 for e in embeddings if e is not None)
-    if show_progress:
-        print(f'  [EMBED] Generated {valid_count}/{len(chunks)} embeddings')
-
-    # Step 4: Insert chunks
-    inserted = insert_chunks(doc_id, chunks, embeddings)
+        print(f'  [CHUNK] {len(chunks)} chunks: {len(chunks) - len(new_chunks)} unchanged, '
+              f'{len(new_chunks)} new/changed, {len(stale_ids)} removed')
+
+    if not new_chunks and not moved and not stale_ids:
+        index_document_metadata(doc_id, doc, source_type)
+        if show_progress:
+            print(f'  [DONE] Up to date: {doc.get("title", "Unknown")}')
+        return True
+
+    # Step 4: Generate embeddings (new/changed chunks only)
+    embeddings = []
+    if new_chunks:
+        embeddings = cached_batch_get_embeddings([c['text'] for c in new_chunks], show_progress=show_progress)
+
+        # Count successful embeddings
+        valid_count = sum(1 for e in embeddings if e is not None)
+        if show_progress:
+            print(f'  [EMBED] {valid_count}/{len(new_chunks)} embeddings ready')
+
+    # Step 5: Store - insert before deleting so the document stays searchable
+    inserted = insert_chunks(doc_id, new_chunks, embeddings) if new_chunks else 0
+    reindexed = reindex_chunks(doc_id, moved) if moved else 0
+    deleted = delete_chunks(stale_ids) if stale_ids else 0
+    index_document_metadata(doc_id, doc, source_type)
     if show_progress:
-        print(f'  [STORE] Inserted {inserted} chunks')
+        print(f'  [STORE] Inserted {inserted}, re-indexed {reindexed}, deleted {deleted} chunks')
 
-    # Step 5: Update timestamp
+    # Step 6: Update timestamp
     update_document_indexed(doc_id)
 
     if show_progress:
         print(f'  [DONE] {doc.get("title", "Unknown")}')
 
-    return inserted > 0
+    return inserted == len(new_chunks)
 
 def ingest_directory(
     directory: str,
@@ -1457,6 +1626,7 @@ def main():
         return
 
     print('\n[INFO] Environment OK, starting ingestion...')
+    open_local_index()
 
     # Ingest all knowledge
     spiritual_count = ingest_gemral_spiritual_knowledge()
@@ -1474,6 +1644,8 @@ def main():
     print(f'Response guidelines: {guidelines_count}')
     print(f'Partnership documents: {partnership_count}')
     print(f'Total: {spiritual_count + trading_count + product_count + guidelines_count + partnership_count}')
+    print(f'Embedding API calls: {embedding_stats["requests"]} ({embedding_stats["texts"]} texts)')
+    save_local_index()
 
 def ingest_partnership_knowledge():
     """Ingest GEM Partnership/CTV program knowledge."""
@@ -1615,12 +1787,15 @@ def ingest_guidelines_only():
         return
 
     print('\n[INFO] Environment OK, ingesting response guidelines...')
+    open_local_index()
     guidelines_count = ingest_gem_master_response_guidelines()
 
     print('\n' + '='*60)
     print('INGESTION COMPLETE')
     print('='*60)
     print(f'Response guidelines: {guidelines_count}')
+    print(f'Embedding API calls: {embedding_stats["requests"]} ({embedding_stats["texts"]} texts)')
+    save_local_index()
 
 
 def ingest_partnership_only():
@@ -1642,12 +1817,15 @@ def ingest_partnership_only():
         return
 
     print('\n[INFO] Environment OK, ingesting partnership knowledge...')
+    open_local_index()
     partnership_count = ingest_partnership_knowledge()
 
     print('\n' + '='*60)
     print('INGESTION COMPLETE')
     print('='*60)
     print(f'Partnership documents: {partnership_count}')
+    print(f'Embedding API calls: {embedding_stats["requests"]} ({embedding_stats["texts"]} texts)')
+    save_local_index()
 
 
 if __name__ == '__main__':
@@ -0,0 +1,582 @@
+# scripts/ai/live_scanner.py
+# Event-driven live pattern scanner with Redis pub/sub output
+# GEMRAL AI BRAIN - Phase 9
+#
+# Keeps a ring buffer of the latest candles per (symbol, timeframe) and runs
+# PatternDetectionEngine.detect_all only for the stream whose candle just
+# closed. New detections are published to Redis channels
+# (RedisKeys.pattern_channel / PATTERN_ALL_CHANNEL in backend/app/core/redis.py).
+#
+# Usage:
+#   python live_scanner.py --symbols BTCUSDT ETHUSDT --timeframes 15m 1h
+#   python live_scanner.py --dry-run          # print instead of publishing
+#   python live_scanner.py --no-derive        # poll every timeframe, not just the finest
+
+import argparse
+import asyncio
+import heapq
+import json
+import os
+import sys
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import List, Dict, Any, Optional, Callable, AsyncIterator, Tuple
+
+import numpy as np
+
+from feature_extractor import Candle, CandleArray, SwingIndex
+from pattern_detection_engine import PatternDetectionEngine, PatternDetection, ZoneIndex, ZONE_LEVELS
+from historical_data_fetcher import TIMEFRAME_MINUTES, MAX_CANDLES_PER_REQUEST, fetch_binance_klines
+from candle_resampler import CandleResampler, base_timeframe_for, bucket_start, timeframe_ms
+
+# ═══════════════════════════════════════════════════════════════════════════
+# CONFIGURATION
+# ═══════════════════════════════════════════════════════════════════════════
+
+DEFAULT_BUFFER_SIZE = 500       # Candles kept per stream
+MIN_SCAN_CANDLES = 200          # detect_all needs at least 200
+DEDUPE_HISTORY = 256            # Published pattern keys remembered per stream
+POLL_INTERVAL = 5.0             # Seconds between REST polls in live mode
+
+BACKEND_DIR = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'backend'))
+
+# ═══════════════════════════════════════════════════════════════════════════
+# RING BUFFER
+# ═══════════════════════════════════════════════════════════════════════════
+
+class CandleRingBuffer:
+    """
+    Latest `capacity` candles of one stream in columnar storage.
+
+    Columns are allocated at twice the capacity and compacted when the
+    write position reaches the end, so view() is always a contiguous,
+    zero-copy CandleArray and appends are amortized O(1). A view is only
+    valid until the next append.
+    """
+
+    def __init__(self, capacity: int = DEFAULT_BUFFER_SIZE):
+        self.capacity = capacity
+        self._columns = {
+            name: np.empty(2 * capacity, dtype=np.int64 if name == 'timestamp' else np.float64)
+            for name in CandleArray.FIELDS
+        }
+        self._start = 0
+        self._end = 0
+
+    def __len__(self) -> int:
+        return self._end - self._start
+
+    @property
+    def last_timestamp(self) -> Optional[int]:
+        return int(self._columns['timestamp'][self._end - 1]) if len(self) else None
+
+    def append(self, candle: Candle) -> bool:
+        """
+        Add a candle. A candle with the last timestamp replaces it (kline
+        updates); older candles are ignored. Returns True if a new row was added.
+        """
+        last = self.last_timestamp
+        if last is not None and candle.timestamp <= last:
+            if candle.timestamp == last:
+                self._write(self._end - 1, candle)
+            return False
+
+        if self._end == 2 * self.capacity:
+            keep = self.capacity - 1
+            for column in self._columns.values():
+                column[:keep] = column[self._end - keep:self._end]
+            self._start, self._end = 0, keep
+
+        self._write(self._end, candle)
+        self._end += 1
+        if len(self) > self.capacity:
+            self._start += 1
+        return True
+
+    def extend(self, candles) -> int:
+        return sum(1 for candle in candles if self.append(candle))
+
+    def _write(self, index: int, candle: Candle):
+        for name in CandleArray.FIELDS:
+            self._columns[name][index] = getattr(candle, name)
+
+    def view(self) -> CandleArray:
+        return CandleArray(*(self._columns[name][self._start:self._end] for name in CandleArray.FIELDS))
+
+# ═══════════════════════════════════════════════════════════════════════════
+# FEEDS
+# ═══════════════════════════════════════════════════════════════════════════
+
+@dataclass
+class CandleEvent:
+    """A candle update for one stream. Only closed candles trigger scans."""
+    symbol: str
+    timeframe: str
+    candle: Candle
+    closed: bool = True
+
+class ReplayCandleFeed:
+    """
+    Replays stored candles as closed-candle events in close-time order,
+    merged across all streams. Used to load-test the scanner offline.
+
+    Args:
+        candles_data: {symbol: {timeframe: candles}}
+        start_index: events start at this candle of each stream (earlier
+            candles are meant to be seeded into the scanner)
+        speed: None replays as fast as possible; otherwise seconds of
+            market time per wall-clock second (e.g. 3600 = 1h per second)
+    """
+
+    def __init__(
+        self,
+        candles_data: Dict[str, Dict[str, CandleArray]],
+        start_index: int = 0,
+        speed: Optional[float] = None
+    ):
+        self.candles_data = {
+            symbol: {tf: CandleArray.from_candles(c) for tf, c in tfs.items()}
+            for symbol, tfs in candles_data.items()
+        }
+        self.start_index = start_index
+        self.speed = speed
+
+    def history(self, symbol: str, timeframe: str) -> CandleArray:
+        """Candles before start_index, for seeding ring buffers."""
+        return self.candles_data[symbol][timeframe][:self.start_index]
+
+    async def __aiter__(self) -> AsyncIterator[CandleEvent]:
+        heap: List[Tuple[int, str, str, int]] = []
+        for symbol, tfs in self.candles_data.items():
+            for timeframe, candles in tfs.items():
+                if self.start_index < len(candles):
+                    heapq.heappush(heap, (self._close_time(candles, timeframe, self.start_index), symbol, timeframe, self.start_index))
+
+        previous_close = None
+        emitted = 0
+        while heap:
+            close_time, symbol, timeframe, index = heapq.heappop(heap)
+            candles = self.candles_data[symbol][timeframe]
+
+            if self.speed and previous_close is not None and close_time > previous_close:
+                await asyncio.sleep((close_time - previous_close) / 1000 / self.speed)
+            previous_close = close_time
+
+            yield CandleEvent(symbol, timeframe, candles[index], closed=True)
+
+            emitted += 1
+            if not self.speed and emitted % 1000 == 0:
+                await asyncio.sleep(0)  # Let other tasks (e.g. publishers) run
+
+            if index + 1 < len(candles):
+                heapq.heappush(heap, (self._close_time(candles, timeframe, index + 1), symbol, timeframe, index + 1))
+
+    @staticmethod
+    def _close_time(candles: CandleArray, timeframe: str, index: int) -> int:
+        return int(candles.timestamp[index]) + TIMEFRAME_MINUTES.get(timeframe, 60) * 60 * 1000
+
+class PollingKlineFeed:
+    """
+    Live feed polling Binance REST klines. Emits each candle once, when
+    the next candle has opened (i.e. it is closed).
+
+    With a base_timeframe, only that stream is polled (one request per
+    symbol instead of one per symbol and timeframe) and the other
+    timeframes are resampled from it with a CandleResampler; a derived bar
+    is emitted as soon as the last base candle of its bucket closes.
+    history() still loads each timeframe from the exchange once, to seed.
+    """
+
+    def __init__(
+        self,
+        symbols: List[str],
+        timeframes: List[str],
+        poll_interval: float = POLL_INTERVAL,
+        futures: bool = False,
+        base_timeframe: Optional[str] = None,
+        base_url: Optional[str] = None
+    ):
+        self.symbols = symbols
+        self.timeframes = timeframes
+        self.poll_interval = poll_interval
+        self.futures = futures
+        self.base_url = base_url
+        self.base_timeframe = base_timeframe
+        self.poll_requests = 0
+        self._last_closed: Dict[Tuple[str, str], int] = {}
+        self._resamplers: Dict[str, CandleResampler] = {}
+        self._next_base: Dict[str, int] = {}  # Open time of the next base candle to fetch
+
+    def history(self, symbol: str, timeframe: str, limit: int = DEFAULT_BUFFER_SIZE) -> CandleArray:
+        klines = fetch_binance_klines(symbol, timeframe, limit=limit + 1, futures=self.futures, base_url=self.base_url)
+        candles = CandleArray.from_klines(klines[:-1])  # Last kline is still open
+        if len(candles):
+            self._last_closed[(symbol, timeframe)] = int(candles.timestamp[-1])
+        return candles
+
+    async def __aiter__(self) -> AsyncIterator[CandleEvent]:
+        loop = asyncio.get_running_loop()
+        while True:
+            for symbol in self.symbols:
+                if self.base_timeframe:
+                    for event in await loop.run_in_executor(None, self._poll_base, symbol):
+                        yield event
+                    continue
+
+                for timeframe in self.timeframes:
+                    try:
+                        self.poll_requests += 1
+                        klines = await loop.run_in_executor(
+                            None, lambda: fetch_binance_klines(symbol, timeframe, limit=3, futures=self.futures, base_url=self.base_url)
+                        )
+                    except Exception as e:
+                        print(f'[LiveScanner] Poll error {symbol} {timeframe}: {e}')
+                        continue
+
+                    last = self._last_closed.get((symbol, timeframe))
+                    for candle in CandleArray.from_klines(klines[:-1]):
+                        if last is None or candle.timestamp > last:
+                            self._last_closed[(symbol, timeframe)] = candle.timestamp
+                            last = candle.timestamp
+                            yield CandleEvent(symbol, timeframe, candle, closed=True)
+
+            await asyncio.sleep(self.poll_interval)
+
+    def _poll_base(self, symbol: str) -> List[CandleEvent]:
+        """Base candles closed since the last poll, and the derived bars they close."""
+        base_ms = timeframe_ms(self.base_timeframe)
+        resampler = self._resamplers.get(symbol)
+        if resampler is None:
+            derived = [tf for tf in self.timeframes if tf != self.base_timeframe]
+            resampler = self._resamplers[symbol] = CandleResampler(self.base_timeframe, derived)
+            self._next_base[symbol] = self._first_unseen(symbol)
+
+        events: List[CandleEvent] = []
+        while True:
+            try:
+                self.poll_requests += 1
+                klines = fetch_binance_klines(
+                    symbol, self.base_timeframe, start_time=self._next_base[symbol],
+                    limit=MAX_CANDLES_PER_REQUEST, futures=self.futures, base_url=self.base_url,
+                )
+            except Exception as e:
+                print(f'[LiveScanner] Poll error {symbol} {self.base_timeframe}: {e}')
+                break
+
+            now = int(time.time() * 1000)
+            for candle in CandleArray.from_klines([k for k in klines if k[0] + base_ms <= now]):
+                self._next_base[symbol] = candle.timestamp + base_ms
+                if self.base_timeframe in self.timeframes:
+                    events.extend(self._closed_event(symbol, self.base_timeframe, candle))
+                for update in resampler.update(candle):
+                    if update.closed:
+                        events.extend(self._closed_event(symbol, update.timeframe, update.candle))
+
+            if len(klines) < MAX_CANDLES_PER_REQUEST:
+                break
+        return events
+
+    def _first_unseen(self, symbol: str) -> int:
+        """
+        Where base polling starts: the earliest bar not yet seen by any
+        timeframe (its bucket start), or the current bucket when history()
+        was not called.
+        """
+        now = int(time.time() * 1000)
+        starts = []
+        for timeframe in self.timeframes:
+            last = self._last_closed.get((symbol, timeframe))
+            starts.append(last + timeframe_ms(timeframe) if last is not None else int(bucket_start(now, timeframe)))
+        return min(starts)
+
+    def _closed_event(self, symbol: str, timeframe: str, candle: Candle) -> List[CandleEvent]:
+        last = self._last_closed.get((symbol, timeframe))
+        if last is not None and candle.timestamp <= last:
+            return []
+        self._last_closed[(symbol, timeframe)] = candle.timestamp
+        return [CandleEvent(symbol, timeframe, candle, closed=True)]
+
+# ═══════════════════════════════════════════════════════════════════════════
+# PUBLISHERS
+# ═══════════════════════════════════════════════════════════════════════════
+
+class MemoryPublisher:
+    """In-process publisher: keeps messages and calls local subscribers."""
+
+    def __init__(self, keep: Optional[int] = 10_000):
+        self.messages: List[Tuple[str, Dict]] = []
+        self.keep = keep
+        self.published = 0
+        self._subscribers: List[Callable[[str, Dict], None]] = []
+
+    def subscribe(self, callback: Callable[[str, Dict], None]):
+        self._subscribers.append(callback)
+
+    async def publish(self, symbol: str, timeframe: str, message: Dict):
+        channel = f'{symbol}:{timeframe}'
+        self.published += 1
+        if self.keep is None or len(self.messages) < self.keep:
+            self.messages.append((channel, message))
+        for callback in self._subscribers:
+            callback(channel, message)
+
+    async def close(self):
+        pass
+
+class RedisPatternPublisher:
+    """
+    Publishes detections through the backend RedisManager, on the
+    per-stream channel and on the all-patterns channel.
+    """
+
+    def __init__(self):
+        if BACKEND_DIR not in sys.path:
+            sys.path.append(BACKEND_DIR)
+        from app.core.redis import RedisManager, RedisKeys
+
+        self._manager = RedisManager
+        self._keys = RedisKeys
+        self.published = 0
+
+    async def publish(self, symbol: str, timeframe: str, message: Dict):
+        client = await self._manager.get_client()
+        payload = json.dumps(message)
+        async with client.pipeline(transaction=False) as pipe:
+            pipe.publish(self._keys.pattern_channel(symbol, timeframe), payload)
+            pipe.publish(self._keys.PATTERN_ALL_CHANNEL, payload)
+            await pipe.execute()
+        self.published += 1
+
+    async def close(self):
+        await self._manager.close()
+
+# ═══════════════════════════════════════════════════════════════════════════
+# SCANNER
+# ═══════════════════════════════════════════════════════════════════════════
+
+@dataclass
+class ScannerStats:
+    events: int = 0
+    scans: int = 0
+    detections: int = 0
+    published: int = 0
+    scan_seconds: float = 0.0
+    started: float = field(default_factory=time.perf_counter)
+
+    def summary(self) -> str:
+        elapsed = time.perf_counter() - self.started
+        avg_ms = self.scan_seconds / self.scans * 1000 if self.scans else 0.0
+        return (f'{self.events} events, {self.scans} scans ({avg_ms:.1f} ms avg), '
+                f'{self.detections} detections, {self.published} published, '
+                f'{self.events / elapsed if elapsed > 0 else 0:.0f} events/s')
+
+class _Stream:
+    def __init__(self, capacity: int, zone_levels: int = ZONE_LEVELS):
+        self.buffer = CandleRingBuffer(capacity)
+        self.swings = SwingIndex(max_length=capacity)
+        self.zones = ZoneIndex(levels=zone_levels)
+        self.published: 'OrderedDict[Tuple[str, int], None]' = OrderedDict()
+
+    def append(self, candle: Candle) -> bool:
+        """Add a candle to the buffer and keep the swing and zone indexes in step."""
+        last = self.buffer.last_timestamp
+        added = self.buffer.append(candle)
+        if added:
+            self.swings.append(candle)
+            self.zones.append(candle)
+        elif candle.timestamp == last:
+            self.swings.replace_last(candle)
+            self.zones.replace_last(candle)
+        return added
+
+    def extend(self, candles) -> int:
+        return sum(1 for candle in candles if self.append(candle))
+
+class LiveScanner:
+    """
+    Runs detection per stream on candle close and publishes new patterns.
+
+    A pattern is published once per (pattern type, start candle time), so
+    it is not re-sent on every close while it stays valid.
+    """
+
+    def __init__(
+        self,
+        publisher,
+        user_tier: str = 'TIER3',
+        buffer_size: int = DEFAULT_BUFFER_SIZE,
+        min_confidence: float = 0.5,
+        require_zone_retest: bool = True,
+        zone_levels: int = ZONE_LEVELS
+    ):
+        self.publisher = publisher
+        self.engine = PatternDetectionEngine(user_tier=user_tier)
+        self.buffer_size = buffer_size
+        self.zone_levels = zone_levels
+        self.min_confidence = min_confidence
+        self.require_zone_retest = require_zone_retest
+        self.streams: Dict[Tuple[str, str], _Stream] = {}
+        self.stats = ScannerStats()
+
+    def _stream(self, symbol: str, timeframe: str) -> _Stream:
+        key = (symbol, timeframe)
+        if key not in self.streams:
+            self.streams[key] = _Stream(self.buffer_size, self.zone_levels)
+        return self.streams[key]
+
+    def seed(self, symbol: str, timeframe: str, candles) -> int:
+        """Preload history without scanning."""
+        return self._stream(symbol, timeframe).extend(candles)
+
+    async def handle(self, event: CandleEvent) -> List[PatternDetection]:
+        """Apply one event; scan and publish if it closed a new candle."""
+        self.stats.events += 1
+        stream = self._stream(event.symbol, event.timeframe)
+        added = stream.append(event.candle)
+
+        if not (event.closed and added) or len(stream.buffer) < MIN_SCAN_CANDLES:
+            return []
+
+        candles = stream.buffer.view()
+        start = time.perf_counter()
+        detections = self.engine.detect_all(
+            candles,
+            min_confidence=self.min_confidence,
+            require_zone_retest=self.require_zone_retest,
+            swings=stream.swings.view(-len(candles)),
+            zones=stream.zones,
+            # No symbol: each scan is at a new bar of a sliding window, so
+            # cross-call FeatureCache entries would never hit (see FeatureCache)
+        )
+        self.stats.scan_seconds += time.perf_counter() - start
+        self.stats.scans += 1
+
+        fresh = []
+        for detection in detections:
+            start_ts = int(candles.timestamp[max(0, detection.start_index)])
+            key = (detection.pattern_type.value, start_ts)
+            if key in stream.published:
+                continue
+
+            stream.published[key] = None
+            if len(stream.published) > DEDUPE_HISTORY:
+                stream.published.popitem(last=False)
+
+            fresh.append(detection)
+            await self.publisher.publish(
+                event.symbol, event.timeframe,
+                detection_message(event.symbol, event.timeframe, detection, candles)
+            )
+
+        self.stats.detections += len(detections)
+        self.stats.published += len(fresh)
+        return fresh
+
+    async def run(self, feed, max_events: Optional[int] = None, report_every: float = 60.0):
+        """Consume a feed until it ends (or max_events)."""
+        last_report = time.perf_counter()
+        async for event in feed:
+            await self.handle(event)
+
+            if max_events is not None and self.stats.events >= max_events:
+                break
+            if time.perf_counter() - last_report >= report_every:
+                print(f'[LiveScanner] {self.stats.summary()}')
+                last_report = time.perf_counter()
+
+        print(f'[LiveScanner] Done: {self.stats.summary()}')
+
+def detection_message(
+    symbol: str,
+    timeframe: str,
+    detection: PatternDetection,
+    candles: CandleArray
+) -> Dict[str, Any]:
+    """JSON-safe pub/sub payload for a detection."""
+    end_index = min(max(0, detection.end_index), len(candles) - 1)
+    features = detection.features
+
+    return {
+        'symbol': symbol,
+        'timeframe': timeframe,
+        'pattern': detection.pattern_type.value,
+        'signal': detection.signal_type.value,
+        'confidence': float(detection.confidence),
+        'entry_price': float(detection.entry_price),
+        'stop_loss': float(detection.stop_loss),
+        'take_profit': float(detection.take_profit),
+        'zone_price': float(detection.zone_price) if detection.zone_price is not None else None,
+        'zone_type': detection.zone_type,
+        'start_time': int(candles.timestamp[max(0, detection.start_index)]),
+        'end_time': int(candles.timestamp[end_index]),
+        'candle_time': int(candles.timestamp[-1]),
+        'has_zone_retest': bool(features.has_zone_retest) if features else None,
+        'overall_score': float(features.overall_score) if features else None,
+        'detected_at': datetime.utcnow().isoformat(),
+    }
+
+# ═══════════════════════════════════════════════════════════════════════════
+# CLI
+# ═══════════════════════════════════════════════════════════════════════════
+
+async def _run_live(args):
+    publisher = MemoryPublisher(keep=0) if args.dry_run else RedisPatternPublisher()
+    if args.dry_run:
+        publisher.subscribe(lambda channel, msg: print(f'[LiveScanner] {channel} {msg["pattern"]} {msg["confidence"]:.2f}'))
+
+    scanner = LiveScanner(
+        publisher,
+        user_tier=args.tier,
+        buffer_size=args.buffer,
+        min_confidence=args.min_confidence,
+        require_zone_retest=not args.no_retest,
+        zone_levels=args.zone_levels,
+    )
+    base_timeframe = None if args.no_derive else base_timeframe_for(args.timeframes)
+    feed = PollingKlineFeed(args.symbols, args.timeframes, poll_interval=args.poll, base_timeframe=base_timeframe)
+
+    for symbol in args.symbols:
+        for timeframe in args.timeframes:
+            seeded = scanner.seed(symbol, timeframe, feed.history(symbol, timeframe, args.buffer))
+            print(f'[LiveScanner] Seeded {symbol} {timeframe}: {seeded} candles')
+
+    try:
+        await scanner.run(feed)
+    finally:
+        await publisher.close()
+
+def main():
+    parser = argparse.ArgumentParser(description='Live pattern scanner')
+    parser.add_argument('--symbols', nargs='+', default=['BTCUSDT', 'ETHUSDT'])
+    parser.add_argument('--timeframes', nargs='+', default=['15m', '1h'])
+    parser.add_argument('--tier', default='TIER3')
+    parser.add_argument('--buffer', type=int, default=DEFAULT_BUFFER_SIZE)
+    parser.add_argument('--min-confidence', type=float, default=0.5)
+    parser.add_argument('--no-retest', action='store_true', help='Do not require zone retest')
+    parser.add_argument('--poll', type=float, default=POLL_INTERVAL)
+    parser.add_argument('--no-derive', action='store_true', help='Poll every timeframe instead of resampling from the finest')
+    parser.add_argument('--zone-levels', type=int, default=ZONE_LEVELS, help='HFZ/LFZ price levels tested per scan')
+    parser.add_argument('--dry-run', action='store_true', help='Print detections instead of publishing to Redis')
+    args = parser.parse_args()
+
+    asyncio.run(_run_live(args))
+
+# ═══════════════════════════════════════════════════════════════════════════
+# EXPORT
+# ═══════════════════════════════════════════════════════════════════════════
+
+__all__ = [
+    'CandleRingBuffer',
+    'CandleEvent',
+    'ReplayCandleFeed',
+    'PollingKlineFeed',
+    'MemoryPublisher',
+    'RedisPatternPublisher',
+    'LiveScanner',
+    'detection_message',
+]
+
+if __name__ == '__main__':
+    main()
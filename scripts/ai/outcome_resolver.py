@@ -0,0 +1,252 @@
+# scripts/ai/outcome_resolver.py
+# Resolve pending pattern detections (TP/SL hit) from cached candles
+# GEMRAL AI BRAIN - Phase 8
+#
+# Pending detections are grouped by (symbol, timeframe). Each group loads
+# the closed candles after its earliest detection once, through
+# HistoricalDataFetcher (local disk cache, then Supabase, then Binance),
+# and all of its detections are resolved in one exit_simulator batch: the
+# first candle whose low/high touches the stop loss or take profit decides
+# the outcome, the stop loss first when one candle touches both (same rule
+# as BacktestEngine). Detections that touch neither stay pending.
+#
+# Results are written back in chunks through the resolve_pattern_outcomes
+# RPC (one UPDATE ... FROM jsonb_to_recordset per chunk) instead of one
+# .update().eq('id') round-trip per detection.
+
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import List, Dict, Any, Optional, Tuple
+import time
+
+import numpy as np
+
+from feature_extractor import CandleArray
+from exit_simulator import simulate_exits, REASON_NAMES
+from historical_data_fetcher import HistoricalDataFetcher, TIMEFRAME_MINUTES
+
+# ═══════════════════════════════════════════════════════════════════════════
+# CONFIGURATION
+# ═══════════════════════════════════════════════════════════════════════════
+
+PENDING_PAGE_SIZE = 1000   # PostgREST max rows per select
+WRITE_CHUNK_SIZE = 1000    # Outcomes per resolve_pattern_outcomes call
+
+DETECTION_COLUMNS = 'id, symbol, timeframe, entry_price, stop_loss_price, take_profit_price, detected_at'
+
+# ═══════════════════════════════════════════════════════════════════════════
+# HELPERS
+# ═══════════════════════════════════════════════════════════════════════════
+
+def to_millis(value: Any) -> int:
+    """Epoch ms for an ISO timestamp, datetime (naive = UTC) or epoch ms."""
+    if isinstance(value, (int, float, np.integer)):
+        return int(value)
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return int(value.timestamp() * 1000)
+
+def from_millis(ts: int) -> str:
+    return datetime.fromtimestamp(ts / 1000, tz=timezone.utc).isoformat()
+
+def _levels(detection: Dict) -> Optional[Tuple[float, float, float, bool]]:
+    """(entry, stop loss, take profit, is long), None if not resolvable."""
+    entry = detection.get('entry_price')
+    sl = detection.get('stop_loss_price')
+    tp = detection.get('take_profit_price')
+    if not entry or not sl or not tp:
+        return None
+    entry, sl, tp = float(entry), float(sl), float(tp)
+    if sl < entry < tp:
+        return entry, sl, tp, True
+    if tp < entry < sl:
+        return entry, sl, tp, False
+    return None
+
+# ═══════════════════════════════════════════════════════════════════════════
+# RESOLUTION
+# ═══════════════════════════════════════════════════════════════════════════
+
+def resolve_detections(
+    candles: CandleArray,
+    detections: List[Dict],
+    max_holding_candles: Optional[int] = None
+) -> List[Dict]:
+    """
+    Outcomes for detections of one symbol/timeframe.
+
+    Each detection is checked from the first candle opening at or after
+    its detected_at. Direction follows the levels (take profit above
+    entry = long); detections without consistent levels are skipped.
+
+    Args:
+        candles: Closed candles covering the detections
+        detections: Rows with id, entry/stop_loss/take_profit_price, detected_at
+        max_holding_candles: Close unresolved detections at the close of
+            this many candles (exit_reason 'time_exit'); None keeps them pending
+
+    Returns:
+        Outcome rows (id, outcome, exit_price, profit_loss_percent,
+        exit_reason, exited_at) for the detections that resolved
+    """
+    rows, levels = [], []
+    for detection in detections:
+        level = _levels(detection)
+        if level is not None:
+            rows.append(detection)
+            levels.append(level)
+    if not rows or not len(candles):
+        return []
+
+    entry, stop_loss, take_profit, long = (np.array(column) for column in zip(*levels))
+    detected = np.array([to_millis(d['detected_at']) for d in rows], dtype=np.int64)
+    start = np.searchsorted(candles.timestamp, detected, side='left')
+
+    batch = simulate_exits(
+        candles, start, long, entry, stop_loss, take_profit,
+        expire=None if max_holding_candles is None else start + max_holding_candles - 1,
+    )
+
+    resolved = np.flatnonzero(batch.index >= 0)
+    price = batch.price[resolved]
+    sign = np.where(long[resolved], 1.0, -1.0)
+    profit_loss = (price - entry[resolved]) / entry[resolved] * 100 * sign
+    exit_times = candles.timestamp[batch.index[resolved]]
+
+    outcomes = []
+    for k, exit_price, pl, reason, exit_time in zip(
+        resolved.tolist(), price.tolist(), profit_loss.tolist(),
+        batch.reason[resolved].tolist(), exit_times.tolist()
+    ):
+        outcomes.append({
+            'id': rows[k]['id'],
+            'outcome': 'win' if pl > 0 else 'loss' if pl < 0 else 'breakeven',
+            'exit_price': exit_price,
+            'profit_loss_percent': pl,
+            'exit_reason': REASON_NAMES[reason],
+            'exited_at': from_millis(exit_time),
+        })
+    return outcomes
+
+class OutcomeResolver:
+    """
+    Resolve pending detections, loading candles once per symbol/timeframe.
+    """
+
+    def __init__(
+        self,
+        fetcher: Optional[HistoricalDataFetcher] = None,
+        max_holding_candles: Optional[int] = None
+    ):
+        self.fetcher = fetcher if fetcher is not None else HistoricalDataFetcher()
+        self.max_holding_candles = max_holding_candles
+        self.stats = {
+            'groups': 0,
+            'detections': 0,
+            'resolved': 0,
+            'candles_loaded': 0,
+            'load_seconds': 0.0,
+            'resolve_seconds': 0.0,
+        }
+
+    def resolve(self, detections: List[Dict], now: Optional[datetime] = None) -> List[Dict]:
+        """
+        Outcome rows for every detection that hit its TP or SL before `now`
+        (default: current time). Only candles closed by `now` are used.
+        """
+        now_ts = to_millis(now or datetime.now(timezone.utc))
+        groups: Dict[Tuple[str, str], List[Dict]] = defaultdict(list)
+        for detection in detections:
+            groups[(detection['symbol'], detection['timeframe'])].append(detection)
+
+        outcomes = []
+        for (symbol, timeframe), group in groups.items():
+            outcomes.extend(self._resolve_group(symbol, timeframe, group, now_ts))
+
+        self.stats['groups'] += len(groups)
+        self.stats['detections'] += len(detections)
+        self.stats['resolved'] += len(outcomes)
+        return outcomes
+
+    def _resolve_group(self, symbol: str, timeframe: str, detections: List[Dict], now_ts: int) -> List[Dict]:
+        timeframe_ms = TIMEFRAME_MINUTES.get(timeframe, 60) * 60 * 1000
+        first_ts = min(to_millis(d['detected_at']) for d in detections)
+        last_closed = now_ts - timeframe_ms  # Open time of the last closed candle
+        if last_closed < first_ts:
+            return []
+
+        started = time.perf_counter()
+        try:
+            candles = self.fetcher.fetch_historical(
+                symbol, timeframe,
+                datetime.fromtimestamp(first_ts / 1000, tz=timezone.utc),
+                datetime.fromtimestamp(last_closed / 1000, tz=timezone.utc),
+            )
+        except Exception as e:
+            print(f'[OutcomeResolver] {symbol} {timeframe}: could not load candles: {e}')
+            return []
+        self.stats['load_seconds'] += time.perf_counter() - started
+
+        lo = np.searchsorted(candles.timestamp, first_ts, side='left')
+        hi = np.searchsorted(candles.timestamp, last_closed, side='right')
+        candles = candles[lo:hi]
+        self.stats['candles_loaded'] += len(candles)
+
+        started = time.perf_counter()
+        outcomes = resolve_detections(candles, detections, self.max_holding_candles)
+        self.stats['resolve_seconds'] += time.perf_counter() - started
+        return outcomes
+
+# ═══════════════════════════════════════════════════════════════════════════
+# SUPABASE
+# ═══════════════════════════════════════════════════════════════════════════
+
+def load_pending_detections(supabase, detected_before: str, page_size: int = PENDING_PAGE_SIZE) -> List[Dict]:
+    """All pending detections older than detected_before, paged by id."""
+    detections: List[Dict] = []
+    last_id = None
+    while True:
+        query = supabase.table('ai_pattern_detections').select(DETECTION_COLUMNS).eq(
+            'outcome', 'pending'
+        ).lt('detected_at', detected_before)
+        if last_id is not None:
+            query = query.gt('id', last_id)
+        page = query.order('id').limit(page_size).execute().data or []
+        detections.extend(page)
+        if len(page) < page_size:
+            return detections
+        last_id = page[-1]['id']
+
+def write_outcomes(supabase, outcomes: List[Dict], chunk_size: int = WRITE_CHUNK_SIZE) -> int:
+    """
+    Write outcome rows with the resolve_pattern_outcomes RPC, chunk_size
+    rows per call. Returns the number of detections updated (rows no
+    longer pending are left alone).
+    """
+    updated = 0
+    for i in range(0, len(outcomes), chunk_size):
+        chunk = outcomes[i:i + chunk_size]
+        try:
+            result = supabase.rpc('resolve_pattern_outcomes', {'p_outcomes': chunk}).execute()
+            updated += int(result.data or 0)
+        except Exception as e:
+            # RPC not deployed yet: fall back to one update per row
+            print(f'[OutcomeResolver] Bulk write failed ({e}), updating {len(chunk)} rows one by one')
+            for outcome in chunk:
+                fields = {key: value for key, value in outcome.items() if key != 'id'}
+                supabase.table('ai_pattern_detections').update(fields).eq('id', outcome['id']).execute()
+                updated += 1
+    return updated
+
+# ═══════════════════════════════════════════════════════════════════════════
+# EXPORT
+# ═══════════════════════════════════════════════════════════════════════════
+
+__all__ = [
+    'OutcomeResolver',
+    'resolve_detections',
+    'load_pending_detections',
+    'write_outcomes',
+]
@@ -0,0 +1,324 @@
+# scripts/ai/parallel_backtest.py
+# Multi-process backtest runner sharded by (symbol, timeframe)
+# GEMRAL AI BRAIN - Phase 7
+#
+# Usage:
+#   python parallel_backtest.py --workers 8 --timeframes 1h 4h --days 365
+
+import argparse
+import contextlib
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, replace
+from datetime import datetime, timedelta
+from multiprocessing import shared_memory
+from typing import List, Dict, Optional, Tuple
+
+import numpy as np
+
+from feature_extractor import CandleArray
+from backtest_engine import (
+    BacktestConfig, BacktestEngine, Position, Trade,
+)
+
+# ═══════════════════════════════════════════════════════════════════════════
+# CONFIGURATION
+# ═══════════════════════════════════════════════════════════════════════════
+
+# Same universe as config.TOP_COINS, in Binance symbol format
+TOP_COINS = [
+    'BTCUSDT', 'ETHUSDT', 'BNBUSDT', 'XRPUSDT', 'ADAUSDT',
+    'SOLUSDT', 'DOGEUSDT', 'DOTUSDT', 'MATICUSDT', 'AVAXUSDT',
+    'LINKUSDT', 'UNIUSDT', 'LTCUSDT', 'ATOMUSDT', 'ETCUSDT',
+    'XLMUSDT', 'NEARUSDT', 'ALGOUSDT', 'APTUSDT', 'ARBUSDT',
+    'OPUSDT', 'INJUSDT', 'TIAUSDT', 'SUIUSDT', 'SEIUSDT',
+]
+
+COLUMN_DTYPES = [(name, np.int64 if name == 'timestamp' else np.float64) for name in CandleArray.FIELDS]
+
+# ═══════════════════════════════════════════════════════════════════════════
+# DATA CLASSES
+# ═══════════════════════════════════════════════════════════════════════════
+
+@dataclass
+class ShardTask:
+    """One (symbol, timeframe) unit of work and where its candles live."""
+    index: int
+    symbol: str
+    timeframe: str
+    config: BacktestConfig
+    shm_name: str
+    offset: int   # Byte offset of this shard's columns in the shared block
+    length: int   # Number of candles
+    verbose: bool = False
+
+@dataclass
+class ShardResult:
+    """What an isolated engine produced for one shard."""
+    index: int
+    symbol: str
+    timeframe: str
+    closed_trades: List[Trade]
+    open_positions: List[Position]
+    equity_curve: List[Dict]
+
+# ═══════════════════════════════════════════════════════════════════════════
+# SHARED MEMORY
+# ═══════════════════════════════════════════════════════════════════════════
+
+def _pack_shards(
+    shards: List[Tuple[str, str, CandleArray]]
+) -> Tuple[shared_memory.SharedMemory, List[Tuple[int, int]]]:
+    """Copy every shard's columns into one shared block; return (block, [(offset, length)])."""
+    layout = []
+    total = 0
+    for _, _, candles in shards:
+        layout.append((total, len(candles)))
+        total += len(candles) * 8 * len(COLUMN_DTYPES)
+
+    shm = shared_memory.SharedMemory(create=True, size=max(total, 1))
+    for (_, _, candles), (offset, length) in zip(shards, layout):
+        for column, view in zip(_column_views(shm, offset, length), (getattr(candles, name) for name, _ in COLUMN_DTYPES)):
+            column[:] = view
+
+    return shm, layout
+
+def _column_views(shm: shared_memory.SharedMemory, offset: int, length: int) -> List[np.ndarray]:
+    views = []
+    for i, (_, dtype) in enumerate(COLUMN_DTYPES):
+        views.append(np.ndarray(length, dtype=dtype, buffer=shm.buf, offset=offset + i * length * 8))
+    return views
+
+# ═══════════════════════════════════════════════════════════════════════════
+# WORKER
+# ═══════════════════════════════════════════════════════════════════════════
+
+def _run_shard(task: ShardTask) -> ShardResult:
+    """Run an isolated BacktestEngine on one shard's shared-memory candles."""
+    shm = shared_memory.SharedMemory(name=task.shm_name)
+    try:
+        candles = CandleArray(*_column_views(shm, task.offset, task.length))
+        engine = BacktestEngine(replace(task.config, symbols=[task.symbol], timeframes=[task.timeframe]))
+
+        output = contextlib.nullcontext() if task.verbose else contextlib.redirect_stdout(io.StringIO())
+        with output:
+            engine.run({task.symbol: {task.timeframe: candles}})
+
+        # Drop the views before closing the block
+        del candles
+        return ShardResult(
+            index=task.index,
+            symbol=task.symbol,
+            timeframe=task.timeframe,
+            closed_trades=engine.state.closed_trades,
+            open_positions=engine.state.open_positions,
+            equity_curve=engine.state.equity_curve,
+        )
+    finally:
+        shm.close()
+
+# ═══════════════════════════════════════════════════════════════════════════
+# MERGE
+# ═══════════════════════════════════════════════════════════════════════════
+
+def merge_shard_results(config: BacktestConfig, results: List[ShardResult]) -> Dict:
+    """
+    Combine shard results into one `_calculate_summary` dict.
+
+    Every position open/close across all shards is replayed through a
+    single capital ledger in time order (closes before opens on the same
+    candle, then shard order, then in-shard order). The order does not
+    depend on worker scheduling. On that shared ledger:
+
+    - an open is dropped (with its close) while config.max_concurrent_trades
+      positions are already open across all shards
+    - each kept position is re-sized from the ledger's capital with
+      config's sizing rule, and its P&L scaled by the same factor
+    """
+    OPEN, CLOSE = 1, 0
+    events = []
+    for result in sorted(results, key=lambda r: r.index):
+        for seq, trade in enumerate(result.closed_trades):
+            events.append((trade.entry_time, OPEN, result.index, seq, trade))
+            events.append((trade.exit_time, CLOSE, result.index, seq, trade))
+        for seq, position in enumerate(result.open_positions, start=len(result.closed_trades)):
+            events.append((position.entry_time, OPEN, result.index, seq, position))
+    events.sort(key=lambda e: e[:4])
+
+    record_times = sorted({
+        datetime.fromisoformat(point['time'])
+        for result in results for point in result.equity_curve
+    })
+
+    engine = BacktestEngine(config)
+    state = engine.state
+    open_values: Dict[Tuple[int, int], float] = {}
+    scale: Dict[Tuple[int, int], float] = {}
+    open_positions = []
+
+    def record(time: datetime):
+        total_equity = state.current_capital
+        for value in open_values.values():
+            total_equity += value
+        state.equity_curve.append({
+            'time': time.isoformat(),
+            'equity': total_equity,
+            'drawdown': state.current_drawdown,
+        })
+
+    next_record = 0
+    for time, kind, shard, seq, item in events:
+        while next_record < len(record_times) and record_times[next_record] < time:
+            record(record_times[next_record])
+            next_record += 1
+
+        key = (shard, seq)
+        if kind == OPEN:
+            if len(open_values) >= config.max_concurrent_trades:
+                continue
+            position_size, position_value = engine._calculate_position_size(item.entry_price)
+            if position_value <= 0:
+                continue
+            scale[key] = position_value / item.position_value
+            open_values[key] = position_value
+            state.current_capital -= position_value
+            if isinstance(item, Position):
+                open_positions.append(replace(item, position_size=position_size, position_value=position_value))
+            continue
+
+        if key not in open_values:
+            continue
+        position_value = open_values.pop(key)
+        trade = replace(
+            item,
+            position_size=item.position_size * scale[key],
+            position_value=position_value,
+            profit_loss=item.profit_loss * scale[key],
+        )
+        state.closed_trades.append(trade)
+        state.current_capital += position_value + trade.profit_loss
+
+        if state.current_capital > state.peak_capital:
+            state.peak_capital = state.current_capital
+        if state.current_capital < state.lowest_capital:
+            state.lowest_capital = state.current_capital
+
+        state.current_drawdown = (state.peak_capital - state.current_capital) / state.peak_capital
+        if state.current_drawdown > state.max_drawdown:
+            state.max_drawdown = state.current_drawdown
+
+    for time in record_times[next_record:]:
+        record(time)
+
+    state.open_positions = open_positions
+    state.trade_counter = len(scale)
+
+    return engine._calculate_summary()
+
+# ═══════════════════════════════════════════════════════════════════════════
+# RUNNER
+# ═══════════════════════════════════════════════════════════════════════════
+
+def run_parallel_backtest(
+    config: BacktestConfig,
+    candles_data: Dict[str, Dict[str, CandleArray]],
+    workers: Optional[int] = None,
+    verbose: bool = False
+) -> Dict:
+    """
+    Run config.symbols x config.timeframes as independent shards on a
+    process pool and merge them into one summary.
+
+    Each shard runs an isolated engine against the full initial_capital,
+    so results are the same for any worker count, and merge_shard_results
+    then applies the portfolio-wide concurrency cap and sizing. Numbers
+    can still differ from the serial BacktestEngine.run, which walks the
+    shards one after another rather than in time order, and whose shards
+    see each other's open positions when deciding to trade (a shard here
+    may skip a signal for a position the merge later drops).
+    """
+    shards = []
+    for symbol in config.symbols:
+        for timeframe in config.timeframes:
+            candles = candles_data.get(symbol, {}).get(timeframe)
+            if candles is None or len(candles) == 0:
+                print(f'[ParallelBacktest] No data for {symbol} {timeframe}')
+                continue
+            shards.append((symbol, timeframe, CandleArray.from_candles(candles)))
+
+    if not shards:
+        return BacktestEngine(config)._calculate_summary()
+
+    workers = max(1, min(workers or os.cpu_count() or 1, len(shards)))
+
+    print(f'[ParallelBacktest] {len(shards)} shards on {workers} workers')
+
+    shm, layout = _pack_shards(shards)
+    try:
+        tasks = [
+            ShardTask(i, symbol, timeframe, config, shm.name, offset, length, verbose)
+            for i, ((symbol, timeframe, _), (offset, length)) in enumerate(zip(shards, layout))
+        ]
+
+        if workers == 1:
+            results = [_run_shard(task) for task in tasks]
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                results = list(pool.map(_run_shard, tasks))
+    finally:
+        shm.close()
+        shm.unlink()
+
+    summary = merge_shard_results(config, results)
+
+    print(f'[ParallelBacktest] Completed. {summary["total_trades"]} trades.')
+    return summary
+
+# ═══════════════════════════════════════════════════════════════════════════
+# CLI
+# ═══════════════════════════════════════════════════════════════════════════
+
+def main():
+    parser = argparse.ArgumentParser(description='Parallel backtest over symbol/timeframe shards')
+    parser.add_argument('--symbols', nargs='+', default=TOP_COINS)
+    parser.add_argument('--timeframes', nargs='+', default=['4h'])
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--no-retest', action='store_true', help='Do not require zone retest')
+    args = parser.parse_args()
+
+    from historical_data_fetcher import fetch_all_symbols
+
+    date_to = datetime.now()
+    date_from = date_to - timedelta(days=args.days)
+
+    config = BacktestConfig(
+        date_from=date_from,
+        date_to=date_to,
+        symbols=args.symbols,
+        timeframes=args.timeframes,
+        require_zone_retest=not args.no_retest,
+    )
+
+    candles_data = fetch_all_symbols(args.symbols, args.timeframes, date_from, date_to)
+    summary = run_parallel_backtest(config, candles_data, workers=args.workers)
+
+    print(f'\nTrades: {summary["total_trades"]}')
+    print(f'Win rate: {summary["win_rate"]:.2%}')
+    print(f'Profit Factor: {summary["profit_factor"]:.2f}')
+    print(f'Max drawdown: {summary["max_drawdown_percent"]:.2f}%')
+
+# ═══════════════════════════════════════════════════════════════════════════
+# EXPORT
+# ═══════════════════════════════════════════════════════════════════════════
+
+__all__ = [
+    'TOP_COINS',
+    'ShardResult',
+    'run_parallel_backtest',
+    'merge_shard_results',
+]
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,247 @@
+# scripts/ai/parameter_sweep.py
+# Grid search over BacktestConfig parameters with cached signals
+# GEMRAL AI BRAIN - Phase 7
+#
+# Pattern detection and feature extraction don't depend on the filter or
+# risk settings, so they run once per (symbol, timeframe) and are cached
+# on disk keyed by a hash of the candle data. Each config in the grid then
+# only replays the cheap position-management loop.
+#
+# Usage:
+#   python parameter_sweep.py --symbols BTCUSDT ETHUSDT --timeframes 4h --days 365
+
+import argparse
+import contextlib
+import hashlib
+import io
+import itertools
+import os
+import pickle
+import time
+from dataclasses import fields, replace
+from datetime import datetime, timedelta
+from typing import List, Dict, Any, Optional
+
+from feature_extractor import Candle, CandleArray
+from backtest_engine import BacktestConfig, BacktestEngine, Signal
+
+# ═══════════════════════════════════════════════════════════════════════════
+# CONFIGURATION
+# ═══════════════════════════════════════════════════════════════════════════
+
+SIGNAL_CACHE_DIR = os.getenv(
+    'BACKTEST_SIGNAL_CACHE_DIR',
+    os.path.join(os.path.expanduser('~'), '.cache', 'gemral', 'backtest_signals')
+)
+
+# Bump when detection or feature extraction changes, to invalidate caches
+SIGNAL_CACHE_VERSION = 1
+
+DEFAULT_GRID = {
+    'min_score_threshold': [0.3, 0.4, 0.5, 0.6, 0.7],
+    'take_profit_value': [1.5, 2.0, 2.5, 3.0, 4.0],
+    'require_zone_retest': [True, False],
+    'max_concurrent_trades': [3, 5],
+}
+
+RANK_KEYS = ('profit_factor', 'win_rate', 'total_return_percent', 'max_drawdown')
+
+# ═══════════════════════════════════════════════════════════════════════════
+# SIGNAL CACHE
+# ═══════════════════════════════════════════════════════════════════════════
+
+def candles_hash(candles: List[Candle]) -> str:
+    """Content hash of a candle series (all six columns)."""
+    data = CandleArray.from_candles(candles)
+    digest = hashlib.sha256()
+    for name in CandleArray.FIELDS:
+        digest.update(getattr(data, name).tobytes())
+    return digest.hexdigest()
+
+def load_or_collect_signals(
+    candles: List[Candle],
+    cache_dir: Optional[str] = SIGNAL_CACHE_DIR,
+    config: Optional[BacktestConfig] = None
+) -> List[Signal]:
+    """
+    Signals for a candle series, from the disk cache when available.
+
+    cache_dir=None disables the cache.
+    """
+    path = None
+    if cache_dir:
+        key = f'{candles_hash(candles)}_v{SIGNAL_CACHE_VERSION}'
+        path = os.path.join(cache_dir, f'{key}.pkl')
+        if os.path.exists(path):
+            try:
+                with open(path, 'rb') as f:
+                    return pickle.load(f)
+            except Exception as e:
+                print(f'[Sweep] Ignoring unreadable signal cache {path}: {e}')
+
+    config = config or BacktestConfig(date_from=datetime.now(), date_to=datetime.now())
+    with contextlib.redirect_stdout(io.StringIO()):
+        signals = BacktestEngine(config).collect_signals(candles)
+
+    if path:
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(signals, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+
+    return signals
+
+# ═══════════════════════════════════════════════════════════════════════════
+# SWEEP
+# ═══════════════════════════════════════════════════════════════════════════
+
+def expand_grid(grid: Dict[str, List[Any]]) -> List[Dict[str, Any]]:
+    """Cartesian product of a {field: [values]} grid, in key order."""
+    valid = {f.name for f in fields(BacktestConfig)}
+    unknown = set(grid) - valid
+    if unknown:
+        raise ValueError(f'Unknown BacktestConfig fields in grid: {sorted(unknown)}')
+
+    keys = list(grid)
+    return [dict(zip(keys, values)) for values in itertools.product(*(grid[k] for k in keys))]
+
+def run_parameter_sweep(
+    base_config: BacktestConfig,
+    grid: Dict[str, List[Any]],
+    candles_data: Dict[str, Dict[str, List[Candle]]],
+    cache_dir: Optional[str] = SIGNAL_CACHE_DIR,
+    rank_by: str = 'profit_factor'
+) -> List[Dict[str, Any]]:
+    """
+    Backtest every combination in `grid` on top of base_config.
+
+    Returns one row per config ({'params', 'total_trades', 'win_rate',
+    'profit_factor', 'max_drawdown', 'total_return_percent'}), ranked by
+    `rank_by` (max_drawdown ascending, everything else descending).
+    """
+    if rank_by not in RANK_KEYS:
+        raise ValueError(f'rank_by must be one of {RANK_KEYS}')
+
+    combos = expand_grid(grid)
+    print(f'[Sweep] {len(combos)} configs over {len(base_config.symbols)} symbols x {len(base_config.timeframes)} timeframes')
+
+    # Stage 1: signals once per (symbol, timeframe)
+    start = time.perf_counter()
+    replay_candles: Dict[str, Dict[str, CandleArray]] = {}
+    signals_data: Dict[str, Dict[str, List[Signal]]] = {}
+
+    for symbol in base_config.symbols:
+        for timeframe in base_config.timeframes:
+            candles = candles_data.get(symbol, {}).get(timeframe)
+            if candles is None:
+                continue
+            signals = load_or_collect_signals(candles, cache_dir, base_config)
+            replay_candles.setdefault(symbol, {})[timeframe] = CandleArray.from_candles(candles)
+            signals_data.setdefault(symbol, {})[timeframe] = signals
+
+    print(f'[Sweep] Signals ready in {time.perf_counter() - start:.2f}s')
+
+    # Stage 2: replay position management per config
+    start = time.perf_counter()
+    rows = []
+    exit_cache: Dict = {}
+
+    for params in combos:
+        config = replace(base_config, **params)
+        with contextlib.redirect_stdout(io.StringIO()):
+            summary = BacktestEngine(config).run(replay_candles, signals_data, exit_cache)
+
+        rows.append({
+            'params': params,
+            'total_trades': summary['total_trades'],
+            'win_rate': summary['win_rate'],
+            'profit_factor': summary['profit_factor'],
+            'max_drawdown': summary['max_drawdown'],
+            'total_return_percent': summary.get('total_return_percent', 0.0),
+        })
+
+    print(f'[Sweep] Replayed {len(combos)} configs in {time.perf_counter() - start:.2f}s')
+
+    descending = rank_by != 'max_drawdown'
+    rows.sort(key=lambda r: r[rank_by], reverse=descending)
+    return rows
+
+def format_sweep_table(rows: List[Dict[str, Any]], top: Optional[int] = 20) -> str:
+    """Render sweep rows as a fixed-width ranked table."""
+    if not rows:
+        return '(no results)'
+
+    param_keys = list(rows[0]['params'])
+    header = ['#'] + param_keys + ['trades', 'win_rate', 'pf', 'max_dd', 'return%']
+    lines = []
+
+    for rank, row in enumerate(rows[:top] if top else rows, start=1):
+        lines.append([str(rank)] + [str(row['params'][k]) for k in param_keys] + [
+            str(row['total_trades']),
+            f'{row["win_rate"]:.2%}',
+            f'{row["profit_factor"]:.2f}',
+            f'{row["max_drawdown"]:.2%}',
+            f'{row["total_return_percent"]:.2f}',
+        ])
+
+    widths = [max(len(h), *(len(line[i]) for line in lines)) for i, h in enumerate(header)]
+
+    def render(cells: List[str]) -> str:
+        return '  '.join(c.rjust(w) for c, w in zip(cells, widths))
+
+    return '\n'.join([render(header), render(['-' * w for w in widths])] + [render(line) for line in lines])
+
+# ═══════════════════════════════════════════════════════════════════════════
+# CLI
+# ═══════════════════════════════════════════════════════════════════════════
+
+def main():
+    parser = argparse.ArgumentParser(description='BacktestConfig grid search')
+    parser.add_argument('--symbols', nargs='+', default=['BTCUSDT', 'ETHUSDT'])
+    parser.add_argument('--timeframes', nargs='+', default=['4h'])
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--rank-by', default='profit_factor', choices=RANK_KEYS)
+    parser.add_argument('--top', type=int, default=20)
+    parser.add_argument('--no-cache', action='store_true')
+    args = parser.parse_args()
+
+    from historical_data_fetcher import fetch_all_symbols
+
+    date_to = datetime.now()
+    date_from = date_to - timedelta(days=args.days)
+
+    base_config = BacktestConfig(
+        date_from=date_from,
+        date_to=date_to,
+        symbols=args.symbols,
+        timeframes=args.timeframes,
+    )
+
+    candles_data = fetch_all_symbols(args.symbols, args.timeframes, date_from, date_to)
+    rows = run_parameter_sweep(
+        base_config,
+        DEFAULT_GRID,
+        candles_data,
+        cache_dir=None if args.no_cache else SIGNAL_CACHE_DIR,
+        rank_by=args.rank_by,
+    )
+
+    print()
+    print(format_sweep_table(rows, top=args.top))
+
+# ═══════════════════════════════════════════════════════════════════════════
+# EXPORT
+# ═══════════════════════════════════════════════════════════════════════════
+
+__all__ = [
+    'DEFAULT_GRID',
+    'candles_hash',
+    'load_or_collect_signals',
+    'expand_grid',
+    'run_parameter_sweep',
+    'format_sweep_table',
+]
+
+if __name__ == '__main__':
+    main()
@@ -2,13 +2,17 @@
 # Core pattern detection engine with 24 patterns
 # GEMRAL AI BRAIN - Phase 6
 
+from array import array
+from bisect import bisect_left, insort
+from collections import deque
 from dataclasses import dataclass
 from enum import Enum
 from typing import List, Dict, Any, Optional, Tuple
 import numpy as np
 
 from feature_extractor import (
-    Candle, PatternFeatures, extract_features,
+    Candle, PatternFeatures, extract_features, FeatureCache,
+    SwingIndex, SwingView,
     calculate_ema, calculate_rsi, calculate_atr, calculate_macd,
     zone_retest_validation, support_resistance_confluence,
     volume_confirmation, trend_context
@@ -102,10 +106,146 @@ class PatternDetection:
     features: Optional[PatternFeatures] = None
 
 # ═══════════════════════════════════════════════════════════════════════════
-# INDIVIDUAL PATTERN DETECTORS
+# ZONE INDEX
 # ═══════════════════════════════════════════════════════════════════════════
+# HFZ/LFZ count, for evenly spaced levels between the lowest and highest
+# low (high) of the lookback, how many lows (highs) lie within tolerance.
+# ZoneIndex keeps the lookback's lows and highs sorted as bars arrive, so
+# each count is a pair of binary searches instead of a pass over the window and
+# the level grid can be refined (e.g. 500 levels) at almost no cost.
+
+ZONE_LOOKBACK = 100   # detect_hfz / detect_lfz default lookback
+ZONE_LEVELS = 20      # Level grid of the original scan
+ZONE_PATTERNS = {PatternType.HFZ, PatternType.LFZ}
+MIN_ZONE_TOUCHES = 3
+
+_LEVEL_STEPS = np.arange(ZONE_LEVELS, dtype=np.float64)
+
+def _zone_levels(low: float, high: float) -> np.ndarray:
+    """np.linspace(low, high, ZONE_LEVELS), same rounding, without its per-call overhead."""
+    levels = _LEVEL_STEPS * ((high - low) / (ZONE_LEVELS - 1)) + low
+    levels[-1] = high
+    return levels
+
+def _best_zone(test_levels: np.ndarray, touch_counts: np.ndarray) -> Tuple[Optional[float], int]:
+    """First level with the most touches, if it has at least MIN_ZONE_TOUCHES."""
+    best = int(np.argmax(touch_counts))
+    best_touches = int(touch_counts[best])
+    if best_touches < MIN_ZONE_TOUCHES:
+        return None, 0
+    return test_levels[best], best_touches
+
+class ZoneIndex:
+    """
+    Sorted lows and highs of the last `lookback` candles, updated per bar,
+    for HFZ/LFZ touch counts.
 
-def detect_double_bottom(candles: List[Candle], lookback: int = 50) -> Optional[PatternDetection]:
+    Counts are exact: with levels=ZONE_LEVELS the detectors give the same
+    results as scanning the window. Keep it in step with the candles
+    passed to the detectors (append each new bar, replace_last on updates).
+    """
+
+    SIDES = ('low', 'high')
+
+    def __init__(self, candles=None, lookback: int = ZONE_LOOKBACK, levels: int = ZONE_LEVELS):
+        if levels < 2:
+            raise ValueError('ZoneIndex needs at least 2 levels')
+        self.lookback = lookback
+        self.levels = levels
+        # Level grid twice over: one copy per edge of the tolerance band
+        self._steps = np.tile(np.arange(levels, dtype=np.float64), 2)
+        self._recent = {side: deque() for side in self.SIDES}
+        # Sorted values between -inf/+inf sentinels, so every edge has neighbours
+        self._sorted = {side: array('d', [-np.inf, np.inf]) for side in self.SIDES}
+        if candles is not None:
+            self.extend(candles[-lookback:])
+
+    def __len__(self) -> int:
+        return len(self._recent['low'])
+
+    def covers(self, lookback: int) -> bool:
+        """True if this index answers for a full window of `lookback` bars."""
+        return lookback == self.lookback and len(self) == lookback
+
+    def append(self, candle: Candle):
+        """Add a closed candle, dropping the one that leaves the lookback."""
+        full = len(self) == self.lookback
+        for side in self.SIDES:
+            value = float(getattr(candle, side))
+            recent, values = self._recent[side], self._sorted[side]
+            if full:
+                del values[bisect_left(values, recent.popleft())]
+            recent.append(value)
+            insort(values, value)
+
+    def extend(self, candles):
+        for candle in candles:
+            self.append(candle)
+
+    def replace_last(self, candle: Candle):
+        """Overwrite the last bar (an update to the still-open candle)."""
+        for side in self.SIDES:
+            value = float(getattr(candle, side))
+            recent, values = self._recent[side], self._sorted[side]
+            del values[bisect_left(values, recent.pop())]
+            recent.append(value)
+            insort(values, value)
+
+    def touches(self, side: str, tolerance: float) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Test levels (np.linspace(min, max, levels) of the side's values)
+        and, per level, how many values lie strictly within tolerance.
+        """
+        padded = np.array(self._sorted[side])
+        low, high = padded[1], padded[-2]
+        n = self.levels
+
+        # Same rounding as np.linspace
+        levels = self._steps * ((high - low) / (n - 1)) + low
+        levels[n - 1] = levels[-1] = high
+
+        # |v - L| < tol  <=>  (v - L < tol) and not (v - L <= -tol). Both are
+        # prefixes of the sorted values; x <= -tol is x < nextafter(-tol, inf).
+        limits = np.empty(2 * n)
+        limits[:n] = tolerance
+        limits[n:] = np.nextafter(-tolerance, np.inf)
+
+        # Binary search on v < L + limit, then move edges the subtraction
+        # rounds the other way (count c: padded[c] passes, padded[c+1] fails)
+        count = np.searchsorted(padded, levels + limits) - 1
+        while True:
+            back = padded[count] - levels >= limits
+            forward = padded[count + 1] - levels < limits
+            if not (back.any() or forward.any()):
+                break
+            count += forward.astype(np.intp) - back
+
+        return levels[:n], count[:n] - count[n:]
+
+    def best_zone(self, side: str, tolerance: float) -> Tuple[Optional[float], int]:
+        """Level with the most touches (at least MIN_ZONE_TOUCHES) and its count."""
+        return _best_zone(*self.touches(side, tolerance))
+
+# ═══════════════════════════════════════════════════════════════════════════
+# INDIVIDUAL PATTERN DETECTORS
+# ═══════════════════════════════════════════════════════════════════════════
+# Each detector takes an optional SwingView covering the last len(swings)
+# candles (see PatternDetectionEngine.detect_all); without one, or if it is
+# shorter than the lookback, it reads its own window.
+
+SWING_LOOKBACK = 100  # Longest detector window and S/R lookback
+
+def _window(candles: List[Candle], lookback: int, swings: Optional[SwingView]) -> SwingView:
+    """The last `lookback` candles as a SwingView."""
+    if swings is None or len(swings) < lookback:
+        return SwingView.from_candles(candles[-lookback:])
+    return swings.tail(lookback)
+
+def detect_double_bottom(
+    candles: List[Candle],
+    lookback: int = 50,
+    swings: Optional[SwingView] = None
+) -> Optional[PatternDetection]:
     """
     Detect Double Bottom pattern.
     Two lows at similar price levels, with a peak in between.
@@ -113,19 +253,17 @@ def detect_double_bottom(candles: List[Candle], lookback: int = 50) -> Optional[
     if len(candles) < lookback:
         return None
 
-    recent = candles[-lookback:]
-    lows = [c.low for c in recent]
-    highs = [c.high for c in recent]
-    closes = [c.close for c in recent]
-
-    # Find two lowest points
-    sorted_lows = sorted(enumerate(lows), key=lambda x: x[1])
+    w = _window(candles, lookback, swings)
+    lows = w.low
+    highs = w.high
+    closes = w.close
 
-    if len(sorted_lows) < 2:
+    # Find two lowest points (earliest first on ties)
+    if len(lows) < 2:
         return None
 
-    idx1, low1 = sorted_lows[0]
-    idx2, low2 = sorted_lows[1]
+    idx1, idx2 = np.argsort(lows, kind='stable')[:2].tolist()
+    low1, low2 = float(lows[idx1]), float(lows[idx2])
 
     # Ensure they're at least 5 candles apart
     if abs(idx1 - idx2) < 5:
@@ -141,7 +279,7 @@ def detect_double_bottom(candles: List[Candle], lookback: int = 50) -> Optional[
         return None
 
     # Find high between the two lows (neckline)
-    high_between = max(highs[idx1:idx2+1])
+    high_between = float(highs[idx1:idx2+1].max())
     neckline = high_between
 
     # There should be at least 3% bounce from the lows to the neckline
@@ -150,7 +288,7 @@ def detect_double_bottom(candles: List[Candle], lookback: int = 50) -> Optional[
         return None
 
     # Current price should be near or above neckline
-    current_price = closes[-1]
+    current_price = float(closes[-1])
     if current_price < neckline * 0.98:
         return None
 
@@ -185,7 +323,11 @@ def detect_double_bottom(candles: List[Candle], lookback: int = 50) -> Optional[
         }
     )
 
-def detect_double_top(candles: List[Candle], lookback: int = 50) -> Optional[PatternDetection]:
+def detect_double_top(
+    candles: List[Candle],
+    lookback: int = 50,
+    swings: Optional[SwingView] = None
+) -> Optional[PatternDetection]:
     """
     Detect Double Top pattern.
     Two highs at similar price levels, with a trough in between.
@@ -193,19 +335,17 @@ def detect_double_top(candles: List[Candle], lookback: int = 50) -> Optional[Pat
     if len(candles) < lookback:
         return None
 
-    recent = candles[-lookback:]
-    lows = [c.low for c in recent]
-    highs = [c.high for c in recent]
-    closes = [c.close for c in recent]
+    w = _window(candles, lookback, swings)
+    lows = w.low
+    highs = w.high
+    closes = w.close
 
-    # Find two highest points
-    sorted_highs = sorted(enumerate(highs), key=lambda x: x[1], reverse=True)
-
-    if len(sorted_highs) < 2:
+    # Find two highest points (earliest first on ties)
+    if len(highs) < 2:
         return None
 
-    idx1, high1 = sorted_highs[0]
-    idx2, high2 = sorted_highs[1]
+    idx1, idx2 = np.argsort(-highs, kind='stable')[:2].tolist()
+    high1, high2 = float(highs[idx1]), float(highs[idx2])
 
     if abs(idx1 - idx2) < 5:
         return None
@@ -217,14 +357,14 @@ def detect_double_top(candles: List[Candle], lookback: int = 50) -> Optional[Pat
     if abs(high1 - high2) / high1 > 0.02:
         return None
 
-    low_between = min(lows[idx1:idx2+1])
+    low_between = float(lows[idx1:idx2+1].min())
     neckline = low_between
 
     avg_high = (high1 + high2) / 2
     if (avg_high - neckline) / avg_high < 0.03:
         return None
 
-    current_price = closes[-1]
+    current_price = float(closes[-1])
     if current_price > neckline * 1.02:
         return None
 
@@ -257,7 +397,11 @@ def detect_double_top(candles: List[Candle], lookback: int = 50) -> Optional[Pat
         }
     )
 
-def detect_head_shoulders(candles: List[Candle], lookback: int = 60) -> Optional[PatternDetection]:
+def detect_head_shoulders(
+    candles: List[Candle],
+    lookback: int = 60,
+    swings: Optional[SwingView] = None
+) -> Optional[PatternDetection]:
     """
     Detect Head and Shoulders pattern.
     Three peaks with middle (head) being highest.
@@ -265,23 +409,22 @@ def detect_head_shoulders(candles: List[Candle], lookback: int = 60) -> Optional
     if len(candles) < lookback:
         return None
 
-    recent = candles[-lookback:]
-    highs = [c.high for c in recent]
-    lows = [c.low for c in recent]
-    closes = [c.close for c in recent]
+    w = _window(candles, lookback, swings)
+    highs = w.high
+    lows = w.low
+    closes = w.close
 
     # Find peaks (local maxima)
-    peaks = []
-    for i in range(2, len(highs) - 2):
-        if (highs[i] > highs[i-1] and highs[i] > highs[i-2] and
-            highs[i] > highs[i+1] and highs[i] > highs[i+2]):
-            peaks.append((i, highs[i]))
+    peak_positions = w.pivot_highs()
 
-    if len(peaks) < 3:
+    if len(peak_positions) < 3:
         return None
 
+    peak_highs = highs[peak_positions]
+    peaks = list(zip(peak_positions.tolist(), peak_highs.tolist()))
+
     # Find head (highest peak)
-    head_idx = max(range(len(peaks)), key=lambda x: peaks[x][1])
+    head_idx = int(np.argmax(peak_highs))
 
     # Need at least one peak on each side
     if head_idx == 0 or head_idx == len(peaks) - 1:
@@ -302,12 +445,12 @@ def detect_head_shoulders(candles: List[Candle], lookback: int = 60) -> Optional
         return None
 
     # Find neckline (connect lows between peaks)
-    left_trough = min(lows[left_shoulder[0]:head[0]])
-    right_trough = min(lows[head[0]:right_shoulder[0]+1])
+    left_trough = float(lows[left_shoulder[0]:head[0]].min())
+    right_trough = float(lows[head[0]:right_shoulder[0]+1].min())
     neckline = (left_trough + right_trough) / 2
 
     # Current price should be near or below neckline
-    current_price = closes[-1]
+    current_price = float(closes[-1])
     if current_price > neckline * 1.02:
         return None
 
@@ -343,7 +486,11 @@ def detect_head_shoulders(candles: List[Candle], lookback: int = 60) -> Optional
         }
     )
 
-def detect_upu(candles: List[Candle], lookback: int = 40) -> Optional[PatternDetection]:
+def detect_upu(
+    candles: List[Candle],
+    lookback: int = 40,
+    swings: Optional[SwingView] = None
+) -> Optional[PatternDetection]:
     """
     Detect UPU (Up-Pause-Up) pattern.
     GEM proprietary continuation pattern.
@@ -351,13 +498,13 @@ def detect_upu(candles: List[Candle], lookback: int = 40) -> Optional[PatternDet
     if len(candles) < lookback:
         return None
 
-    recent = candles[-lookback:]
-    closes = [c.close for c in recent]
+    w = _window(candles, lookback, swings)
+    closes = w.close
 
     # Phase 1: Initial up move (first 1/3)
     phase1_end = lookback // 3
-    phase1_start_price = closes[0]
-    phase1_end_price = max(closes[:phase1_end])
+    phase1_start_price = float(closes[0])
+    phase1_end_price = float(closes[:phase1_end].max())
     phase1_move = (phase1_end_price - phase1_start_price) / phase1_start_price
 
     if phase1_move < 0.02:  # Need at least 2% move
@@ -367,18 +514,18 @@ def detect_upu(candles: List[Candle], lookback: int = 40) -> Optional[PatternDet
     phase2_start = phase1_end
     phase2_end = phase1_end * 2
     phase2_prices = closes[phase2_start:phase2_end]
-    phase2_range = (max(phase2_prices) - min(phase2_prices)) / min(phase2_prices)
+    phase2_high = float(phase2_prices.max())
+    phase2_low = float(phase2_prices.min())
+    phase2_range = (phase2_high - phase2_low) / phase2_low
 
     if phase2_range > 0.03:  # Consolidation should be tight
         return None
 
     # Phase 3: Continuation up (last 1/3)
-    phase3_prices = closes[phase2_end:]
-    if not phase3_prices:
+    if phase2_end >= len(closes):
         return None
 
-    current_price = closes[-1]
-    phase2_high = max(phase2_prices)
+    current_price = float(closes[-1])
 
     # Should break above consolidation
     if current_price <= phase2_high:
@@ -386,7 +533,7 @@ def detect_upu(candles: List[Candle], lookback: int = 40) -> Optional[PatternDet
 
     # Calculate targets
     entry_price = current_price
-    stop_loss = min(phase2_prices) * 0.99
+    stop_loss = phase2_low * 0.99
     take_profit = current_price + (phase1_end_price - phase1_start_price)
 
     confidence = min(1.0, phase1_move * 10) * 0.5 + (1 - phase2_range * 10) * 0.5
@@ -400,7 +547,7 @@ def detect_upu(candles: List[Candle], lookback: int = 40) -> Optional[PatternDet
         entry_price=entry_price,
         stop_loss=stop_loss,
         take_profit=take_profit,
-        zone_price=min(phase2_prices),
+        zone_price=phase2_low,
         zone_type='support',
         pattern_data={
             'phase1_move': phase1_move,
@@ -409,7 +556,11 @@ def detect_upu(candles: List[Candle], lookback: int = 40) -> Optional[PatternDet
         }
     )
 
-def detect_dpd(candles: List[Candle], lookback: int = 40) -> Optional[PatternDetection]:
+def detect_dpd(
+    candles: List[Candle],
+    lookback: int = 40,
+    swings: Optional[SwingView] = None
+) -> Optional[PatternDetection]:
     """
     Detect DPD (Down-Pause-Down) pattern.
     GEM proprietary continuation pattern.
@@ -417,13 +568,13 @@ def detect_dpd(candles: List[Candle], lookback: int = 40) -> Optional[PatternDet
     if len(candles) < lookback:
         return None
 
-    recent = candles[-lookback:]
-    closes = [c.close for c in recent]
+    w = _window(candles, lookback, swings)
+    closes = w.close
 
     # Phase 1: Initial down move
     phase1_end = lookback // 3
-    phase1_start_price = closes[0]
-    phase1_end_price = min(closes[:phase1_end])
+    phase1_start_price = float(closes[0])
+    phase1_end_price = float(closes[:phase1_end].min())
     phase1_move = (phase1_start_price - phase1_end_price) / phase1_start_price
 
     if phase1_move < 0.02:
@@ -433,20 +584,21 @@ def detect_dpd(candles: List[Candle], lookback: int = 40) -> Optional[PatternDet
     phase2_start = phase1_end
     phase2_end = phase1_end * 2
     phase2_prices = closes[phase2_start:phase2_end]
-    phase2_range = (max(phase2_prices) - min(phase2_prices)) / max(phase2_prices)
+    phase2_high = float(phase2_prices.max())
+    phase2_low = float(phase2_prices.min())
+    phase2_range = (phase2_high - phase2_low) / phase2_high
 
     if phase2_range > 0.03:
         return None
 
     # Phase 3: Continuation down
-    current_price = closes[-1]
-    phase2_low = min(phase2_prices)
+    current_price = float(closes[-1])
 
     if current_price >= phase2_low:
         return None
 
     entry_price = current_price
-    stop_loss = max(phase2_prices) * 1.01
+    stop_loss = phase2_high * 1.01
     take_profit = current_price - (phase1_start_price - phase1_end_price)
 
     confidence = min(1.0, phase1_move * 10) * 0.5 + (1 - phase2_range * 10) * 0.5
@@ -460,7 +612,7 @@ def detect_dpd(candles: List[Candle], lookback: int = 40) -> Optional[PatternDet
         entry_price=entry_price,
         stop_loss=stop_loss,
         take_profit=take_profit,
-        zone_price=max(phase2_prices),
+        zone_price=phase2_high,
         zone_type='resistance',
         pattern_data={
             'phase1_move': phase1_move,
@@ -469,31 +621,36 @@ def detect_dpd(candles: List[Candle], lookback: int = 40) -> Optional[PatternDet
         }
     )
 
-def detect_hfz(candles: List[Candle], lookback: int = 100) -> Optional[PatternDetection]:
+def detect_hfz(
+    candles: List[Candle],
+    lookback: int = 100,
+    swings: Optional[SwingView] = None,
+    zones: Optional[ZoneIndex] = None
+) -> Optional[PatternDetection]:
     """
     Detect HFZ (High Frequency Zone) - Support zone with multiple touches.
+
+    zones: ZoneIndex over the same candles; touch counts come from it
+    (and its level grid) instead of a scan of the window.
     """
     if len(candles) < lookback:
         return None
 
-    recent = candles[-lookback:]
-    lows = [c.low for c in recent]
-    closes = [c.close for c in recent]
-    current_price = closes[-1]
+    w = _window(candles, lookback, swings)
+    lows = w.low
+    closes = w.close
+    current_price = float(closes[-1])
 
     # Find potential support zones
     zone_tolerance = current_price * 0.015  # 1.5% zone width
 
     # Count touches at various levels
-    test_levels = np.linspace(min(lows), max(lows), 20)
-    best_zone = None
-    best_touches = 0
-
-    for level in test_levels:
-        touches = sum(1 for low in lows if abs(low - level) < zone_tolerance)
-        if touches > best_touches and touches >= 3:
-            best_touches = touches
-            best_zone = level
+    if zones is not None and zones.covers(lookback):
+        best_zone, best_touches = zones.best_zone('low', zone_tolerance)
+    else:
+        test_levels = _zone_levels(lows.min(), lows.max())
+        touch_counts = (np.abs(lows[None, :] - test_levels[:, None]) < zone_tolerance).sum(axis=1)
+        best_zone, best_touches = _best_zone(test_levels, touch_counts)
 
     if best_zone is None:
         return None
@@ -530,29 +687,33 @@ def detect_hfz(candles: List[Candle], lookback: int = 100) -> Optional[PatternDe
         }
     )
 
-def detect_lfz(candles: List[Candle], lookback: int = 100) -> Optional[PatternDetection]:
+def detect_lfz(
+    candles: List[Candle],
+    lookback: int = 100,
+    swings: Optional[SwingView] = None,
+    zones: Optional[ZoneIndex] = None
+) -> Optional[PatternDetection]:
     """
     Detect LFZ (Low Frequency Zone) - Resistance zone with multiple touches.
+
+    zones: ZoneIndex over the same candles (see detect_hfz).
     """
     if len(candles) < lookback:
         return None
 
-    recent = candles[-lookback:]
-    highs = [c.high for c in recent]
-    closes = [c.close for c in recent]
-    current_price = closes[-1]
+    w = _window(candles, lookback, swings)
+    highs = w.high
+    closes = w.close
+    current_price = float(closes[-1])
 
     zone_tolerance = current_price * 0.015
 
-    test_levels = np.linspace(min(highs), max(highs), 20)
-    best_zone = None
-    best_touches = 0
-
-    for level in test_levels:
-        touches = sum(1 for high in highs if abs(high - level) < zone_tolerance)
-        if touches > best_touches and touches >= 3:
-            best_touches = touches
-            best_zone = level
+    if zones is not None and zones.covers(lookback):
+        best_zone, best_touches = zones.best_zone('high', zone_tolerance)
+    else:
+        test_levels = _zone_levels(highs.min(), highs.max())
+        touch_counts = (np.abs(highs[None, :] - test_levels[:, None]) < zone_tolerance).sum(axis=1)
+        best_zone, best_touches = _best_zone(test_levels, touch_counts)
 
     if best_zone is None:
         return None
@@ -587,7 +748,11 @@ def detect_lfz(candles: List[Candle], lookback: int = 100) -> Optional[PatternDe
         }
     )
 
-def detect_bull_flag(candles: List[Candle], lookback: int = 40) -> Optional[PatternDetection]:
+def detect_bull_flag(
+    candles: List[Candle],
+    lookback: int = 40,
+    swings: Optional[SwingView] = None
+) -> Optional[PatternDetection]:
     """
     Detect Bull Flag pattern.
     Strong upward move (pole) followed by slight downward consolidation (flag).
@@ -595,31 +760,30 @@ def detect_bull_flag(candles: List[Candle], lookback: int = 40) -> Optional[Patt
     if len(candles) < lookback:
         return None
 
-    recent = candles[-lookback:]
-    closes = [c.close for c in recent]
-    highs = [c.high for c in recent]
-    lows = [c.low for c in recent]
+    w = _window(candles, lookback, swings)
+    closes = w.close
+    highs = w.high
+    lows = w.low
 
     # Find the pole (strong up move in first half)
     pole_end = lookback // 2
-    pole_start_price = min(lows[:pole_end])
-    pole_end_price = max(highs[:pole_end])
+    pole_start_price = float(lows[:pole_end].min())
+    pole_end_price = float(highs[:pole_end].max())
     pole_move = (pole_end_price - pole_start_price) / pole_start_price
 
     if pole_move < 0.05:  # Need at least 5% pole
         return None
 
     # Flag should retrace no more than 38.2% of pole
-    flag_prices = closes[pole_end:]
-    flag_low = min(flag_prices)
+    flag_low = float(closes[pole_end:].min())
     max_retrace = pole_start_price + (pole_end_price - pole_start_price) * 0.618
 
     if flag_low < max_retrace:
         return None
 
     # Current price should be breaking out of flag
-    current_price = closes[-1]
-    flag_high = max(highs[pole_end:])
+    current_price = float(closes[-1])
+    flag_high = float(highs[pole_end:].max())
 
     if current_price < flag_high * 0.98:
         return None
@@ -649,35 +813,38 @@ def detect_bull_flag(candles: List[Candle], lookback: int = 40) -> Optional[Patt
         }
     )
 
-def detect_bear_flag(candles: List[Candle], lookback: int = 40) -> Optional[PatternDetection]:
+def detect_bear_flag(
+    candles: List[Candle],
+    lookback: int = 40,
+    swings: Optional[SwingView] = None
+) -> Optional[PatternDetection]:
     """
     Detect Bear Flag pattern.
     """
     if len(candles) < lookback:
         return None
 
-    recent = candles[-lookback:]
-    closes = [c.close for c in recent]
-    highs = [c.high for c in recent]
-    lows = [c.low for c in recent]
+    w = _window(candles, lookback, swings)
+    closes = w.close
+    highs = w.high
+    lows = w.low
 
     pole_end = lookback // 2
-    pole_start_price = max(highs[:pole_end])
-    pole_end_price = min(lows[:pole_end])
+    pole_start_price = float(highs[:pole_end].max())
+    pole_end_price = float(lows[:pole_end].min())
     pole_move = (pole_start_price - pole_end_price) / pole_start_price
 
     if pole_move < 0.05:
         return None
 
-    flag_prices = closes[pole_end:]
-    flag_high = max(flag_prices)
+    flag_high = float(closes[pole_end:].max())
     max_retrace = pole_start_price - (pole_start_price - pole_end_price) * 0.618
 
     if flag_high > max_retrace:
         return None
 
-    current_price = closes[-1]
-    flag_low = min(lows[pole_end:])
+    current_price = float(closes[-1])
+    flag_low = float(lows[pole_end:].min())
 
     if current_price > flag_low * 1.02:
         return None
@@ -714,10 +881,13 @@ def detect_bear_flag(candles: List[Candle], lookback: int = 40) -> Optional[Patt
 class PatternDetectionEngine:
     """Main pattern detection engine."""
 
-    def __init__(self, user_tier: str = 'FREE'):
+    def __init__(self, user_tier: str = 'FREE', feature_cache: Optional[FeatureCache] = None):
         self.user_tier = user_tier
         self.available_patterns = self._get_available_patterns()
 
+        # Bar contexts shared across detect_all calls that name their symbol
+        self.feature_cache = feature_cache if feature_cache is not None else FeatureCache()
+
         # Pattern detector functions
         self.detectors = {
             PatternType.DOUBLE_BOTTOM: detect_double_bottom,
@@ -748,15 +918,28 @@ class PatternDetectionEngine:
         self,
         candles: List[Candle],
         min_confidence: float = 0.5,
-        require_zone_retest: bool = True
+        require_zone_retest: bool = True,
+        swings: Optional[SwingView] = None,
+        zones: Optional[ZoneIndex] = None,
+        symbol: Optional[str] = None,
+        timeframe: Optional[str] = None
     ) -> List[PatternDetection]:
         """
         Detect all patterns in candles.
 
         Args:
-            candles: List of candles
+            candles: List of candles or a CandleArray
             min_confidence: Minimum confidence threshold
             require_zone_retest: Whether to require zone retest (KEY for win rate)
+            swings: SwingView over the last candles (e.g. from a SwingIndex
+                kept current bar by bar); built once over the last
+                SWING_LOOKBACK candles if omitted and shared by every detector
+                and the S/R features
+            zones: ZoneIndex over the same candles for HFZ/LFZ touch counts
+            symbol, timeframe: Identify the candles so the pattern-independent
+                bar features come from self.feature_cache across calls (only
+                for closed candles); without them they are still computed
+                once per call
 
         Returns:
             List of detected patterns
@@ -765,7 +948,13 @@ class PatternDetectionEngine:
             print('[PatternEngine] Need at least 200 candles')
             return []
 
+        if swings is None:
+            swings = SwingIndex(candles[-SWING_LOOKBACK:]).view()
+        elif len(swings) > len(candles):
+            raise ValueError(f'SwingView has {len(swings)} bars, candles only {len(candles)}')
+
         detections = []
+        feature_cache = self.feature_cache if symbol is not None else FeatureCache()
 
         for pattern_type in self.available_patterns:
             if pattern_type not in self.detectors:
@@ -774,7 +963,10 @@ class PatternDetectionEngine:
             detector = self.detectors[pattern_type]
 
             try:
-                detection = detector(candles)
+                if pattern_type in ZONE_PATTERNS and zones is not None:
+                    detection = detector(candles, swings=swings, zones=zones)
+                else:
+                    detection = detector(candles, swings=swings)
 
                 if detection is None:
                     continue
@@ -790,7 +982,11 @@ class PatternDetectionEngine:
                             detection.start_index,
                             detection.end_index,
                             detection.zone_price,
-                            detection.zone_type
+                            detection.zone_type,
+                            context=feature_cache.context(
+                                candles, detection.end_index, swings=swings,
+                                symbol=symbol, timeframe=timeframe
+                            )
                         )
                         detection.features = features
 
@@ -817,13 +1013,40 @@ class PatternDetectionEngine:
     def detect_pattern(
         self,
         candles: List[Candle],
-        pattern_type: PatternType
+        pattern_type: PatternType,
+        swings: Optional[SwingView] = None
     ) -> Optional[PatternDetection]:
         """Detect a specific pattern."""
         if pattern_type not in self.detectors:
             return None
 
-        return self.detectors[pattern_type](candles)
+        return self.detectors[pattern_type](candles, swings=swings)
+
+    def detect_all_history(
+        self,
+        candles: List[Candle],
+        min_confidence: float = 0.5,
+        min_bars: int = 200
+    ) -> np.ndarray:
+        """
+        Run every available detector at every bar in one vectorized pass.
+
+        Row for bar i = what the detector returns on candles[:i+1], so this
+        replaces a per-bar loop for labeling and research. Confidence is the
+        raw detector score (no feature scoring or zone-retest filter).
+
+        Args:
+            candles: List of candles or a CandleArray
+            min_confidence: Minimum raw confidence
+            min_bars: First bar evaluated is min_bars - 1 (detect_all needs 200)
+
+        Returns:
+            pattern_history.HISTORY_DTYPE array (end/start index, pattern,
+            signal, confidence, entry, stop, target, zone), sorted by end_index
+        """
+        # pattern_history builds on this module, so import it lazily
+        from pattern_history import detect_history
+        return detect_history(candles, self.available_patterns, min_confidence, min_bars)
 
 # ═══════════════════════════════════════════════════════════════════════════
 # FILTER ENGINE
@@ -888,6 +1111,17 @@ class FilterEngine:
 
         return True, min(1.0, score)
 
+    def passes(self, frame) -> np.ndarray:
+        """
+        Boolean mask of the detections in a filter_evaluation.DetectionFrame
+        that meet the conditions of every filter, in one vectorized pass.
+        """
+        from filter_evaluation import condition_mask
+        mask = frame.has_features.copy()
+        for f in self.filters:
+            mask &= condition_mask(frame, f.get('conditions') or {})
+        return mask
+
 # ═══════════════════════════════════════════════════════════════════════════
 # EXPORT
 # ═══════════════════════════════════════════════════════════════════════════
@@ -899,6 +1133,7 @@ __all__ = [
     'PatternDetectionEngine',
     'FilterEngine',
     'TIER_PATTERNS',
+    'ZoneIndex',
     'detect_double_bottom',
     'detect_double_top',
     'detect_head_shoulders',
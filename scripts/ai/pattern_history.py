@@ -0,0 +1,452 @@
+# scripts/ai/pattern_history.py
+# Full-history batch pattern detection
+# GEMRAL AI BRAIN - Phase 6
+#
+# Evaluates the detectors of pattern_detection_engine at every bar in one
+# vectorized pass. Row k of a sliding-window view is exactly the window
+# detect_xxx(candles[:end+1]) reads, and each kernel repeats its detector's
+# arithmetic operation for operation, so results are bit-identical to
+# per-bar calls. Windows are processed in chunks to bound memory.
+#
+# Usage:
+#   engine = PatternDetectionEngine(user_tier='TIER3')
+#   history = engine.detect_all_history(candles, min_confidence=0.0)
+#   history['end_index'], history['pattern'], history['confidence'] ...
+
+from typing import List, Dict, Tuple, Callable
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from feature_extractor import Candle, candle_column, _swing_flags
+from pattern_detection_engine import PatternType, SignalType, PatternDetection
+
+# ═══════════════════════════════════════════════════════════════════════════
+# CONFIGURATION
+# ═══════════════════════════════════════════════════════════════════════════
+
+HISTORY_CHUNK = 8192  # Windows per kernel call
+
+# One row per detection; `pattern` indexes HISTORY_PATTERNS,
+# `signal` is 1 for bullish and -1 for bearish
+HISTORY_DTYPE = np.dtype([
+    ('end_index', np.int64),
+    ('start_index', np.int64),
+    ('pattern', np.int8),
+    ('signal', np.int8),
+    ('confidence', np.float64),
+    ('entry_price', np.float64),
+    ('stop_loss', np.float64),
+    ('take_profit', np.float64),
+    ('zone_price', np.float64),
+])
+
+HISTORY_PATTERNS: List[PatternType] = list(PatternType)
+
+# Kernel output for one chunk: (valid, first bar offset in window,
+# confidence, entry, stop loss, take profit, zone price)
+Hits = Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]
+
+# ═══════════════════════════════════════════════════════════════════════════
+# HELPERS
+# ═══════════════════════════════════════════════════════════════════════════
+
+def _span(values: np.ndarray, first: np.ndarray, last: np.ndarray, reduce: str) -> np.ndarray:
+    """Per-row max/min of values[k, first[k]:last[k]+1]."""
+    positions = np.arange(values.shape[1])
+    inside = (positions >= first[:, None]) & (positions <= last[:, None])
+    if reduce == 'max':
+        return np.where(inside, values, -np.inf).max(axis=1)
+    return np.where(inside, values, np.inf).min(axis=1)
+
+def _linspace_rows(lo: np.ndarray, hi: np.ndarray, num: int) -> np.ndarray:
+    """np.linspace(lo[k], hi[k], num) for every row, with the same rounding."""
+    step = (hi - lo) / (num - 1)
+    levels = np.arange(num, dtype=np.float64)[None, :] * step[:, None] + lo[:, None]
+    levels[:, -1] = hi
+    return levels
+
+def _touch_counts(window: np.ndarray, levels: np.ndarray, tolerance: np.ndarray) -> np.ndarray:
+    """
+    np.count_nonzero(np.abs(window[k] - level) < tolerance[k]) for every
+    row k and level.
+
+    |x - L| < tol is (x - L < tol) and not (x - L <= -tol). x - L is
+    monotone in x, so each half holds on a prefix of the sorted window,
+    found by a branchless binary search over all rows and levels at once
+    (rows padded with +inf to a power of two).
+    """
+    rows, width = window.shape
+    size = 1 << int(width).bit_length()
+    padded = np.full((rows, size), np.inf)
+    padded[:, :width] = np.sort(window, axis=1)
+    flat = padded.ravel()
+
+    count = levels.shape[1]
+    both = np.concatenate([levels, levels], axis=1)
+    tol = tolerance[:, None]
+    base = (np.arange(rows) * size)[:, None]
+    position = np.repeat(base, 2 * count, axis=1)
+    take = np.empty(position.shape, dtype=bool)
+
+    step = size >> 1
+    while step:
+        diff = flat[position + (step - 1)] - both
+        np.less(diff[:, :count], tol, out=take[:, :count])
+        np.less_equal(diff[:, count:], -tol, out=take[:, count:])
+        position += take * step
+        step >>= 1
+
+    prefix = position - base
+    return prefix[:, :count] - prefix[:, count:]
+
+# ═══════════════════════════════════════════════════════════════════════════
+# KERNELS
+# ═══════════════════════════════════════════════════════════════════════════
+# Each kernel takes high/low/close (and swing-high flags) covering its
+# chunk's windows and mirrors the detector of the same name.
+
+def _double_bottom(high, low, close, swing_high, lookback: int = 50) -> Hits:
+    lows = sliding_window_view(low, lookback)
+    highs = sliding_window_view(high, lookback)
+    current_price = close[lookback - 1:]
+    rows = np.arange(len(lows))
+
+    # Two lowest points, earliest first on ties (as a stable sort)
+    idx1 = lows.argmin(axis=1)
+    rest = lows.copy()
+    rest[rows, idx1] = np.inf
+    idx2 = rest.argmin(axis=1)
+    ok = np.abs(idx1 - idx2) >= 5
+
+    first, second = np.minimum(idx1, idx2), np.maximum(idx1, idx2)
+    low1, low2 = lows[rows, first], lows[rows, second]
+    ok &= ~(np.abs(low1 - low2) / low1 > 0.02)
+
+    neckline = _span(highs, first, second, 'max')
+    avg_low = (low1 + low2) / 2
+    ok &= ~((neckline - avg_low) / avg_low < 0.03)
+    ok &= ~(current_price < neckline * 0.98)
+
+    pattern_height = neckline - avg_low
+    symmetry = 1 - np.abs(low1 - low2) / avg_low
+    height_score = np.minimum(1.0, pattern_height / avg_low / 0.05)
+    breakout_score = np.where(current_price > neckline, 1.0, 0.5)
+    confidence = (symmetry * 0.3 + height_score * 0.3 + breakout_score * 0.4)
+
+    return ok, first, confidence, current_price, avg_low * 0.99, neckline + pattern_height, avg_low
+
+def _double_top(high, low, close, swing_high, lookback: int = 50) -> Hits:
+    lows = sliding_window_view(low, lookback)
+    highs = sliding_window_view(high, lookback)
+    current_price = close[lookback - 1:]
+    rows = np.arange(len(highs))
+
+    idx1 = highs.argmax(axis=1)
+    rest = highs.copy()
+    rest[rows, idx1] = -np.inf
+    idx2 = rest.argmax(axis=1)
+    ok = np.abs(idx1 - idx2) >= 5
+
+    first, second = np.minimum(idx1, idx2), np.maximum(idx1, idx2)
+    high1, high2 = highs[rows, first], highs[rows, second]
+    ok &= ~(np.abs(high1 - high2) / high1 > 0.02)
+
+    neckline = _span(lows, first, second, 'min')
+    avg_high = (high1 + high2) / 2
+    ok &= ~((avg_high - neckline) / avg_high < 0.03)
+    ok &= ~(current_price > neckline * 1.02)
+
+    pattern_height = avg_high - neckline
+    symmetry = 1 - np.abs(high1 - high2) / avg_high
+    height_score = np.minimum(1.0, pattern_height / avg_high / 0.05)
+    breakdown_score = np.where(current_price < neckline, 1.0, 0.5)
+    confidence = (symmetry * 0.3 + height_score * 0.3 + breakdown_score * 0.4)
+
+    return ok, first, confidence, current_price, avg_high * 1.01, neckline - pattern_height, avg_high
+
+def _head_shoulders(high, low, close, swing_high, lookback: int = 60) -> Hits:
+    lows = sliding_window_view(low, lookback)
+    highs = sliding_window_view(high, lookback)
+    current_price = close[lookback - 1:]
+    rows = np.arange(len(highs))
+    positions = np.arange(lookback)
+
+    # Peaks need two bars on each side inside the window
+    inner = (positions >= 2) & (positions <= lookback - 3)
+    is_peak = sliding_window_view(swing_high, lookback) & inner
+    ok = np.count_nonzero(is_peak, axis=1) >= 3
+
+    head = np.where(is_peak, highs, -np.inf).argmax(axis=1)
+    left = np.where(is_peak & (positions < head[:, None]), positions, -1).max(axis=1)
+    right = np.where(is_peak & (positions > head[:, None]), positions, lookback).min(axis=1)
+    ok &= (left >= 0) & (right < lookback)
+    left = np.maximum(left, 0)
+    right = np.minimum(right, lookback - 1)
+
+    left_shoulder, head_high, right_shoulder = highs[rows, left], highs[rows, head], highs[rows, right]
+    ok &= ~((head_high <= left_shoulder) | (head_high <= right_shoulder))
+
+    shoulder_diff = np.abs(left_shoulder - right_shoulder) / left_shoulder
+    ok &= ~(shoulder_diff > 0.15)
+
+    left_trough = _span(lows, left, head - 1, 'min')
+    right_trough = _span(lows, head, right, 'min')
+    neckline = (left_trough + right_trough) / 2
+    ok &= ~(current_price > neckline * 1.02)
+
+    pattern_height = head_high - neckline
+    shoulder_symmetry = 1 - shoulder_diff
+    head_prominence = (head_high - (left_shoulder + right_shoulder) / 2) / head_high
+    breakdown_score = np.where(current_price < neckline, 1.0, 0.5)
+    confidence = (shoulder_symmetry * 0.3 + np.minimum(head_prominence * 5, 1.0) * 0.3 + breakdown_score * 0.4)
+
+    return ok, left, confidence, current_price, right_shoulder * 1.01, neckline - pattern_height, neckline
+
+def _upu(high, low, close, swing_high, lookback: int = 40) -> Hits:
+    closes = sliding_window_view(close, lookback)
+    phase1_end = lookback // 3
+    phase2_end = phase1_end * 2
+
+    phase1_start_price = closes[:, 0]
+    phase1_end_price = closes[:, :phase1_end].max(axis=1)
+    phase1_move = (phase1_end_price - phase1_start_price) / phase1_start_price
+    ok = ~(phase1_move < 0.02)
+
+    phase2_prices = closes[:, phase1_end:phase2_end]
+    phase2_high = phase2_prices.max(axis=1)
+    phase2_low = phase2_prices.min(axis=1)
+    phase2_range = (phase2_high - phase2_low) / phase2_low
+    ok &= ~(phase2_range > 0.03)
+    ok &= phase2_end < lookback
+
+    current_price = closes[:, -1]
+    ok &= ~(current_price <= phase2_high)
+
+    confidence = np.minimum(1.0, phase1_move * 10) * 0.5 + (1 - phase2_range * 10) * 0.5
+    take_profit = current_price + (phase1_end_price - phase1_start_price)
+
+    return ok, np.zeros(len(closes), dtype=np.int64), confidence, current_price, phase2_low * 0.99, take_profit, phase2_low
+
+def _dpd(high, low, close, swing_high, lookback: int = 40) -> Hits:
+    closes = sliding_window_view(close, lookback)
+    phase1_end = lookback // 3
+    phase2_end = phase1_end * 2
+
+    phase1_start_price = closes[:, 0]
+    phase1_end_price = closes[:, :phase1_end].min(axis=1)
+    phase1_move = (phase1_start_price - phase1_end_price) / phase1_start_price
+    ok = ~(phase1_move < 0.02)
+
+    phase2_prices = closes[:, phase1_end:phase2_end]
+    phase2_high = phase2_prices.max(axis=1)
+    phase2_low = phase2_prices.min(axis=1)
+    phase2_range = (phase2_high - phase2_low) / phase2_high
+    ok &= ~(phase2_range > 0.03)
+
+    current_price = closes[:, -1]
+    ok &= ~(current_price >= phase2_low)
+
+    confidence = np.minimum(1.0, phase1_move * 10) * 0.5 + (1 - phase2_range * 10) * 0.5
+    take_profit = current_price - (phase1_start_price - phase1_end_price)
+
+    return ok, np.zeros(len(closes), dtype=np.int64), confidence, current_price, phase2_high * 1.01, take_profit, phase2_high
+
+def _frequency_zone(values, close, lookback: int, support: bool) -> Hits:
+    """Shared body of the HFZ (support, lows) and LFZ (resistance, highs) kernels."""
+    window = sliding_window_view(values, lookback)
+    current_price = close[lookback - 1:]
+    rows = np.arange(len(window))
+    zone_tolerance = current_price * 0.015
+
+    test_levels = _linspace_rows(window.min(axis=1), window.max(axis=1), 20)
+    touch_counts = _touch_counts(window, test_levels, zone_tolerance)
+
+    # First level with the most touches, if that is at least 3
+    best = touch_counts.argmax(axis=1)
+    best_touches = touch_counts[rows, best]
+    best_zone = test_levels[rows, best]
+    ok = best_touches >= 3
+
+    ok &= ~(np.abs(current_price - best_zone) / current_price > 0.03)
+    confidence = np.minimum(1.0, best_touches / 5)
+
+    if support:
+        ok &= ~(current_price < best_zone)
+        stop_loss = best_zone * 0.98
+        take_profit = current_price + (current_price - best_zone) * 2.5
+    else:
+        ok &= ~(current_price > best_zone)
+        stop_loss = best_zone * 1.02
+        take_profit = current_price - (best_zone - current_price) * 2.5
+
+    return ok, np.zeros(len(window), dtype=np.int64), confidence, current_price, stop_loss, take_profit, best_zone
+
+def _hfz(high, low, close, swing_high, lookback: int = 100) -> Hits:
+    return _frequency_zone(low, close, lookback, support=True)
+
+def _lfz(high, low, close, swing_high, lookback: int = 100) -> Hits:
+    return _frequency_zone(high, close, lookback, support=False)
+
+def _bull_flag(high, low, close, swing_high, lookback: int = 40) -> Hits:
+    closes = sliding_window_view(close, lookback)
+    highs = sliding_window_view(high, lookback)
+    lows = sliding_window_view(low, lookback)
+    pole_end = lookback // 2
+
+    pole_start_price = lows[:, :pole_end].min(axis=1)
+    pole_end_price = highs[:, :pole_end].max(axis=1)
+    pole_move = (pole_end_price - pole_start_price) / pole_start_price
+    ok = ~(pole_move < 0.05)
+
+    flag_low = closes[:, pole_end:].min(axis=1)
+    max_retrace = pole_start_price + (pole_end_price - pole_start_price) * 0.618
+    ok &= ~(flag_low < max_retrace)
+
+    current_price = closes[:, -1]
+    flag_high = highs[:, pole_end:].max(axis=1)
+    ok &= ~(current_price < flag_high * 0.98)
+
+    retrace_pct = (pole_end_price - flag_low) / (pole_end_price - pole_start_price)
+    confidence = np.minimum(1.0, pole_move * 5) * 0.5 + (1 - retrace_pct) * 0.5
+    take_profit = current_price + (pole_end_price - pole_start_price)
+
+    return ok, np.zeros(len(closes), dtype=np.int64), confidence, current_price, flag_low * 0.99, take_profit, flag_low
+
+def _bear_flag(high, low, close, swing_high, lookback: int = 40) -> Hits:
+    closes = sliding_window_view(close, lookback)
+    highs = sliding_window_view(high, lookback)
+    lows = sliding_window_view(low, lookback)
+    pole_end = lookback // 2
+
+    pole_start_price = highs[:, :pole_end].max(axis=1)
+    pole_end_price = lows[:, :pole_end].min(axis=1)
+    pole_move = (pole_start_price - pole_end_price) / pole_start_price
+    ok = ~(pole_move < 0.05)
+
+    flag_high = closes[:, pole_end:].max(axis=1)
+    max_retrace = pole_start_price - (pole_start_price - pole_end_price) * 0.618
+    ok &= ~(flag_high > max_retrace)
+
+    current_price = closes[:, -1]
+    flag_low = lows[:, pole_end:].min(axis=1)
+    ok &= ~(current_price > flag_low * 1.02)
+
+    retrace_pct = (flag_high - pole_end_price) / (pole_start_price - pole_end_price)
+    confidence = np.minimum(1.0, pole_move * 5) * 0.5 + (1 - retrace_pct) * 0.5
+    take_profit = current_price - (pole_start_price - pole_end_price)
+
+    return ok, np.zeros(len(closes), dtype=np.int64), confidence, current_price, flag_high * 1.01, take_profit, flag_high
+
+# Kernel, lookback (the detector's default), signal, zone type
+HISTORY_KERNELS: Dict[PatternType, Tuple[Callable, int, SignalType, str]] = {
+    PatternType.DOUBLE_BOTTOM: (_double_bottom, 50, SignalType.BULLISH, 'support'),
+    PatternType.DOUBLE_TOP: (_double_top, 50, SignalType.BEARISH, 'resistance'),
+    PatternType.HEAD_SHOULDERS: (_head_shoulders, 60, SignalType.BEARISH, 'support'),
+    PatternType.UPU: (_upu, 40, SignalType.BULLISH, 'support'),
+    PatternType.DPD: (_dpd, 40, SignalType.BEARISH, 'resistance'),
+    PatternType.HFZ: (_hfz, 100, SignalType.BULLISH, 'support'),
+    PatternType.LFZ: (_lfz, 100, SignalType.BEARISH, 'resistance'),
+    PatternType.BULL_FLAG: (_bull_flag, 40, SignalType.BULLISH, 'support'),
+    PatternType.BEAR_FLAG: (_bear_flag, 40, SignalType.BEARISH, 'resistance'),
+}
+
+# ═══════════════════════════════════════════════════════════════════════════
+# BATCH DETECTION
+# ═══════════════════════════════════════════════════════════════════════════
+
+def detect_history(
+    candles: List[Candle],
+    patterns: List[PatternType],
+    min_confidence: float = 0.0,
+    min_bars: int = 0
+) -> np.ndarray:
+    """
+    Run the given detectors at every bar.
+
+    A row for bar `end` is what detect_xxx(candles[:end+1]) returns (raw
+    detector confidence, no feature scoring). Bars before the detector's
+    lookback, or before min_bars candles, are skipped.
+
+    Returns:
+        HISTORY_DTYPE array sorted by end_index, then by `patterns` order
+    """
+    high = candle_column(candles, 'high')
+    low = candle_column(candles, 'low')
+    close = candle_column(candles, 'close')
+    n = len(close)
+
+    swing_high = np.zeros(n, dtype=bool)
+    if n > 4:
+        swing_high[2:-2] = _swing_flags(high, True)
+
+    parts = []
+    for order, pattern_type in enumerate(patterns):
+        if pattern_type not in HISTORY_KERNELS:
+            continue
+        kernel, lookback, signal_type, _ = HISTORY_KERNELS[pattern_type]
+
+        for chunk_start in range(max(lookback, min_bars, 1) - 1, n, HISTORY_CHUNK):
+            chunk_end = min(chunk_start + HISTORY_CHUNK, n)
+            window = slice(chunk_start - lookback + 1, chunk_end)
+
+            with np.errstate(all='ignore'):
+                ok, first, confidence, entry, stop, target, zone = kernel(
+                    high[window], low[window], close[window], swing_high[window], lookback
+                )
+            ok &= ~(confidence < min_confidence)
+            hits = np.flatnonzero(ok)
+            if not len(hits):
+                continue
+
+            rows = np.empty(len(hits), dtype=HISTORY_DTYPE)
+            rows['end_index'] = chunk_start + hits
+            rows['start_index'] = chunk_start + hits - lookback + 1 + first[hits]
+            rows['pattern'] = HISTORY_PATTERNS.index(pattern_type)
+            rows['signal'] = 1 if signal_type == SignalType.BULLISH else -1
+            rows['confidence'] = confidence[hits]
+            rows['entry_price'] = entry[hits]
+            rows['stop_loss'] = stop[hits]
+            rows['take_profit'] = target[hits]
+            rows['zone_price'] = zone[hits]
+            parts.append((order, rows))
+
+    if not parts:
+        return np.empty(0, dtype=HISTORY_DTYPE)
+
+    history = np.concatenate([rows for _, rows in parts])
+    orders = np.concatenate([np.full(len(rows), order) for order, rows in parts])
+    return history[np.lexsort((orders, history['end_index']))]
+
+def history_detections(history: np.ndarray) -> List[PatternDetection]:
+    """Expand history rows into PatternDetection objects (without pattern_data)."""
+    detections = []
+    for row in history.tolist():
+        end_index, start_index, pattern, _, confidence, entry, stop, target, zone = row
+        pattern_type = HISTORY_PATTERNS[pattern]
+        _, _, signal_type, zone_type = HISTORY_KERNELS[pattern_type]
+        detections.append(PatternDetection(
+            pattern_type=pattern_type,
+            signal_type=signal_type,
+            confidence=confidence,
+            start_index=start_index,
+            end_index=end_index,
+            entry_price=entry,
+            stop_loss=stop,
+            take_profit=target,
+            zone_price=zone,
+            zone_type=zone_type,
+        ))
+    return detections
+
+# ═══════════════════════════════════════════════════════════════════════════
+# EXPORT
+# ═══════════════════════════════════════════════════════════════════════════
+
+__all__ = [
+    'HISTORY_DTYPE',
+    'HISTORY_PATTERNS',
+    'HISTORY_KERNELS',
+    'detect_history',
+    'history_detections',
+]
@@ -0,0 +1,51 @@
+# scripts/ai/vector_index.py
+# Local vector index for RAG retrieval (shared with the backend)
+# GEMRAL AI BRAIN - Phase 1
+#
+# The index lives in backend/app/core/vector_index.py, where the chat
+# backend serves retrieval from it. That file only depends on numpy; it is
+# loaded here by path so ingestion and benchmarks do not import the backend
+# app package (pydantic-settings, Supabase settings). Ingestion keeps a
+# snapshot at VECTOR_INDEX_PATH in sync; the backend opens the same
+# snapshot through KNOWLEDGE_INDEX_PATH.
+
+import importlib.util
+import os
+import sys
+
+# ═══════════════════════════════════════════════════════════════════════════
+# CONFIGURATION
+# ═══════════════════════════════════════════════════════════════════════════
+
+BACKEND_DIR = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'backend'))
+INDEX_MODULE_PATH = os.path.join(BACKEND_DIR, 'app', 'core', 'vector_index.py')
+
+VECTOR_INDEX_PATH = os.getenv('VECTOR_INDEX_PATH')  # Snapshot directory (unset = no local index)
+
+# ═══════════════════════════════════════════════════════════════════════════
+# MODULE
+# ═══════════════════════════════════════════════════════════════════════════
+
+_spec = importlib.util.spec_from_file_location('gemral_vector_index', INDEX_MODULE_PATH)
+_module = importlib.util.module_from_spec(_spec)
+sys.modules[_spec.name] = _module
+_spec.loader.exec_module(_module)
+
+VectorIndex = _module.VectorIndex
+add_chunk_rows = _module.add_chunk_rows
+load_from_supabase = _module.load_from_supabase
+snapshot_exists = _module.snapshot_exists
+sync_from_supabase = _module.sync_from_supabase
+
+# ═══════════════════════════════════════════════════════════════════════════
+# EXPORT
+# ═══════════════════════════════════════════════════════════════════════════
+
+__all__ = [
+    'VectorIndex',
+    'add_chunk_rows',
+    'load_from_supabase',
+    'snapshot_exists',
+    'sync_from_supabase',
+    'VECTOR_INDEX_PATH',
+]
@@ -0,0 +1,242 @@
+# scripts/ai/vectorized_indicators.py
+# NumPy implementations of the feature_extractor indicators
+# GEMRAL AI BRAIN - Phase 7
+#
+# Same signatures, padding and warm-up conventions as calculate_ema /
+# calculate_rsi / calculate_atr / calculate_macd in feature_extractor.py,
+# but computed on whole arrays. Every function also accepts 2-D input of
+# shape (n_series, n_candles) so many symbols can be computed in one call.
+#
+# Results match the list versions to floating-point rounding (the
+# recursive EMA/RSI filters are evaluated blockwise in closed form, and
+# window sums use NumPy's summation order). Use the list versions where
+# bit-identical output matters (e.g. the streaming backtest).
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from typing import List, Tuple, Union
+
+from feature_extractor import (
+    Candle, CandleArray, candle_column,
+    RSI_PERIOD, ATR_PERIOD, MACD_FAST, MACD_SLOW, MACD_SIGNAL,
+)
+
+ArrayLike = Union[List[float], np.ndarray]
+
+# ═══════════════════════════════════════════════════════════════════════════
+# CONFIGURATION
+# ═══════════════════════════════════════════════════════════════════════════
+
+# Largest d^-k scale factor allowed inside one closed-form block of the
+# first-order filter. Bounds the rounding error growth to ~1e-13 relative.
+MAX_BLOCK_GROWTH = 1e3
+
+# ═══════════════════════════════════════════════════════════════════════════
+# HELPERS
+# ═══════════════════════════════════════════════════════════════════════════
+
+def _as_2d(values: ArrayLike) -> Tuple[np.ndarray, bool]:
+    """Return (float64 array with shape (n_series, n), was_1d)."""
+    arr = np.asarray(values, dtype=np.float64)
+    if arr.ndim == 1:
+        return arr[None, :], True
+    if arr.ndim != 2:
+        raise ValueError(f'Expected 1-D or 2-D input, got shape {arr.shape}')
+    return arr, False
+
+def _restore(arr: np.ndarray, was_1d: bool) -> np.ndarray:
+    return arr[0] if was_1d else arr
+
+def exponential_filter(x: np.ndarray, alpha: float, initial: np.ndarray) -> np.ndarray:
+    """
+    Evaluate y[t] = y[t-1] + alpha * (x[t] - y[t-1]) along the last axis.
+
+    `initial` is y[-1] for each row. The series is cut into blocks of
+    length B (d = 1 - alpha, B chosen so d^-B stays below MAX_BLOCK_GROWTH)
+    and every block is solved at once in closed form from a zero start:
+
+        local[k] = alpha * d^k * cumsum(x[j] * d^-j)
+
+    The true start value of each block (the carry) follows
+    carry' = D * carry + local[-1] with D = d^B <= ~1e-3, so only the last
+    few block ends contribute above float precision and the carries are
+    a short sum of shifted arrays. Finally y[k] = local[k] + d^(k+1) * carry.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    rows, n = x.shape
+    initial = np.asarray(initial, dtype=np.float64).reshape(rows)
+
+    if n == 0:
+        return np.empty_like(x)
+
+    decay = 1.0 - alpha
+    if decay <= 0.0:
+        return x.copy()
+
+    block = max(1, min(n, int(np.log(MAX_BLOCK_GROWTH) / -np.log(decay))))
+    n_blocks = -(-n // block)
+    powers = decay ** np.arange(block)         # d^k
+    inverse = decay ** -np.arange(block)       # d^-k
+
+    padded = np.zeros((rows, n_blocks * block))
+    padded[:, :n] = x
+    blocks = padded.reshape(rows, n_blocks, block)
+
+    local = alpha * powers * np.cumsum(blocks * inverse, axis=2)
+
+    # Carry each block's start value forward (block_decay = d^B)
+    block_decay = decay ** block
+    ends = local[:, :, -1]
+    carries = np.outer(initial, block_decay ** np.arange(n_blocks))
+    if n_blocks > 1:
+        # D^terms < 1e-17: older block ends are below float precision
+        terms = n_blocks - 1
+        if 0.0 < block_decay < 1.0:
+            terms = min(terms, int(np.ceil(np.log(1e-17) / np.log(block_decay))))
+        for m in range(terms):
+            carries[:, m + 1:] += block_decay ** m * ends[:, :n_blocks - m - 1]
+
+    out = local + (decay * powers) * carries[:, :, None]
+    return out.reshape(rows, -1)[:, :n]
+
+def stack_column(series: List[CandleArray], field: str) -> np.ndarray:
+    """Stack one column of equal-length candle series into (n_series, n)."""
+    columns = [candle_column(candles, field) for candles in series]
+    lengths = {len(col) for col in columns}
+    if len(lengths) > 1:
+        raise ValueError(f'All series must have the same length, got {sorted(lengths)}')
+    return np.vstack(columns) if columns else np.empty((0, 0))
+
+# ═══════════════════════════════════════════════════════════════════════════
+# INDICATORS
+# ═══════════════════════════════════════════════════════════════════════════
+
+def calculate_ema(prices: ArrayLike, period: int) -> np.ndarray:
+    """Calculate Exponential Moving Average."""
+    x, was_1d = _as_2d(prices)
+    n = x.shape[1]
+
+    if n < period:
+        # Not enough data: repeat the first price (empty stays empty)
+        return _restore(np.repeat(x[:, :1], n, axis=1), was_1d)
+
+    seed = x[:, :period].sum(axis=1) / period
+    out = np.empty_like(x)
+    out[:, :period] = seed[:, None]  # Pad beginning with first EMA value
+    out[:, period:] = exponential_filter(x[:, period:], 2 / (period + 1), seed)
+
+    return _restore(out, was_1d)
+
+def calculate_rsi(prices: ArrayLike, period: int = RSI_PERIOD) -> np.ndarray:
+    """Calculate Relative Strength Index (Wilder smoothing)."""
+    x, was_1d = _as_2d(prices)
+    n = x.shape[1]
+
+    if n < period + 1:
+        return _restore(np.full_like(x, 50.0), was_1d)
+
+    deltas = np.diff(x, axis=1)
+    gains = np.where(deltas > 0, deltas, 0.0)
+    losses = np.where(deltas < 0, -deltas, 0.0)
+
+    avg_gain = exponential_filter(gains[:, period:], 1 / period, gains[:, :period].sum(axis=1) / period)
+    avg_loss = exponential_filter(losses[:, period:], 1 / period, losses[:, :period].sum(axis=1) / period)
+
+    out = np.full_like(x, 50.0)  # Pad beginning (period deltas + first price)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rsi = 100 - (100 / (1 + avg_gain / avg_loss))
+    out[:, period + 1:] = np.where(avg_loss == 0, 100.0, rsi)
+
+    return _restore(out, was_1d)
+
+def atr_from_columns(
+    high: ArrayLike,
+    low: ArrayLike,
+    close: ArrayLike,
+    period: int = ATR_PERIOD
+) -> np.ndarray:
+    """ATR from high/low/close arrays (1-D or 2-D)."""
+    h, was_1d = _as_2d(high)
+    l, _ = _as_2d(low)
+    c, _ = _as_2d(close)
+    n = h.shape[1]
+
+    if n < 2:
+        return _restore(np.zeros_like(h), was_1d)
+
+    tr = np.empty_like(h)
+    tr[:, 0] = h[:, 0] - l[:, 0]
+    prev_close = c[:, :-1]
+    tr[:, 1:] = np.maximum.reduce([
+        h[:, 1:] - l[:, 1:],
+        np.abs(h[:, 1:] - prev_close),
+        np.abs(l[:, 1:] - prev_close),
+    ])
+
+    out = np.empty_like(tr)
+
+    # Expanding mean until a full window is available
+    head = min(period, n)
+    out[:, :head] = np.cumsum(tr[:, :head], axis=1) / np.arange(1, head + 1)
+
+    # Simple moving average of true ranges
+    if n > period:
+        out[:, period:] = sliding_window_view(tr, period, axis=1)[:, 1:].sum(axis=2) / period
+
+    return _restore(out, was_1d)
+
+def calculate_atr(candles: Union[CandleArray, List[Candle]], period: int = ATR_PERIOD) -> np.ndarray:
+    """Calculate Average True Range."""
+    return atr_from_columns(
+        candle_column(candles, 'high'),
+        candle_column(candles, 'low'),
+        candle_column(candles, 'close'),
+        period,
+    )
+
+def calculate_macd(prices: ArrayLike) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Calculate MACD, Signal line, and Histogram."""
+    ema_fast = calculate_ema(prices, MACD_FAST)
+    ema_slow = calculate_ema(prices, MACD_SLOW)
+
+    macd_line = ema_fast - ema_slow
+    signal_line = calculate_ema(macd_line, MACD_SIGNAL)
+    histogram = macd_line - signal_line
+
+    return macd_line, signal_line, histogram
+
+# ═══════════════════════════════════════════════════════════════════════════
+# EXPORT
+# ═══════════════════════════════════════════════════════════════════════════
+
+__all__ = [
+    'calculate_ema',
+    'calculate_rsi',
+    'calculate_atr',
+    'calculate_macd',
+    'atr_from_columns',
+    'exponential_filter',
+    'stack_column',
+]
+
+if __name__ == '__main__':
+    # Quick comparison against the list implementations
+    import feature_extractor as fe
+
+    rng = np.random.default_rng(42)
+    closes = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, 2000)))
+    spread = closes * rng.uniform(0, 0.01, 2000)
+    candles = CandleArray(np.arange(2000) * 3_600_000, closes, closes + spread, closes - spread, closes, np.ones(2000))
+    prices = closes.tolist()
+
+    checks = {
+        'EMA(20)': (fe.calculate_ema(prices, 20), calculate_ema(closes, 20)),
+        'RSI(14)': (fe.calculate_rsi(prices), calculate_rsi(closes)),
+        'ATR(14)': (fe.calculate_atr(candles), calculate_atr(candles)),
+        'MACD hist': (fe.calculate_macd(prices)[2], calculate_macd(closes)[2]),
+    }
+    for name, (expected, actual) in checks.items():
+        print(f'{name:10s} max abs diff: {np.max(np.abs(np.asarray(expected) - actual)):.2e}')
+
+    batch = calculate_rsi(np.vstack([closes, closes[::-1]]))
+    print(f'Batched RSI shape: {batch.shape}')
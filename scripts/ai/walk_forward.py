@@ -0,0 +1,622 @@
+# scripts/ai/walk_forward.py
+# Walk-forward (rolling out-of-sample) evaluation of BacktestConfig grids
+# GEMRAL AI BRAIN - Phase 7
+#
+# History is split into rolling windows: each one optimizes the grid on a
+# train slice and trades the winning parameters on the test slice right
+# after it. Only the test slices are reported as out-of-sample results,
+# stitched into one equity curve with stability metrics across windows.
+#
+# Signals are causal (the signal at candle i only sees candles[:i+1]), so
+# they are collected once per (symbol, timeframe) over the full history
+# and shared by every window through the parameter_sweep signal cache;
+# windows then only replay position management. Windows run in parallel
+# processes. Candles are read from the local candle cache (candle_cache.py),
+# so a run needs no network once the cache is filled.
+#
+# Usage:
+#   python walk_forward.py --days 730 --timeframes 1h --workers 8
+#   python walk_forward.py --symbols BTCUSDT ETHUSDT --train-days 90 --test-days 30
+#   python walk_forward.py --fetch            # fill missing candles first (network)
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import time
+from bisect import bisect_left
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, replace
+from datetime import datetime, timedelta
+from typing import List, Dict, Any, Optional, Tuple
+
+import numpy as np
+
+from feature_extractor import CandleArray
+from backtest_engine import BacktestConfig, BacktestEngine, Signal, TradeDirection, TradeOutcome
+from parameter_sweep import (
+    DEFAULT_GRID, RANK_KEYS, SIGNAL_CACHE_DIR, expand_grid, load_or_collect_signals,
+)
+
+# ═══════════════════════════════════════════════════════════════════════════
+# CONFIGURATION
+# ═══════════════════════════════════════════════════════════════════════════
+
+DEFAULT_TRAIN_DAYS = 180
+DEFAULT_TEST_DAYS = 30
+MIN_TRAIN_TRADES = 20     # Configs with fewer train trades rank below the rest
+WARMUP_CANDLES = 200      # Replay starts trading at candle 200 of a slice
+
+DAY_MS = 86_400_000
+
+# ═══════════════════════════════════════════════════════════════════════════
+# DATA CLASSES
+# ═══════════════════════════════════════════════════════════════════════════
+
+@dataclass
+class WalkForwardWindow:
+    """One train/test split; times are candle open times in ms, end exclusive."""
+    index: int
+    train_start: int
+    train_end: int
+    test_start: int
+    test_end: int
+
+@dataclass
+class WindowResult:
+    """Best train parameters of one window and how they did on its test slice."""
+    window: WalkForwardWindow
+    params: Dict[str, Any]
+    qualified: bool           # Best config had at least min_trades train trades
+    train: Dict[str, Any]     # Summary metrics of the best config on the train slice
+    test: Dict[str, Any]      # Same config on the test slice
+    test_equity: List[Dict]   # Test slice equity curve [{time, equity, drawdown}]
+    configs: int
+    seconds: float
+
+# ═══════════════════════════════════════════════════════════════════════════
+# WINDOWS
+# ═══════════════════════════════════════════════════════════════════════════
+
+def make_windows(
+    start_ts: int,
+    end_ts: int,
+    train_days: int = DEFAULT_TRAIN_DAYS,
+    test_days: int = DEFAULT_TEST_DAYS,
+    step_days: Optional[int] = None
+) -> List[WalkForwardWindow]:
+    """
+    Rolling windows over [start_ts, end_ts): a train_days train slice
+    followed by a test_days test slice, advancing step_days (default
+    test_days, so test slices tile the range without overlap). The last
+    test slice is cut at end_ts.
+    """
+    step = (step_days or test_days) * DAY_MS
+    windows = []
+    train_start = start_ts
+
+    while True:
+        test_start = train_start + train_days * DAY_MS
+        if test_start >= end_ts:
+            break
+        windows.append(WalkForwardWindow(
+            index=len(windows),
+            train_start=train_start,
+            train_end=test_start,
+            test_start=test_start,
+            test_end=min(test_start + test_days * DAY_MS, end_ts),
+        ))
+        train_start += step
+
+    return windows
+
+def _slice_series(
+    candles: CandleArray,
+    signals: List[Signal],
+    signal_indexes: List[int],
+    start_ts: int,
+    end_ts: int
+) -> Tuple[CandleArray, List[Signal]]:
+    """
+    Candles of [start_ts, end_ts) plus WARMUP_CANDLES before them, and the
+    signals inside the range re-indexed to the slice, so replay trades
+    exactly the range and closes what is still open at its end.
+    """
+    lo = int(np.searchsorted(candles.timestamp, start_ts, side='left'))
+    hi = int(np.searchsorted(candles.timestamp, end_ts, side='left'))
+    base = max(0, lo - WARMUP_CANDLES)
+
+    first, last = bisect_left(signal_indexes, lo), bisect_left(signal_indexes, hi)
+    return candles[base:hi], [replace(s, index=s.index - base) for s in signals[first:last]]
+
+# ═══════════════════════════════════════════════════════════════════════════
+# WORKER
+# ═══════════════════════════════════════════════════════════════════════════
+
+# Per-process copy of every series, set once by the pool initializer
+_SERIES: Dict[Tuple[str, str], Tuple[CandleArray, List[Signal], List[int]]] = {}
+
+def _init_worker(candles_data: Dict[str, Dict[str, CandleArray]], signals_data: Dict[str, Dict[str, List[Signal]]]):
+    _SERIES.clear()
+    for symbol, by_timeframe in signals_data.items():
+        for timeframe, signals in by_timeframe.items():
+            _SERIES[(symbol, timeframe)] = (
+                candles_data[symbol][timeframe], signals, [s.index for s in signals]
+            )
+
+def _collect_series(task: Tuple[str, str, CandleArray, Optional[str], BacktestConfig]) -> Tuple[str, str, List[Signal]]:
+    symbol, timeframe, candles, cache_dir, config = task
+    return symbol, timeframe, load_or_collect_signals(candles, cache_dir, config)
+
+def _slice_all(start_ts: int, end_ts: int) -> Tuple[Dict, Dict]:
+    candles_data: Dict[str, Dict[str, CandleArray]] = {}
+    signals_data: Dict[str, Dict[str, List[Signal]]] = {}
+    for (symbol, timeframe), (candles, signals, indexes) in _SERIES.items():
+        sliced, window_signals = _slice_series(candles, signals, indexes, start_ts, end_ts)
+        candles_data.setdefault(symbol, {})[timeframe] = sliced
+        signals_data.setdefault(symbol, {})[timeframe] = window_signals
+    return candles_data, signals_data
+
+def _replay(
+    config: BacktestConfig,
+    candles_data: Dict[str, Dict[str, CandleArray]],
+    signals_data: Dict[str, Dict[str, List[Signal]]],
+    exit_cache: Optional[Dict] = None
+) -> BacktestEngine:
+    """BacktestEngine.run on precomputed signals, without logging or building the summary."""
+    engine = BacktestEngine(config)
+    with contextlib.redirect_stdout(io.StringIO()):
+        for symbol in config.symbols:
+            for timeframe in config.timeframes:
+                candles = candles_data.get(symbol, {}).get(timeframe)
+                if candles is not None:
+                    engine._replay_signals(symbol, timeframe, candles, signals_data[symbol][timeframe], exit_cache)
+    return engine
+
+def _metrics(engine: BacktestEngine, candles_data: Dict[str, Dict[str, CandleArray]]) -> Dict[str, Any]:
+    """
+    Summary metrics of a replay. Positions still open at the end of the
+    slice are marked to its last close for the return (run() leaves them
+    out of the capital), so short test slices are not biased downwards.
+    """
+    state = engine.state
+    trades = state.closed_trades
+    wins = sum(1 for t in trades if t.outcome == TradeOutcome.WIN)
+    gross_profit = sum(t.profit_loss for t in trades if t.profit_loss > 0)
+    gross_loss = abs(sum(t.profit_loss for t in trades if t.profit_loss < 0))
+
+    equity = state.current_capital
+    for position in state.open_positions:
+        last_close = float(candles_data[position.symbol][position.timeframe].close[-1])
+        move = last_close - position.entry_price
+        if position.direction == TradeDirection.SHORT:
+            move = -move
+        equity += position.position_value + move * position.position_size
+
+    return {
+        'total_trades': len(trades),
+        'winning_trades': wins,
+        'win_rate': wins / len(trades) if trades else 0,
+        'gross_profit': gross_profit,
+        'gross_loss': gross_loss,
+        'profit_factor': gross_profit / gross_loss if gross_loss > 0 else 0,
+        'max_drawdown': state.max_drawdown,
+        'open_positions': len(state.open_positions),
+        'total_return_percent': (equity - engine.config.initial_capital) / engine.config.initial_capital * 100,
+    }
+
+def _run_window(task: Tuple[WalkForwardWindow, BacktestConfig, List[Dict[str, Any]], str, int]) -> WindowResult:
+    """Optimize the grid on the window's train slice, then trade the winner on its test slice."""
+    window, base_config, combos, rank_by, min_trades = task
+    started = time.perf_counter()
+
+    train_candles, train_signals = _slice_all(window.train_start, window.train_end)
+    exit_cache: Dict = {}
+    best = None
+
+    for params in combos:
+        engine = _replay(replace(base_config, **params), train_candles, train_signals, exit_cache)
+        metrics = _metrics(engine, train_candles)
+        score = metrics[rank_by] if rank_by != 'max_drawdown' else -metrics[rank_by]
+        key = (metrics['total_trades'] >= min_trades, score)
+        if best is None or key > best[0]:
+            best = (key, params, metrics)
+
+    (qualified, _), params, train_metrics = best
+    test_candles, test_signals = _slice_all(window.test_start, window.test_end)
+    engine = _replay(replace(base_config, **params), test_candles, test_signals)
+
+    return WindowResult(
+        window=window,
+        params=params,
+        qualified=qualified,
+        train=train_metrics,
+        test=_metrics(engine, test_candles),
+        test_equity=engine.state.equity_curve,
+        configs=len(combos),
+        seconds=time.perf_counter() - started,
+    )
+
+# ═══════════════════════════════════════════════════════════════════════════
+# REPORT
+# ═══════════════════════════════════════════════════════════════════════════
+
+def stitch_equity(results: List[WindowResult], initial_capital: float) -> List[Dict]:
+    """
+    One out-of-sample equity curve: each test slice starts from the
+    capital the previous one ended with (its curve is rescaled by that
+    factor). Drawdown is measured from the running peak of the stitched
+    curve.
+    """
+    capital = initial_capital
+    peak = initial_capital
+    curve = []
+
+    for result in results:
+        scale = capital / initial_capital
+        points = [(point['time'], point['equity'] * scale) for point in result.test_equity]
+        capital *= 1 + result.test['total_return_percent'] / 100
+        points.append((datetime.fromtimestamp(result.window.test_end / 1000).isoformat(), capital))
+
+        for time_iso, equity in points:
+            peak = max(peak, equity)
+            curve.append({
+                'time': time_iso,
+                'equity': equity,
+                'drawdown': (peak - equity) / peak if peak > 0 else 0.0,
+                'window': result.window.index,
+            })
+
+    return curve
+
+def stability_metrics(results: List[WindowResult], equity: List[Dict], initial_capital: float) -> Dict[str, Any]:
+    """
+    Out-of-sample totals and how consistent the windows were: spread of
+    test returns and win rates, in-sample vs out-of-sample degradation,
+    walk-forward efficiency (OOS return per day / IS return per day) and
+    how often the chosen parameters changed.
+    """
+    if not results:
+        return {}
+
+    test_returns = np.array([r.test['total_return_percent'] for r in results])
+    train_returns = np.array([r.train['total_return_percent'] for r in results])
+    test_win_rates = np.array([r.test['win_rate'] for r in results if r.test['total_trades']])
+    train_win_rates = np.array([r.train['win_rate'] for r in results if r.train['total_trades']])
+
+    train_days = np.array([(r.window.train_end - r.window.train_start) / DAY_MS for r in results])
+    test_days = np.array([(r.window.test_end - r.window.test_start) / DAY_MS for r in results])
+    is_per_day = float(np.mean(train_returns / train_days))
+    oos_per_day = float(np.mean(test_returns / test_days))
+
+    trades = sum(r.test['total_trades'] for r in results)
+    wins = sum(r.test['winning_trades'] for r in results)
+    gross_profit = sum(r.test['gross_profit'] for r in results)
+    gross_loss = sum(r.test['gross_loss'] for r in results)
+
+    chosen = [json.dumps(r.params, sort_keys=True) for r in results]
+    most_common, count = Counter(chosen).most_common(1)[0]
+    final_equity = equity[-1]['equity'] if equity else initial_capital
+
+    return {
+        'windows': len(results),
+        'oos_trades': trades,
+        'oos_win_rate': wins / trades if trades else 0.0,
+        'oos_profit_factor': gross_profit / gross_loss if gross_loss > 0 else 0.0,
+        'oos_return_percent': (final_equity / initial_capital - 1) * 100,
+        'oos_max_drawdown': max((p['drawdown'] for p in equity), default=0.0),
+        'profitable_windows': float(np.mean(test_returns > 0)),
+        'test_return_mean': float(test_returns.mean()),
+        'test_return_std': float(test_returns.std()),
+        'test_win_rate_mean': float(test_win_rates.mean()) if len(test_win_rates) else 0.0,
+        'test_win_rate_std': float(test_win_rates.std()) if len(test_win_rates) else 0.0,
+        'win_rate_degradation': (
+            float(train_win_rates.mean() - test_win_rates.mean())
+            if len(train_win_rates) and len(test_win_rates) else 0.0
+        ),
+        'walk_forward_efficiency': oos_per_day / is_per_day if is_per_day > 0 else 0.0,
+        'param_changes': sum(a != b for a, b in zip(chosen, chosen[1:])),
+        'most_common_params': json.loads(most_common),
+        'most_common_params_share': count / len(results),
+        'unqualified_windows': sum(not r.qualified for r in results),
+    }
+
+def _window_row(result: WindowResult) -> Dict[str, Any]:
+    window = result.window
+    iso = lambda ts: datetime.fromtimestamp(ts / 1000).isoformat()
+    return {
+        'index': window.index,
+        'train_from': iso(window.train_start),
+        'train_to': iso(window.train_end),
+        'test_from': iso(window.test_start),
+        'test_to': iso(window.test_end),
+        'params': result.params,
+        'qualified': result.qualified,
+        'train': result.train,
+        'test': result.test,
+        'seconds': result.seconds,
+    }
+
+# ═══════════════════════════════════════════════════════════════════════════
+# DATA
+# ═══════════════════════════════════════════════════════════════════════════
+
+def load_cached_candles(
+    symbols: List[str],
+    timeframes: List[str],
+    date_from: datetime,
+    date_to: datetime,
+    cache=None,
+    source: str = 'binance',
+    derive_timeframes: bool = True
+) -> Dict[str, Dict[str, CandleArray]]:
+    """
+    Candles opening in [date_from, date_to) from the local candle cache
+    only (no network). Ranges the cache does not cover are reported and
+    left out.
+
+    derive_timeframes mirrors fetch_all_symbols: when every timeframe is
+    a multiple of the finest, only that base timeframe is in the cache,
+    so it is loaded and the others are resampled from it.
+    """
+    from candle_cache import CandleDiskCache
+    from candle_resampler import base_timeframe_for, covering_end, derive_range
+
+    cache = cache if cache is not None else CandleDiskCache()
+    start_ts, end_ts = int(date_from.timestamp() * 1000), int(date_to.timestamp() * 1000) - 1
+    base = base_timeframe_for(timeframes) if derive_timeframes and len(set(timeframes)) > 1 else None
+    result: Dict[str, Dict[str, CandleArray]] = {}
+
+    def load(symbol: str, timeframe: str, until: int) -> CandleArray:
+        candles, missing = cache.load(symbol, timeframe, start_ts, until, source)
+        if missing:
+            print(f'[WalkForward] {symbol} {timeframe}: {len(candles)} cached candles, '
+                  f'{len(missing)} range(s) not in the candle cache')
+        return candles
+
+    for symbol in symbols:
+        result[symbol] = {}
+        if base:
+            candles = load(symbol, base, covering_end(end_ts, base, timeframes))
+            if len(candles):
+                for timeframe in timeframes:
+                    result[symbol][timeframe] = derive_range(candles, base, timeframe, start_ts, end_ts)
+                continue
+            # Nothing at the base timeframe: fetched with derive_timeframes=False
+        for timeframe in timeframes:
+            result[symbol][timeframe] = load(symbol, timeframe, end_ts)
+
+    return result
+
+# ═══════════════════════════════════════════════════════════════════════════
+# RUNNER
+# ═══════════════════════════════════════════════════════════════════════════
+
+def run_walk_forward(
+    base_config: BacktestConfig,
+    candles_data: Dict[str, Dict[str, CandleArray]],
+    grid: Dict[str, List[Any]] = DEFAULT_GRID,
+    train_days: int = DEFAULT_TRAIN_DAYS,
+    test_days: int = DEFAULT_TEST_DAYS,
+    step_days: Optional[int] = None,
+    workers: Optional[int] = None,
+    cache_dir: Optional[str] = SIGNAL_CACHE_DIR,
+    rank_by: str = 'profit_factor',
+    min_trades: int = MIN_TRAIN_TRADES
+) -> Dict[str, Any]:
+    """
+    Walk-forward evaluation of `grid` on top of base_config over
+    base_config.symbols x base_config.timeframes.
+
+    Each window picks the config ranking best by `rank_by` on its train
+    slice (configs with fewer than min_trades trades rank last) and
+    trades it on the test slice. Results do not depend on the worker
+    count.
+
+    Returns:
+        {'settings', 'windows': [per-window rows], 'equity_curve':
+        stitched out-of-sample curve, 'stability': stability_metrics,
+        'timing'}
+    """
+    if rank_by not in RANK_KEYS:
+        raise ValueError(f'rank_by must be one of {RANK_KEYS}')
+
+    combos = expand_grid(grid)
+    workers = max(1, workers or os.cpu_count() or 1)
+
+    series = []
+    for symbol in base_config.symbols:
+        for timeframe in base_config.timeframes:
+            candles = candles_data.get(symbol, {}).get(timeframe)
+            if candles is None or len(candles) <= WARMUP_CANDLES:
+                print(f'[WalkForward] Not enough data for {symbol} {timeframe}')
+                continue
+            series.append((symbol, timeframe, CandleArray.from_candles(candles), cache_dir, base_config))
+
+    settings = {
+        'train_days': train_days,
+        'test_days': test_days,
+        'step_days': step_days or test_days,
+        'rank_by': rank_by,
+        'min_trades': min_trades,
+        'configs': len(combos),
+        'series': len(series),
+    }
+    report = {'settings': settings, 'windows': [], 'equity_curve': [], 'stability': {}, 'timing': {}}
+    if not series:
+        return report
+
+    # Stage 1: signals once per series (disk-cached across runs)
+    start = time.perf_counter()
+    if workers == 1:
+        collected = [_collect_series(task) for task in series]
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(series))) as pool:
+            collected = list(pool.map(_collect_series, series))
+
+    series_candles: Dict[str, Dict[str, CandleArray]] = {}
+    series_signals: Dict[str, Dict[str, List[Signal]]] = {}
+    for (symbol, timeframe, candles, _, _), (_, _, signals) in zip(series, collected):
+        series_candles.setdefault(symbol, {})[timeframe] = candles
+        series_signals.setdefault(symbol, {})[timeframe] = signals
+    report['timing']['signals_s'] = time.perf_counter() - start
+    print(f'[WalkForward] Signals for {len(series)} series in {report["timing"]["signals_s"]:.2f}s')
+
+    # Stage 2: windows over the span covered by both the config and the data
+    start_ts = max(int(base_config.date_from.timestamp() * 1000), min(int(s[2].timestamp[0]) for s in series))
+    end_ts = min(int(base_config.date_to.timestamp() * 1000), max(int(s[2].timestamp[-1]) for s in series) + 1)
+    windows = make_windows(start_ts, end_ts, train_days, test_days, step_days)
+    if not windows:
+        print(f'[WalkForward] History is shorter than one {train_days}-day train slice')
+        return report
+
+    print(f'[WalkForward] {len(windows)} windows x {len(combos)} configs on {min(workers, len(windows))} workers')
+
+    start = time.perf_counter()
+    tasks = [(window, base_config, combos, rank_by, min_trades) for window in windows]
+    if workers == 1:
+        _init_worker(series_candles, series_signals)
+        results = [_run_window(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(
+            max_workers=min(workers, len(windows)),
+            initializer=_init_worker,
+            initargs=(series_candles, series_signals),
+        ) as pool:
+            results = list(pool.map(_run_window, tasks))
+    report['timing']['windows_s'] = time.perf_counter() - start
+
+    equity = stitch_equity(results, base_config.initial_capital)
+    report['windows'] = [_window_row(result) for result in results]
+    report['equity_curve'] = equity
+    report['stability'] = stability_metrics(results, equity, base_config.initial_capital)
+
+    print(f'[WalkForward] Completed {len(windows)} windows in {report["timing"]["windows_s"]:.2f}s')
+    return report
+
+def format_walk_forward_report(report: Dict[str, Any]) -> str:
+    """Per-window table (in-sample vs out-of-sample) followed by the stability metrics."""
+    rows = report['windows']
+    if not rows:
+        return '(no windows)'
+
+    header = ['#', 'test_from', 'params', 'is_trades', 'is_wr', 'is_pf', 'oos_trades', 'oos_wr', 'oos_pf', 'oos_ret%']
+    lines = []
+    for row in rows:
+        train, test = row['train'], row['test']
+        lines.append([
+            str(row['index']),
+            row['test_from'][:10],
+            ' '.join(f'{k}={v}' for k, v in row['params'].items()) + ('' if row['qualified'] else ' *'),
+            str(train['total_trades']),
+            f'{train["win_rate"]:.2%}',
+            f'{train["profit_factor"]:.2f}',
+            str(test['total_trades']),
+            f'{test["win_rate"]:.2%}',
+            f'{test["profit_factor"]:.2f}',
+            f'{test["total_return_percent"]:.2f}',
+        ])
+
+    widths = [max(len(h), *(len(line[i]) for line in lines)) for i, h in enumerate(header)]
+
+    def render(cells: List[str]) -> str:
+        return '  '.join(c.rjust(w) if i != 2 else c.ljust(w) for i, (c, w) in enumerate(zip(cells, widths)))
+
+    out = [render(header), render(['-' * w for w in widths])] + [render(line) for line in lines]
+    if any(not row['qualified'] for row in rows):
+        out.append(f'* fewer than {report["settings"]["min_trades"]} train trades for every config')
+
+    stability = report['stability']
+    out += [
+        '',
+        f'Out-of-sample: {stability["oos_trades"]} trades | win rate {stability["oos_win_rate"]:.2%} | '
+        f'PF {stability["oos_profit_factor"]:.2f} | return {stability["oos_return_percent"]:.2f}% | '
+        f'max DD {stability["oos_max_drawdown"]:.2%}',
+        f'Stability: {stability["profitable_windows"]:.0%} profitable windows | '
+        f'test return {stability["test_return_mean"]:.2f}% +/- {stability["test_return_std"]:.2f}% | '
+        f'win rate {stability["test_win_rate_mean"]:.2%} +/- {stability["test_win_rate_std"]:.2%} | '
+        f'IS-OOS win rate gap {stability["win_rate_degradation"]:+.2%}',
+        f'Walk-forward efficiency {stability["walk_forward_efficiency"]:.2f} | '
+        f'params changed {stability["param_changes"]}/{max(len(rows) - 1, 0)} times | '
+        f'most common {stability["most_common_params"]} ({stability["most_common_params_share"]:.0%})',
+    ]
+    return '\n'.join(out)
+
+# ═══════════════════════════════════════════════════════════════════════════
+# CLI
+# ═══════════════════════════════════════════════════════════════════════════
+
+def main():
+    from parallel_backtest import TOP_COINS
+
+    parser = argparse.ArgumentParser(description='Walk-forward out-of-sample evaluation')
+    parser.add_argument('--symbols', nargs='+', default=TOP_COINS)
+    parser.add_argument('--timeframes', nargs='+', default=['1h'])
+    parser.add_argument('--days', type=int, default=730)
+    parser.add_argument('--end', help='Last day (YYYY-MM-DD), default now')
+    parser.add_argument('--train-days', type=int, default=DEFAULT_TRAIN_DAYS)
+    parser.add_argument('--test-days', type=int, default=DEFAULT_TEST_DAYS)
+    parser.add_argument('--step-days', type=int, default=None)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--rank-by', default='profit_factor', choices=RANK_KEYS)
+    parser.add_argument('--min-trades', type=int, default=MIN_TRAIN_TRADES)
+    parser.add_argument('--no-cache', action='store_true', help='Do not use the signal cache')
+    parser.add_argument('--fetch', action='store_true', help='Download candles missing from the candle cache first')
+    parser.add_argument('--output', help='Write the full report (with equity curve) as JSON')
+    args = parser.parse_args()
+
+    date_to = datetime.strptime(args.end, '%Y-%m-%d') if args.end else datetime.now()
+    date_from = date_to - timedelta(days=args.days)
+
+    base_config = BacktestConfig(
+        date_from=date_from,
+        date_to=date_to,
+        symbols=args.symbols,
+        timeframes=args.timeframes,
+    )
+
+    if args.fetch:
+        from historical_data_fetcher import fetch_all_symbols
+        candles_data = fetch_all_symbols(args.symbols, args.timeframes, date_from, date_to, concurrent=True)
+    else:
+        candles_data = load_cached_candles(args.symbols, args.timeframes, date_from, date_to)
+
+    report = run_walk_forward(
+        base_config,
+        candles_data,
+        train_days=args.train_days,
+        test_days=args.test_days,
+        step_days=args.step_days,
+        workers=args.workers,
+        cache_dir=None if args.no_cache else SIGNAL_CACHE_DIR,
+        rank_by=args.rank_by,
+        min_trades=args.min_trades,
+    )
+
+    print()
+    print(format_walk_forward_report(report))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2, default=str)
+        print(f'\n[WalkForward] Report written to {args.output}')
+
+# ═══════════════════════════════════════════════════════════════════════════
+# EXPORT
+# ═══════════════════════════════════════════════════════════════════════════
+
+__all__ = [
+    'WalkForwardWindow',
+    'WindowResult',
+    'make_windows',
+    'stitch_equity',
+    'stability_metrics',
+    'load_cached_candles',
+    'run_walk_forward',
+    'format_walk_forward_report',
+]
+
+if __name__ == '__main__':
+    main()
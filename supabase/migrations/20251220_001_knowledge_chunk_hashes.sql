@@ -0,0 +1,23 @@
+-- supabase/migrations/20251220_001_knowledge_chunk_hashes.sql
+-- Content hash per knowledge chunk cho incremental ingestion
+-- GEMRAL AI BRAIN - Phase 1
+
+-- ═══════════════════════════════════════════════════════════════════════════
+-- 1. CHUNK CONTENT HASH - MD5 của chunk_text (generate_content_hash)
+-- ═══════════════════════════════════════════════════════════════════════════
+
+ALTER TABLE ai_knowledge_chunks
+  ADD COLUMN IF NOT EXISTS content_hash TEXT;
+
+-- Backfill: cùng MD5 hex với Python hashlib trên UTF-8 text,
+-- nên chunks hiện có được giữ lại thay vì embed lại
+UPDATE ai_knowledge_chunks
+  SET content_hash = md5(chunk_text)
+  WHERE content_hash IS NULL;
+
+-- ═══════════════════════════════════════════════════════════════════════════
+-- 2. INDEXES
+-- ═══════════════════════════════════════════════════════════════════════════
+
+CREATE INDEX IF NOT EXISTS idx_ai_knowledge_chunks_document_hash
+  ON ai_knowledge_chunks(document_id, content_hash);
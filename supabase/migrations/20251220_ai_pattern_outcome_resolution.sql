@@ -0,0 +1,50 @@
+-- supabase/migrations/20251220_ai_pattern_outcome_resolution.sql
+-- Bulk outcome write-back cho DailyOptimizationJob (outcome_resolver.py)
+-- GEMRAL AI BRAIN - Phase 8
+
+-- ═══════════════════════════════════════════════════════════════════════════
+-- 1. PENDING INDEX - Page pending detections by id
+-- ═══════════════════════════════════════════════════════════════════════════
+
+CREATE INDEX IF NOT EXISTS idx_ai_pattern_detections_pending
+  ON ai_pattern_detections(id)
+  WHERE outcome = 'pending';
+
+-- ═══════════════════════════════════════════════════════════════════════════
+-- 2. RESOLVE PATTERN OUTCOMES - One UPDATE for a batch of outcomes
+-- ═══════════════════════════════════════════════════════════════════════════
+
+-- p_outcomes: [{"id", "outcome", "exit_price", "profit_loss_percent",
+--               "exit_reason", "exited_at"}, ...]
+-- Rows that are no longer pending are left unchanged.
+CREATE OR REPLACE FUNCTION resolve_pattern_outcomes(p_outcomes JSONB)
+RETURNS INTEGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+DECLARE
+  v_updated INTEGER;
+BEGIN
+  UPDATE ai_pattern_detections pd
+  SET
+    outcome = o.outcome,
+    exit_price = o.exit_price,
+    profit_loss_percent = o.profit_loss_percent,
+    exit_reason = o.exit_reason,
+    exited_at = o.exited_at,
+    updated_at = NOW()
+  FROM jsonb_to_recordset(p_outcomes) AS o(
+    id UUID,
+    outcome TEXT,
+    exit_price FLOAT,
+    profit_loss_percent FLOAT,
+    exit_reason TEXT,
+    exited_at TIMESTAMPTZ
+  )
+  WHERE pd.id = o.id
+    AND pd.outcome = 'pending';
+
+  GET DIAGNOSTICS v_updated = ROW_COUNT;
+  RETURN v_updated;
+END;
+$$;